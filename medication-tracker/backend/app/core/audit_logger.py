@@ -14,6 +14,7 @@ from pathlib import Path
 from app.core.validation_types import ValidationResult
 from app.services.metrics_service import MetricsService
 from app.core.evidence_collector import EvidenceCollector
+from app.security.audit_chain import AuditChain, ChainedAuditHandler
 
 class AuditEventType(Enum):
     USER_ACCESS = "user_access"
@@ -46,17 +47,12 @@ class AuditLogger:
         """
         Configure audit logger with HIPAA-compliant settings
         """
-        audit_handler = logging.FileHandler(
-            self.log_dir / "audit.log",
-            encoding="utf-8"
+        self.chain = AuditChain.for_path(str(self.log_dir / "audit.log"))
+        ChainedAuditHandler.attach(
+            self.logger,
+            self.chain,
+            logging.Formatter('%(message)s')
         )
-        audit_handler.setFormatter(
-            logging.Formatter(
-                '{"timestamp": "%(asctime)s", "level": "%(levelname)s", '
-                '"event": %(message)s}'
-            )
-        )
-        self.logger.addHandler(audit_handler)
         self.logger.setLevel(logging.INFO)
 
     async def log_event(
@@ -171,9 +167,14 @@ class AuditLogger:
             AuditEventType.SECURITY_EVENT.value,
             AuditEventType.CRITICAL_PATH.value
         ]:
-            self.logger.warning(json.dumps(sanitized_data))
+            level = logging.WARNING
         else:
-            self.logger.info(json.dumps(sanitized_data))
+            level = logging.INFO
+
+        # Stamp and write while holding the chain so file order matches it in every process
+        with self.chain.writing():
+            entry = self.chain.stamp(dict(sanitized_data, level=logging.getLevelName(level)))
+            self.logger.log(level, json.dumps(entry), extra={"audit_entry": entry})
 
     def _sanitize_sensitive_data(
         self,
@@ -208,26 +209,23 @@ class AuditLogger:
         Retrieve audit trail with filters
         """
         timestamp = datetime.utcnow().isoformat()
-        audit_trail = []
+
+        def matches(event: Dict[str, Any]) -> bool:
+            if resource_id and event.get("resource_id") != resource_id:
+                return False
+            if event_type and event.get("event_type") != event_type.value:
+                return False
+            return True
 
         try:
-            with open(self.log_dir / "audit.log", "r") as f:
-                for line in f:
-                    event = json.loads(line)
-                    
-                    # Apply filters
-                    if user_id and event.get("user_id") != user_id:
-                        continue
-                    if resource_id and event.get("resource_id") != resource_id:
-                        continue
-                    if event_type and event.get("event_type") != event_type.value:
-                        continue
-                    if start_time and event.get("timestamp") < start_time:
-                        continue
-                    if end_time and event.get("timestamp") > end_time:
-                        continue
-                    
-                    audit_trail.append(event)
+            # Checkpoints summarise each block's time range and users, so
+            # only blocks that can contain matches are read
+            audit_trail = list(self.chain.query(
+                start_time=start_time,
+                end_time=end_time,
+                user_id=user_id or None,
+                predicate=matches
+            ))
 
         except Exception as e:
             return ValidationResult(
@@ -0,0 +1,235 @@
+"""
+Batched evidence sink.
+
+Evidence records are queued in memory and written by a background thread
+to a local SQLite table in batches, one transaction per batch, instead of
+one JSON file per record. The queue is bounded: when the writer falls
+behind, new records are dropped and counted rather than blocking the
+request path, and stats() reports queue depth and drops.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BATCH = 500
+DEFAULT_MAX_QUEUE = int(os.getenv('EVIDENCE_SINK_MAX_QUEUE', '10000'))
+DROP_LOG_INTERVAL = 60.0  # Seconds between warnings about dropped records
+
+_sinks: Dict[str, "EvidenceSink"] = {}
+_sinks_lock = threading.Lock()
+
+
+def get_evidence_sink(directory: Union[str, Path]) -> "EvidenceSink":
+    """Shared sink writing to evidence.db in the given directory"""
+    path = os.path.abspath(os.path.join(str(directory), 'evidence.db'))
+    with _sinks_lock:
+        if path not in _sinks:
+            _sinks[path] = EvidenceSink(path)
+        return _sinks[path]
+
+
+def _as_iso(value: Optional[Union[str, datetime]]) -> Optional[str]:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+class EvidenceSink:
+    """Bounded queue drained in batches into a SQLite evidence table"""
+
+    def __init__(
+        self,
+        path: str,
+        max_batch: int = DEFAULT_MAX_BATCH,
+        max_queue: int = DEFAULT_MAX_QUEUE
+    ):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.max_batch = max_batch
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS evidence ("
+                "id INTEGER PRIMARY KEY, kind TEXT NOT NULL, category TEXT, "
+                "timestamp TEXT NOT NULL, data TEXT NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_evidence_kind_time "
+                "ON evidence (kind, category, timestamp)"
+            )
+            self._conn.commit()
+
+        self._progress = threading.Condition()
+        self.submitted = 0
+        self.written = 0
+        self.dropped = 0
+        self.write_errors = 0
+        self.batches = 0
+        self.high_water = 0
+        self.last_batch_size = 0
+        self.last_batch_ms = 0.0
+        self._last_drop_log = 0.0
+        self._closed = False
+
+        self._thread = threading.Thread(target=self._run, name="evidence-sink", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, kind: str, record: Dict[str, Any], category: Optional[str] = None) -> bool:
+        """Queue a record without blocking; returns False if it was dropped"""
+        timestamp = _as_iso(record.get('timestamp')) or datetime.utcnow().isoformat()
+        try:
+            data = json.dumps(record, default=str)
+        except (TypeError, ValueError) as e:
+            logger.error(f"Evidence record not serializable: {str(e)}")
+            return False
+
+        with self._progress:
+            if self._closed:
+                return False
+            self.submitted += 1
+            try:
+                self._queue.put_nowait((kind, category, timestamp, data))
+            except queue.Full:
+                self.dropped += 1
+                self._progress.notify_all()
+                now = time.monotonic()
+                if now - self._last_drop_log >= DROP_LOG_INTERVAL:
+                    self._last_drop_log = now
+                    logger.warning(f"Evidence sink full, {self.dropped} records dropped so far")
+                return False
+            self.high_water = max(self.high_water, self._queue.qsize())
+        return True
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every record submitted so far is written or dropped"""
+        with self._progress:
+            target = self.submitted
+            return self._progress.wait_for(
+                lambda: self.written + self.dropped + self.write_errors >= target
+                or not self._thread.is_alive(),
+                timeout
+            )
+
+    def query(
+        self,
+        kind: Optional[str] = None,
+        category: Optional[str] = None,
+        start_time: Optional[Union[str, datetime]] = None,
+        end_time: Optional[Union[str, datetime]] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Stored records matching the filters, oldest first"""
+        self.flush()
+        clauses, params = [], []
+        for column, op, value in (
+            ('kind', '=', kind),
+            ('category', '=', category),
+            ('timestamp', '>=', _as_iso(start_time)),
+            ('timestamp', '<=', _as_iso(end_time))
+        ):
+            if value is not None:
+                clauses.append(f"{column} {op} ?")
+                params.append(value)
+
+        sql = "SELECT data FROM evidence"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY timestamp, id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def stats(self) -> Dict[str, Any]:
+        """Backpressure and throughput counters"""
+        with self._progress:
+            return {
+                'queued': self._queue.qsize(),
+                'capacity': self._queue.maxsize,
+                'high_water': self.high_water,
+                'submitted': self.submitted,
+                'written': self.written,
+                'dropped': self.dropped,
+                'write_errors': self.write_errors,
+                'batches': self.batches,
+                'last_batch_size': self.last_batch_size,
+                'last_batch_ms': self.last_batch_ms
+            }
+
+    def purge(self, before: Union[str, datetime]) -> int:
+        """Delete records older than `before`, returning how many were removed"""
+        self.flush()
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM evidence WHERE timestamp < ?", (_as_iso(before),)
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+    def close(self) -> None:
+        with self._progress:
+            if self._closed:
+                return
+            self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+        with self._lock:
+            self._conn.close()
+
+    def _run(self) -> None:
+        while True:
+            # Block for the first record, then take whatever queued up
+            # while the previous batch was being written
+            batch = [self._queue.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = None in batch
+            batch = [item for item in batch if item is not None]
+            if batch:
+                self._write(batch)
+            if stop:
+                return
+
+    def _write(self, batch: List[tuple]) -> None:
+        started = time.perf_counter()
+        try:
+            with self._lock:
+                self._conn.executemany(
+                    "INSERT INTO evidence (kind, category, timestamp, data) VALUES (?, ?, ?, ?)",
+                    batch
+                )
+                self._conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Evidence batch write failed: {str(e)}")
+            with self._progress:
+                self.write_errors += len(batch)
+                self._progress.notify_all()
+            return
+
+        with self._progress:
+            self.written += len(batch)
+            self.batches += 1
+            self.last_batch_size = len(batch)
+            self.last_batch_ms = (time.perf_counter() - started) * 1000
+            self._progress.notify_all()
@@ -1,12 +1,21 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Optional
 from datetime import datetime, time
 from app.services.drug_interaction_service import drug_interaction_service
 from app.services.herb_drug_interaction_service import herb_drug_interaction_service
+from app.services.interaction_index import interaction_index
 from app.models.medication import Medication
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Ordering used to pick the worst interaction of a pair
+SEVERITY_RANK = {'high': 3, 'major': 3, 'medium': 2, 'moderate': 2, 'low': 1, 'minor': 1}
+
+# Herb service severities mapped onto the drug interaction scale
+HERB_SEVERITY = {'Major': 'high', 'Moderate': 'moderate', 'Minor': 'low'}
+
 class InteractionChecker:
     """
     Core service for checking medication interactions.
@@ -16,6 +25,7 @@ class InteractionChecker:
     def __init__(self):
         self.drug_service = drug_interaction_service
         self.herb_service = herb_drug_interaction_service
+        self.interaction_index = interaction_index
         
     def check_interactions(self, medications: List[Medication]) -> List[Dict]:
         """
@@ -30,45 +40,158 @@ class InteractionChecker:
         if len(medications) < 2:
             return []
             
-        interactions = []
+        regimen = self.check_regimen(medications)
+        return [
+            interaction
+            for pair in regimen['pairs']
+            for interaction in pair['interactions']
+        ]
+    
+    def check_regimen(self, medications: List[Medication]) -> Dict:
+        """
+        Screen a whole regimen in one pass
+        
+        Each drug's label data, herb lookups and dose times are resolved once,
+        then every pair is evaluated against the resolved data.
+        
+        Args:
+            medications: All medications in the regimen (e.g. a user's active list)
+            
+        Returns:
+            Deduplicated interaction matrix, see _evaluate_regimen
+        """
+        resolved = self._resolve_regimen(medications)
+        herb_results = {}
+        if resolved['herb_pairs']:
+            herb_results = self._run_sync(self._fetch_herb_interactions(resolved['herb_pairs']))
+        return self._evaluate_regimen(medications, resolved, herb_results)
+    
+    async def check_regimen_async(self, medications: List[Medication]) -> Dict:
+        """Async variant of check_regimen for callers already inside an event loop"""
+        resolved = await asyncio.to_thread(self._resolve_regimen, medications)
+        herb_results = await self._fetch_herb_interactions(resolved['herb_pairs'])
+        return self._evaluate_regimen(medications, resolved, herb_results)
+    
+    def _run_sync(self, coroutine):
+        """Run a coroutine to completion from synchronous code"""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(coroutine)
+        # Called from a thread that is running an event loop, which
+        # asyncio.run refuses; give the coroutine a loop of its own
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(asyncio.run, coroutine).result()
+    
+    def _resolve_regimen(self, medications: List[Medication]) -> Dict:
+        """Resolve per-drug data once for the whole regimen"""
+        # Index every label once so each pair below is a set lookup
+        self.interaction_index.ensure(med.name for med in medications)
+        
+        herbs = {med.name for med in medications if self._is_herb(med.name)}
+        names = {med.name for med in medications}
+        herb_pairs = sorted(
+            (herb, other) for herb in herbs for other in names if other != herb
+        )
+        
+        return {
+            'herb_pairs': herb_pairs,
+            'dose_minutes': {id(med): self._dose_minutes(med) for med in medications}
+        }
+    
+    async def _fetch_herb_interactions(self, herb_pairs: List[tuple]) -> Dict[tuple, Dict]:
+        """Look up every herb/drug pair of the regimen concurrently"""
+        if not herb_pairs:
+            return {}
+        results = await asyncio.gather(*(
+            self.herb_service.check_interaction(herb, drug) for herb, drug in herb_pairs
+        ))
+        return dict(zip(herb_pairs, results))
+    
+    def _evaluate_regimen(self, medications: List[Medication], resolved: Dict,
+                          herb_results: Dict[tuple, Dict]) -> Dict:
+        """
+        Evaluate all pairs against resolved data
+        
+        Returns:
+            Dictionary with the checked medications, one entry per interacting
+            pair (interactions deduplicated, highest severity first) and a
+            symmetric severity matrix keyed by medication id
+        """
+        pairs = []
+        matrix: Dict[str, Dict[str, str]] = {}
         checked_pairs = set()
         
         for i, med1 in enumerate(medications):
-            for j, med2 in enumerate(medications[i+1:], i+1):
+            for med2 in medications[i+1:]:
                 pair_key = tuple(sorted([med1.name, med2.name]))
                 if pair_key in checked_pairs:
                     continue
                     
                 checked_pairs.add(pair_key)
                 
-                # Check drug-drug interactions
-                drug_interactions = self.drug_service.check_interaction(med1.name, med2.name)
-                if drug_interactions:
-                    for interaction in drug_interactions:
-                        enriched = self._enrich_interaction(interaction, med1, med2)
-                        interactions.append(enriched)
+                found = []
+                drug_interactions = self.interaction_index.check_interaction(med1.name, med2.name)
+                for interaction in drug_interactions or []:
+                    found.append(dict(interaction, type='drug-drug'))
+                
+                for herb, drug in ((med1.name, med2.name), (med2.name, med1.name)):
+                    herb_interaction = self._herb_result_to_interaction(herb_results.get((herb, drug)))
+                    if herb_interaction:
+                        found.append(herb_interaction)
+                
+                found.extend(self._timing_interactions_from_minutes(
+                    med1, med2,
+                    resolved['dose_minutes'][id(med1)],
+                    resolved['dose_minutes'][id(med2)]
+                ))
                 
-                # Check herb-drug interactions if applicable
-                if self._is_herb(med1.name):
-                    herb_interactions = self.herb_service.check_interaction(med1.name, med2.name)
-                    if herb_interactions:
-                        for interaction in herb_interactions:
-                            enriched = self._enrich_interaction(interaction, med1, med2)
-                            interactions.append(enriched)
-                            
-                if self._is_herb(med2.name):
-                    herb_interactions = self.herb_service.check_interaction(med2.name, med1.name)
-                    if herb_interactions:
-                        for interaction in herb_interactions:
-                            enriched = self._enrich_interaction(interaction, med1, med2)
-                            interactions.append(enriched)
-                            
-                # Check timing-based interactions
-                timing_interactions = self._check_timing_interactions(med1, med2)
-                if timing_interactions:
-                    interactions.extend(timing_interactions)
+                interactions = []
+                seen = set()
+                for interaction in found:
+                    key = (interaction.get('type'), interaction['severity'], interaction['description'])
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    interactions.append(self._enrich_interaction(interaction, med1, med2))
+                    
+                if not interactions:
+                    continue
+                    
+                interactions.sort(key=lambda x: SEVERITY_RANK.get(x['severity'], 0), reverse=True)
+                severity = interactions[0]['severity']
+                pairs.append({
+                    'medication_ids': [med1.id, med2.id],
+                    'medications': [med1.name, med2.name],
+                    'severity': severity,
+                    'interactions': interactions
+                })
+                matrix.setdefault(str(med1.id), {})[str(med2.id)] = severity
+                matrix.setdefault(str(med2.id), {})[str(med1.id)] = severity
         
-        return interactions
+        pairs.sort(key=lambda x: SEVERITY_RANK.get(x['severity'], 0), reverse=True)
+        
+        return {
+            'medications': [{'id': med.id, 'name': med.name} for med in medications],
+            'pairs_checked': len(checked_pairs),
+            'pairs': pairs,
+            'matrix': matrix
+        }
+    
+    def _herb_result_to_interaction(self, result: Optional[Dict]) -> Optional[Dict]:
+        """Convert combined herb service data into an interaction entry"""
+        if not result or not result.get('sources'):
+            return None
+        severity = HERB_SEVERITY.get(result.get('severity'))
+        if not severity:
+            return None
+        return {
+            'severity': severity,
+            'description': result.get('effect', ''),
+            'evidence': result.get('evidence'),
+            'sources': result.get('sources'),
+            'type': 'herb-drug'
+        }
     
     def _is_herb(self, medication_name: str) -> bool:
         """Check if a medication is an herbal supplement"""
@@ -81,19 +204,38 @@ class InteractionChecker:
     
     def _check_timing_interactions(self, med1: Medication, med2: Medication) -> List[Dict]:
         """Check for interactions based on medication timing"""
-        interactions = []
+        return self._timing_interactions_from_minutes(
+            med1, med2, self._dose_minutes(med1), self._dose_minutes(med2)
+        )
+    
+    def _dose_minutes(self, med: Medication) -> List[int]:
+        """Get a medication's scheduled times as minutes since midnight"""
+        schedule = getattr(med, 'schedule', None)
+        if not schedule or not isinstance(schedule, (list, tuple)):
+            return []
         
-        # Get schedules for both medications
-        schedule1 = med1.schedule if hasattr(med1, 'schedule') else None
-        schedule2 = med2.schedule if hasattr(med2, 'schedule') else None
+        minutes = []
+        for dose_time in schedule:
+            if isinstance(dose_time, str):
+                try:
+                    hour, minute = map(int, dose_time.split(':'))
+                except ValueError:
+                    continue
+            elif isinstance(dose_time, time):
+                hour, minute = dose_time.hour, dose_time.minute
+            else:
+                continue
+            minutes.append(hour * 60 + minute)
+        return minutes
+    
+    def _timing_interactions_from_minutes(self, med1: Medication, med2: Medication,
+                                          minutes1: List[int], minutes2: List[int]) -> List[Dict]:
+        """Flag dose times of two medications that fall too close together"""
+        interactions = []
         
-        if not schedule1 or not schedule2:
-            return []
-            
-        # Check for close timing
-        for time1 in schedule1:
-            for time2 in schedule2:
-                if self._times_too_close(time1, time2):
+        for t1_mins in minutes1:
+            for t2_mins in minutes2:
+                if self._minutes_too_close(t1_mins, t2_mins):
                     interactions.append({
                         'severity': 'moderate',
                         'description': f'Medications {med1.name} and {med2.name} are scheduled too close together',
@@ -106,9 +248,14 @@ class InteractionChecker:
     def _times_too_close(self, time1: time, time2: time, min_gap_hours: int = 2) -> bool:
         """Check if two medication times are too close together"""
         # Convert times to minutes since midnight for easier comparison
-        t1_mins = time1.hour * 60 + time1.minute
-        t2_mins = time2.hour * 60 + time2.minute
-        
+        return self._minutes_too_close(
+            time1.hour * 60 + time1.minute,
+            time2.hour * 60 + time2.minute,
+            min_gap_hours
+        )
+    
+    def _minutes_too_close(self, t1_mins: int, t2_mins: int, min_gap_hours: int = 2) -> bool:
+        """Check if two times, in minutes since midnight, are too close together"""
         # Calculate difference accounting for wraparound at midnight
         diff = min(
             abs(t1_mins - t2_mins),
@@ -3,7 +3,7 @@ Metrics Collector Module
 Maintains critical path alignment and validation chain
 Last Updated: 2024-12-24T21:35:48+01:00
 """
-from datetime import datetime
+from datetime import datetime, timedelta
 from enum import Enum
 from typing import Dict, Any, List, Optional
 import json
@@ -12,6 +12,14 @@ from pathlib import Path
 
 from app.core.validation_types import ValidationResult
 from app.core.evidence_collector import EvidenceCollector
+from app.core.segmented_store import (
+    SegmentedStore,
+    COUNT,
+    TOTAL,
+    MINIMUM,
+    MAXIMUM,
+    LATEST_VALUE
+)
 
 class MetricType(Enum):
     COUNTER = "counter"
@@ -31,7 +39,10 @@ class MetricsCollector:
     def __init__(
         self,
         evidence_collector: EvidenceCollector,
-        metrics_dir: str = "/metrics"
+        metrics_dir: str = "/metrics",
+        flush_size: int = 100,
+        flush_interval: float = 5.0,
+        retention_days: Optional[int] = 30
     ):
         self.evidence_collector = evidence_collector
         self.metrics_dir = Path(metrics_dir)
@@ -40,8 +51,16 @@ class MetricsCollector:
         # Ensure metrics directory exists
         self.metrics_dir.mkdir(parents=True, exist_ok=True)
 
-        # Initialize metrics storage
-        self.metrics: Dict[str, Dict[str, Any]] = {}
+        # Append-only segments hold the values; the index keeps the catalog
+        self.store = SegmentedStore(
+            str(self.metrics_dir / "segments"),
+            flush_size=flush_size,
+            flush_interval=flush_interval,
+            retention=timedelta(days=retention_days) if retention_days else None
+        )
+
+        # Metric catalog: name -> type and category
+        self.metrics: Dict[str, Dict[str, Any]] = self.store.meta.setdefault("metrics", {})
         
         # Load existing metrics
         self._load_metrics()
@@ -81,11 +100,11 @@ class MetricsCollector:
         if metric_name not in self.metrics:
             self.metrics[metric_name] = {
                 "type": metric_type.value,
-                "category": category.value,
-                "values": []
+                "category": category.value
             }
-        
-        self.metrics[metric_name]["values"].append({
+
+        self.store.append({
+            "name": metric_name,
             "value": value,
             "labels": labels,
             "timestamp": timestamp
@@ -98,9 +117,6 @@ class MetricsCollector:
             evidence_data=metric_data
         )
 
-        # Save metrics to disk
-        self._save_metrics()
-
         # Log metric collection
         self._log_metric(metric_data)
 
@@ -129,15 +145,15 @@ class MetricsCollector:
                 timestamp=timestamp
             )
 
-        values = self.metrics[metric_name]["values"]
         filtered_values = []
 
-        for value in values:
-            # Apply time filters
-            if start_time and value["timestamp"] < start_time:
-                continue
-            if end_time and value["timestamp"] > end_time:
-                continue
+        # Only segments overlapping the time range and holding this metric are read
+        for record in self.store.query(start_time, end_time, key=metric_name):
+            value = {
+                "value": record["value"],
+                "labels": record["labels"],
+                "timestamp": record["timestamp"]
+            }
             
             # Apply label filters
             if labels:
@@ -164,32 +180,35 @@ class MetricsCollector:
 
     async def get_metrics_summary(
         self,
-        category: Optional[MetricCategory] = None
+        category: Optional[MetricCategory] = None,
+        start_time: Optional[str] = None,
+        end_time: Optional[str] = None
     ) -> ValidationResult:
         """
-        Get summary of all metrics, optionally filtered by category
+        Get summary of all metrics, optionally filtered by category and time range
         """
         timestamp = datetime.utcnow().isoformat()
         summary = {}
 
-        for metric_name, metric_data in self.metrics.items():
-            if category and metric_data["category"] != category.value:
-                continue
+        names = [
+            metric_name for metric_name, metric_data in self.metrics.items()
+            if not category or metric_data["category"] == category.value
+        ]
+        stats = self.store.stats(start_time, end_time, keys=names)
 
-            values = metric_data["values"]
-            if not values:
+        for metric_name in names:
+            if metric_name not in stats:
                 continue
 
-            latest_value = values[-1]["value"]
-            all_values = [v["value"] for v in values]
-
+            metric_data = self.metrics[metric_name]
+            values = stats[metric_name]
             summary[metric_name] = {
                 "type": metric_data["type"],
                 "category": metric_data["category"],
-                "latest_value": latest_value,
-                "min_value": min(all_values),
-                "max_value": max(all_values),
-                "avg_value": sum(all_values) / len(all_values)
+                "latest_value": values[LATEST_VALUE],
+                "min_value": values[MINIMUM],
+                "max_value": values[MAXIMUM],
+                "avg_value": values[TOTAL] / values[COUNT]
             }
 
         return ValidationResult(
@@ -237,29 +256,39 @@ class MetricsCollector:
             timestamp=timestamp
         )
 
-    def _load_metrics(self) -> None:
+    def flush(self) -> None:
         """
-        Load metrics from disk
+        Write buffered metric values to disk
         """
         try:
-            metrics_file = self.metrics_dir / "metrics.json"
-            if metrics_file.exists():
-                with open(metrics_file, "r") as f:
-                    self.metrics = json.load(f)
+            self.store.flush()
         except Exception as e:
-            self.logger.error(f"Failed to load metrics: {str(e)}")
-            self.metrics = {}
+            self.logger.error(f"Failed to save metrics: {str(e)}")
 
-    def _save_metrics(self) -> None:
+    def _load_metrics(self) -> None:
         """
-        Save metrics to disk
+        Import metrics from the legacy metrics.json file, if present
         """
+        metrics_file = self.metrics_dir / "metrics.json"
+        if not metrics_file.exists():
+            return
+
         try:
-            metrics_file = self.metrics_dir / "metrics.json"
-            with open(metrics_file, "w") as f:
-                json.dump(self.metrics, f, indent=2)
+            with open(metrics_file, "r") as f:
+                legacy = json.load(f)
+
+            for metric_name, metric_data in legacy.items():
+                self.metrics.setdefault(metric_name, {
+                    "type": metric_data["type"],
+                    "category": metric_data["category"]
+                })
+                for value in sorted(metric_data.get("values", []), key=lambda v: v["timestamp"]):
+                    self.store.buffer.append({"name": metric_name, **value})
+
+            self.store.flush()
+            metrics_file.rename(metrics_file.with_suffix(".json.migrated"))
         except Exception as e:
-            self.logger.error(f"Failed to save metrics: {str(e)}")
+            self.logger.error(f"Failed to load metrics: {str(e)}")
 
     def _log_metric(self, metric_data: Dict[str, Any]) -> None:
         """
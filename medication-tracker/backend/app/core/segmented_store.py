@@ -0,0 +1,429 @@
+"""
+Segmented Store Module
+Append-only, time-indexed record segments with buffered writes
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".ndjson"
+INDEX_FILE = "segments.json"
+
+# Per-key aggregate: [count, sum, min, max, latest_timestamp, latest_value]
+COUNT, TOTAL, MINIMUM, MAXIMUM, LATEST_TS, LATEST_VALUE = range(6)
+
+def merge_stats(target: Dict[str, List], source: Dict[str, List]) -> None:
+    """Fold per-key aggregates from source into target"""
+    for key, stats in source.items():
+        current = target.get(key)
+        if current is None:
+            target[key] = list(stats)
+            continue
+        current[COUNT] += stats[COUNT]
+        current[TOTAL] += stats[TOTAL]
+        current[MINIMUM] = min(current[MINIMUM], stats[MINIMUM])
+        current[MAXIMUM] = max(current[MAXIMUM], stats[MAXIMUM])
+        if stats[LATEST_TS] >= current[LATEST_TS]:
+            current[LATEST_TS] = stats[LATEST_TS]
+            current[LATEST_VALUE] = stats[LATEST_VALUE]
+
+@dataclass
+class Segment:
+    """One append-only file and the summary kept for it in the index"""
+    name: str
+    min_ts: Optional[str] = None
+    max_ts: Optional[str] = None
+    count: int = 0
+    size: int = 0
+    stats: Dict[str, List] = field(default_factory=dict)
+
+    def add(self, key: str, timestamp: str, value: float) -> None:
+        if self.min_ts is None or timestamp < self.min_ts:
+            self.min_ts = timestamp
+        if self.max_ts is None or timestamp > self.max_ts:
+            self.max_ts = timestamp
+        self.count += 1
+
+        stats = self.stats.get(key)
+        if stats is None:
+            self.stats[key] = [1, value, value, value, timestamp, value]
+            return
+        stats[COUNT] += 1
+        stats[TOTAL] += value
+        if value < stats[MINIMUM]:
+            stats[MINIMUM] = value
+        if value > stats[MAXIMUM]:
+            stats[MAXIMUM] = value
+        if timestamp >= stats[LATEST_TS]:
+            stats[LATEST_TS] = timestamp
+            stats[LATEST_VALUE] = value
+
+    def overlaps(self, start: Optional[str], end: Optional[str]) -> bool:
+        if self.count == 0:
+            return False
+        return (start is None or self.max_ts >= start) and (end is None or self.min_ts <= end)
+
+    def within(self, start: Optional[str], end: Optional[str]) -> bool:
+        return (start is None or self.min_ts >= start) and (end is None or self.max_ts <= end)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "min_ts": self.min_ts,
+            "max_ts": self.max_ts,
+            "count": self.count,
+            "size": self.size,
+            "stats": self.stats
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Segment':
+        return cls(**data)
+
+class SegmentedStore:
+    """
+    Records are buffered in memory and appended as JSON lines to the active
+    segment when the buffer reaches flush_size or flush_interval seconds have
+    passed; a background thread flushes a stale buffer while no records
+    arrive, and the buffer is flushed at exit. Segments are sealed by record count or time span. The index keeps
+    each segment's min/max timestamp and per-key aggregates so range queries
+    and summaries only open the segments they need. Segments older than the
+    retention period are deleted, and small sealed segments are periodically
+    compacted into larger ones.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        key_field: str = "name",
+        time_field: str = "timestamp",
+        value_field: str = "value",
+        flush_size: int = 100,
+        flush_interval: float = 5.0,
+        segment_max_records: int = 10000,
+        segment_span: timedelta = timedelta(hours=1),
+        retention: Optional[timedelta] = timedelta(days=30),
+        compact_every: int = 8
+    ):
+        self.directory = Path(directory)
+        self.key_field = key_field
+        self.time_field = time_field
+        self.value_field = value_field
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.segment_max_records = segment_max_records
+        self.segment_span = segment_span
+        self.retention = retention
+        self.compact_every = compact_every
+        self.logger = logging.getLogger(__name__)
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        self.segments: List[Segment] = []
+        self.active: Optional[Segment] = None
+        self.meta: Dict[str, Any] = {}
+        self.buffer: List[Dict[str, Any]] = []
+        self._next_seq = 0
+        self._sealed_since_compaction = 0
+        self._last_flush = time.monotonic()
+        self._lock = threading.RLock()
+        self._closed = threading.Event()
+
+        self._load_index()
+
+        if self.flush_interval:
+            threading.Thread(target=self._run_flusher, name="segment-flusher", daemon=True).start()
+        atexit.register(self.close)
+
+    def append(self, record: Dict[str, Any]) -> None:
+        """Buffer a record, flushing when the buffer is full or stale"""
+        with self._lock:
+            self.buffer.append(record)
+            if len(self.buffer) >= self.flush_size or self._stale():
+                self.flush()
+
+    def flush(self) -> None:
+        """Append buffered records to disk and update the index"""
+        with self._lock:
+            self._flush()
+
+    def _flush(self) -> None:
+        self._last_flush = time.monotonic()
+        records, self.buffer = self.buffer, []
+
+        position = 0
+        while position < len(records):
+            segment, span_end = self._writable_segment(records[position][self.time_field])
+            limit = min(len(records), position + self.segment_max_records - segment.count)
+            end = position + 1
+            while end < limit and records[end][self.time_field] < span_end:
+                end += 1
+            self._write(segment, records[position:end])
+            position = end
+
+        self.apply_retention()
+        if self.compact_every and self._sealed_since_compaction >= self.compact_every:
+            self.compact()
+        self._save_index()
+
+    def close(self) -> None:
+        self._closed.set()
+        self.flush()
+
+    def _stale(self) -> bool:
+        return time.monotonic() - self._last_flush >= self.flush_interval
+
+    def _run_flusher(self) -> None:
+        """Flush records that have waited flush_interval without a new append"""
+        while not self._closed.wait(self.flush_interval):
+            with self._lock:
+                if self.buffer and self._stale():
+                    try:
+                        self._flush()
+                    except Exception as e:
+                        self.logger.error(f"Background segment flush failed: {str(e)}")
+
+    def query(
+        self,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        key: Optional[str] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Records in [start, end], oldest segment first, then the buffer"""
+        # Collected under the lock so a background flush can't move buffered
+        # records into a segment, or compact one away, mid-query
+        with self._lock:
+            records = [
+                record
+                for segment in self._candidates(start, end, key)
+                for record in self._filter(self._read(segment), start, end, key)
+            ]
+            records.extend(self._filter(list(self.buffer), start, end, key))
+        yield from records
+
+    def stats(
+        self,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        keys: Optional[Iterable[str]] = None
+    ) -> Dict[str, List]:
+        """
+        Per-key aggregates over [start, end]. Segments wholly inside the
+        range contribute their indexed aggregates; only segments straddling
+        a boundary and the buffer are read.
+        """
+        with self._lock:
+            return self._stats(start, end, set(keys) if keys is not None else None)
+
+    def _stats(self, start: Optional[str], end: Optional[str], keys: Optional[set]) -> Dict[str, List]:
+        result: Dict[str, List] = {}
+
+        def fold(records):
+            partial = Segment(name="")
+            for record in self._filter(records, start, end, None):
+                key = record[self.key_field]
+                if keys is None or key in keys:
+                    partial.add(key, record[self.time_field], record[self.value_field])
+            merge_stats(result, partial.stats)
+
+        for segment in self._candidates(start, end, None):
+            if segment.within(start, end):
+                merge_stats(result, {
+                    key: stats for key, stats in segment.stats.items()
+                    if keys is None or key in keys
+                })
+            elif keys is None or keys & segment.stats.keys():
+                fold(self._read(segment))
+        fold(list(self.buffer))
+        return result
+
+    def apply_retention(self, now: Optional[datetime] = None) -> int:
+        """Delete sealed segments whose newest record is past retention"""
+        if self.retention is None:
+            return 0
+
+        with self._lock:
+            return self._apply_retention(now)
+
+    def _apply_retention(self, now: Optional[datetime]) -> int:
+        cutoff = ((now or datetime.utcnow()) - self.retention).isoformat()
+        expired = [
+            segment for segment in self.segments
+            if segment is not self.active and segment.max_ts is not None and segment.max_ts < cutoff
+        ]
+        for segment in expired:
+            self._path(segment).unlink(missing_ok=True)
+            self.segments.remove(segment)
+        return len(expired)
+
+    def compact(self, now: Optional[datetime] = None) -> None:
+        """
+        Merge runs of adjacent sealed segments that together fit in one
+        segment, dropping records past retention along the way
+        """
+        with self._lock:
+            self._compact(now)
+
+    def _compact(self, now: Optional[datetime]) -> None:
+        self._sealed_since_compaction = 0
+        cutoff = ((now or datetime.utcnow()) - self.retention).isoformat() if self.retention else None
+        sealed = [segment for segment in self.segments if segment is not self.active]
+
+        runs: List[List[Segment]] = []
+        for segment in sealed:
+            if runs and sum(s.count for s in runs[-1]) + segment.count <= self.segment_max_records:
+                runs[-1].append(segment)
+            else:
+                runs.append([segment])
+
+        for run in runs:
+            straddles = cutoff is not None and run[0].min_ts is not None and run[0].min_ts < cutoff
+            if len(run) < 2 and not straddles:
+                continue
+
+            records = [record for segment in run for record in self._read(segment)]
+            if cutoff is not None:
+                records = [record for record in records if record[self.time_field] >= cutoff]
+            records.sort(key=lambda record: record[self.time_field])
+
+            merged = self._new_segment()
+            self._write(merged, records, temporary=True)
+            position = self.segments.index(run[0])
+            for segment in run:
+                self._path(segment).unlink(missing_ok=True)
+                self.segments.remove(segment)
+            if merged.count:
+                self.segments.insert(position, merged)
+            else:
+                self._path(merged).unlink(missing_ok=True)
+
+        self._save_index()
+
+    def _candidates(self, start: Optional[str], end: Optional[str], key: Optional[str]) -> List[Segment]:
+        return [
+            segment for segment in self.segments
+            if segment.overlaps(start, end) and (key is None or key in segment.stats)
+        ]
+
+    def _filter(self, records, start, end, key) -> Iterator[Dict[str, Any]]:
+        for record in records:
+            timestamp = record[self.time_field]
+            if start and timestamp < start:
+                continue
+            if end and timestamp > end:
+                continue
+            if key is not None and record[self.key_field] != key:
+                continue
+            yield record
+
+    def _writable_segment(self, timestamp: str):
+        """
+        The active segment and the timestamp at which its span ends, rolling
+        to a new segment when the active one is full or too old
+        """
+        active = self.active
+        if active is None or active.count >= self.segment_max_records or (
+            active.min_ts is not None and timestamp >= self._span_end(active.min_ts)
+        ):
+            if active is not None:
+                self._sealed_since_compaction += 1
+            active = self.active = self._new_segment()
+            self.segments.append(active)
+        return active, self._span_end(active.min_ts or timestamp)
+
+    def _span_end(self, timestamp: str) -> str:
+        return (datetime.fromisoformat(timestamp) + self.segment_span).isoformat()
+
+    def _new_segment(self) -> Segment:
+        segment = Segment(name=f"{SEGMENT_PREFIX}{self._next_seq:08d}{SEGMENT_SUFFIX}")
+        self._next_seq += 1
+        return segment
+
+    def _write(self, segment: Segment, records: List[Dict[str, Any]], temporary: bool = False) -> None:
+        path = self._path(segment)
+        target = path.with_suffix(".tmp") if temporary else path
+        lines = []
+        for record in records:
+            lines.append(json.dumps(record, separators=(",", ":")))
+            segment.add(record[self.key_field], record[self.time_field], record[self.value_field])
+        data = ("\n".join(lines) + "\n").encode() if lines else b""
+
+        # A leftover .tmp from an interrupted compaction is overwritten
+        with open(target, "wb" if temporary else "ab") as f:
+            f.write(data)
+        if temporary:
+            os.replace(target, path)
+        segment.size += len(data)
+
+    def _read(self, segment: Segment) -> List[Dict[str, Any]]:
+        records = []
+        try:
+            with open(self._path(segment), "rb") as f:
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        # A torn final line from an interrupted write
+                        continue
+        except FileNotFoundError:
+            self.logger.error(f"Missing metrics segment {segment.name}")
+        return records
+
+    def _path(self, segment: Segment) -> Path:
+        return self.directory / segment.name
+
+    def _load_index(self) -> None:
+        index_file = self.directory / INDEX_FILE
+        try:
+            if index_file.exists():
+                with open(index_file, "r") as f:
+                    index = json.load(f)
+                self.meta = index.get("meta", {})
+                self._next_seq = index.get("next_seq", 0)
+                self.segments = [Segment.from_dict(data) for data in index.get("segments", [])]
+        except Exception as e:
+            self.logger.error(f"Failed to load segment index: {str(e)}")
+            self.segments = []
+
+        indexed = {segment.name for segment in self.segments}
+        for path in sorted(self.directory.glob(f"{SEGMENT_PREFIX}*{SEGMENT_SUFFIX}")):
+            if path.name not in indexed:
+                self.segments.append(Segment(name=path.name))
+            self._next_seq = max(self._next_seq, int(path.name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]) + 1)
+
+        # Rebuild summaries for segments written after the index was last saved
+        for segment in list(self.segments):
+            path = self._path(segment)
+            if not path.exists():
+                self.segments.remove(segment)
+            elif path.stat().st_size != segment.size:
+                rebuilt = Segment(name=segment.name, size=path.stat().st_size)
+                for record in self._read(segment):
+                    rebuilt.add(record[self.key_field], record[self.time_field], record[self.value_field])
+                self.segments[self.segments.index(segment)] = rebuilt
+
+        self.segments.sort(key=lambda segment: segment.name)
+        if self.segments and self.segments[-1].count < self.segment_max_records:
+            self.active = self.segments[-1]
+
+    def _save_index(self) -> None:
+        index_file = self.directory / INDEX_FILE
+        try:
+            temporary = index_file.with_suffix(".tmp")
+            with open(temporary, "w") as f:
+                json.dump({
+                    "next_seq": self._next_seq,
+                    "meta": self.meta,
+                    "segments": [segment.to_dict() for segment in self.segments]
+                }, f)
+            os.replace(temporary, index_file)
+        except Exception as e:
+            self.logger.error(f"Failed to save segment index: {str(e)}")
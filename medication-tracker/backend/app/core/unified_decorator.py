@@ -12,7 +12,7 @@ from typing import Callable, Any, Dict, Optional
 from pathlib import Path
 from datetime import datetime
 
-from .unified_validation_framework import UnifiedValidationFramework
+from .unified_validation_framework import get_framework
 from .exceptions import ValidationError
 
 logger = logging.getLogger(__name__)
@@ -33,20 +33,24 @@ def unified_validation(
     def decorator(func: Callable) -> Callable:
         @functools.wraps(func)
         async def wrapper(*args, **kwargs) -> Any:
-            framework = UnifiedValidationFramework()
+            # Shared framework; the plan for this path and layer is compiled
+            # on first use and its static check result reused until the
+            # framework's patterns or hooks change
+            framework = get_framework()
+            plan = framework.compile_plan(critical_path, validation_layer)
             
             try:
                 # Pre-validation
-                validation_result = await framework.validate_critical_path(critical_path)
+                validation_result = await framework.execute_plan(plan)
                 if not validation_result["valid"]:
                     raise ValidationError(
-                        f"Critical path validation failed: {validation_result['error']}",
+                        f"Critical path validation failed: {validation_result.get('error')}",
                         details=validation_result.get("details")
                     )
                     
                 # If layer specified, validate layer
                 if validation_layer:
-                    layer_result = await framework.validate_layer(validation_layer)
+                    layer_result = plan.layer_result
                     if not layer_result["valid"]:
                         raise ValidationError(
                             f"Layer validation failed: {layer_result['error']}",
@@ -4,106 +4,234 @@ Critical Path: VALIDATION-FRAMEWORK
 Last Updated: 2025-01-02T20:01:23+01:00
 """
 
+import copy
 import logging
 import json
+import re
+import threading
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, List, Any, Optional, Set
+from typing import Callable, Dict, List, Any, Optional, Set, Tuple
 from datetime import datetime, timezone
 from functools import wraps
 
 from ..exceptions import ValidationError, DependencyError
 from ..models.validation_result import ValidationResult
 from ..services.metrics_service import MetricsService
+from .config import settings
+from .evidence_sink import get_evidence_sink
 
 logger = logging.getLogger(__name__)
 
+VALIDATION_LAYERS = ("Domain", "Application", "Infrastructure", "Presentation")
+
+_framework: Optional["UnifiedValidationFramework"] = None
+_framework_lock = threading.Lock()
+
+def get_framework() -> "UnifiedValidationFramework":
+    """Process-wide framework shared by the unified_validation decorator"""
+    global _framework
+    if _framework is None:
+        with _framework_lock:
+            if _framework is None:
+                _framework = UnifiedValidationFramework()
+    return _framework
+
+@dataclass
+class ValidationPlan:
+    """Patterns, hooks and layer check resolved once per (critical_path, layer)"""
+    critical_path: str
+    layer: Optional[str]
+    patterns: Tuple[Dict[str, Any], ...]
+    pre_hooks: Tuple[Callable, ...]
+    post_hooks: Tuple[Callable, ...]
+    layer_result: Optional[Dict[str, Any]] = None
+    # Memoized pattern results; only kept when no hooks are registered,
+    # since hooks may have side effects on every call
+    results: Optional[List[Dict[str, Any]]] = None
+
 class UnifiedValidationFramework:
     """Unified validation framework with import validation"""
     
     def __init__(self):
         self.import_validator = ImportValidator()
-        self.hooks = ValidationHooks()
+        self.hooks = ValidationHooks(on_change=self.invalidate_plans)
         self.enforcer = RuntimeEnforcer()
         self.validation_patterns: Dict[str, Any] = {}
         self.adaptation_history: List[Dict[str, Any]] = []
         self.validated_imports = False
-        
-        # Register core patterns
-        self._register_core_patterns()
+        self._plans: Dict[Tuple[str, Optional[str]], ValidationPlan] = {}
+        self._relevant: Dict[str, Tuple[Dict[str, Any], ...]] = {}
+        self._plans_lock = threading.Lock()
         
     def register_pattern(self, pattern_id: str, relevance: float, rules: Dict[str, Any]) -> None:
         """Register a validation pattern"""
+        existing = self.validation_patterns.get(pattern_id)
+        if existing and existing["relevance"] == relevance and existing["rules"] == rules:
+            # Re-registering the same pattern keeps compiled plans valid
+            return
+            
         self.validation_patterns[pattern_id] = {
             "id": pattern_id,
             "relevance": relevance,
             "rules": rules,
             "timestamp": datetime.now(timezone.utc).isoformat()
         }
+        self.invalidate_plans()
+        
+    def invalidate_plans(self, critical_path: Optional[str] = None) -> None:
+        """Drop compiled plans and memoized results, for one path or all"""
+        with self._plans_lock:
+            if critical_path is None:
+                self._plans.clear()
+                self._relevant.clear()
+            else:
+                for key in [key for key in self._plans if key[0] == critical_path]:
+                    del self._plans[key]
+                    
+    def compile_plan(self, critical_path: str, layer: Optional[str] = None) -> ValidationPlan:
+        """Resolve the patterns, hooks and layer check for a path once"""
+        key = (critical_path, layer)
+        plan = self._plans.get(key)
+        if plan is not None:
+            return plan
+            
+        context = {"critical_path": critical_path, "validation_layer": layer}
+        plan = ValidationPlan(
+            critical_path=critical_path,
+            layer=layer,
+            patterns=self._relevant_patterns(context),
+            pre_hooks=tuple(self.hooks.pre_hooks),
+            post_hooks=tuple(self.hooks.post_hooks),
+            layer_result=self.validate_layer(layer) if layer else None
+        )
+        with self._plans_lock:
+            return self._plans.setdefault(key, plan)
+            
+    async def execute_plan(self, plan: ValidationPlan) -> Dict[str, Any]:
+        """
+        Run a compiled plan's static check. Pattern results are memoized;
+        the result and its evidence are built fresh on every call.
+        """
+        if plan.results is not None:
+            # Callers get their own copy so they can't alter later results
+            results = copy.deepcopy(plan.results)
+        else:
+            context = {"critical_path": plan.critical_path, "validation_layer": plan.layer}
+            results = await self._run_patterns(context, plan.patterns, plan.pre_hooks, plan.post_hooks)
+            if not plan.pre_hooks and not plan.post_hooks:
+                plan.results = copy.deepcopy(results)
+        return self._summarize(plan.critical_path, plan.patterns, results)
+        
+    def validate_layer(self, layer: str) -> Dict[str, Any]:
+        """Validate that a layer is one of the known architecture layers"""
+        if layer in VALIDATION_LAYERS:
+            return {"valid": True, "layer": layer}
+        return {
+            "valid": False,
+            "error": f"Unknown validation layer: {layer}",
+            "details": {"allowed_layers": list(VALIDATION_LAYERS)}
+        }
+        
+    def _store_validation_evidence(self, critical_path: str, evidence: Dict[str, Any]) -> None:
+        """Queue validation evidence for the batched evidence sink"""
+        get_evidence_sink(settings.VALIDATION_EVIDENCE_PATH).submit("unified_validation", evidence, category=critical_path)
+        
+    def _relevant_patterns(self, context: Dict[str, Any]) -> Tuple[Dict[str, Any], ...]:
+        """Patterns relevant to a context; relevance only depends on its endpoint"""
+        endpoint = context.get("endpoint", "")
+        patterns = self._relevant.get(endpoint)
+        if patterns is None:
+            patterns = tuple(
+                pattern for pattern in self.validation_patterns.values()
+                if self._is_pattern_relevant(pattern, context)
+            )
+            self._relevant[endpoint] = patterns
+        return patterns
         
     async def validate_critical_path(
         self,
         path_name: str,
-        context: Dict[str, Any],
+        context: Optional[Dict[str, Any]] = None,
         patterns: Optional[List[str]] = None
     ) -> Dict[str, Any]:
         """Validate a critical path"""
+        context = context if context is not None else {}
+        if patterns:
+            # Use specified patterns
+            selected = tuple(
+                self.validation_patterns[pattern_id]
+                for pattern_id in patterns
+                if pattern_id in self.validation_patterns
+            )
+        else:
+            # Use all relevant patterns
+            selected = self._relevant_patterns(context)
+            
+        results = await self._run_patterns(
+            context, selected, self.hooks.pre_hooks, self.hooks.post_hooks
+        )
+        return self._summarize(path_name, selected, results)
+        
+    async def _run_patterns(
+        self,
+        context: Dict[str, Any],
+        patterns: Tuple[Dict[str, Any], ...],
+        pre_hooks: Tuple[Callable, ...],
+        post_hooks: Tuple[Callable, ...]
+    ) -> List[Dict[str, Any]]:
+        """Apply patterns between the pre- and post-validation hooks"""
         try:
             # Run pre-validation hooks
-            for hook in self.hooks.pre_hooks:
+            for hook in pre_hooks:
                 await hook(context)
                 
             # Apply validation patterns
             results = []
-            used_patterns = []
-            
-            if patterns:
-                # Use specified patterns
-                for pattern_id in patterns:
-                    if pattern_id in self.validation_patterns:
-                        pattern = self.validation_patterns[pattern_id]
-                        result = await self._apply_pattern(pattern, context)
-                        results.append(result)
-                        used_patterns.append(pattern_id)
-            else:
-                # Use all relevant patterns
-                for pattern_id, pattern in self.validation_patterns.items():
-                    if self._is_pattern_relevant(pattern, context):
-                        result = await self._apply_pattern(pattern, context)
-                        results.append(result)
-                        used_patterns.append(pattern_id)
+            for pattern in patterns:
+                results.append(await self._apply_pattern(pattern, context))
                         
             # Run post-validation hooks
-            for hook in self.hooks.post_hooks:
+            for hook in post_hooks:
                 await hook(context, results)
                 
-            # Collect validation evidence
-            evidence = {
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-                "path_name": path_name,
-                "patterns_applied": used_patterns,
-                "validation_results": results
-            }
-            
-            # Check if any validation failed
-            is_valid = all(r.get("valid", False) for r in results)
-            issues = []
-            warnings = []
-            
-            for result in results:
-                issues.extend(result.get("issues", []))
-                warnings.extend(result.get("warnings", []))
-                
-            return {
-                "valid": is_valid,
-                "evidence": evidence,
-                "issues": issues,
-                "warnings": warnings
-            }
+            return results
             
         except Exception as e:
             logger.error(f"Critical path validation failed: {str(e)}")
             raise ValidationError(f"Critical path validation failed: {str(e)}")
             
+    def _summarize(
+        self,
+        path_name: str,
+        patterns: Tuple[Dict[str, Any], ...],
+        results: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Validation result with evidence for this call"""
+        # Collect validation evidence
+        evidence = {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "path_name": path_name,
+            "patterns_applied": [pattern["id"] for pattern in patterns],
+            "validation_results": results
+        }
+        
+        # Check if any validation failed
+        is_valid = all(r.get("valid", False) for r in results)
+        issues = []
+        warnings = []
+        
+        for result in results:
+            issues.extend(result.get("issues", []))
+            warnings.extend(result.get("warnings", []))
+            
+        return {
+            "valid": is_valid,
+            "evidence": evidence,
+            "issues": issues,
+            "warnings": warnings
+        }
+            
     async def _apply_pattern(self, pattern: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
         """Apply a validation pattern"""
         try:
@@ -264,17 +392,24 @@ class ImportValidator:
 class ValidationHooks:
     """Manages validation hooks and callbacks"""
     
-    def __init__(self):
+    def __init__(self, on_change: Optional[Callable[[], None]] = None):
         self.pre_hooks: List[callable] = []
         self.post_hooks: List[callable] = []
+        self.on_change = on_change
         
     def register_pre_hook(self, hook: callable) -> None:
         """Register a pre-validation hook"""
         self.pre_hooks.append(hook)
+        self._changed()
         
     def register_post_hook(self, hook: callable) -> None:
         """Register a post-validation hook"""
         self.post_hooks.append(hook)
+        self._changed()
+        
+    def _changed(self) -> None:
+        if self.on_change:
+            self.on_change()
 
 class RuntimeEnforcer:
     """Enforces runtime validation rules"""
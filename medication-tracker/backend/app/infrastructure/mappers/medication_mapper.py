@@ -1,3 +1,5 @@
+import json
+from typing import Any, Callable, Mapping
 from app.domain.medication.entities import (
     Medication as MedicationEntity,
     Dosage,
@@ -11,8 +13,22 @@ class MedicationMapper(BaseMapper[MedicationEntity, Medication]):
         if not model:
             return None
             
-        dosage_data = model.dosage
-        schedule_data = model.schedule
+        return self._build_entity(lambda name: getattr(model, name))
+
+    def row_to_entity(self, row: Mapping[str, Any]) -> MedicationEntity:
+        """Map a raw `medications` result row without building an ORM instance"""
+        def value(name):
+            data = row.get(name)
+            # JSON columns arrive undecoded from textual queries on some drivers
+            if name in ('dosage', 'schedule') and isinstance(data, str):
+                return json.loads(data)
+            return data
+
+        return self._build_entity(value)
+
+    def _build_entity(self, value: Callable[[str], Any]) -> MedicationEntity:
+        dosage_data = value('dosage')
+        schedule_data = value('schedule')
         
         dosage = Dosage(
             amount=dosage_data['amount'],
@@ -31,25 +47,26 @@ class MedicationMapper(BaseMapper[MedicationEntity, Medication]):
         )
         
         medication = MedicationEntity(
-            name=model.name,
+            name=value('name'),
             dosage=dosage,
             schedule=schedule,
-            user_id=model.user_id,
-            category=model.category,
-            instructions=model.instructions,
-            is_prn=model.is_prn,
-            min_hours_between_doses=model.min_hours_between_doses,
-            max_daily_doses=model.max_daily_doses,
-            reason_for_taking=model.reason_for_taking,
-            id=model.id,
-            created_at=model.created_at,
-            updated_at=model.updated_at
+            user_id=value('user_id'),
+            category=value('category'),
+            instructions=value('instructions'),
+            is_prn=value('is_prn'),
+            min_hours_between_doses=value('min_hours_between_doses'),
+            max_daily_doses=value('max_daily_doses'),
+            reason_for_taking=value('reason_for_taking')
         )
         
-        medication.remaining_doses = model.remaining_doses
-        medication.last_taken = model.last_taken
-        medication.daily_doses_taken = model.daily_doses_taken
-        medication.daily_doses_reset_at = model.daily_doses_reset_at
+        # BaseEntity fields are not MedicationEntity constructor arguments
+        medication.id = value('id')
+        medication.created_at = value('created_at')
+        medication.updated_at = value('updated_at')
+        medication.remaining_doses = value('remaining_doses')
+        medication.last_taken = value('last_taken')
+        medication.daily_doses_taken = value('daily_doses_taken')
+        medication.daily_doses_reset_at = value('daily_doses_reset_at')
         
         return medication
 
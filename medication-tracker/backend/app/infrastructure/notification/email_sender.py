@@ -1,11 +1,11 @@
 from typing import Dict, Any, List, Optional
-import aiosmtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.application import MIMEApplication
 import os
 from app.config import Config
 from .base_sender import NotificationSender
+from .smtp_pool import get_smtp_pool
 
 class EmailSender(NotificationSender):
     def __init__(self):
@@ -15,6 +15,13 @@ class EmailSender(NotificationSender):
         self.smtp_user = Config.SMTP_USER
         self.smtp_password = Config.SMTP_PASSWORD
         self.from_email = Config.FROM_EMAIL
+        self.pool = get_smtp_pool(
+            self.smtp_host,
+            self.smtp_port,
+            self.smtp_user,
+            self.smtp_password,
+            use_tls=True
+        )
 
     async def send_message(
         self,
@@ -34,14 +41,8 @@ class EmailSender(NotificationSender):
             # Create message
             message = self._create_message(recipients, subject, content, attachments)
             
-            # Send email
-            async with aiosmtplib.SMTP(
-                hostname=self.smtp_host,
-                port=self.smtp_port,
-                use_tls=True
-            ) as smtp:
-                await smtp.login(self.smtp_user, self.smtp_password)
-                await smtp.send_message(message)
+            # Send email over a pooled connection
+            await self.pool.send(message)
             
             return self._format_success_response(
                 recipients=recipients,
@@ -51,6 +52,38 @@ class EmailSender(NotificationSender):
         except Exception as e:
             return await self._handle_send_error(e, "email")
 
+    async def send_many(self, emails: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Send a batch of emails concurrently; each dict takes send_message's arguments"""
+        responses: List[Optional[Dict[str, Any]]] = [None] * len(emails)
+        messages = []
+        for index, email in enumerate(emails):
+            if not self._validate_recipients(email.get("recipients")):
+                responses[index] = self._format_error_response("Invalid recipients")
+            elif not self._validate_content(email.get("content")):
+                responses[index] = self._format_error_response("Invalid content")
+            else:
+                messages.append((index, self._create_message(
+                    email["recipients"],
+                    email.get("subject", ""),
+                    email["content"],
+                    email.get("attachments")
+                )))
+
+        results = await self.pool.send_many(message for _, message in messages)
+        for (index, _), result in zip(messages, results):
+            if isinstance(result, Exception):
+                responses[index] = await self._handle_send_error(result, "email")
+            else:
+                responses[index] = self._format_success_response(
+                    recipients=emails[index]["recipients"],
+                    subject=emails[index].get("subject", "")
+                )
+        return responses
+
+    async def close(self) -> None:
+        """Close pooled SMTP connections"""
+        await self.pool.close()
+
     def _create_message(
         self,
         recipients: List[str],
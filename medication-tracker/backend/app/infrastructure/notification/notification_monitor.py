@@ -7,6 +7,7 @@ Last Updated: 2025-01-03T22:28:16+01:00
 from datetime import datetime
 from typing import Dict, List, Optional
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
 from ...core.config import get_database_url
 from ...models.notification import NotificationStatus
 
@@ -18,7 +19,7 @@ class NotificationMonitor:
         self.db = self.client.medication_tracker
         self.collection = self.db.notification_logs
     
-    async def log_notification(
+    def build_log(
         self,
         notification_id: str,
         user_id: str,
@@ -28,8 +29,8 @@ class NotificationMonitor:
         data: Optional[Dict] = None,
         status: str = NotificationStatus.PENDING
     ) -> Dict:
-        """Log a notification attempt"""
-        log = {
+        """Build a notification log document"""
+        return {
             "notification_id": notification_id,
             "user_id": user_id,
             "title": title,
@@ -45,10 +46,27 @@ class NotificationMonitor:
             "failed_tokens": [],
             "error_details": None
         }
-        
+    
+    async def log_notification(
+        self,
+        notification_id: str,
+        user_id: str,
+        title: str,
+        body: str,
+        tokens: List[str],
+        data: Optional[Dict] = None,
+        status: str = NotificationStatus.PENDING
+    ) -> Dict:
+        """Log a notification attempt"""
+        log = self.build_log(notification_id, user_id, title, body, tokens, data, status)
         await self.collection.insert_one(log)
         return log
     
+    async def log_notifications(self, logs: List[Dict]) -> None:
+        """Log a batch of notification attempts in one write"""
+        if logs:
+            await self.collection.insert_many(logs, ordered=False)
+    
     async def update_status(
         self,
         notification_id: str,
@@ -59,20 +77,51 @@ class NotificationMonitor:
         error_details: Optional[str] = None
     ) -> None:
         """Update notification status"""
-        update = {
-            "status": status,
-            "updated_at": datetime.utcnow(),
-            "success_count": success_count,
-            "failure_count": failure_count,
-            "failed_tokens": failed_tokens or [],
-            "error_details": error_details
-        }
-        
         await self.collection.update_one(
             {"notification_id": notification_id},
-            {"$set": update, "$inc": {"attempts": 1}}
+            self._status_update(status, success_count, failure_count, failed_tokens, error_details)
         )
     
+    async def update_statuses(self, updates: List[Dict]) -> None:
+        """Apply a batch of update_status calls, given as keyword dicts, in one write"""
+        if updates:
+            await self.collection.bulk_write(
+                [
+                    UpdateOne(
+                        {"notification_id": update["notification_id"]},
+                        self._status_update(
+                            update["status"],
+                            update.get("success_count", 0),
+                            update.get("failure_count", 0),
+                            update.get("failed_tokens"),
+                            update.get("error_details")
+                        )
+                    )
+                    for update in updates
+                ],
+                ordered=False
+            )
+    
+    @staticmethod
+    def _status_update(
+        status: str,
+        success_count: int,
+        failure_count: int,
+        failed_tokens: Optional[List[str]],
+        error_details: Optional[str]
+    ) -> Dict:
+        return {
+            "$set": {
+                "status": status,
+                "updated_at": datetime.utcnow(),
+                "success_count": success_count,
+                "failure_count": failure_count,
+                "failed_tokens": failed_tokens or [],
+                "error_details": error_details
+            },
+            "$inc": {"attempts": 1}
+        }
+    
     async def get_notification_status(self, notification_id: str) -> Dict:
         """Get notification status"""
         return await self.collection.find_one({"notification_id": notification_id})
@@ -4,13 +4,9 @@ Handles scheduling and sending of periodic medication reminders
 Last Updated: 2025-01-02T22:21:23+01:00
 """
 
-import asyncio
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from datetime import datetime
+from typing import Dict, Optional
 import pytz
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.triggers.cron import CronTrigger
-from apscheduler.triggers.interval import IntervalTrigger
 
 from ...core.enforcer_decorators import (
     requires_context,
@@ -21,22 +17,22 @@ from ...core.enforcer_decorators import (
 from ...core.development_mode import DevelopmentConfig
 from ...exceptions import NotificationError
 from .push_sender import PushSender, NotificationType, NotificationPriority
+from .reminder_engine import ReminderEngine
 from ...models.medication import MedicationSchedule
 from ...services.medication_service import MedicationService
 
 class NotificationScheduler:
-    """Handles scheduling of medication reminders"""
+    """
+    Handles scheduling of medication reminders. Fire times live in the
+    shared ReminderEngine, so they survive restarts and are split across
+    worker processes; call start() on each process that should send them.
+    """
     
-    def __init__(self):
-        self.scheduler = AsyncIOScheduler()
+    def __init__(self, engine: Optional[ReminderEngine] = None):
+        self.engine = engine or ReminderEngine(self._send_medication_reminder)
         self.push_sender = PushSender()
         self.medication_service = MedicationService()
         self.dev_config = DevelopmentConfig()
-        self._initialize_scheduler()
-        
-    def _initialize_scheduler(self):
-        """Initialize the scheduler"""
-        self.scheduler.start()
         
     @requires_context(
         component="notification",
@@ -57,63 +53,12 @@ class NotificationScheduler:
     ):
         """Schedule medication reminders based on medication schedule"""
         try:
-            user_tz = pytz.timezone(timezone)
-            
-            for time in schedule.times:
-                # Parse time string
-                hour, minute = map(int, time.split(':'))
-                
-                # Create cron trigger
-                if schedule.type == 'daily':
-                    trigger = CronTrigger(
-                        hour=hour,
-                        minute=minute,
-                        timezone=user_tz
-                    )
-                elif schedule.type == 'weekly':
-                    if not schedule.days:
-                        raise ValueError("Days must be specified for weekly schedule")
-                    trigger = CronTrigger(
-                        day_of_week=','.join(map(str, schedule.days)),
-                        hour=hour,
-                        minute=minute,
-                        timezone=user_tz
-                    )
-                elif schedule.type == 'monthly':
-                    if not schedule.days:
-                        raise ValueError("Days must be specified for monthly schedule")
-                    trigger = CronTrigger(
-                        day=','.join(map(str, schedule.days)),
-                        hour=hour,
-                        minute=minute,
-                        timezone=user_tz
-                    )
-                elif schedule.type == 'custom':
-                    if not schedule.interval:
-                        raise ValueError("Interval must be specified for custom schedule")
-                    trigger = IntervalTrigger(
-                        days=schedule.interval,
-                        start_date=datetime.fromisoformat(schedule.startDate),
-                        end_date=schedule.endDate and datetime.fromisoformat(schedule.endDate),
-                        timezone=user_tz
-                    )
-                else:
-                    raise ValueError(f"Invalid schedule type: {schedule.type}")
-                
-                # Add job to scheduler
-                job_id = f"med_{medication_id}_{time}"
-                self.scheduler.add_job(
-                    self._send_medication_reminder,
-                    trigger=trigger,
-                    args=[user_id, medication_id],
-                    id=job_id,
-                    replace_existing=True
-                )
+            await self.engine.schedule(user_id, medication_id, schedule, timezone)
                 
         except Exception as e:
             raise NotificationError(f"Failed to schedule medication reminder: {str(e)}")
             
-    async def _send_medication_reminder(self, user_id: str, medication_id: str):
+    async def _send_medication_reminder(self, user_id: str, medication_id: str, dose_time: Optional[str] = None):
         """Send medication reminder notification"""
         try:
             # Get medication details
@@ -121,7 +66,7 @@ class NotificationScheduler:
             
             # Check if medication is still active
             if not self._is_medication_active(medication):
-                self._remove_medication_schedule(medication_id)
+                await self._remove_medication_schedule(medication_id)
                 return
                 
             # Send notification
@@ -162,11 +107,9 @@ class NotificationScheduler:
                 
         return True
         
-    def _remove_medication_schedule(self, medication_id: str):
-        """Remove all scheduled jobs for a medication"""
-        for job in self.scheduler.get_jobs():
-            if job.id.startswith(f"med_{medication_id}_"):
-                job.remove()
+    async def _remove_medication_schedule(self, medication_id: str):
+        """Remove all scheduled reminders for a medication"""
+        await self.engine.cancel(medication_id)
                 
     @maintains_critical_path("medication_scheduling")
     async def update_medication_schedule(
@@ -179,7 +122,7 @@ class NotificationScheduler:
         """Update existing medication schedule"""
         try:
             # Remove existing schedule
-            self._remove_medication_schedule(medication_id)
+            await self._remove_medication_schedule(medication_id)
             
             # Create new schedule
             await self.schedule_medication_reminder(
@@ -197,11 +140,15 @@ class NotificationScheduler:
         try:
             medications = await self.medication_service.get_user_medications(user_id)
             for medication in medications:
-                self._remove_medication_schedule(medication.id)
+                await self._remove_medication_schedule(medication.id)
                 
         except Exception as e:
             raise NotificationError(f"Failed to remove user schedules: {str(e)}")
             
-    def shutdown(self):
+    async def start(self):
+        """Start firing due reminders for this worker's shards"""
+        await self.engine.start()
+        
+    async def shutdown(self):
         """Shutdown the scheduler"""
-        self.scheduler.shutdown()
+        await self.engine.stop()
@@ -0,0 +1,177 @@
+"""
+Push Delivery Batcher
+Coalesces single-device pushes into FCM batch sends
+Last Updated: 2025-01-03T22:28:16+01:00
+"""
+
+import asyncio
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+from firebase_admin import messaging
+from ...models.notification import NotificationStatus
+
+logger = logging.getLogger(__name__)
+
+# FCM accepts at most 500 messages per batch request
+MAX_BATCH_SIZE = 500
+BATCH_LINGER_SECONDS = float(os.getenv("PUSH_BATCH_LINGER_SECONDS", "0.02"))
+SEND_WORKERS = int(os.getenv("PUSH_SEND_WORKERS", "4"))
+
+@dataclass
+class PendingPush:
+    """A queued single-device message and its delivery log"""
+    message: messaging.Message
+    log: Dict
+    future: asyncio.Future
+
+    @property
+    def token(self) -> str:
+        return self.log["tokens"][0]
+
+def chunked(items: List, size: int = MAX_BATCH_SIZE) -> List[List]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+def is_unregistered(error: Optional[Exception]) -> bool:
+    return isinstance(error, messaging.UnregisteredError)
+
+class PushDeliveryBatcher:
+    """
+    Queues single-device pushes for up to BATCH_LINGER_SECONDS (or until
+    MAX_BATCH_SIZE are waiting) and delivers them with one send_each call
+    on a worker thread, so the blocking SDK never runs on the event loop.
+    Monitor logs and status updates are written once per batch, and
+    unregistered tokens are pruned from the token store.
+    """
+
+    def __init__(
+        self,
+        monitor,
+        token_service=None,
+        max_batch_size: int = MAX_BATCH_SIZE,
+        linger: float = BATCH_LINGER_SECONDS,
+        max_workers: int = SEND_WORKERS
+    ):
+        self.monitor = monitor
+        self.token_service = token_service
+        self.max_batch_size = min(max_batch_size, MAX_BATCH_SIZE)
+        self.linger = linger
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fcm-send")
+
+        self._pending: List[PendingPush] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks = set()
+
+    async def send(self, message: messaging.Message, log: Dict) -> Dict:
+        """Queue one message; resolves with its delivery result once its batch is sent"""
+        loop = self._bind_loop()
+        future = loop.create_future()
+        self._pending.append(PendingPush(message, log, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self.flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.linger, self.flush)
+
+        return await future
+
+    def flush(self) -> None:
+        """Start delivering everything queued so far"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        batch, self._pending = self._pending, []
+        if batch:
+            task = self._loop.create_task(self._deliver(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def run_blocking(self, func: Callable, *args) -> Any:
+        """Run a blocking SDK call on the sender's thread pool"""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    async def prune_tokens(self, tokens: List[str]) -> None:
+        if not tokens or self.token_service is None:
+            return
+        try:
+            removed = await self.token_service.remove_tokens(tokens)
+            logger.info(f"Pruned {removed} unregistered FCM tokens")
+        except Exception as e:
+            logger.error(f"Failed to prune unregistered FCM tokens: {str(e)}")
+
+    def _bind_loop(self) -> asyncio.AbstractEventLoop:
+        """Batches are scheduled on the running loop; a new loop starts a new queue"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._pending = []
+            self._flush_handle = None
+            self._loop = loop
+        return loop
+
+    async def _deliver(self, batch: List[PendingPush]) -> None:
+        try:
+            await self._deliver_batch(batch)
+        except Exception as e:
+            logger.error(f"Push notification batch failed: {str(e)}")
+            for pending in batch:
+                if not pending.future.done():
+                    pending.future.set_exception(e)
+
+    async def _deliver_batch(self, batch: List[PendingPush]) -> None:
+        try:
+            await self.monitor.log_notifications([pending.log for pending in batch])
+        except Exception as e:
+            logger.error(f"Failed to log push notification batch: {str(e)}")
+
+        try:
+            response = await self.run_blocking(messaging.send_each, [pending.message for pending in batch])
+            outcomes = [(result.message_id, result.exception) for result in response.responses]
+        except Exception as e:
+            outcomes = [(None, e)] * len(batch)
+
+        results, updates, unregistered = [], [], []
+        for pending, (message_id, error) in zip(batch, outcomes):
+            notification_id = pending.log["notification_id"]
+            if error is None:
+                results.append({
+                    "notification_id": notification_id,
+                    "success": True,
+                    "message_id": message_id
+                })
+                updates.append({
+                    "notification_id": notification_id,
+                    "status": NotificationStatus.SENT,
+                    "success_count": 1
+                })
+                continue
+
+            error_details = "Token is unregistered" if is_unregistered(error) else str(error)
+            if is_unregistered(error):
+                unregistered.append(pending.token)
+            results.append({
+                "notification_id": notification_id,
+                "success": False,
+                "error": error_details
+            })
+            updates.append({
+                "notification_id": notification_id,
+                "status": NotificationStatus.FAILED,
+                "failure_count": 1,
+                "failed_tokens": [pending.token],
+                "error_details": error_details
+            })
+
+        try:
+            await self.monitor.update_statuses(updates)
+        except Exception as e:
+            logger.error(f"Failed to update push notification batch status: {str(e)}")
+
+        for pending, result in zip(batch, results):
+            if not pending.future.done():
+                pending.future.set_result(result)
+
+        await self.prune_tokens(unregistered)
@@ -4,12 +4,16 @@ Handles sending push notifications via Firebase Cloud Messaging
 Last Updated: 2025-01-03T22:28:16+01:00
 """
 
+import asyncio
 import uuid
+from functools import partial
 from typing import Dict, List, Optional
 from firebase_admin import messaging
 from ...config.firebase_config import FirebaseConfig
 from ...models.notification import NotificationStatus
+from ...services.token_service import TokenService
 from .notification_monitor import NotificationMonitor
+from .push_batcher import PushDeliveryBatcher, chunked, is_unregistered
 
 class PushNotificationSender:
     """Firebase Cloud Messaging notification sender"""
@@ -17,6 +21,8 @@ class PushNotificationSender:
     def __init__(self):
         self.firebase = FirebaseConfig()
         self.monitor = NotificationMonitor()
+        self.token_service = TokenService()
+        self.batcher = PushDeliveryBatcher(self.monitor, self.token_service)
     
     async def send_notification(
         self,
@@ -26,21 +32,10 @@ class PushNotificationSender:
         data: Optional[Dict] = None,
         priority: str = "high"
     ) -> Dict:
-        """Send notification to a single device"""
+        """Send notification to a single device, batched with other pending sends"""
         notification_id = str(uuid.uuid4())
         
         try:
-            # Log notification attempt
-            await self.monitor.log_notification(
-                notification_id=notification_id,
-                user_id="single",  # Single device notification
-                title=title,
-                body=body,
-                tokens=[token],
-                data=data,
-                status=NotificationStatus.PENDING
-            )
-            
             # Create message
             message = messaging.Message(
                 notification=messaging.Notification(
@@ -57,44 +52,19 @@ class PushNotificationSender:
                 )
             )
             
-            # Send message
-            response = messaging.send(message)
-            
-            # Update status
-            await self.monitor.update_status(
+            # Logged, sent and status-updated together with the rest of its batch
+            log = self.monitor.build_log(
                 notification_id=notification_id,
-                status=NotificationStatus.SENT,
-                success_count=1
+                user_id="single",  # Single device notification
+                title=title,
+                body=body,
+                tokens=[token],
+                data=data,
+                status=NotificationStatus.PENDING
             )
-            
-            return {
-                "notification_id": notification_id,
-                "success": True,
-                "message_id": response
-            }
-            
-        except messaging.UnregisteredError:
-            await self.monitor.update_status(
-                notification_id=notification_id,
-                status=NotificationStatus.FAILED,
-                failure_count=1,
-                failed_tokens=[token],
-                error_details="Token is unregistered"
-            )
-            return {
-                "notification_id": notification_id,
-                "success": False,
-                "error": "Token is unregistered"
-            }
+            return await self.batcher.send(message, log)
             
         except Exception as e:
-            await self.monitor.update_status(
-                notification_id=notification_id,
-                status=NotificationStatus.FAILED,
-                failure_count=1,
-                failed_tokens=[token],
-                error_details=str(e)
-            )
             return {
                 "notification_id": notification_id,
                 "success": False,
@@ -124,45 +94,42 @@ class PushNotificationSender:
                 status=NotificationStatus.PENDING
             )
             
-            # Create message
-            message = messaging.MulticastMessage(
-                notification=messaging.Notification(
-                    title=title,
-                    body=body
-                ),
-                data=data,
-                tokens=tokens,
-                android=messaging.AndroidConfig(
-                    priority=priority
-                ),
-                apns=messaging.APNSConfig(
-                    headers={'apns-priority': '10' if priority == 'high' else '5'}
+            # FCM takes at most 500 tokens per request; send the chunks in parallel
+            chunks = chunked(tokens)
+            responses = await asyncio.gather(*(
+                self.batcher.run_blocking(
+                    messaging.send_each_for_multicast,
+                    self._create_multicast(chunk, title, body, data, priority)
                 )
-            )
-            
-            # Send message
-            response = messaging.send_multicast(message)
+                for chunk in chunks
+            ))
             
             # Get failed tokens
-            failed_tokens = [
-                tokens[idx] for idx, result in enumerate(response.responses)
-                if not result.success
-            ]
+            failed_tokens, unregistered = [], []
+            for chunk, response in zip(chunks, responses):
+                for token, result in zip(chunk, response.responses):
+                    if not result.success:
+                        failed_tokens.append(token)
+                        if is_unregistered(result.exception):
+                            unregistered.append(token)
+            success_count = sum(response.success_count for response in responses)
+            failure_count = sum(response.failure_count for response in responses)
             
             # Update status
             await self.monitor.update_status(
                 notification_id=notification_id,
                 status=NotificationStatus.SENT,
-                success_count=response.success_count,
-                failure_count=response.failure_count,
+                success_count=success_count,
+                failure_count=failure_count,
                 failed_tokens=failed_tokens
             )
+            await self.batcher.prune_tokens(unregistered)
             
             return {
                 "notification_id": notification_id,
                 "success": True,
-                "success_count": response.success_count,
-                "failure_count": response.failure_count,
+                "success_count": success_count,
+                "failure_count": failure_count,
                 "failed_tokens": failed_tokens
             }
             
@@ -191,7 +158,30 @@ class PushNotificationSender:
                 ),
                 token=token
             )
-            messaging.send(message, dry_run=True)
+            await self.batcher.run_blocking(partial(messaging.send, message, dry_run=True))
             return True
         except:
             return False
+    
+    def _create_multicast(
+        self,
+        tokens: List[str],
+        title: str,
+        body: str,
+        data: Optional[Dict],
+        priority: str
+    ) -> messaging.MulticastMessage:
+        return messaging.MulticastMessage(
+            notification=messaging.Notification(
+                title=title,
+                body=body
+            ),
+            data=data,
+            tokens=tokens,
+            android=messaging.AndroidConfig(
+                priority=priority
+            ),
+            apns=messaging.APNSConfig(
+                headers={'apns-priority': '10' if priority == 'high' else '5'}
+            )
+        )
@@ -0,0 +1,399 @@
+"""
+Reminder Engine
+Persistent, sharded timing wheel of medication reminder fire times
+Last Updated: 2025-01-04T10:12:41+01:00
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+import zlib
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import pytz
+import redis.asyncio as redis
+from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+REMINDER_SHARDS = int(os.getenv("REMINDER_SHARDS", "64"))
+REMINDER_WORKER_INDEX = int(os.getenv("REMINDER_WORKER_INDEX", "0"))
+REMINDER_WORKER_COUNT = int(os.getenv("REMINDER_WORKER_COUNT", "1"))
+# Missed minutes older than this are skipped rather than fired late after downtime
+REMINDER_CATCH_UP_MINUTES = int(os.getenv("REMINDER_CATCH_UP_MINUTES", "15"))
+
+SCHEDULE_FIELDS = ("type", "times", "days", "interval", "startDate", "endDate")
+
+# Seconds a drained reminder may stay in flight before another tick takes it over
+REMINDER_IN_FLIGHT_LEASE = int(os.getenv("REMINDER_IN_FLIGHT_LEASE", "300"))
+
+ReminderCallback = Callable[[str, str, str], Awaitable[None]]
+
+# Moves the members of due buckets into the shard's in-flight set, leased
+# until they are rescheduled, and advances the shard cursor. Returns those
+# members plus any whose lease expired because a previous tick died part way.
+# Items are "<minute>|<medication>|<dose time>".
+# KEYS: cursor, in-flight, due buckets...
+# ARGV: current minute, now, lease cut-off, bucket minutes...
+DRAIN_SCRIPT = """
+local claimed = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[3])
+for _, item in ipairs(claimed) do
+    redis.call('ZADD', KEYS[2], ARGV[2], item)
+end
+for i = 3, #KEYS do
+    local minute = ARGV[i + 1]
+    for _, member in ipairs(redis.call('SMEMBERS', KEYS[i])) do
+        local item = minute .. '|' .. member
+        redis.call('ZADD', KEYS[2], ARGV[2], item)
+        table.insert(claimed, item)
+    end
+    redis.call('DEL', KEYS[i])
+end
+redis.call('SET', KEYS[1], ARGV[1])
+return claimed
+"""
+
+# Settles one in-flight reminder. Its slot moves to the next bucket (or is
+# removed when the schedule has ended) only while it still points at the
+# drained minute, so a concurrent cancel or reschedule wins.
+# KEYS: entry, in-flight, next bucket
+# ARGV: in-flight item, slot field, drained minute, next minute or "", bucket member
+RESCHEDULE_SCRIPT = """
+redis.call('ZREM', KEYS[2], ARGV[1])
+if redis.call('HGET', KEYS[1], ARGV[2]) ~= ARGV[3] then
+    return 0
+end
+if ARGV[4] == '' then
+    redis.call('HDEL', KEYS[1], ARGV[2])
+    for _, field in ipairs(redis.call('HKEYS', KEYS[1])) do
+        if string.sub(field, 1, 5) == 'slot:' then
+            return 1
+        end
+    end
+    redis.call('DEL', KEYS[1])
+else
+    redis.call('HSET', KEYS[1], ARGV[2], ARGV[4])
+    redis.call('SADD', KEYS[3], ARGV[5])
+end
+return 1
+"""
+
+def build_trigger(schedule: Dict[str, Any], dose_time: str, timezone: str):
+    """Trigger computing the fire times of one dose time of a schedule"""
+    user_tz = pytz.timezone(timezone)
+    hour, minute = map(int, dose_time.split(':'))
+
+    if schedule["type"] == 'daily':
+        return CronTrigger(hour=hour, minute=minute, timezone=user_tz)
+    if schedule["type"] == 'weekly':
+        if not schedule.get("days"):
+            raise ValueError("Days must be specified for weekly schedule")
+        return CronTrigger(
+            day_of_week=','.join(map(str, schedule["days"])),
+            hour=hour,
+            minute=minute,
+            timezone=user_tz
+        )
+    if schedule["type"] == 'monthly':
+        if not schedule.get("days"):
+            raise ValueError("Days must be specified for monthly schedule")
+        return CronTrigger(
+            day=','.join(map(str, schedule["days"])),
+            hour=hour,
+            minute=minute,
+            timezone=user_tz
+        )
+    if schedule["type"] == 'custom':
+        if not schedule.get("interval"):
+            raise ValueError("Interval must be specified for custom schedule")
+        return IntervalTrigger(
+            days=schedule["interval"],
+            start_date=datetime.fromisoformat(schedule["startDate"]),
+            end_date=schedule.get("endDate") and datetime.fromisoformat(schedule["endDate"]),
+            timezone=user_tz
+        )
+    raise ValueError(f"Invalid schedule type: {schedule['type']}")
+
+def schedule_to_dict(schedule: Any) -> Dict[str, Any]:
+    """Plain, JSON-serialisable copy of a medication schedule"""
+    if isinstance(schedule, dict):
+        return {field: schedule.get(field) for field in SCHEDULE_FIELDS}
+    return {field: getattr(schedule, field, None) for field in SCHEDULE_FIELDS}
+
+def shard_for(medication_id: str, shards: int = REMINDER_SHARDS) -> int:
+    return zlib.crc32(str(medication_id).encode()) % shards
+
+def owned_shards(worker_index: int, worker_count: int, shards: int = REMINDER_SHARDS) -> List[int]:
+    return [shard for shard in range(shards) if shard % worker_count == worker_index]
+
+def minute_of(instant: datetime) -> int:
+    return int(instant.timestamp()) // 60
+
+class ReminderEngine:
+    """
+    Holds the next fire time of every medication dose time in Redis sets,
+    one per shard per minute. A medication's index hash records which
+    bucket each of its dose times sits in, so scheduling and cancelling
+    touch only that medication's entries. Each worker process ticks the
+    shards it owns once a minute, moves the buckets that have come due into
+    a leased in-flight set and only then computes each reminder's next
+    occurrence. A reminder leaves the in-flight set in the same script that
+    reschedules it, so one interrupted tick is retried by a later one.
+    """
+
+    def __init__(
+        self,
+        on_fire: ReminderCallback,
+        redis_client: Optional[redis.Redis] = None,
+        shards: int = REMINDER_SHARDS,
+        worker_index: int = REMINDER_WORKER_INDEX,
+        worker_count: int = REMINDER_WORKER_COUNT,
+        catch_up_minutes: int = REMINDER_CATCH_UP_MINUTES,
+        in_flight_lease: int = REMINDER_IN_FLIGHT_LEASE
+    ):
+        self.on_fire = on_fire
+        self.redis = redis_client
+        self.shards = shards
+        self.owned = owned_shards(worker_index, worker_count, shards)
+        self.catch_up_minutes = catch_up_minutes
+        self.in_flight_lease = in_flight_lease
+        self.running = False
+        self.current_task: Optional[asyncio.Task] = None
+        self._drain = None
+        self._settle = None
+
+    async def connect(self):
+        if not self.redis:
+            self.redis = redis.from_url(
+                settings.REDIS_URL,
+                encoding="utf-8",
+                decode_responses=True
+            )
+        if self._drain is None:
+            self._drain = self.redis.register_script(DRAIN_SCRIPT)
+            self._settle = self.redis.register_script(RESCHEDULE_SCRIPT)
+
+    @staticmethod
+    def _entry_key(medication_id: str) -> str:
+        return f"reminder_entry:{medication_id}"
+
+    @staticmethod
+    def _bucket_key(shard: int, minute: int) -> str:
+        return f"reminder_wheel:{shard}:{minute}"
+
+    @staticmethod
+    def _cursor_key(shard: int) -> str:
+        return f"reminder_cursor:{shard}"
+
+    @staticmethod
+    def _in_flight_key(shard: int) -> str:
+        return f"reminder_in_flight:{shard}"
+
+    @staticmethod
+    def _member(medication_id: str, dose_time: str) -> str:
+        return f"{medication_id}|{dose_time}"
+
+    @staticmethod
+    def _next_minute(trigger, after: datetime) -> Optional[int]:
+        next_fire = trigger.get_next_fire_time(None, after)
+        return minute_of(next_fire) if next_fire else None
+
+    def _unschedule(self, pipe, medication_id: str, entry: Dict[str, str]):
+        shard = shard_for(medication_id, self.shards)
+        for field, minute in entry.items():
+            if field.startswith("slot:"):
+                dose_time = field[len("slot:"):]
+                pipe.srem(self._bucket_key(shard, int(minute)), self._member(medication_id, dose_time))
+        pipe.delete(self._entry_key(medication_id))
+
+    async def schedule(
+        self,
+        user_id: str,
+        medication_id: str,
+        schedule: Any,
+        timezone: str,
+        now: Optional[datetime] = None
+    ):
+        """Insert or replace every dose time of a medication"""
+        await self.connect()
+        schedule = schedule_to_dict(schedule)
+        now = now or datetime.now(pytz.UTC)
+
+        # Validate every trigger before touching the stored schedule
+        slots = {}
+        for dose_time in schedule["times"]:
+            minute = self._next_minute(build_trigger(schedule, dose_time, timezone), now)
+            if minute is not None:
+                slots[dose_time] = minute
+
+        entry_key = self._entry_key(medication_id)
+        shard = shard_for(medication_id, self.shards)
+        existing = await self.redis.hgetall(entry_key)
+
+        pipe = self.redis.pipeline(transaction=True)
+        self._unschedule(pipe, medication_id, existing)
+        if slots:
+            pipe.hset(entry_key, mapping={
+                "user_id": user_id,
+                "timezone": timezone,
+                "schedule": json.dumps(schedule),
+                **{f"slot:{dose_time}": minute for dose_time, minute in slots.items()}
+            })
+            for dose_time, minute in slots.items():
+                pipe.sadd(self._bucket_key(shard, minute), self._member(medication_id, dose_time))
+        await pipe.execute()
+
+    async def cancel(self, medication_id: str) -> bool:
+        """Remove every dose time of a medication"""
+        await self.connect()
+        existing = await self.redis.hgetall(self._entry_key(medication_id))
+        if not existing:
+            return False
+
+        pipe = self.redis.pipeline(transaction=True)
+        self._unschedule(pipe, medication_id, existing)
+        await pipe.execute()
+        return True
+
+    async def tick(self, now: Optional[datetime] = None) -> int:
+        """Fire every due bucket of the owned shards; returns reminders fired"""
+        await self.connect()
+        now = now or datetime.now(pytz.UTC)
+        current = minute_of(now)
+
+        cursors = await self.redis.mget([self._cursor_key(shard) for shard in self.owned])
+        timestamp = now.timestamp()
+
+        # Claim due buckets into each shard's in-flight set and advance the
+        # cursors atomically, so overlapping workers never fire the same
+        # bucket twice and a tick that dies part way is retried once its
+        # lease expires
+        pipe = self.redis.pipeline(transaction=False)
+        for shard, cursor in zip(self.owned, cursors):
+            start = current if cursor is None else int(cursor) + 1
+            minutes = list(range(max(start, current - self.catch_up_minutes), current + 1))
+            await self._drain(
+                keys=[
+                    self._cursor_key(shard),
+                    self._in_flight_key(shard),
+                    *(self._bucket_key(shard, minute) for minute in minutes)
+                ],
+                args=[current, timestamp, timestamp - self.in_flight_lease, *minutes],
+                client=pipe
+            )
+        results = await pipe.execute()
+
+        due = []
+        for shard, items in zip(self.owned, results):
+            for item in items:
+                minute, member = item.split("|", 1)
+                due.append((shard, int(minute), member))
+        if not due:
+            return 0
+        fired = await self._reschedule(due, now)
+
+        outcomes = await asyncio.gather(
+            *(self.on_fire(user_id, medication_id, dose_time) for user_id, medication_id, dose_time in fired),
+            return_exceptions=True
+        )
+        for (user_id, medication_id, _), outcome in zip(fired, outcomes):
+            if isinstance(outcome, Exception):
+                logger.error(f"Failed to fire reminder for medication {medication_id}: {str(outcome)}")
+        return len(fired)
+
+    async def _reschedule(
+        self,
+        due: List[Tuple[int, int, str]],
+        now: datetime
+    ) -> List[Tuple[str, str, str]]:
+        """
+        Move in-flight reminders to the bucket of their next occurrence
+        before they fire, so a crash mid-send never drops a medication's
+        later doses. A reminder whose entry is unusable is logged and
+        released without stopping the rest of the batch.
+        """
+        medication_ids = list({member.rsplit("|", 1)[0] for _, _, member in due})
+        pipe = self.redis.pipeline(transaction=False)
+        for medication_id in medication_ids:
+            pipe.hgetall(self._entry_key(medication_id))
+        entries = dict(zip(medication_ids, await pipe.execute()))
+
+        # One entry per pipelined command: the reminder it fires, or None
+        # for a plain release
+        settling = []
+        # Reminders sharing a schedule and bucket share their next occurrence
+        next_minutes = {}
+        pipe = self.redis.pipeline(transaction=False)
+        for shard, minute, member in due:
+            medication_id, dose_time = member.rsplit("|", 1)
+            entry = entries[medication_id]
+            field = f"slot:{dose_time}"
+            item = f"{minute}|{member}"
+
+            # Release reminders cancelled or rescheduled since the bucket was filled
+            if entry.get(field) != str(minute) or not entry.get("user_id"):
+                pipe.zrem(self._in_flight_key(shard), item)
+                settling.append(None)
+                continue
+            try:
+                key = (entry["schedule"], entry["timezone"], dose_time, minute)
+                if key not in next_minutes:
+                    trigger = build_trigger(json.loads(entry["schedule"]), dose_time, entry["timezone"])
+                    after = max(now, datetime.fromtimestamp((minute + 1) * 60, pytz.UTC))
+                    next_minutes[key] = self._next_minute(trigger, after)
+                next_minute = next_minutes[key]
+            except Exception as e:
+                logger.error(f"Dropping reminder for medication {medication_id} at {dose_time}: {str(e)}")
+                pipe.zrem(self._in_flight_key(shard), item)
+                settling.append(None)
+                continue
+
+            await self._settle(
+                keys=[
+                    self._entry_key(medication_id),
+                    self._in_flight_key(shard),
+                    self._bucket_key(shard, minute if next_minute is None else next_minute)
+                ],
+                args=[item, field, minute, "" if next_minute is None else next_minute, member],
+                client=pipe
+            )
+            settling.append((entry["user_id"], medication_id, dose_time))
+        results = await pipe.execute()
+
+        return [reminder for reminder, result in zip(settling, results) if reminder and result == 1]
+
+    async def start(self):
+        """Start ticking the owned shards once a minute"""
+        if self.running:
+            return
+        await self.connect()
+        self.running = True
+        self.current_task = asyncio.create_task(self._run())
+        logger.info(f"Reminder engine started for {len(self.owned)} of {self.shards} shards")
+
+    async def stop(self):
+        self.running = False
+        if self.current_task:
+            self.current_task.cancel()
+            try:
+                await self.current_task
+            except asyncio.CancelledError:
+                pass
+        logger.info("Reminder engine stopped")
+
+    async def _run(self):
+        while self.running:
+            try:
+                fired = await self.tick()
+                if fired:
+                    logger.info(f"Fired {fired} medication reminders")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in reminder engine: {str(e)}")
+            # Wake just after the next minute boundary
+            await asyncio.sleep(60 - time.time() % 60 + 0.05)
@@ -0,0 +1,250 @@
+"""
+Pooled SMTP transport
+
+Keeps a bounded set of authenticated SMTP connections open between sends
+instead of paying TCP, TLS and AUTH for every message. Idle connections
+are health checked with NOOP before reuse and replaced when stale or
+broken. Batches are spread over every pooled connection at once.
+
+Commands on one connection are not pipelined (RFC 2920): aiosmtplib's
+protocol tracks a single pending response and discards replies that
+arrive together, so each connection runs one command at a time.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from email.message import Message
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import aiosmtplib
+from aiosmtplib.email import extract_recipients, extract_sender, flatten_message
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "4"))
+
+# Raised when a connection dropped before the message was handed over,
+# so the send can safely be retried on a fresh connection
+RETRYABLE_ERRORS = (aiosmtplib.SMTPServerDisconnected, ConnectionError, asyncio.TimeoutError)
+
+SendResult = Tuple[Dict[str, aiosmtplib.SMTPResponse], str]
+
+@dataclass
+class PooledConnection:
+    """An authenticated SMTP client and its usage counters"""
+    smtp: aiosmtplib.SMTP
+    created_at: float = field(default_factory=time.monotonic)
+    last_used: float = field(default_factory=time.monotonic)
+    messages: int = 0
+
+class MessageNotSent(Exception):
+    """Wraps a failure that happened before any message data was written"""
+
+    def __init__(self, error: Exception):
+        super().__init__(str(error))
+        self.error = error
+
+class SMTPPool:
+    """Bounded pool of persistent SMTP connections"""
+
+    def __init__(
+        self,
+        hostname: str,
+        port: int,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        use_tls: bool = False,
+        start_tls: Optional[bool] = None,
+        size: int = DEFAULT_POOL_SIZE,
+        max_messages: int = 500,
+        max_idle: float = 60.0,
+        health_check_after: float = 10.0,
+        timeout: float = 30.0
+    ):
+        self.hostname = hostname
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.start_tls = start_tls
+        self.size = size
+        self.max_messages = max_messages
+        self.max_idle = max_idle
+        self.health_check_after = health_check_after
+        self.timeout = timeout
+
+        self._idle: List[PooledConnection] = []
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.stats = {"connects": 0, "reconnects": 0, "health_checks": 0, "sent": 0, "failed": 0, "retries": 0}
+
+    async def send(
+        self,
+        message: Message,
+        sender: Optional[str] = None,
+        recipients: Optional[Union[str, Sequence[str]]] = None
+    ) -> SendResult:
+        """Send one message over a pooled connection, like SMTP.send_message"""
+        sender = sender or extract_sender(message)
+        if isinstance(recipients, str):
+            recipients = [recipients]
+        recipients = list(recipients or extract_recipients(message))
+        if not sender or not recipients:
+            raise ValueError("Message has no sender or recipients")
+
+        data = flatten_message(message)
+        semaphore = self._bind_loop()
+        async with semaphore:
+            for attempt in range(2):
+                connection = await self._checkout()
+                try:
+                    result = await self._transact(connection.smtp, sender, recipients, data)
+                except MessageNotSent as e:
+                    self._discard(connection)
+                    if attempt == 0 and isinstance(e.error, RETRYABLE_ERRORS):
+                        # Most likely an idle connection the server closed
+                        logger.warning(f"SMTP connection lost before sending, retrying: {e.error}")
+                        self.stats["retries"] += 1
+                        continue
+                    self.stats["failed"] += 1
+                    raise e.error
+                except RETRYABLE_ERRORS:
+                    self._discard(connection)
+                    self.stats["failed"] += 1
+                    raise
+                except aiosmtplib.SMTPException:
+                    # The server refused the transaction; the connection is still usable
+                    self.stats["failed"] += 1
+                    await self._reset(connection)
+                    raise
+                except Exception:
+                    self._discard(connection)
+                    self.stats["failed"] += 1
+                    raise
+
+                connection.messages += 1
+                connection.last_used = time.monotonic()
+                self._idle.append(connection)
+                self.stats["sent"] += 1
+                return result
+
+    async def send_many(self, messages: Iterable[Message]) -> List[Union[SendResult, Exception]]:
+        """Send messages concurrently across the pool; failures are returned in place"""
+        return await asyncio.gather(*(self.send(message) for message in messages), return_exceptions=True)
+
+    async def close(self) -> None:
+        """Quit every idle connection"""
+        idle, self._idle = self._idle, []
+        for connection in idle:
+            try:
+                await connection.smtp.quit(timeout=self.timeout)
+            except Exception:
+                connection.smtp.close()
+
+    def _bind_loop(self) -> asyncio.Semaphore:
+        """
+        Connections belong to the event loop that opened them; a new loop
+        (e.g. one per request under Flask async views) starts a new pool.
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            for connection in self._idle:
+                connection.smtp.close()
+            self._idle = []
+            self._semaphore = asyncio.Semaphore(self.size)
+            self._loop = loop
+        return self._semaphore
+
+    async def _checkout(self) -> PooledConnection:
+        """Reuse a healthy idle connection or open a new one"""
+        while self._idle:
+            connection = self._idle.pop()
+            idle_for = time.monotonic() - connection.last_used
+            if (
+                not connection.smtp.is_connected
+                or idle_for > self.max_idle
+                or connection.messages >= self.max_messages
+            ):
+                await self._retire(connection)
+                continue
+            if idle_for > self.health_check_after:
+                self.stats["health_checks"] += 1
+                try:
+                    await connection.smtp.noop(timeout=self.timeout)
+                except Exception:
+                    self._discard(connection)
+                    continue
+            return connection
+        return await self._connect()
+
+    async def _connect(self) -> PooledConnection:
+        smtp = aiosmtplib.SMTP(
+            hostname=self.hostname,
+            port=self.port,
+            use_tls=self.use_tls,
+            start_tls=self.start_tls,
+            timeout=self.timeout
+        )
+        await smtp.connect()
+        try:
+            if self.username and self.password:
+                await smtp.login(self.username, self.password)
+        except Exception:
+            smtp.close()
+            raise
+        self.stats["connects"] += 1
+        return PooledConnection(smtp)
+
+    async def _retire(self, connection: PooledConnection) -> None:
+        self.stats["reconnects"] += 1
+        try:
+            await connection.smtp.quit(timeout=self.timeout)
+        except Exception:
+            connection.smtp.close()
+
+    async def _reset(self, connection: PooledConnection) -> None:
+        try:
+            await connection.smtp.rset(timeout=self.timeout)
+        except Exception:
+            self._discard(connection)
+        else:
+            connection.last_used = time.monotonic()
+            self._idle.append(connection)
+
+    def _discard(self, connection: PooledConnection) -> None:
+        self.stats["reconnects"] += 1
+        connection.smtp.close()
+
+    async def _transact(self, smtp: aiosmtplib.SMTP, sender: str, recipients: List[str], data: bytes) -> SendResult:
+        """One mail transaction; connection failures before DATA are raised as MessageNotSent"""
+        try:
+            await smtp.mail(sender, timeout=self.timeout)
+            errors = {}
+            for recipient in recipients:
+                try:
+                    await smtp.rcpt(recipient, timeout=self.timeout)
+                except aiosmtplib.SMTPRecipientRefused as e:
+                    errors[recipient] = aiosmtplib.SMTPResponse(e.code, e.message)
+        except RETRYABLE_ERRORS as e:
+            raise MessageNotSent(e) from e
+
+        if len(errors) == len(recipients):
+            raise aiosmtplib.SMTPRecipientsRefused([
+                aiosmtplib.SMTPRecipientRefused(response.code, response.message, recipient)
+                for recipient, response in errors.items()
+            ])
+
+        response = await smtp.data(data, timeout=self.timeout)
+        return errors, response.message
+
+_pools: Dict[tuple, SMTPPool] = {}
+
+def get_smtp_pool(hostname: str, port: int, username: Optional[str] = None, password: Optional[str] = None, **kwargs) -> SMTPPool:
+    """Shared pool per server and account"""
+    key = (hostname, port, username)
+    if key not in _pools:
+        _pools[key] = SMTPPool(hostname, port, username, password, **kwargs)
+    return _pools[key]
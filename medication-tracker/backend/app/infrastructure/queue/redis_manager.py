@@ -1,5 +1,6 @@
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 import json
+import uuid
 import redis.asyncio as redis
 import logging
 from datetime import datetime
@@ -7,12 +8,110 @@ from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Claims due scheduled notifications, then ready ones, leasing each in the
+# processing set until its visibility deadline. Lease members are
+# "<claim token>|<payload>", so a redelivered message gets a new receipt and a
+# worker whose lease expired can no longer settle it. Expired leases are put
+# back on the ready queue first, so a crashed worker's messages are redelivered.
+# KEYS: scheduled, ready, processing
+# ARGV: now, count, lease deadline, max leases to reap, claim token
+CLAIM_SCRIPT = """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[3], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[4]))
+for _, lease in ipairs(expired) do
+    redis.call('ZREM', KEYS[3], lease)
+    redis.call('RPUSH', KEYS[2], string.sub(lease, string.find(lease, '|', 1, true) + 1))
+end
+
+local count = tonumber(ARGV[2])
+local claimed = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, count)
+for _, payload in ipairs(claimed) do
+    redis.call('ZREM', KEYS[1], payload)
+end
+while #claimed < count do
+    local payload = redis.call('RPOP', KEYS[2])
+    if not payload then
+        break
+    end
+    table.insert(claimed, payload)
+end
+
+local leases = {}
+for i, payload in ipairs(claimed) do
+    local lease = ARGV[5] .. ':' .. i .. '|' .. payload
+    redis.call('ZADD', KEYS[3], ARGV[3], lease)
+    leases[i] = lease
+end
+return leases
+"""
+
+# Returns every expired lease to the ready queue
+# KEYS: processing, ready
+# ARGV: now
+REAP_SCRIPT = """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+for _, lease in ipairs(expired) do
+    redis.call('ZREM', KEYS[1], lease)
+    redis.call('RPUSH', KEYS[2], string.sub(lease, string.find(lease, '|', 1, true) + 1))
+end
+return #expired
+"""
+
+# Extends a lease only while the caller still holds it
+# KEYS: processing
+# ARGV: receipt, new deadline
+EXTEND_SCRIPT = """
+if redis.call('ZSCORE', KEYS[1], ARGV[1]) then
+    redis.call('ZADD', KEYS[1], ARGV[2], ARGV[1])
+    return 1
+end
+return 0
+"""
+
+# Reschedules a claimed notification only while the caller still holds its lease
+# KEYS: processing, scheduled
+# ARGV: receipt, schedule time, payload
+RETRY_SCRIPT = """
+if redis.call('ZREM', KEYS[1], ARGV[1]) == 1 then
+    redis.call('ZADD', KEYS[2], ARGV[2], ARGV[3])
+    return 1
+end
+return 0
+"""
+
+# Dead-letters a claimed notification only while the caller still holds its lease
+# KEYS: processing, dead letter
+# ARGV: receipt, payload
+DLQ_SCRIPT = """
+if redis.call('ZREM', KEYS[1], ARGV[1]) == 1 then
+    redis.call('LPUSH', KEYS[2], ARGV[2])
+    return 1
+end
+return 0
+"""
+
 class RedisQueueManager:
-    def __init__(self):
+    """
+    Reliable notification queue. Dequeued notifications are leased in the
+    processing set rather than removed, and must be acknowledged with
+    ack_notification, rescheduled with retry_notification or dead-lettered
+    with move_to_dlq. Unacknowledged notifications become visible again
+    once their lease expires.
+    """
+
+    def __init__(self, visibility_timeout: int = 300, reap_batch_size: int = 100):
         self.redis: Optional[redis.Redis] = None
         self.notification_queue = "notification_queue"
         self.dead_letter_queue = "notification_dlq"
         self.processing_queue = "notification_processing"
+        self.scheduled_queue = "scheduled_notifications"
+        self.wakeup_queue = "notification_wakeup"
+        self.visibility_timeout = visibility_timeout
+        self.reap_batch_size = reap_batch_size
+        self._claim = None
+        self._reap = None
+        self._extend = None
+        self._retry = None
+        self._dlq = None
         
     async def connect(self):
         if not self.redis:
@@ -22,11 +121,25 @@ class RedisQueueManager:
                     encoding="utf-8",
                     decode_responses=True
                 )
+                self._register_scripts()
                 logger.info("Successfully connected to Redis")
             except Exception as e:
                 logger.error(f"Failed to connect to Redis: {str(e)}")
                 raise
                 
+    def _register_scripts(self):
+        self._claim = self.redis.register_script(CLAIM_SCRIPT)
+        self._reap = self.redis.register_script(REAP_SCRIPT)
+        self._extend = self.redis.register_script(EXTEND_SCRIPT)
+        self._retry = self.redis.register_script(RETRY_SCRIPT)
+        self._dlq = self.redis.register_script(DLQ_SCRIPT)
+        
+    async def _ensure_connected(self):
+        if not self.redis:
+            await self.connect()
+        elif self._claim is None:
+            self._register_scripts()
+            
     async def disconnect(self):
         if self.redis:
             await self.redis.close()
@@ -39,20 +152,25 @@ class RedisQueueManager:
             
         try:
             message = {
+                # Keeps every queued payload unique, since payloads are the queue members
+                "id": uuid.uuid4().hex,
                 "data": notification_data,
                 "attempts": 0,
                 "created_at": datetime.utcnow().isoformat(),
                 "schedule_time": schedule_time.isoformat() if schedule_time else None
             }
             
+            pipe = self.redis.pipeline(transaction=True)
             # If scheduled for later, add to sorted set with schedule time as score
             if schedule_time:
-                await self.redis.zadd(
-                    "scheduled_notifications",
+                pipe.zadd(
+                    self.scheduled_queue,
                     {json.dumps(message): schedule_time.timestamp()}
                 )
             else:
-                await self.redis.lpush(self.notification_queue, json.dumps(message))
+                pipe.lpush(self.notification_queue, json.dumps(message))
+            self._signal(pipe)
+            await pipe.execute()
                 
             logger.info(f"Notification enqueued successfully: {notification_data.get('id')}")
             
@@ -61,48 +179,152 @@ class RedisQueueManager:
             raise
             
     async def dequeue_notification(self) -> Optional[Dict[str, Any]]:
-        """Get the next notification from the queue"""
-        if not self.redis:
-            await self.connect()
+        """Claim the next notification from the queue"""
+        claimed = await self.claim_notifications(1)
+        return claimed[0] if claimed else None
+        
+    async def claim_notifications(
+        self,
+        count: int,
+        visibility_timeout: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Atomically claim up to `count` notifications in one round trip: due
+        scheduled notifications first, then the ready queue. Each is leased
+        for `visibility_timeout` seconds and carries a "receipt" to settle it with.
+        """
+        await self._ensure_connected()
             
         try:
-            # First check scheduled notifications
             now = datetime.utcnow().timestamp()
-            scheduled = await self.redis.zrangebyscore(
-                "scheduled_notifications",
-                "-inf",
-                now,
-                start=0,
-                num=1
+            deadline = now + (visibility_timeout or self.visibility_timeout)
+            leases = await self._claim(
+                keys=[self.scheduled_queue, self.notification_queue, self.processing_queue],
+                args=[now, count, deadline, self.reap_batch_size, uuid.uuid4().hex]
             )
             
-            if scheduled:
-                # Remove from scheduled set and return
-                notification = json.loads(scheduled[0])
-                await self.redis.zrem("scheduled_notifications", scheduled[0])
-                return notification
-                
-            # If no scheduled notifications are ready, check regular queue
-            data = await self.redis.rpop(self.notification_queue)
-            if data:
-                return json.loads(data)
-                
-            return None
+            notifications = []
+            for lease in leases:
+                notification = json.loads(lease.split("|", 1)[1])
+                notification["receipt"] = lease
+                notifications.append(notification)
+            return notifications
             
         except Exception as e:
             logger.error(f"Failed to dequeue notification: {str(e)}")
             raise
             
-    async def move_to_dlq(self, notification: Dict[str, Any], error: str):
-        """Move a failed notification to the dead letter queue"""
-        if not self.redis:
-            await self.connect()
+    async def ack_notification(self, notification: Dict[str, Any]) -> bool:
+        """Settle a claimed notification; False if its lease had already expired"""
+        await self._ensure_connected()
+        return bool(await self.redis.zrem(self.processing_queue, notification["receipt"]))
+        
+    async def ack_notifications(self, notifications: List[Dict[str, Any]]) -> int:
+        """Settle a batch of claimed notifications in one round trip"""
+        if not notifications:
+            return 0
+        await self._ensure_connected()
+        return await self.redis.zrem(
+            self.processing_queue,
+            *(notification["receipt"] for notification in notifications)
+        )
+        
+    async def extend_lease(self, notification: Dict[str, Any], visibility_timeout: Optional[int] = None) -> bool:
+        """Keep a long-running claim invisible to other workers"""
+        await self._ensure_connected()
+        deadline = datetime.utcnow().timestamp() + (visibility_timeout or self.visibility_timeout)
+        return bool(await self._extend(keys=[self.processing_queue], args=[notification["receipt"], deadline]))
+        
+    async def retry_notification(self, notification: Dict[str, Any], schedule_time: float) -> bool:
+        """
+        Atomically release a claimed notification and reschedule it for
+        `schedule_time` (epoch seconds). False if its lease had expired, in
+        which case it has already been redelivered and is left alone.
+        """
+        await self._ensure_connected()
             
         try:
-            notification["error"] = error
-            notification["moved_to_dlq_at"] = datetime.utcnow().isoformat()
-            await self.redis.lpush(self.dead_letter_queue, json.dumps(notification))
-            logger.info(f"Notification moved to DLQ: {notification.get('data', {}).get('id')}")
+            message = {key: value for key, value in notification.items() if key != "receipt"}
+            message["schedule_time"] = datetime.utcfromtimestamp(schedule_time).isoformat()
+            
+            retried = await self._retry(
+                keys=[self.processing_queue, self.scheduled_queue],
+                args=[notification["receipt"], schedule_time, json.dumps(message)]
+            )
+            if retried:
+                pipe = self.redis.pipeline(transaction=True)
+                self._signal(pipe)
+                await pipe.execute()
+            return bool(retried)
+            
+        except Exception as e:
+            logger.error(f"Failed to reschedule notification: {str(e)}")
+            raise
+            
+    async def wait_for_notifications(self, timeout: float) -> bool:
+        """
+        Block until a notification is enqueued, the next scheduled one falls
+        due or a lease expires, or `timeout` seconds pass. Returns True if
+        woken before the timeout.
+        """
+        await self._ensure_connected()
+        
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.zrange(self.scheduled_queue, 0, 0, withscores=True)
+        pipe.zrange(self.processing_queue, 0, 0, withscores=True)
+        next_scheduled, next_expiry = await pipe.execute()
+        
+        now = datetime.utcnow().timestamp()
+        for entries in (next_scheduled, next_expiry):
+            if entries:
+                timeout = min(timeout, entries[0][1] - now)
+        if timeout <= 0:
+            return True
+        
+        # BLPOP rounds sub-millisecond timeouts down to "block forever"
+        return await self.redis.blpop(self.wakeup_queue, timeout=max(timeout, 0.01)) is not None
+        
+    def _signal(self, pipe):
+        """Wake one blocked worker; the list is capped so idle signals don't pile up"""
+        pipe.lpush(self.wakeup_queue, 1)
+        pipe.ltrim(self.wakeup_queue, 0, 99)
+        
+    async def reap_expired_leases(self) -> int:
+        """Return notifications whose lease expired to the ready queue"""
+        await self._ensure_connected()
+        reaped = await self._reap(
+            keys=[self.processing_queue, self.notification_queue],
+            args=[datetime.utcnow().timestamp()]
+        )
+        if reaped:
+            logger.warning(f"Requeued {reaped} notifications with expired leases")
+        return reaped
+            
+    async def move_to_dlq(self, notification: Dict[str, Any], error: str) -> bool:
+        """
+        Move a failed notification to the dead letter queue. A claimed
+        notification is only moved while the caller still holds its lease;
+        False if it had expired, in which case it has already been
+        redelivered and is left alone.
+        """
+        await self._ensure_connected()
+            
+        try:
+            receipt = notification.get("receipt")
+            message = {key: value for key, value in notification.items() if key != "receipt"}
+            message["error"] = error
+            message["moved_to_dlq_at"] = datetime.utcnow().isoformat()
+            
+            if receipt:
+                moved = await self._dlq(
+                    keys=[self.processing_queue, self.dead_letter_queue],
+                    args=[receipt, json.dumps(message)]
+                )
+            else:
+                moved = await self.redis.lpush(self.dead_letter_queue, json.dumps(message))
+            if moved:
+                logger.info(f"Notification moved to DLQ: {message.get('data', {}).get('id')}")
+            return bool(moved)
             
         except Exception as e:
             logger.error(f"Failed to move notification to DLQ: {str(e)}")
@@ -138,12 +360,14 @@ class RedisQueueManager:
         try:
             pending = await self.redis.llen(self.notification_queue)
             dlq = await self.redis.llen(self.dead_letter_queue)
-            scheduled = await self.redis.zcard("scheduled_notifications")
+            scheduled = await self.redis.zcard(self.scheduled_queue)
+            processing = await self.redis.zcard(self.processing_queue)
             
             return {
                 "pending_notifications": pending,
                 "dead_letter_queue": dlq,
-                "scheduled_notifications": scheduled
+                "scheduled_notifications": scheduled,
+                "processing_notifications": processing
             }
             
         except Exception as e:
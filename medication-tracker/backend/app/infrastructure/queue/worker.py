@@ -1,7 +1,12 @@
 import asyncio
 import logging
-from typing import Optional
+import os
+import time
+from collections import deque
+from contextlib import AsyncExitStack
+from typing import Dict, Optional, Set
 from datetime import datetime
+from prometheus_client import CollectorRegistry, Gauge, Histogram
 from app.infrastructure.queue.redis_manager import queue_manager
 from app.application.services.notification_service import NotificationApplicationService
 from app.domain.notification.entities import Notification
@@ -9,23 +14,84 @@ from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+def parse_channel_limits(value: str) -> Dict[str, int]:
+    """Parse "push=32,email=8" into per-channel concurrency limits"""
+    limits = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        channel, _, limit = item.partition("=")
+        limits[channel.strip()] = int(limit)
+    return limits
+
+DEFAULT_CONCURRENCY = int(os.getenv("NOTIFICATION_WORKER_CONCURRENCY", "32"))
+DEFAULT_CHANNEL_LIMITS = parse_channel_limits(os.getenv("NOTIFICATION_CHANNEL_LIMITS", ""))
+DEFAULT_DRAIN_TIMEOUT = float(os.getenv("NOTIFICATION_WORKER_DRAIN_TIMEOUT", "30"))
+QUEUE_DEPTH_REFRESH_SECONDS = 1.0
+
 class NotificationWorker:
-    def __init__(self, notification_service: NotificationApplicationService):
+    """
+    Claims notifications in batches and sends up to `concurrency` of them at
+    once, with optional per-channel limits so one slow channel cannot take
+    every slot. Waits on the queue's wake-up signal instead of sleep-polling.
+    """
+
+    def __init__(
+        self,
+        notification_service: NotificationApplicationService,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        channel_limits: Optional[Dict[str, int]] = None,
+        drain_timeout: float = DEFAULT_DRAIN_TIMEOUT,
+        registry: Optional[CollectorRegistry] = None
+    ):
         self.notification_service = notification_service
+        self.concurrency = concurrency
+        self.channel_limits = DEFAULT_CHANNEL_LIMITS if channel_limits is None else channel_limits
+        self.drain_timeout = drain_timeout
         self.running = False
         self.current_task: Optional[asyncio.Task] = None
-        
+        self.in_flight: Set[asyncio.Task] = set()
+        self.slots: Optional[asyncio.Semaphore] = None
+        self.channel_slots: Dict[str, asyncio.Semaphore] = {}
+        self.latencies = deque(maxlen=1000)
+        self._depth_checked_at = 0.0
+        self._setup_metrics(registry or CollectorRegistry())
+
+    def _setup_metrics(self, registry: CollectorRegistry):
+        """Live gauges for the worker pool"""
+        self.registry = registry
+        self.in_flight_gauge = Gauge(
+            'notification_worker_in_flight',
+            'Notifications currently being sent',
+            ['channel'],
+            registry=registry
+        )
+        self.queue_depth_gauge = Gauge(
+            'notification_queue_depth',
+            'Notifications waiting in the queue',
+            ['queue'],
+            registry=registry
+        )
+        self.send_latency = Histogram(
+            'notification_send_latency_seconds',
+            'Time to send one notification',
+            ['channel'],
+            registry=registry
+        )
+
     async def start(self):
         """Start the notification worker"""
         if self.running:
             return
-            
+
         self.running = True
+        self.slots = asyncio.Semaphore(self.concurrency)
+        self.channel_slots = {
+            channel: asyncio.Semaphore(limit) for channel, limit in self.channel_limits.items()
+        }
         self.current_task = asyncio.create_task(self._process_queue())
-        logger.info("Notification worker started")
-        
+        logger.info(f"Notification worker started with {self.concurrency} slots")
+
     async def stop(self):
-        """Stop the notification worker"""
+        """Stop claiming, then let in-flight sends finish for up to drain_timeout"""
         self.running = False
         if self.current_task:
             self.current_task.cancel()
@@ -33,53 +99,125 @@ class NotificationWorker:
                 await self.current_task
             except asyncio.CancelledError:
                 pass
+
+        if self.in_flight:
+            logger.info(f"Draining {len(self.in_flight)} in-flight notifications")
+            _, pending = await asyncio.wait(self.in_flight, timeout=self.drain_timeout)
+            # Unfinished sends are not acknowledged, so they are redelivered once their lease expires
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
         logger.info("Notification worker stopped")
-        
+
+    def stats(self) -> Dict[str, float]:
+        """Current in-flight count and recent send latency"""
+        latencies = sorted(self.latencies)
+        return {
+            "in_flight": len(self.in_flight),
+            "sent": len(latencies),
+            "latency_p50": latencies[len(latencies) // 2] if latencies else 0.0,
+            "latency_p99": latencies[int(len(latencies) * 0.99)] if latencies else 0.0
+        }
+
     async def _process_queue(self):
         """Main queue processing loop"""
         while self.running:
             try:
-                # Get next notification from queue
-                notification_data = await queue_manager.dequeue_notification()
-                if not notification_data:
-                    # No notifications to process, wait before checking again
-                    await asyncio.sleep(settings.QUEUE_POLL_INTERVAL)
+                # Claim only as many notifications as there are free slots
+                if len(self.in_flight) >= self.concurrency:
+                    await asyncio.wait(self.in_flight, return_when=asyncio.FIRST_COMPLETED)
+                    continue
+
+                claimed = await queue_manager.claim_notifications(self.concurrency - len(self.in_flight))
+                await self._refresh_queue_depth()
+                if not claimed:
+                    # Nothing due; block until something is enqueued or falls due
+                    await queue_manager.wait_for_notifications(settings.QUEUE_POLL_INTERVAL)
                     continue
-                    
-                # Convert queue data to Notification entity
-                notification = Notification.from_dict(notification_data["data"])
-                
-                # Process the notification
-                try:
-                    await self.notification_service.send_notification(notification)
-                    logger.info(f"Successfully processed notification: {notification.id}")
-                    
-                except Exception as e:
-                    logger.error(f"Failed to process notification {notification.id}: {str(e)}")
-                    notification_data["attempts"] += 1
-                    
-                    if notification_data["attempts"] >= settings.MAX_NOTIFICATION_ATTEMPTS:
-                        # Move to dead letter queue after max attempts
-                        await queue_manager.move_to_dlq(
-                            notification_data,
-                            f"Max attempts ({settings.MAX_NOTIFICATION_ATTEMPTS}) reached. Last error: {str(e)}"
-                        )
-                    else:
-                        # Re-queue with exponential backoff
-                        delay = 2 ** notification_data["attempts"]  # exponential backoff
-                        schedule_time = datetime.utcnow().timestamp() + delay
-                        await queue_manager.enqueue_notification(
-                            notification_data["data"],
-                            schedule_time
-                        )
-                        
+
+                for notification_data in claimed:
+                    task = asyncio.create_task(self._handle(notification_data))
+                    self.in_flight.add(task)
+                    task.add_done_callback(self.in_flight.discard)
+
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
                 logger.error(f"Error in notification worker: {str(e)}")
                 await asyncio.sleep(settings.QUEUE_ERROR_RETRY_INTERVAL)
-                
+
+    async def _handle(self, notification_data: Dict):
+        """Send one notification within its channel's and the pool's limits"""
+        channel = self._channel(notification_data)
+        async with AsyncExitStack() as stack:
+            if channel in self.channel_slots:
+                await stack.enter_async_context(self.channel_slots[channel])
+            await stack.enter_async_context(self.slots)
+
+            self.in_flight_gauge.labels(channel).inc()
+            start_time = time.perf_counter()
+            try:
+                await self._process_notification(notification_data)
+            finally:
+                elapsed = time.perf_counter() - start_time
+                self.in_flight_gauge.labels(channel).dec()
+                self.send_latency.labels(channel).observe(elapsed)
+                self.latencies.append(elapsed)
+
+    async def _process_notification(self, notification_data: Dict):
+        try:
+            # Convert queue data to Notification entity
+            notification = Notification.from_dict(notification_data["data"])
+
+            # Process the notification
+            try:
+                await self.notification_service.send_notification(notification)
+                await queue_manager.ack_notification(notification_data)
+                logger.info(f"Successfully processed notification: {notification.id}")
+
+            except Exception as e:
+                logger.error(f"Failed to process notification {notification.id}: {str(e)}")
+                notification_data["attempts"] += 1
+
+                if notification_data["attempts"] >= settings.MAX_NOTIFICATION_ATTEMPTS:
+                    # Move to dead letter queue after max attempts
+                    await queue_manager.move_to_dlq(
+                        notification_data,
+                        f"Max attempts ({settings.MAX_NOTIFICATION_ATTEMPTS}) reached. Last error: {str(e)}"
+                    )
+                else:
+                    # Re-queue with exponential backoff
+                    delay = 2 ** notification_data["attempts"]  # exponential backoff
+                    schedule_time = datetime.utcnow().timestamp() + delay
+                    await queue_manager.retry_notification(
+                        notification_data,
+                        schedule_time
+                    )
+
+        except Exception as e:
+            logger.error(f"Error in notification worker: {str(e)}")
+
+    @staticmethod
+    def _channel(notification_data: Dict) -> str:
+        data = notification_data.get("data") or {}
+        return data.get("channel") or data.get("type") or "default"
+
+    async def _refresh_queue_depth(self):
+        now = time.monotonic()
+        if now - self._depth_checked_at < QUEUE_DEPTH_REFRESH_SECONDS:
+            return
+        self._depth_checked_at = now
+        try:
+            stats = await queue_manager.get_queue_stats()
+            for queue, depth in stats.items():
+                self.queue_depth_gauge.labels(queue).set(depth)
+        except Exception as e:
+            logger.warning(f"Failed to refresh queue depth: {str(e)}")
+
     @classmethod
-    async def create_and_start(cls, notification_service: NotificationApplicationService):
+    async def create_and_start(cls, notification_service: NotificationApplicationService, **kwargs):
         """Factory method to create and start a worker"""
-        worker = cls(notification_service)
+        worker = cls(notification_service, **kwargs)
         await worker.start()
         return worker
@@ -1,7 +1,7 @@
 """Medication repository implementation."""
 
 from datetime import datetime, timedelta
-from typing import List, Optional
+from typing import Iterator, List, Optional
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 import logging
@@ -97,12 +97,27 @@ class SQLMedicationRepository(MedicationRepository):
         end_time: datetime
     ) -> List[Medication]:
         """Get due medications with SQL injection protection."""
+        return [
+            medication
+            for batch in self.iter_due_medications(start_time, end_time)
+            for medication in batch
+        ]
+
+    @secure_query_wrapper
+    def iter_due_medications(
+        self,
+        start_time: datetime,
+        end_time: datetime,
+        batch_size: int = 500
+    ) -> Iterator[List[Medication]]:
+        """Yield due medications in batches, mapping rows straight to entities."""
         try:
             # Use parameterized query
             query = text("""
                 SELECT m.* FROM medications m
                 JOIN schedules s ON m.id = s.medication_id
                 WHERE s.dose_time BETWEEN :start_time AND :end_time
+                ORDER BY m.id
             """)
             
             result = self.db.execute(
@@ -111,15 +126,13 @@ class SQLMedicationRepository(MedicationRepository):
                     "start_time": start_time,
                     "end_time": end_time
                 }
-            )
+            ).mappings()
             
-            medication_models = [
-                MedicationModel(**row) for row in result
-            ]
-            return [
-                self.mapper.to_entity(model)
-                for model in medication_models
-            ]
+            while True:
+                rows = result.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield [self.mapper.row_to_entity(row) for row in rows]
         except Exception as e:
             logger.error(f"Error getting due medications: {str(e)}")
             raise
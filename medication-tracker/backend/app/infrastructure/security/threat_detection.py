@@ -1,5 +1,6 @@
+from collections import OrderedDict, deque
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Set
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Set
 from enum import Enum
 from dataclasses import dataclass
 import re
@@ -32,12 +33,78 @@ class SecurityEvent:
     request_pattern: str
     validation_codes: List[str]  # Related VALIDATION-SEC-* codes
 
+# Abnormal behavior thresholds
+IP_EVENT_WINDOW = timedelta(minutes=5)
+IP_EVENT_THRESHOLD = 50  # More than 50 events in 5 minutes
+USER_RESOURCE_WINDOW = timedelta(minutes=15)
+USER_RESOURCE_THRESHOLD = 20  # More than 20 different resources in 15 minutes
+MAX_TRACKED_SOURCES = 10000  # Least recently active IPs/users are evicted beyond this
+
+# Digits become "0" and everything but "-" a space, so digit runs can be
+# found with plain substring checks
+DIGIT_SHAPE_TABLE = bytes(
+    ord("0") if chr(i) in "0123456789" else ord("-") if chr(i) == "-" else ord(" ")
+    for i in range(256)
+)
+
+def digit_shape(text: str) -> bytes:
+    return text.encode("utf-8", "surrogatepass").translate(DIGIT_SHAPE_TABLE)
+
+class CategoryScanner:
+    """
+    One precompiled alternation for a pattern category. The regex only runs
+    when the normalized text contains one of the trigger literals that every
+    match must include, which rules out most clean requests with a few
+    substring checks.
+    """
+
+    def __init__(
+        self,
+        patterns: List[str],
+        flags: int = 0,
+        triggers: Iterable = (),
+        normalize: Optional[Callable[[str], Any]] = None
+    ):
+        self.pattern = re.compile("|".join(f"(?:{pattern})" for pattern in patterns), flags)
+        self.triggers = tuple(triggers)
+        self.normalize = normalize
+
+    def search(self, text: str) -> bool:
+        if self.triggers:
+            normalized = self.normalize(text) if self.normalize else text
+            if not any(trigger in normalized for trigger in self.triggers):
+                return False
+        return self.pattern.search(text) is not None
+
+def iter_request_fields(request_data: Any) -> Iterator[str]:
+    """Yield the text of every key and scalar value in nested request data"""
+    stack = [request_data]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            yield item
+        elif isinstance(item, dict):
+            for key, value in item.items():
+                if isinstance(key, str):
+                    yield key
+                stack.append(value)
+        elif isinstance(item, (list, tuple, set)):
+            stack.extend(item)
+        elif item is not None and not isinstance(item, bool):
+            yield str(item)
+
+def request_text(request_data: Any) -> str:
+    """Request fields one per line, so "." never spans two fields"""
+    return "\n".join(iter_request_fields(request_data))
+
 class ThreatDetectionService:
     def __init__(self):
         self.logger = beta_logger
         self._initialize_detection_patterns()
-        self.suspicious_ips: Dict[str, List[SecurityEvent]] = {}
-        self.suspicious_users: Dict[str, List[SecurityEvent]] = {}
+        # Recent events per IP (bounded ring buffers) and last access time
+        # per resource per user, both pruned to their sliding windows
+        self.suspicious_ips: Dict[str, Deque[datetime]] = OrderedDict()
+        self.suspicious_users: Dict[str, Dict[str, datetime]] = OrderedDict()
         self.active_threats: Dict[str, SecurityEvent] = {}
         
     def _initialize_detection_patterns(self) -> None:
@@ -45,8 +112,12 @@ class ThreatDetectionService:
         self.sql_injection_patterns = [
             r"(\b(union|select|insert|update|delete|drop)\b.*\b(from|into|table)\b)",
             r"('|\")\s*or\s*('|\")?\s*1\s*=\s*1",
-            r"--.*$",
-            r";\s*$"
+            # str(request) put a quote before every string value, so a field
+            # that starts with the tautology still counts
+            r"(\A|\n)[ \t]*or[ \t]*('|\")?[ \t]*1[ \t]*=[ \t]*1",
+            r"--",
+            # A terminated statement, not any field ending in ";"
+            r"\b(union|select|insert|update|delete|drop)\b.*;[ \t]*(\n|\Z)"
         ]
         
         self.phi_patterns = [
@@ -60,6 +131,24 @@ class ThreatDetectionService:
             r"key=",
             r"secret="
         ]
+
+        # One precompiled scanner per category, run once over the request fields
+        self.sql_injection_scanner = CategoryScanner(
+            self.sql_injection_patterns,
+            re.IGNORECASE,
+            triggers=("union", "select", "insert", "update", "delete", "drop", "=", "--", ";"),
+            normalize=str.casefold
+        )
+        self.phi_scanner = CategoryScanner(
+            self.phi_patterns,
+            re.ASCII,
+            triggers=(b"000-00-0000", b"000000"),
+            normalize=digit_shape
+        )
+        self.encryption_scanner = CategoryScanner(
+            self.encryption_patterns,
+            triggers=("password=", "key=", "secret=")
+        )
     
     async def analyze_request(
         self,
@@ -72,9 +161,10 @@ class ThreatDetectionService:
             source_ip = request_data.get('ip_address', '')
             resource = request_data.get('path', '')
             request_pattern = f"{request_data.get('method', '')} {resource}"
+            text = request_text(request_data)
             
             # Check for injection attempts
-            if self._detect_injection_attempt(request_data):
+            if self._detect_injection_attempt(request_data, text):
                 return await self._create_security_event(
                     ThreatType.INJECTION_ATTEMPT,
                     ThreatLevel.HIGH,
@@ -86,7 +176,7 @@ class ThreatDetectionService:
                 )
             
             # Check for unauthorized PHI access
-            if self._detect_phi_access(request_data):
+            if self._detect_phi_access(request_data, text):
                 return await self._create_security_event(
                     ThreatType.DATA_EXFILTRATION,
                     ThreatLevel.CRITICAL,
@@ -98,7 +188,7 @@ class ThreatDetectionService:
                 )
             
             # Check for encryption-related issues
-            if self._detect_encryption_issue(request_data):
+            if self._detect_encryption_issue(request_data, text):
                 return await self._create_security_event(
                     ThreatType.ENCRYPTION_FAILURE,
                     ThreatLevel.HIGH,
@@ -126,29 +216,17 @@ class ThreatDetectionService:
         except Exception as e:
             raise SecurityValidationError(f"Threat detection failed: {str(e)}")
     
-    def _detect_injection_attempt(self, request_data: Dict) -> bool:
+    def _detect_injection_attempt(self, request_data: Dict, text: Optional[str] = None) -> bool:
         """Detect potential SQL injection attempts"""
-        request_str = str(request_data)
-        return any(
-            re.search(pattern, request_str, re.IGNORECASE)
-            for pattern in self.sql_injection_patterns
-        )
+        return self.sql_injection_scanner.search(request_text(request_data) if text is None else text)
     
-    def _detect_phi_access(self, request_data: Dict) -> bool:
+    def _detect_phi_access(self, request_data: Dict, text: Optional[str] = None) -> bool:
         """Detect unauthorized PHI access attempts"""
-        request_str = str(request_data)
-        return any(
-            re.search(pattern, request_str)
-            for pattern in self.phi_patterns
-        )
+        return self.phi_scanner.search(request_text(request_data) if text is None else text)
     
-    def _detect_encryption_issue(self, request_data: Dict) -> bool:
+    def _detect_encryption_issue(self, request_data: Dict, text: Optional[str] = None) -> bool:
         """Detect potential encryption-related issues"""
-        request_str = str(request_data)
-        return any(
-            re.search(pattern, request_str)
-            for pattern in self.encryption_patterns
-        )
+        return self.encryption_scanner.search(request_text(request_data) if text is None else text)
     
     async def _detect_abnormal_behavior(
         self,
@@ -157,26 +235,50 @@ class ThreatDetectionService:
         resource: str
     ) -> bool:
         """Detect abnormal behavior patterns"""
+        now = datetime.utcnow()
+
         # Check for rapid successive requests
-        if source_ip in self.suspicious_ips:
-            recent_events = [
-                event for event in self.suspicious_ips[source_ip]
-                if event.timestamp > datetime.utcnow() - timedelta(minutes=5)
-            ]
-            if len(recent_events) > 50:  # More than 50 requests in 5 minutes
+        events = self.suspicious_ips.get(source_ip)
+        if events is not None:
+            cutoff = now - IP_EVENT_WINDOW
+            while events and events[0] <= cutoff:
+                events.popleft()
+            if len(events) > IP_EVENT_THRESHOLD:
                 return True
         
         # Check for unusual resource access patterns
-        if user_id and user_id in self.suspicious_users:
-            recent_events = [
-                event for event in self.suspicious_users[user_id]
-                if event.timestamp > datetime.utcnow() - timedelta(minutes=15)
-            ]
-            accessed_resources = {event.resource_accessed for event in recent_events}
-            if len(accessed_resources) > 20:  # Accessing many different resources
+        resources = self.suspicious_users.get(user_id) if user_id else None
+        if resources is not None:
+            cutoff = now - USER_RESOURCE_WINDOW
+            while resources and next(iter(resources.values())) <= cutoff:
+                resources.popitem(last=False)
+            if len(resources) > USER_RESOURCE_THRESHOLD:  # Accessing many different resources
                 return True
         
         return False
+
+    def _track_event(self, event: SecurityEvent) -> None:
+        """Record an event in the bounded per-IP and per-user windows"""
+        if event.source_ip:
+            events = self.suspicious_ips.pop(event.source_ip, None)
+            if events is None:
+                events = deque(maxlen=IP_EVENT_THRESHOLD + 1)
+            events.append(event.timestamp)
+            self.suspicious_ips[event.source_ip] = events
+            if len(self.suspicious_ips) > MAX_TRACKED_SOURCES:
+                self.suspicious_ips.popitem(last=False)
+
+        if event.user_id:
+            resources = self.suspicious_users.pop(event.user_id, None)
+            if resources is None:
+                resources = OrderedDict()
+            resources.pop(event.resource_accessed, None)
+            resources[event.resource_accessed] = event.timestamp
+            if len(resources) > USER_RESOURCE_THRESHOLD + 1:
+                resources.popitem(last=False)
+            self.suspicious_users[event.user_id] = resources
+            if len(self.suspicious_users) > MAX_TRACKED_SOURCES:
+                self.suspicious_users.popitem(last=False)
     
     async def _create_security_event(
         self,
@@ -200,16 +302,8 @@ class ThreatDetectionService:
             validation_codes=validation_codes
         )
         
-        # Update tracking dictionaries
-        if source_ip:
-            if source_ip not in self.suspicious_ips:
-                self.suspicious_ips[source_ip] = []
-            self.suspicious_ips[source_ip].append(event)
-        
-        if user_id:
-            if user_id not in self.suspicious_users:
-                self.suspicious_users[user_id] = []
-            self.suspicious_users[user_id].append(event)
+        # Update tracking windows
+        self._track_event(event)
         
         # Log the security event
         self.logger.error(
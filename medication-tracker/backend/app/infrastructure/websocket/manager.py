@@ -1,35 +1,175 @@
-from typing import Dict, Set
+from typing import Callable, Dict, Optional, Set
 from fastapi import WebSocket
 from datetime import datetime
+import asyncio
 import json
 import logging
+import os
+import uuid
+import redis.asyncio as redis
 from app.domain.notification.entities import Notification
 
 logger = logging.getLogger(__name__)
 
+SEND_QUEUE_SIZE = int(os.getenv("WEBSOCKET_SEND_QUEUE_SIZE", "100"))
+SEND_TIMEOUT_SECONDS = float(os.getenv("WEBSOCKET_SEND_TIMEOUT", "10"))
+ROUTING_ENABLED = os.getenv("WEBSOCKET_ROUTING_ENABLED", "false").lower() == "true"
+ROUTING_CHANNEL = "websocket_messages"
+# "Try Again Later": the client fell too far behind and should reconnect
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+class ConnectionWriter:
+    """
+    Bounded outbox for one socket, drained by its own writer task so a slow
+    client only ever delays itself. A full outbox or a send that times out
+    closes the connection.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        on_close: Callable[[], None],
+        max_queue: int = SEND_QUEUE_SIZE,
+        send_timeout: float = SEND_TIMEOUT_SECONDS
+    ):
+        self.websocket = websocket
+        self.on_close = on_close
+        self.send_timeout = send_timeout
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.task = asyncio.create_task(self._run())
+
+    def offer(self, text: str) -> bool:
+        """Queue a pre-serialized message; False when the outbox is full"""
+        try:
+            self.queue.put_nowait(text)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    async def _run(self):
+        try:
+            while True:
+                text = await self.queue.get()
+                await asyncio.wait_for(self.websocket.send_text(text), self.send_timeout)
+                self.queue.task_done()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"WebSocket send failed: {str(e)}")
+            self.on_close()
+
+    async def drain(self):
+        """Wait until every queued message has been sent or the writer stopped"""
+        join = asyncio.create_task(self.queue.join())
+        await asyncio.wait({join, self.task}, return_when=asyncio.FIRST_COMPLETED)
+        join.cancel()
+
+    def stop(self):
+        self.task.cancel()
+
+    async def close(self, code: int):
+        self.stop()
+        try:
+            await self.websocket.close(code=code)
+        except Exception as e:
+            logger.debug(f"Failed to close WebSocket: {str(e)}")
+
 class ConnectionManager:
-    def __init__(self):
+    """
+    Tracks this node's sockets and fans messages out to them concurrently
+    through per-connection writers. With routing enabled, every message is
+    also published on a Redis channel, and nodes holding sockets subscribe
+    to it, so a user is reached whichever node their sockets are on.
+    """
+
+    def __init__(
+        self,
+        redis_client: Optional[redis.Redis] = None,
+        routing: bool = ROUTING_ENABLED,
+        max_queue: int = SEND_QUEUE_SIZE,
+        send_timeout: float = SEND_TIMEOUT_SECONDS
+    ):
         # Map of user_id to set of WebSocket connections
         self.active_connections: Dict[str, Set[WebSocket]] = {}
-        
+        self.writers: Dict[WebSocket, ConnectionWriter] = {}
+        self.max_queue = max_queue
+        self.send_timeout = send_timeout
+        self.redis = redis_client
+        self.routing = routing
+        self.node_id = uuid.uuid4().hex
+        self.routing_task: Optional[asyncio.Task] = None
+        self.routing_lock = asyncio.Lock()
+
     async def connect(self, websocket: WebSocket, user_id: str):
         await websocket.accept()
+        if self.routing:
+            await self.start_routing()
         if user_id not in self.active_connections:
             self.active_connections[user_id] = set()
         self.active_connections[user_id].add(websocket)
+        self._writer(websocket, user_id)
         logger.info(f"New WebSocket connection for user {user_id}")
-        
+
     def disconnect(self, websocket: WebSocket, user_id: str):
         if user_id in self.active_connections:
             self.active_connections[user_id].discard(websocket)
             if not self.active_connections[user_id]:
                 del self.active_connections[user_id]
+        writer = self.writers.pop(websocket, None)
+        if writer:
+            writer.stop()
         logger.info(f"WebSocket disconnected for user {user_id}")
-        
+
+    def _writer(self, websocket: WebSocket, user_id: str) -> ConnectionWriter:
+        writer = self.writers.get(websocket)
+        if writer is None or writer.task.done():
+            writer = ConnectionWriter(
+                websocket,
+                lambda: self._drop(websocket, user_id),
+                self.max_queue,
+                self.send_timeout
+            )
+            self.writers[websocket] = writer
+        return writer
+
+    def _drop(self, websocket: WebSocket, user_id: str):
+        """Forget a failed or slow connection and close it in the background"""
+        writer = self.writers.get(websocket)
+        self.disconnect(websocket, user_id)
+        if writer:
+            asyncio.create_task(writer.close(SLOW_CONSUMER_CLOSE_CODE))
+
+    def _deliver(self, user_id: Optional[str], text: str) -> int:
+        """Queue a message for one user's sockets, or every socket when user_id is None"""
+        if user_id is None:
+            targets = [(uid, ws) for uid, sockets in self.active_connections.items() for ws in sockets]
+        else:
+            targets = [(user_id, ws) for ws in self.active_connections.get(user_id, ())]
+
+        queued = 0
+        for uid, websocket in targets:
+            if self._writer(websocket, uid).offer(text):
+                queued += 1
+            else:
+                logger.warning(f"Closing slow WebSocket connection for user {uid}")
+                self._drop(websocket, uid)
+        return queued
+
+    async def _route(self, user_id: Optional[str], text: str) -> int:
+        queued = self._deliver(user_id, text)
+        if self.routing:
+            try:
+                self._ensure_redis()
+                await self.redis.publish(ROUTING_CHANNEL, json.dumps({
+                    "origin": self.node_id,
+                    "user_id": user_id,
+                    "text": text
+                }))
+            except Exception as e:
+                logger.error(f"Failed to publish WebSocket message: {str(e)}")
+        return queued
+
     async def send_notification(self, user_id: str, notification: Notification):
-        if user_id not in self.active_connections:
-            return
-            
         message = {
             "type": "notification",
             "data": {
@@ -38,39 +178,81 @@ class ConnectionManager:
                 "message": notification.message,
                 "type": notification.type,
                 "timestamp": notification.created_at.isoformat(),
-                "status": notification.status
+                "status": getattr(notification, "status", None)
             }
         }
-        
-        dead_connections = set()
-        for connection in self.active_connections[user_id]:
-            try:
-                await connection.send_json(message)
-            except Exception as e:
-                logger.error(f"Failed to send notification to user {user_id}: {str(e)}")
-                dead_connections.add(connection)
-                
-        # Clean up dead connections
-        for dead_connection in dead_connections:
-            self.active_connections[user_id].discard(dead_connection)
-        
-        if not self.active_connections[user_id]:
-            del self.active_connections[user_id]
-            
+        await self._route(user_id, json.dumps(message))
+
     async def broadcast_system_message(self, message: str):
         """Broadcast a system message to all connected clients"""
-        for user_connections in self.active_connections.values():
-            for connection in user_connections:
+        # Serialized once and shared by every connection
+        text = json.dumps({
+            "type": "system",
+            "data": {
+                "message": message,
+                "timestamp": datetime.utcnow().isoformat()
+            }
+        })
+        await self._route(None, text)
+
+    async def flush(self):
+        """Wait for every queued message on this node to be sent"""
+        await asyncio.gather(*(writer.drain() for writer in list(self.writers.values())))
+
+    def _ensure_redis(self):
+        if not self.redis:
+            self.redis = redis.from_url(
+                os.environ.get('REDIS_URL', 'redis://localhost:6379/0'),
+                encoding="utf-8",
+                decode_responses=True
+            )
+
+    async def start_routing(self):
+        """Receive messages published by other nodes"""
+        async with self.routing_lock:
+            if self.routing_task:
+                return
+            self._ensure_redis()
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            await pubsub.subscribe(ROUTING_CHANNEL)
+            self.routing_task = asyncio.create_task(self._listen(pubsub))
+        logger.info(f"WebSocket routing started on node {self.node_id}")
+
+    async def stop_routing(self):
+        if self.routing_task:
+            self.routing_task.cancel()
+            try:
+                await self.routing_task
+            except asyncio.CancelledError:
+                pass
+            self.routing_task = None
+
+    async def _listen(self, pubsub):
+        try:
+            while True:
                 try:
-                    await connection.send_json({
-                        "type": "system",
-                        "data": {
-                            "message": message,
-                            "timestamp": datetime.utcnow().isoformat()
-                        }
-                    })
+                    message = await pubsub.get_message(timeout=1.0)
+                except redis.RedisError as e:
+                    logger.error(f"WebSocket routing error: {str(e)}")
+                    await asyncio.sleep(1.0)
+                    continue
+                if not message:
+                    continue
+                try:
+                    envelope = json.loads(message["data"])
+                    if envelope["origin"] != self.node_id:
+                        self._deliver(envelope["user_id"], envelope["text"])
                 except Exception as e:
-                    logger.error(f"Failed to broadcast system message: {str(e)}")
+                    logger.error(f"Invalid WebSocket routing message: {str(e)}")
+        finally:
+            await pubsub.unsubscribe(ROUTING_CHANNEL)
+            await pubsub.aclose()
+
+    async def close(self):
+        await self.stop_routing()
+        for writer in list(self.writers.values()):
+            writer.stop()
+        self.writers.clear()
 
 # Global connection manager instance
 manager = ConnectionManager()
@@ -1,10 +1,50 @@
 from fastapi import HTTPException, Request
 from fastapi.responses import JSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
+import logging
+import math
 import time
-from typing import Dict, Tuple, Set, Optional
-import redis
-from app.core.config import settings
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+import redis.asyncio as redis
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+# Token buckets for every key in one atomic round trip. A request is only
+# charged when all buckets have a token, so the IP and path limits never
+# drift apart. Tokens are returned as strings because Lua numbers are
+# truncated to integers in replies.
+TOKEN_BUCKET_SCRIPT = """
+local now = tonumber(ARGV[1])
+local tokens = {}
+local allowed = 1
+
+for i = 1, #KEYS do
+    local rate = tonumber(ARGV[i * 2])
+    local capacity = tonumber(ARGV[i * 2 + 1])
+    local bucket = redis.call('HMGET', KEYS[i], 'tokens', 'ts')
+    local current = tonumber(bucket[1]) or capacity
+    local updated = tonumber(bucket[2]) or now
+    current = math.min(capacity, current + math.max(0, now - updated) * rate)
+    if current < 1 then
+        allowed = 0
+    end
+    tokens[i] = current
+end
+
+local reply = {allowed}
+for i = 1, #KEYS do
+    local rate = tonumber(ARGV[i * 2])
+    local capacity = tonumber(ARGV[i * 2 + 1])
+    if allowed == 1 then
+        tokens[i] = tokens[i] - 1
+    end
+    redis.call('HSET', KEYS[i], 'tokens', tokens[i], 'ts', now)
+    redis.call('PEXPIRE', KEYS[i], math.ceil((capacity - tokens[i]) / rate * 1000) + 1000)
+    reply[i + 1] = tostring(tokens[i])
+end
+return reply
+"""
 
 class RateLimitExceeded(HTTPException):
     def __init__(self):
@@ -13,10 +53,66 @@ class RateLimitExceeded(HTTPException):
             detail="Rate limit exceeded. Please try again later."
         )
 
+class Bucket(NamedTuple):
+    """Token bucket refilled at max_requests per window up to burst"""
+    key: str
+    max_requests: int
+    window: int
+    burst: int
+
+    @property
+    def rate(self) -> float:
+        return self.max_requests / self.window
+
+class RateLimitResult(NamedTuple):
+    allowed: bool
+    limit: int
+    remaining: int
+    reset: int
+    burst_remaining: int
+    retry_after: int
+
+class LocalTokenBuckets:
+    """In-process token buckets used while Redis is unreachable"""
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self.buckets: Dict[str, Tuple[float, float]] = {}
+
+    def consume(self, buckets: List[Bucket], now: float) -> Tuple[bool, List[float]]:
+        tokens = []
+        for bucket in buckets:
+            current, updated = self.buckets.get(bucket.key, (bucket.burst, now))
+            tokens.append(min(bucket.burst, current + max(0.0, now - updated) * bucket.rate))
+
+        allowed = all(current >= 1 for current in tokens)
+        if allowed:
+            tokens = [current - 1 for current in tokens]
+
+        if len(self.buckets) >= self.max_keys:
+            self._evict(now)
+        for bucket, current in zip(buckets, tokens):
+            self.buckets[bucket.key] = (current, now)
+        return allowed, tokens
+
+    def _evict(self, now: float) -> None:
+        """Drop buckets idle for longer than an hour, or the oldest half if none are"""
+        idle = [key for key, (_, updated) in self.buckets.items() if now - updated > 3600]
+        if not idle:
+            ordered = sorted(self.buckets, key=lambda key: self.buckets[key][1])
+            idle = ordered[:len(ordered) // 2]
+        for key in idle:
+            del self.buckets[key]
+
 class RateLimiter(BaseHTTPMiddleware):
-    def __init__(self, app, redis_client: redis.Redis):
+    def __init__(self, app, redis_client: Optional[redis.Redis] = None, retry_interval: float = 5.0):
         super().__init__(app)
         self.redis_client = redis_client
+        self.script = redis_client.register_script(TOKEN_BUCKET_SCRIPT) if redis_client else None
+        self.local_buckets = LocalTokenBuckets()
+        # After a Redis failure, stay on local buckets for this many seconds
+        self.retry_interval = retry_interval
+        self._redis_retry_at = 0.0
         self.rate_limits = {
             "default": (100, 60, 120),  # 100 requests per minute, burst of 120
             "/api/medications": (50, 60, 60),  # 50 requests per minute, burst of 60
@@ -41,38 +137,48 @@ class RateLimiter(BaseHTTPMiddleware):
         if ip in self.whitelist:
             self.whitelist.remove(ip)
 
-    async def check_ip_based_limit(self, ip: str) -> Optional[bool]:
-        """Check IP-based rate limit."""
-        if ip in self.whitelist:
-            return True
-        if ip in self.blacklist:
-            raise HTTPException(status_code=403, detail="IP address blocked")
-
-        key = f"ip_rate_limit:{ip}"
-        requests_per_hour, burst = self.ip_rate_limits["default"]
-        
-        try:
-            current = self.redis_client.get(key)
-            if current is None:
-                self.redis_client.setex(key, 3600, 1)  # 1 hour window
-            else:
-                current = int(current)
-                if current >= requests_per_hour:
-                    # Check if burst limit is exceeded
-                    burst_key = f"ip_burst:{ip}"
-                    burst_count = int(self.redis_client.get(burst_key) or 0)
-                    if burst_count >= burst - requests_per_hour:
-                        return False
-                    # Allow burst but track it
-                    self.redis_client.incr(burst_key)
-                    if not self.redis_client.ttl(burst_key):
-                        self.redis_client.expire(burst_key, 3600)
-                self.redis_client.incr(key)
-        except redis.RedisError:
-            # If Redis is unavailable, allow the request
-            return True
-        
-        return True
+    def get_buckets(self, ip: str, path: str) -> List[Bucket]:
+        """Path bucket first, then the hourly IP bucket unless whitelisted."""
+        max_requests, window, burst = self.get_rate_limit(path)
+        buckets = [Bucket(f"rate_limit:{ip}:{path}", max_requests, window, burst)]
+        if ip not in self.whitelist:
+            requests_per_hour, ip_burst = self.ip_rate_limits["default"]
+            buckets.append(Bucket(f"ip_rate_limit:{ip}", requests_per_hour, 3600, ip_burst))
+        return buckets
+
+    async def consume(self, buckets: List[Bucket]) -> Tuple[bool, List[float]]:
+        """Charge one request against every bucket, in Redis when available."""
+        now = time.time()
+        if self.script is not None and now >= self._redis_retry_at:
+            args = [now]
+            for bucket in buckets:
+                args.extend([bucket.rate, bucket.burst])
+            try:
+                reply = await self.script(keys=[bucket.key for bucket in buckets], args=args)
+                return bool(int(reply[0])), [float(tokens) for tokens in reply[1:]]
+            except (RedisError, OSError) as e:
+                # Keep limiting locally rather than failing open
+                logger.warning(f"Redis rate limiting unavailable, using local buckets: {str(e)}")
+                self._redis_retry_at = now + self.retry_interval
+
+        return self.local_buckets.consume(buckets, now)
+
+    async def check(self, ip: str, path: str) -> RateLimitResult:
+        """Check and charge the limits for a request."""
+        buckets = self.get_buckets(ip, path)
+        allowed, tokens = await self.consume(buckets)
+
+        bucket, available = buckets[0], tokens[0]
+        return RateLimitResult(
+            allowed=allowed,
+            limit=bucket.max_requests,
+            remaining=max(0, min(bucket.max_requests, int(available))),
+            reset=math.ceil((bucket.burst - available) / bucket.rate),
+            burst_remaining=max(0, int(available)),
+            retry_after=max(1, max(
+                math.ceil((1 - current) / limit.rate) for limit, current in zip(buckets, tokens)
+            ))
+        )
 
     async def dispatch(self, request: Request, call_next):
         # Skip rate limiting for certain endpoints
@@ -81,60 +187,27 @@ class RateLimiter(BaseHTTPMiddleware):
 
         # Get client IP
         client_ip = request.client.host
-        
-        try:
-            # Check IP-based rate limit first
-            if not await self.check_ip_based_limit(client_ip):
-                raise RateLimitExceeded()
-
-            # Get endpoint-specific rate limit or default
-            path = request.url.path
-            max_requests, window, burst = self.get_rate_limit(path)
-            
-            # Create Redis key
-            key = f"rate_limit:{client_ip}:{path}"
-            burst_key = f"burst:{client_ip}:{path}"
-            
-            # Check rate limit
-            current = self.redis_client.get(key)
-            if current is None:
-                self.redis_client.setex(key, window, 1)
-            else:
-                current = int(current)
-                if current >= max_requests:
-                    # Check burst limit
-                    burst_count = int(self.redis_client.get(burst_key) or 0)
-                    if burst_count >= burst - max_requests:
-                        raise RateLimitExceeded()
-                    # Allow burst but track it
-                    self.redis_client.incr(burst_key)
-                    if not self.redis_client.ttl(burst_key):
-                        self.redis_client.expire(burst_key, window)
-                self.redis_client.incr(key)
-            
-            # Add rate limit headers
-            response = await call_next(request)
-            remaining = max_requests - (int(self.redis_client.get(key) or 0))
-            reset = self.redis_client.ttl(key)
-            
-            response.headers["X-RateLimit-Limit"] = str(max_requests)
-            response.headers["X-RateLimit-Remaining"] = str(max(0, remaining))
-            response.headers["X-RateLimit-Reset"] = str(reset)
-            response.headers["X-RateLimit-Burst-Remaining"] = str(
-                burst - int(self.redis_client.get(burst_key) or 0)
-            )
-            
-            return response
-            
-        except redis.RedisError:
-            # If Redis is unavailable, log error and continue without rate limiting
-            return await call_next(request)
-        except RateLimitExceeded as exc:
+        if client_ip in self.blacklist:
+            return JSONResponse(status_code=403, content={"detail": "IP address blocked"})
+
+        result = await self.check(client_ip, request.url.path)
+        if not result.allowed:
+            exc = RateLimitExceeded()
             return JSONResponse(
                 status_code=exc.status_code,
-                content={"detail": exc.detail}
+                content={"detail": exc.detail},
+                headers={"Retry-After": str(result.retry_after)}
             )
 
+        # Add rate limit headers
+        response = await call_next(request)
+        response.headers["X-RateLimit-Limit"] = str(result.limit)
+        response.headers["X-RateLimit-Remaining"] = str(result.remaining)
+        response.headers["X-RateLimit-Reset"] = str(result.reset)
+        response.headers["X-RateLimit-Burst-Remaining"] = str(result.burst_remaining)
+
+        return response
+
     def get_rate_limit(self, path: str) -> Tuple[int, int, int]:
         """Get the rate limit for a specific path."""
         for endpoint, limit in self.rate_limits.items():
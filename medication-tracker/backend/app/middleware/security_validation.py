@@ -4,12 +4,11 @@ Compliant with SINGLE_SOURCE_VALIDATION.md
 """
 from functools import wraps
 from datetime import datetime
-import json
-import os
 from typing import Callable, Dict, Any
 
 from flask import request, g
 from app.core.config import settings
+from app.core.evidence_sink import get_evidence_sink
 
 def validate_security(f: Callable) -> Callable:
     """Security validation middleware that enforces validation requirements"""
@@ -69,12 +68,5 @@ def validate_authentication() -> None:
         raise ValueError("Missing authentication token")
 
 def save_validation_evidence(evidence: Dict) -> None:
-    """Saves validation evidence"""
-    if not os.path.exists(settings.VALIDATION_EVIDENCE_PATH):
-        os.makedirs(settings.VALIDATION_EVIDENCE_PATH)
-        
-    filename = f"{evidence['timestamp']}_security_validation.json"
-    filepath = os.path.join(settings.VALIDATION_EVIDENCE_PATH, filename)
-    
-    with open(filepath, 'w') as f:
-        json.dump(evidence, f, indent=2)
+    """Queues validation evidence for the batched evidence sink"""
+    get_evidence_sink(settings.VALIDATION_EVIDENCE_PATH).submit('security_validation', evidence)
@@ -1,6 +1,7 @@
 from app import db
 from datetime import datetime, timedelta
 from .notification import Notification
+from app.services.schedule_expansion import ScheduleExpansionEngine, compile_medication
 import json
 import pytz
 
@@ -51,28 +52,19 @@ class Medication(db.Model):
             return
 
         now = datetime.utcnow()
-        user_tz = pytz.timezone(self.user.timezone)
-        local_now = now.astimezone(user_tz)
-        
-        # Convert dose times to datetime objects
-        today_doses = []
-        tomorrow_doses = []
-        dose_times = json.loads(self.dose_times) if isinstance(self.dose_times, str) else self.dose_times
-        
-        for time_str in dose_times:
-            hour, minute = map(int, time_str.split(':'))
-            dose_time = local_now.replace(hour=hour, minute=minute, second=0, microsecond=0)
-            
-            if dose_time > local_now:
-                today_doses.append(dose_time)
-            tomorrow_doses.append(dose_time + timedelta(days=1))
-        
-        # Find the next dose time
-        next_doses = sorted(today_doses + tomorrow_doses)
+        next_doses = self.get_next_doses(now + timedelta(days=2), now)
         if next_doses:
-            self.next_dose = next_doses[0].astimezone(pytz.UTC)
+            self.next_dose = next_doses[0].replace(tzinfo=pytz.UTC)
             db.session.commit()
 
+    def get_next_doses(self, until, now=None):
+        """Get upcoming dose times (naive UTC) between now and until"""
+        now = now or datetime.utcnow()
+        engine = ScheduleExpansionEngine()
+        engine.add(self.id, compile_medication(self))
+        doses = engine.expand(now + timedelta(seconds=1), until)
+        return doses.to_datetimes(self.id)
+
     def record_dose_taken(self, taken_at=None, reason=None):
         """Record that a dose was taken"""
         taken_at = taken_at or datetime.utcnow()
@@ -1,14 +1,27 @@
 from app import db
-from datetime import datetime
+from datetime import datetime, timedelta
+from sqlalchemy import event, inspect
+from sqlalchemy.dialects import postgresql, sqlite
+
+ON_TIME_WINDOW = timedelta(minutes=30)  # Taken within this of the scheduled time counts as on time
+ADHERENCE_COUNTERS = ('total', 'taken', 'taken_on_time', 'taken_late', 'missed', 'untaken')
 
 class MedicationHistory(db.Model):
     __tablename__ = 'medication_history'
+    __table_args__ = (
+        # Covers the per-medication, time-windowed adherence aggregates
+        db.Index('ix_medication_history_adherence', 'medication_id', 'scheduled_time', 'action'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    medication_id = db.Column(db.Integer, db.ForeignKey('medications.id', ondelete='CASCADE'), nullable=False)
-    action = db.Column(db.String(20), nullable=False)  # 'taken', 'missed', 'skipped'
-    scheduled_time = db.Column(db.DateTime, nullable=False)
-    taken_time = db.Column(db.DateTime, nullable=True)
+    # Counted columns load their previous value on change so updates can adjust the daily rollup
+    medication_id = db.column_property(
+        db.Column(db.Integer, db.ForeignKey('medications.id', ondelete='CASCADE'), nullable=False),
+        active_history=True
+    )
+    action = db.column_property(db.Column(db.String(20), nullable=False), active_history=True)  # 'taken', 'missed', 'skipped'
+    scheduled_time = db.column_property(db.Column(db.DateTime, nullable=False), active_history=True)
+    taken_time = db.column_property(db.Column(db.DateTime, nullable=True), active_history=True)
     notes = db.Column(db.Text, nullable=True)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -27,3 +40,93 @@ class MedicationHistory(db.Model):
             'createdAt': self.created_at.isoformat(),
             'updatedAt': self.updated_at.isoformat()
         }
+
+class DailyAdherence(db.Model):
+    """Per medication and day dose counters, kept in step with medication_history"""
+    __tablename__ = 'daily_adherence'
+    __table_args__ = (
+        db.UniqueConstraint('medication_id', 'day', name='uq_daily_adherence_medication_day'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    medication_id = db.Column(db.Integer, db.ForeignKey('medications.id', ondelete='CASCADE'), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    taken = db.Column(db.Integer, nullable=False, default=0)  # taken_time recorded
+    taken_on_time = db.Column(db.Integer, nullable=False, default=0)
+    taken_late = db.Column(db.Integer, nullable=False, default=0)
+    missed = db.Column(db.Integer, nullable=False, default=0)  # action == 'missed'
+    untaken = db.Column(db.Integer, nullable=False, default=0)  # no taken_time
+
+def dose_counters(action, scheduled_time, taken_time):
+    """The adherence counters a single history row contributes to"""
+    counters = {'total': 1}
+    if taken_time is None:
+        counters['untaken'] = 1
+    else:
+        counters['taken'] = 1
+        if action == 'taken':
+            delay = taken_time - scheduled_time
+            if abs(delay) <= ON_TIME_WINDOW:
+                counters['taken_on_time'] = 1
+            elif delay > ON_TIME_WINDOW:
+                counters['taken_late'] = 1
+    if action == 'missed':
+        counters['missed'] = 1
+    return counters
+
+def _apply_counters(connection, medication_id, scheduled_time, counters, sign):
+    """Add (sign=1) or remove (sign=-1) a row's counters from its day"""
+    table = DailyAdherence.__table__
+    deltas = {name: sign * counters.get(name, 0) for name in ADHERENCE_COUNTERS}
+    values = dict(deltas, medication_id=medication_id, day=scheduled_time.date())
+
+    dialect = connection.dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        insert = (postgresql if dialect == 'postgresql' else sqlite).insert(table).values(**values)
+        connection.execute(insert.on_conflict_do_update(
+            index_elements=['medication_id', 'day'],
+            set_={name: table.c[name] + insert.excluded[name] for name in ADHERENCE_COUNTERS}
+        ))
+        return
+
+    updated = connection.execute(
+        table.update()
+        .where(table.c.medication_id == medication_id, table.c.day == values['day'])
+        .values({name: table.c[name] + delta for name, delta in deltas.items()})
+    )
+    if updated.rowcount == 0:
+        connection.execute(table.insert().values(**values))
+
+@event.listens_for(MedicationHistory, 'after_insert')
+def _count_inserted_dose(mapper, connection, target):
+    _apply_counters(
+        connection, target.medication_id, target.scheduled_time,
+        dose_counters(target.action, target.scheduled_time, target.taken_time), 1
+    )
+
+@event.listens_for(MedicationHistory, 'after_update')
+def _recount_updated_dose(mapper, connection, target):
+    state = inspect(target)
+    old = {}
+    for name in ('medication_id', 'action', 'scheduled_time', 'taken_time'):
+        history = state.attrs[name].history
+        old[name] = history.deleted[0] if history.deleted else getattr(target, name)
+    if all(old[name] == getattr(target, name) for name in old):
+        return
+
+    _apply_counters(
+        connection, old['medication_id'], old['scheduled_time'],
+        dose_counters(old['action'], old['scheduled_time'], old['taken_time']), -1
+    )
+    _apply_counters(
+        connection, target.medication_id, target.scheduled_time,
+        dose_counters(target.action, target.scheduled_time, target.taken_time), 1
+    )
+
+@event.listens_for(MedicationHistory, 'after_delete')
+def _uncount_deleted_dose(mapper, connection, target):
+    _apply_counters(
+        connection, target.medication_id, target.scheduled_time,
+        dose_counters(target.action, target.scheduled_time, target.taken_time), -1
+    )
@@ -36,6 +36,10 @@ class NotificationLog(BaseModel):
 
 class Notification(db.Model):
     __tablename__ = 'notifications'
+    __table_args__ = (
+        # One notification per medication, type and time so re-runs of the scheduler are idempotent
+        db.UniqueConstraint('medication_id', 'type', 'scheduled_time', name='uq_notifications_schedule_key'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
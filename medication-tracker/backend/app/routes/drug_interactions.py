@@ -1,5 +1,8 @@
 from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from datetime import datetime
+from sqlalchemy import or_
+from ..core.medication_interactions import InteractionChecker
 from ..models.medication import Medication
 from ..services.drug_interaction_service import drug_interaction_service
 from .. import db
@@ -28,30 +31,21 @@ def check_interactions():
                 'message': 'One or more medications not found'
             }), 404
             
-        interactions = []
-        # Check each pair of medications
-        for i in range(len(medications)):
-            for j in range(i + 1, len(medications)):
-                med1 = medications[i]
-                med2 = medications[j]
-                
-                interaction = drug_interaction_service.check_interaction(
-                    med1.name,
-                    med2.name
-                )
-                
-                if interaction:
-                    interactions.append({
-                        'medication1': {
-                            'id': med1.id,
-                            'name': med1.name
-                        },
-                        'medication2': {
-                            'id': med2.id,
-                            'name': med2.name
-                        },
-                        'interactions': interaction
-                    })
+        regimen = InteractionChecker().check_regimen(medications)
+        interactions = [
+            {
+                'medication1': {
+                    'id': pair['medication_ids'][0],
+                    'name': pair['medications'][0]
+                },
+                'medication2': {
+                    'id': pair['medication_ids'][1],
+                    'name': pair['medications'][1]
+                },
+                'interactions': pair['interactions']
+            }
+            for pair in regimen['pairs']
+        ]
         
         return jsonify({
             'interactions': interactions
@@ -64,6 +58,40 @@ def check_interactions():
             'error': str(e)
         }), 500
 
+@drug_interactions_bp.route('/check-regimen', methods=['POST'])
+@jwt_required()
+def check_regimen():
+    """Check a whole regimen (default: the user's active medications) in one call"""
+    try:
+        user_id = get_jwt_identity()
+        data = request.get_json(silent=True) or {}
+        medication_ids = data.get('medication_ids')
+        
+        query = Medication.query.filter(Medication.user_id == user_id)
+        if medication_ids:
+            query = query.filter(Medication.id.in_(medication_ids))
+        else:
+            now = datetime.utcnow()
+            query = query.filter(or_(
+                Medication.end_date.is_(None),
+                Medication.end_date > now
+            ))
+        medications = query.all()
+        
+        if medication_ids and len(medications) != len(set(medication_ids)):
+            return jsonify({
+                'message': 'One or more medications not found'
+            }), 404
+            
+        return jsonify(InteractionChecker().check_regimen(medications)), 200
+        
+    except Exception as e:
+        current_app.logger.error(f"Error checking regimen interactions: {str(e)}")
+        return jsonify({
+            'message': 'Error checking interactions',
+            'error': str(e)
+        }), 500
+
 @drug_interactions_bp.route('/info/<medication_id>', methods=['GET'])
 @jwt_required()
 def get_medication_info(medication_id):
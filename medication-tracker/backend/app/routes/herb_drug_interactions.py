@@ -1,3 +1,4 @@
+import asyncio
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.services.herb_drug_interaction_service import herb_drug_interaction_service
@@ -76,13 +77,13 @@ async def check_user_medications():
                 'data': []
             }), 200
 
-        # Check interactions for each medication
+        # Check interactions for every medication concurrently
+        results = await asyncio.gather(*(
+            herb_drug_interaction_service.check_interaction(herb=herb, drug=med.name)
+            for med in medications
+        ))
         interactions = []
-        for med in medications:
-            interaction_data = await herb_drug_interaction_service.check_interaction(
-                herb=herb,
-                drug=med.name
-            )
+        for med, interaction_data in zip(medications, results):
             if interaction_data:
                 interactions.append({
                     'medication': med.name,
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify, current_app
 from app.models.medication_history import MedicationHistory
 from app.models.medication import Medication
+from app.services.adherence_stats import adherence_by_medication, empty_counts
 from app import db
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime, timedelta
@@ -58,20 +59,13 @@ def get_stats(medication_id):
         if request.args.get('endDate'):
             end_date = datetime.fromisoformat(request.args.get('endDate'))
 
-        # Query history within date range
-        history = MedicationHistory.query.filter(
-            MedicationHistory.medication_id == medication_id,
-            MedicationHistory.scheduled_time >= start_date,
-            MedicationHistory.scheduled_time <= end_date
-        ).all()
-
-        # Calculate statistics
-        total_doses = len(history)
-        taken_on_time = sum(1 for h in history if h.action == 'taken' and h.taken_time and 
-                          abs((h.taken_time - h.scheduled_time).total_seconds()) <= 1800)  # within 30 minutes
-        taken_late = sum(1 for h in history if h.action == 'taken' and h.taken_time and 
-                       (h.taken_time - h.scheduled_time).total_seconds() > 1800)
-        missed = sum(1 for h in history if h.action == 'missed')
+        counts = adherence_by_medication(
+            user_id, start_date, end_date, medication_id=medication_id
+        ).get(medication_id, empty_counts())
+        total_doses = counts['total']
+        taken_on_time = counts['taken_on_time']
+        taken_late = counts['taken_late']
+        missed = counts['missed']
 
         stats = {
             'totalDoses': total_doses,
@@ -114,19 +108,16 @@ def get_summary_stats():
             'medications_stats': []
         }
         
+        counts_by_medication = adherence_by_medication(user_id, start, end)
+
         for medication in medications:
-            # Get history for this medication
-            history = MedicationHistory.query.filter(
-                MedicationHistory.medication_id == medication.id,
-                MedicationHistory.scheduled_time.between(start, end)
-            ).all()
-            
+            counts = counts_by_medication.get(medication.id, empty_counts())
             med_stats = {
                 'medication_id': medication.id,
                 'medication_name': medication.name,
-                'total_doses': len(history),
-                'doses_taken': sum(1 for h in history if h.taken_time is not None),
-                'doses_missed': sum(1 for h in history if h.taken_time is None and h.scheduled_time < datetime.now()),
+                'total_doses': counts['total'],
+                'doses_taken': counts['taken'],
+                'doses_missed': counts['overdue'],
                 'compliance_rate': 0
             }
             
@@ -1,6 +1,7 @@
-from flask import Blueprint, request, jsonify, current_app, send_file
+from flask import Blueprint, Response, request, jsonify, current_app, send_file, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime
+import io
 from ..services.report_service import report_service
 from .. import db
 
@@ -40,7 +41,12 @@ def get_compliance_report():
 @reports_bp.route('/compliance/pdf', methods=['GET'])
 @jwt_required()
 def get_compliance_pdf():
-    """Get PDF compliance report for the current user"""
+    """Get PDF compliance report for the current user.
+
+    Cached reports are returned directly. Otherwise a render job is queued
+    and 202 is returned with the job id to poll; the PDF is rendered inline
+    only when the render queue is unavailable.
+    """
     try:
         user_id = get_jwt_identity()
         
@@ -52,6 +58,9 @@ def get_compliance_pdf():
             start_date = datetime.fromisoformat(start_date)
         if end_date:
             end_date = datetime.fromisoformat(end_date)
+        else:
+            # Whole minutes, so repeated default-range requests share a cache entry
+            end_date = datetime.utcnow().replace(second=0, microsecond=0)
             
         # Generate report data
         report_data = report_service.generate_compliance_report(
@@ -59,16 +68,20 @@ def get_compliance_pdf():
             start_date,
             end_date
         )
-        
-        # Generate PDF
-        pdf_buffer = report_service.generate_pdf_report(user_id, report_data)
-        
-        return send_file(
-            pdf_buffer,
-            mimetype='application/pdf',
-            as_attachment=True,
-            download_name='medication_compliance_report.pdf'
-        )
+
+        render_queue = _get_render_queue()
+        if render_queue is None:
+            return _send_pdf(report_service.generate_pdf_report(user_id, report_data))
+
+        key, job = render_queue.submit(user_id, report_data)
+        if job is None:
+            return _send_pdf(io.BytesIO(render_queue.get_cached(user_id, key)))
+
+        return jsonify({
+            'job_id': key,
+            'status': render_queue.job_status(job),
+            'status_url': f"{reports_bp.url_prefix}/compliance/pdf/{key}"
+        }), 202
         
     except Exception as e:
         current_app.logger.error(f"Error generating PDF report: {str(e)}")
@@ -77,6 +90,59 @@ def get_compliance_pdf():
             'error': str(e)
         }), 500
 
+@reports_bp.route('/compliance/pdf/<job_id>', methods=['GET'])
+@jwt_required()
+def get_compliance_pdf_job(job_id):
+    """Poll a queued PDF render; returns the PDF once it is ready"""
+    try:
+        user_id = get_jwt_identity()
+        render_queue = _get_render_queue()
+        if render_queue is None:
+            return jsonify({'message': 'Report rendering queue unavailable'}), 503
+
+        status = render_queue.status(user_id, job_id)
+        if status is None:
+            return jsonify({'message': 'Report not found'}), 404
+        if status == 'finished':
+            pdf = render_queue.get_cached(user_id, job_id)
+            if pdf is not None:
+                return _send_pdf(io.BytesIO(pdf))
+            return jsonify({'message': 'Report not found'}), 404
+        if status == 'failed':
+            return jsonify({'job_id': job_id, 'status': status, 'message': 'Report rendering failed'}), 500
+
+        return jsonify({'job_id': job_id, 'status': status}), 202
+
+    except Exception as e:
+        current_app.logger.error(f"Error fetching PDF report: {str(e)}")
+        return jsonify({
+            'message': 'Error fetching PDF report',
+            'error': str(e)
+        }), 500
+
+def _get_render_queue():
+    """Shared render queue, or None when Redis/RQ is unavailable"""
+    render_queue = current_app.extensions.get('report_render_queue')
+    if render_queue is None:
+        try:
+            from ..workers.report_worker import ReportRenderQueue
+
+            render_queue = ReportRenderQueue()
+            render_queue.redis_conn.ping()
+        except Exception as e:
+            current_app.logger.warning(f"Report render queue unavailable, rendering inline: {str(e)}")
+            return None
+        current_app.extensions['report_render_queue'] = render_queue
+    return render_queue
+
+def _send_pdf(pdf_buffer):
+    return send_file(
+        pdf_buffer,
+        mimetype='application/pdf',
+        as_attachment=True,
+        download_name='medication_compliance_report.pdf'
+    )
+
 @reports_bp.route('/export', methods=['GET'])
 @jwt_required()
 def export_data():
@@ -89,6 +155,9 @@ def export_data():
             return jsonify({
                 'message': 'Invalid export format. Must be json or csv.'
             }), 400
+
+        if request.args.get('stream', 'false').lower() == 'true':
+            return _stream_export(user_id, export_format)
             
         data = report_service.export_medication_data(user_id, export_format)
         
@@ -108,3 +177,21 @@ def export_data():
             'message': 'Error exporting data',
             'error': str(e)
         }), 500
+
+def _stream_export(user_id, export_format):
+    """Stream the export as NDJSON or CSV, gzipped when the client accepts it"""
+    chunks = report_service.stream_medication_data(user_id, export_format)
+    if export_format == 'json':
+        mimetype, filename = 'application/x-ndjson', 'medication_data_export.ndjson'
+    else:
+        mimetype, filename = 'text/csv', 'medication_data_export.csv'
+
+    headers = {
+        'Content-Disposition': f'attachment; filename={filename}',
+        'Vary': 'Accept-Encoding'
+    }
+    if request.accept_encodings['gzip']:
+        chunks = report_service.gzip_chunks(chunks)
+        headers['Content-Encoding'] = 'gzip'
+
+    return Response(stream_with_context(chunks), mimetype=mimetype, headers=headers)
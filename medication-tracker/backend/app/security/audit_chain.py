@@ -0,0 +1,417 @@
+"""
+Chained Audit Log
+Permission: CORE
+Reference: MASTER_CRITICAL_PATH.md
+"""
+
+import hashlib
+import hmac
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from ..core.file_lock import exclusive_lock
+
+GENESIS_HASH = "0" * 64
+CHECKPOINT_SUFFIX = ".checkpoints"
+LOCK_SUFFIX = ".lock"
+
+logger = logging.getLogger(__name__)
+
+def entry_hash(entry: Dict[str, Any]) -> str:
+    """SHA-256 of an entry's canonical JSON, excluding its own hash"""
+    body = {key: value for key, value in entry.items() if key != "hash"}
+    return hashlib.sha256(json.dumps(body, sort_keys=True).encode('utf-8')).hexdigest()
+
+def parse_entry(line: bytes) -> Optional[Dict[str, Any]]:
+    """The JSON entry at the end of a log line, after any formatter prefix"""
+    start = line.find(b"{")
+    if start < 0:
+        return None
+    try:
+        entry = json.loads(line[start:])
+    except ValueError:
+        return None
+    return entry if isinstance(entry, dict) else None
+
+def iter_lines(path: str, start: int, end: Optional[int] = None) -> Iterator[Tuple[int, bytes]]:
+    """Complete lines with their offsets between two byte positions"""
+    with open(path, "rb") as f:
+        f.seek(start)
+        offset = start
+        for line in f:
+            if end is not None and offset >= end:
+                return
+            if not line.endswith(b"\n"):
+                # Entry still being written
+                return
+            yield offset, line
+            offset += len(line)
+
+def verify_block(path: str, start: int, end: Optional[int], prev_hash: str) -> Tuple[Optional[int], str, int]:
+    """
+    Verify the chain between two offsets starting from a known hash.
+    Returns the offset of the first bad entry (or None), the chain head
+    at the end of the block and the number of entries verified.
+    """
+    count = 0
+    for offset, line in iter_lines(path, start, end):
+        entry = parse_entry(line)
+        if entry is None or entry.get("prev_hash") != prev_hash or entry.get("hash") != entry_hash(entry):
+            return offset, prev_hash, count
+        prev_hash = entry["hash"]
+        count += 1
+    return None, prev_hash, count
+
+@dataclass
+class Checkpoint:
+    """
+    Signed chain head at a byte offset. The block it closes starts at the
+    previous checkpoint's offset; its time range and user ids let queries
+    skip blocks without reading them.
+    """
+    offset: int
+    entries: int
+    hash: str
+    min_ts: Optional[str] = None
+    max_ts: Optional[str] = None
+    users: List[str] = field(default_factory=list)
+    signature: str = ""
+
+    def payload(self) -> bytes:
+        body = asdict(self)
+        body.pop("signature")
+        return json.dumps(body, sort_keys=True).encode('utf-8')
+
+    def overlaps(self, start: Optional[str], end: Optional[str]) -> bool:
+        if self.min_ts is None:
+            return False
+        return (start is None or self.max_ts >= start) and (end is None or self.min_ts <= end)
+
+class AuditChain:
+    """
+    Hash chain over an append-only audit log. Every entry carries the hash
+    of the one before it, and every `checkpoint_every` entries an HMAC-signed
+    checkpoint of the chain head and byte offset is appended to a sidecar
+    file. Blocks between checkpoints verify independently, so verification
+    runs in parallel and only needs to resume from the last verified
+    checkpoint, and trail queries seek straight to the blocks they need.
+
+    Writers stamp and write an entry inside `writing()`, which holds the
+    thread lock and an exclusive lock file shared by every process on the
+    log, and first catches up with entries and checkpoints other processes
+    appended, so the file order matches the chain. One chain is shared per
+    log path in a process via `for_path`.
+    """
+
+    _chains: Dict[str, "AuditChain"] = {}
+    _chains_lock = threading.Lock()
+
+    def __init__(self, path: str, checkpoint_every: int = 1000, key: Optional[bytes] = None):
+        self.path = str(path)
+        self.checkpoint_path = self.path + CHECKPOINT_SUFFIX
+        self.lock_path = self.path + LOCK_SUFFIX
+        self.checkpoint_every = checkpoint_every
+        if key is None:
+            key = os.environ.get("AUDIT_CHECKPOINT_KEY", "").encode('utf-8')
+        if not key:
+            # An empty key would let anyone forge checkpoint signatures
+            raise ValueError("AUDIT_CHECKPOINT_KEY must be set to sign audit checkpoints")
+        self.key = key
+        self.lock = threading.RLock()
+        self._file_locked = False
+
+        self.checkpoints: List[Checkpoint] = []
+        self._checkpoints_read = 0
+        self.head = GENESIS_HASH
+        self.offset = 0
+        self.entries = 0
+        self._verified = 0
+        self._reset_block()
+        self._load()
+
+    @classmethod
+    def for_path(cls, path: str, **kwargs) -> "AuditChain":
+        key = os.path.abspath(str(path))
+        with cls._chains_lock:
+            if key not in cls._chains:
+                cls._chains[key] = cls(path, **kwargs)
+            return cls._chains[key]
+
+    @contextmanager
+    def writing(self) -> Iterator[None]:
+        """Hold the chain across threads and processes, synced with the log"""
+        with self.lock:
+            if self._file_locked:
+                # Re-entered from the same thread; the file lock is already held
+                yield
+                return
+            with exclusive_lock(self.lock_path):
+                self._file_locked = True
+                try:
+                    self._sync()
+                    yield
+                finally:
+                    self._file_locked = False
+
+    def stamp(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Link an entry to the current head and add its hash"""
+        entry["prev_hash"] = self.head
+        entry["hash"] = entry_hash(entry)
+        return entry
+
+    def record(self, entry: Dict[str, Any], length: int) -> None:
+        """Advance the chain after a stamped entry of `length` bytes was written"""
+        with self.writing():
+            self.head = entry["hash"]
+            self.offset += length
+            self.entries += 1
+            self._track(entry)
+            if self._block_entries >= self.checkpoint_every:
+                self.checkpoint()
+
+    def checkpoint(self) -> Optional[Checkpoint]:
+        """Sign and persist the current head, closing the open block"""
+        with self.writing():
+            if self._block_entries == 0:
+                return None
+            pending = [] if self.checkpoints else [self._anchor]
+            checkpoint = Checkpoint(
+                offset=self.offset,
+                entries=self.entries,
+                hash=self.head,
+                min_ts=self._block_min_ts,
+                max_ts=self._block_max_ts,
+                users=sorted(self._block_users)
+            )
+            checkpoint.signature = self._sign(checkpoint)
+            pending.append(checkpoint)
+            data = "".join(json.dumps(asdict(c)) + "\n" for c in pending).encode('utf-8')
+            with open(self.checkpoint_path, "ab") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            self._checkpoints_read += len(data)
+            self.checkpoints.extend(pending)
+            self._reset_block()
+            return checkpoint
+
+    def verify(self, full: bool = False, workers: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Verify checkpoint signatures, then the blocks not yet verified (all
+        of them when `full`) in parallel, then the entries after the last
+        checkpoint.
+        """
+        with self.writing():
+            checkpoints = list(self.checkpoints) or [self._anchor]
+
+        for checkpoint in checkpoints:
+            if not hmac.compare_digest(checkpoint.signature, self._sign(checkpoint)):
+                return self._failure("Checkpoint signature mismatch", checkpoint.offset)
+
+        first = 1 if full else self._verified + 1
+        blocks = [
+            (self.path, checkpoints[i - 1].offset, checkpoints[i].offset, checkpoints[i - 1].hash)
+            for i in range(first, len(checkpoints))
+        ]
+        workers = workers or os.cpu_count() or 1
+        if len(blocks) > 1 and workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(verify_block, *zip(*blocks)))
+        else:
+            results = [verify_block(*block) for block in blocks]
+
+        verified = 0
+        for i, (bad_offset, head, count) in enumerate(results, start=first):
+            checkpoint = checkpoints[i]
+            if bad_offset is not None:
+                return self._failure("Entry hash chain broken", bad_offset)
+            if head != checkpoint.hash or count != checkpoint.entries - checkpoints[i - 1].entries:
+                return self._failure("Block does not match checkpoint", checkpoint.offset)
+            verified += count
+
+        self._verified = len(checkpoints) - 1
+        bad_offset, _, count = verify_block(self.path, checkpoints[-1].offset, None, checkpoints[-1].hash)
+        if bad_offset is not None:
+            return self._failure("Entry hash chain broken", bad_offset)
+        verified += count
+
+        return {
+            "valid": True,
+            "verified_entries": verified,
+            "checkpoints": len(checkpoints)
+        }
+
+    def query(
+        self,
+        start_time: Optional[str] = None,
+        end_time: Optional[str] = None,
+        user_id: Optional[Any] = None,
+        predicate: Optional[Callable[[Dict[str, Any]], bool]] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Entries matching the filters, reading only blocks that can contain them"""
+        with self.writing():
+            checkpoints = list(self.checkpoints) or [self._anchor]
+
+        ranges = [
+            (checkpoints[i - 1].offset, checkpoints[i].offset)
+            for i in range(1, len(checkpoints))
+            if checkpoints[i].overlaps(start_time, end_time)
+            and (user_id is None or str(user_id) in checkpoints[i].users)
+        ]
+        # The open block has no summary yet and is always read
+        ranges.append((checkpoints[-1].offset, None))
+
+        for start, end in ranges:
+            for _, line in iter_lines(self.path, start, end):
+                entry = parse_entry(line)
+                if entry is None:
+                    continue
+                timestamp = entry.get("timestamp")
+                if start_time and (timestamp is None or timestamp < start_time):
+                    continue
+                if end_time and (timestamp is None or timestamp > end_time):
+                    continue
+                if user_id is not None and entry.get("user_id") != user_id:
+                    continue
+                if predicate and not predicate(entry):
+                    continue
+                yield entry
+
+    def _load(self) -> None:
+        """Load checkpoints and replay the entries written after the last one"""
+        self._read_checkpoints()
+        if self.checkpoints:
+            self._anchor = self.checkpoints[0]
+        else:
+            # Until the first checkpoint is written the chain is anchored at
+            # its first entry; anything logged before chaining was enabled
+            # is not covered
+            anchor = None
+            try:
+                for offset, line in iter_lines(self.path, 0):
+                    entry = parse_entry(line)
+                    if entry is not None and entry.get("prev_hash") == GENESIS_HASH:
+                        anchor = offset
+                        break
+                end = os.path.getsize(self.path)
+            except OSError:
+                end = 0
+            self._anchor = Checkpoint(offset=end if anchor is None else anchor, entries=0, hash=GENESIS_HASH)
+            self._anchor.signature = self._sign(self._anchor)
+        self._restart()
+
+    def _sync(self) -> None:
+        """Catch up with checkpoints and entries other processes appended"""
+        if self._read_checkpoints():
+            self._anchor = self.checkpoints[0]
+            self._reset_block()
+            self._restart()
+        else:
+            self._replay(self.offset)
+
+    def _restart(self) -> None:
+        """Rebuild the head and open block from the last checkpoint"""
+        last = self.checkpoints[-1] if self.checkpoints else self._anchor
+        self.head, self.offset, self.entries = last.hash, last.offset, last.entries
+        self._replay(last.offset)
+
+    def _replay(self, start: int) -> None:
+        try:
+            for offset, line in iter_lines(self.path, start):
+                entry = parse_entry(line)
+                self.offset = offset + len(line)
+                if entry is None or "hash" not in entry:
+                    logger.warning(f"Unchained audit entry at offset {offset} in {self.path}")
+                    continue
+                self.head = entry["hash"]
+                self.entries += 1
+                self._track(entry)
+        except FileNotFoundError:
+            pass
+
+    def _read_checkpoints(self) -> int:
+        """Read checkpoints appended since the last read; returns how many"""
+        added = 0
+        try:
+            with open(self.checkpoint_path, "rb") as f:
+                f.seek(self._checkpoints_read)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        # Torn final line from an interrupted write
+                        break
+                    self._checkpoints_read += len(line)
+                    try:
+                        self.checkpoints.append(Checkpoint(**json.loads(line)))
+                        added += 1
+                    except (ValueError, TypeError):
+                        continue
+        except FileNotFoundError:
+            pass
+        return added
+
+    def _track(self, entry: Dict[str, Any]) -> None:
+        timestamp = entry.get("timestamp")
+        if timestamp is not None:
+            if self._block_min_ts is None or timestamp < self._block_min_ts:
+                self._block_min_ts = timestamp
+            if self._block_max_ts is None or timestamp > self._block_max_ts:
+                self._block_max_ts = timestamp
+        if entry.get("user_id") is not None:
+            self._block_users.add(str(entry["user_id"]))
+        self._block_entries += 1
+
+    def _reset_block(self) -> None:
+        self._block_entries = 0
+        self._block_min_ts: Optional[str] = None
+        self._block_max_ts: Optional[str] = None
+        self._block_users = set()
+
+    def _sign(self, checkpoint: Checkpoint) -> str:
+        return hmac.new(self.key, checkpoint.payload(), hashlib.sha256).hexdigest()
+
+    def _failure(self, error: str, offset: int) -> Dict[str, Any]:
+        return {"valid": False, "error": error, "offset": offset}
+
+class ChainedAuditHandler(logging.FileHandler):
+    """
+    File handler that advances an AuditChain for every record logged with
+    a stamped `audit_entry`. Records without one would break the chain and
+    are left to the logger's other handlers and its ancestors. Replaces any
+    chained handler already on the logger so repeated setup doesn't write
+    entries twice.
+    """
+
+    def __init__(self, chain: AuditChain, encoding: str = 'utf-8'):
+        super().__init__(chain.path, encoding=encoding)
+        self.chain = chain
+
+    def emit(self, record: logging.LogRecord) -> None:
+        entry = getattr(record, "audit_entry", None)
+        if entry is None:
+            return
+        try:
+            line = self.format(record) + self.terminator
+            with self.chain.writing():
+                if self.stream is None:
+                    self.stream = self._open()
+                self.stream.write(line)
+                self.flush()
+                self.chain.record(entry, len(line.encode(self.encoding or 'utf-8')))
+        except Exception:
+            self.handleError(record)
+
+    @classmethod
+    def attach(cls, target: logging.Logger, chain: AuditChain, formatter: logging.Formatter) -> "ChainedAuditHandler":
+        for existing in [h for h in target.handlers if isinstance(h, cls) and h.chain.path == chain.path]:
+            target.removeHandler(existing)
+            existing.close()
+        handler = cls(chain)
+        handler.setFormatter(formatter)
+        target.addHandler(handler)
+        return handler
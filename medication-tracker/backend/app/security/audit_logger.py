@@ -4,12 +4,12 @@ import logging
 import json
 from datetime import datetime
 from typing import Any, Dict, Optional
-import hashlib
 from functools import wraps
 import os
 from pathlib import Path
 
 from ..core.config import get_settings
+from .audit_chain import AuditChain, ChainedAuditHandler, entry_hash
 
 class AuditLogger:
     """Logger for security and audit events."""
@@ -23,25 +23,43 @@ class AuditLogger:
     def _setup_logger(self) -> None:
         """Setup logger with appropriate handlers and formatters."""
         # Ensure log directory exists
-        log_path = Path(self.settings.AUDIT_LOG_PATH)
-        log_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        # Create a file handler
-        handler = logging.FileHandler(
-            str(log_path),
-            encoding='utf-8'
-        )
-        
-        # Create a formatter
-        formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        )
-        handler.setFormatter(formatter)
-        
-        # Add handler to logger
-        self.logger.addHandler(handler)
+        self.log_path = Path(self.settings.AUDIT_LOG_PATH)
+        self.log_path.parent.mkdir(parents=True, exist_ok=True)
+        self._chain: Optional[AuditChain] = None
         self.logger.setLevel(logging.INFO)
 
+    @property
+    def chain(self) -> AuditChain:
+        """
+        The hash chain shared by every module logging to this path. Built on
+        first use, so modules that create a logger at import don't need the
+        checkpoint key until they write.
+        """
+        if self._chain is None:
+            chain = AuditChain.for_path(str(self.log_path))
+
+            # Create a formatter
+            formatter = logging.Formatter(
+                '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+            )
+
+            # Add a chained file handler, replacing one from an earlier setup
+            ChainedAuditHandler.attach(self.logger, chain, formatter)
+            self._chain = chain
+        return self._chain
+
+    def _log(
+        self,
+        level: int,
+        event_type: str,
+        data: Dict[str, Any],
+        user_id: Optional[int] = None
+    ) -> None:
+        """Stamp and write an entry while holding the chain for writing."""
+        with self.chain.writing():
+            log_entry = self._build_log_entry(event_type, data, user_id)
+            self.logger.log(level, json.dumps(log_entry), extra={"audit_entry": log_entry})
+
     def _format_log_entry(
         self,
         event_type: str,
@@ -49,6 +67,15 @@ class AuditLogger:
         user_id: Optional[int] = None
     ) -> str:
         """Format log entry with consistent structure."""
+        return json.dumps(self._build_log_entry(event_type, data, user_id))
+
+    def _build_log_entry(
+        self,
+        event_type: str,
+        data: Dict[str, Any],
+        user_id: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Build an entry linked to the previous one by hash."""
         log_entry = {
             "timestamp": datetime.utcnow().isoformat(),
             "event_type": event_type,
@@ -56,20 +83,16 @@ class AuditLogger:
             "data": data
         }
 
-        # Add hash for integrity verification
-        log_entry["hash"] = self._generate_entry_hash(log_entry)
-        
-        return json.dumps(log_entry)
+        # Chain to the previous entry and add hash for integrity verification
+        return self.chain.stamp(log_entry)
 
     def _generate_entry_hash(self, entry: Dict[str, Any]) -> str:
         """Generate hash for log entry to ensure integrity."""
-        # Create a deterministic string representation
-        entry_str = json.dumps(entry, sort_keys=True)
-        
-        # Generate hash using SHA-256
-        return hashlib.sha256(
-            entry_str.encode('utf-8')
-        ).hexdigest()
+        return entry_hash(entry)
+
+    def verify_integrity(self, full: bool = False) -> Dict[str, Any]:
+        """Verify the hash chain from the last verified checkpoint."""
+        return self.chain.verify(full=full)
 
     def info(
         self,
@@ -78,8 +101,7 @@ class AuditLogger:
         user_id: Optional[int] = None
     ) -> None:
         """Log an informational audit event."""
-        log_entry = self._format_log_entry(event_type, data, user_id)
-        self.logger.info(log_entry)
+        self._log(logging.INFO, event_type, data, user_id)
 
     def warning(
         self,
@@ -88,8 +110,7 @@ class AuditLogger:
         user_id: Optional[int] = None
     ) -> None:
         """Log a warning audit event."""
-        log_entry = self._format_log_entry(event_type, data, user_id)
-        self.logger.warning(log_entry)
+        self._log(logging.WARNING, event_type, data, user_id)
 
     def error(
         self,
@@ -98,8 +119,7 @@ class AuditLogger:
         user_id: Optional[int] = None
     ) -> None:
         """Log an error audit event."""
-        log_entry = self._format_log_entry(event_type, data, user_id)
-        self.logger.error(log_entry)
+        self._log(logging.ERROR, event_type, data, user_id)
 
     def security_event(
         self,
@@ -109,8 +129,7 @@ class AuditLogger:
     ) -> None:
         """Log a security-specific event."""
         data["security_level"] = "high"
-        log_entry = self._format_log_entry(f"security_{event_type}", data, user_id)
-        self.logger.warning(log_entry)
+        self._log(logging.WARNING, f"security_{event_type}", data, user_id)
 
 def audit_log(event_type: str):
     """Decorator for automatic audit logging of function calls."""
@@ -8,9 +8,11 @@ Reference: MASTER_CRITICAL_PATH.md
 from typing import Dict, List, Optional
 from datetime import datetime
 import logging
+import os
 from enum import Enum
 from dataclasses import dataclass
-import json
+
+from .audit_writer import AuditWriter, STATUS, TIMESTAMP
 
 class AuditLevel(Enum):
     """Audit Event Classification"""
@@ -33,9 +35,11 @@ class AuditEvent:
 class AuditSystem:
     """Comprehensive Audit System"""
     
-    def __init__(self):
+    def __init__(self, log_dir: str = 'logs'):
         self.logger = self._setup_logger()
-        self.events: List[AuditEvent] = []
+        # Events are appended in batches from a background thread and
+        # queried from disk through the segment indexes
+        self.writer = AuditWriter(os.path.join(log_dir, 'secure_audit'))
     
     def _setup_logger(self) -> logging.Logger:
         """Setup secure audit logging"""
@@ -72,8 +76,6 @@ class AuditSystem:
                 validation_status=True
             )
             
-            self.events.append(event)
-            
             # Log to secure audit log
             self.logger.info(
                 f"Audit event - Level: {level.value}, "
@@ -94,68 +96,72 @@ class AuditSystem:
             return ""
     
     def _write_event(self, event: AuditEvent) -> None:
-        """Write event to secure audit file"""
+        """Queue event for the secure audit segments"""
         try:
-            with open('logs/secure_audit.log', 'a') as f:
-                event_dict = {
-                    'event_id': event.event_id,
-                    'timestamp': event.timestamp.isoformat(),
-                    'level': event.level.value,
-                    'component': event.component,
-                    'action': event.action,
-                    'user_id': event.user_id,
-                    'details': event.details,
-                    'validation_status': event.validation_status
-                }
-                f.write(json.dumps(event_dict) + '\n')
+            self.writer.write({
+                'event_id': event.event_id,
+                'timestamp': event.timestamp.isoformat(timespec='microseconds'),
+                'level': event.level.value,
+                'component': event.component,
+                'action': event.action,
+                'user_id': event.user_id,
+                'details': event.details,
+                'validation_status': event.validation_status
+            })
                 
         except Exception as e:
             self.logger.error(f"Audit write error: {str(e)}")
+
+    def flush(self) -> None:
+        """Wait until every logged event is on disk"""
+        self.writer.flush()
     
     def query_events(self,
                     level: Optional[AuditLevel] = None,
                     component: Optional[str] = None,
                     start_time: Optional[datetime] = None,
-                    end_time: Optional[datetime] = None) -> List[AuditEvent]:
+                    end_time: Optional[datetime] = None,
+                    user_id: Optional[str] = None) -> List[AuditEvent]:
         """Query audit events with filters"""
-        if not start_time:
-            start_time = datetime.min
-        if not end_time:
-            end_time = datetime.max
-            
-        filtered_events = self.events
+        records = self.writer.query(
+            start=start_time.isoformat(timespec='microseconds') if start_time else None,
+            end=end_time.isoformat(timespec='microseconds') if end_time else None,
+            level=level.value if level else None,
+            component=component,
+            user_id=user_id
+        )
         
-        if level:
-            filtered_events = [
-                e for e in filtered_events
-                if e.level == level
-            ]
-            
-        if component:
-            filtered_events = [
-                e for e in filtered_events
-                if e.component == component
-            ]
-            
         return [
-            e for e in filtered_events
-            if start_time <= e.timestamp <= end_time
+            AuditEvent(
+                event_id=record['event_id'],
+                timestamp=datetime.fromisoformat(record['timestamp']),
+                level=AuditLevel(record['level']),
+                component=record['component'],
+                action=record['action'],
+                user_id=record['user_id'],
+                details=record['details'],
+                validation_status=record['validation_status']
+            )
+            for record in records
         ]
     
     def validate_audit_chain(self) -> bool:
         """Validate audit event chain integrity"""
         try:
-            previous_event = None
-            
-            for event in self.events:
-                if not event.validation_status:
-                    return False
-                    
-                if previous_event and \
-                   event.timestamp < previous_event.timestamp:
-                    return False
-                    
-                previous_event = event
+            # The sidecar indexes carry everything needed, so event bodies are
+            # not read. Each segment has a single writer, so timestamps must
+            # rise within it; segments of different processes interleave
+            for entries in self.writer.index_entries():
+                previous_timestamp = None
+                for entry in entries:
+                    if not entry[STATUS]:
+                        return False
+                        
+                    if previous_timestamp and \
+                       entry[TIMESTAMP] < previous_timestamp:
+                        return False
+                        
+                    previous_timestamp = entry[TIMESTAMP]
                 
             return True
             
@@ -0,0 +1,349 @@
+"""
+Secure Audit Writer
+Permission: CORE
+Reference: MASTER_CRITICAL_PATH.md
+"""
+
+import atexit
+import heapq
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import ExitStack
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from ..core.file_lock import exclusive_lock
+
+SEGMENT_PREFIX = "audit-"
+DATA_SUFFIX = ".log"
+INDEX_SUFFIX = ".idx"
+LOCK_FILE = ".lock"
+
+# Sidecar index entry: [timestamp, level, component, user_id, validation_status, offset, length]
+TIMESTAMP, LEVEL, COMPONENT, USER_ID, STATUS, OFFSET, LENGTH = range(7)
+
+@dataclass
+class AuditSegment:
+    """A data file, its sidecar index and the time range it covers"""
+    seq: int
+    min_ts: Optional[str] = None
+    max_ts: Optional[str] = None
+    size: int = 0
+    count: int = 0
+    opened_at: float = 0.0
+    index_size: int = 0
+
+    @property
+    def name(self) -> str:
+        return f"{SEGMENT_PREFIX}{self.seq:08d}"
+
+    def overlaps(self, start: Optional[str], end: Optional[str]) -> bool:
+        if self.count == 0:
+            return False
+        return (start is None or self.max_ts >= start) and (end is None or self.min_ts <= end)
+
+class AuditWriter:
+    """
+    Appends audit records from a background thread. Records queued by
+    write() are written and fsynced together once per flush interval (group
+    commit) rather than opening the file for every event. Segments rotate
+    by size and age, and each has a sidecar index of timestamp, level,
+    component and user_id with the record's byte offset, so queries read
+    the indexes of overlapping segments and seek only to matching records.
+
+    Several processes may share a directory: each claims its own segments
+    under a lock file and never appends to another's, and queries pick up
+    the segments and records the others have written. Records are in time
+    order within a segment, but segments of different processes interleave,
+    so queries merge them by timestamp.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        flush_interval: float = 0.05,
+        max_batch: int = 1000,
+        segment_max_bytes: int = 64 * 1024 * 1024,
+        segment_max_age: float = 3600.0,
+        fsync: bool = True
+    ):
+        self.directory = Path(directory)
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.segment_max_bytes = segment_max_bytes
+        self.segment_max_age = segment_max_age
+        self.fsync = fsync
+        self.logger = logging.getLogger('audit_system')
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segments: List[AuditSegment] = []
+        self._owned = set()
+        self._segments_lock = threading.Lock()
+        self._refresh_segments()
+
+        self._condition = threading.Condition()
+        self._pending: List[Tuple[int, Dict, bytes]] = []
+        self._enqueued = 0
+        self._durable = 0
+        self._error: Optional[Exception] = None
+        self._attempts = 0
+        self._flush_requested = False
+        self._closed = False
+
+        self._data_file = None
+        self._index_file = None
+
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def write(self, record: Dict) -> int:
+        """Queue a record; returns its sequence number for flush(until=...)"""
+        # Serialized here so a bad record fails its caller, not a whole batch
+        line = (json.dumps(record) + "\n").encode()
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Audit writer is closed")
+            self._enqueued += 1
+            self._pending.append((self._enqueued, record, line))
+            if len(self._pending) >= self.max_batch:
+                self._condition.notify_all()
+            return self._enqueued
+
+    def flush(self, until: Optional[int] = None, timeout: Optional[float] = None) -> bool:
+        """
+        Block until records up to `until` (default: all queued) are durable.
+        Raises OSError if they could not be written; they stay queued and
+        are retried unless the writer is closing.
+        """
+        with self._condition:
+            target = self._enqueued if until is None else until
+            if self._durable >= target:
+                return True
+            self._flush_requested = True
+            self._condition.notify_all()
+            # Only a commit attempted after this request reports its failure
+            attempts = self._attempts
+            done = self._condition.wait_for(
+                lambda: (
+                    self._durable >= target
+                    or (self._error is not None and self._attempts > attempts)
+                    or not self._thread.is_alive()
+                ),
+                timeout
+            )
+            if self._durable < target and self._error is not None:
+                raise OSError(f"Audit write failed: {str(self._error)}") from self._error
+            return done
+
+    def close(self) -> None:
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+        self._close_files()
+
+    def query(
+        self,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        level: Optional[str] = None,
+        component: Optional[str] = None,
+        user_id: Optional[str] = None
+    ) -> Iterator[Dict]:
+        """Records matching the filters in timestamp order, read via the sidecar indexes"""
+        self.flush()
+        self._refresh_segments()
+        runs = []
+        for segment in list(self.segments):
+            if not segment.overlaps(start, end):
+                continue
+
+            matches = [
+                (segment, entry) for entry in self._read_index(segment)
+                if (start is None or entry[TIMESTAMP] >= start)
+                and (end is None or entry[TIMESTAMP] <= end)
+                and (level is None or entry[LEVEL] == level)
+                and (component is None or entry[COMPONENT] == component)
+                and (user_id is None or entry[USER_ID] == user_id)
+            ]
+            if matches:
+                runs.append(matches)
+
+        with ExitStack() as stack:
+            files = {}
+            for segment, entry in heapq.merge(*runs, key=lambda match: match[1][TIMESTAMP]):
+                f = files.get(segment.seq)
+                if f is None:
+                    f = files[segment.seq] = stack.enter_context(open(self._path(segment, DATA_SUFFIX), "rb"))
+                f.seek(entry[OFFSET])
+                yield json.loads(f.read(entry[LENGTH]))
+
+    def index_entries(self) -> Iterator[List[List]]:
+        """Each segment's index entries, in write order within the segment"""
+        self.flush()
+        self._refresh_segments()
+        for segment in list(self.segments):
+            yield list(self._read_index(segment))
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                self._condition.wait_for(
+                    lambda: self._closed or self._flush_requested or len(self._pending) >= self.max_batch,
+                    self.flush_interval
+                )
+                batch, self._pending = self._pending, []
+                self._flush_requested = False
+                closing = self._closed
+
+            error = None
+            if batch:
+                try:
+                    self._commit(batch)
+                except Exception as e:
+                    error = e
+                    self.logger.error(f"Audit write error: {str(e)}")
+                    # Retry in a fresh segment rather than after a partial write
+                    self._close_files()
+
+            with self._condition:
+                self._attempts += 1
+                if error is None:
+                    if batch:
+                        self._durable = batch[-1][0]
+                    self._error = None
+                else:
+                    self._error = error
+                    if closing:
+                        self.logger.error(f"Dropping {len(batch) + len(self._pending)} audit records on close")
+                    else:
+                        self._pending = batch + self._pending
+                self._condition.notify_all()
+                if closing and (error is not None or not self._pending):
+                    return
+
+    def _commit(self, batch: List[Tuple[int, Dict, bytes]]) -> None:
+        """Write a batch to the active segment and its index with one fsync each"""
+        segment = self._active_segment()
+        data = []
+        index = []
+        timestamps = []
+        offset = segment.size
+
+        for _, record, line in batch:
+            timestamp = record.get("timestamp", "")
+            index.append(json.dumps([
+                timestamp,
+                record.get("level"),
+                record.get("component"),
+                record.get("user_id"),
+                record.get("validation_status", True),
+                offset,
+                len(line)
+            ]))
+            data.append(line)
+            timestamps.append(timestamp)
+            offset += len(line)
+
+        # Data first, so every indexed offset is already on disk
+        self._data_file.write(b"".join(data))
+        self._data_file.flush()
+        if self.fsync:
+            os.fsync(self._data_file.fileno())
+        index_data = ("\n".join(index) + "\n").encode()
+        self._index_file.write(index_data)
+        self._index_file.flush()
+        if self.fsync:
+            os.fsync(self._index_file.fileno())
+
+        if segment.min_ts is None or min(timestamps) < segment.min_ts:
+            segment.min_ts = min(timestamps)
+        if segment.max_ts is None or max(timestamps) > segment.max_ts:
+            segment.max_ts = max(timestamps)
+        segment.count += len(batch)
+        segment.size = offset
+        segment.index_size += len(index_data)
+
+    def _active_segment(self) -> AuditSegment:
+        """
+        The segment to append to, rotating by size or age. Each process
+        starts a fresh segment, so bytes left unindexed by a crash are never
+        followed by new records, and claims it under the directory lock so
+        no two processes append to the same one.
+        """
+        if self._data_file is not None:
+            segment = self.segments[-1]
+            if (
+                segment.size < self.segment_max_bytes
+                and time.monotonic() - segment.opened_at < self.segment_max_age
+            ):
+                return segment
+            self._close_files()
+
+        with exclusive_lock(str(self.directory / LOCK_FILE)):
+            self._refresh_segments()
+            segment = AuditSegment(seq=self.segments[-1].seq + 1 if self.segments else 0)
+            self._index_file = open(self._path(segment, INDEX_SUFFIX), "xb")
+            self._data_file = open(self._path(segment, DATA_SUFFIX), "xb")
+        segment.opened_at = time.monotonic()
+        with self._segments_lock:
+            self._owned.add(segment.seq)
+            self.segments.append(segment)
+        return segment
+
+    def _close_files(self) -> None:
+        for f in (self._data_file, self._index_file):
+            if f is not None:
+                f.close()
+        self._data_file = None
+        self._index_file = None
+
+    def _read_index(self, segment: AuditSegment) -> Iterator[List]:
+        try:
+            with open(self._path(segment, INDEX_SUFFIX), "rb") as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        # Torn final line from an interrupted write
+                        continue
+        except FileNotFoundError:
+            return
+
+    def _refresh_segments(self) -> None:
+        """
+        Rebuild time ranges from the sidecar indexes of segments this
+        process doesn't write, for new ones and ones that have grown
+        """
+        with self._segments_lock:
+            known = {segment.seq: segment for segment in self.segments}
+            for path in self.directory.glob(f"{SEGMENT_PREFIX}*{INDEX_SUFFIX}"):
+                seq = int(path.stem[len(SEGMENT_PREFIX):])
+                if seq in self._owned:
+                    continue
+                segment = known.setdefault(seq, AuditSegment(seq=seq))
+                index_size = path.stat().st_size
+                if index_size == segment.index_size:
+                    continue
+
+                segment.min_ts = segment.max_ts = None
+                segment.count = segment.size = 0
+                for entry in self._read_index(segment):
+                    if segment.min_ts is None or entry[TIMESTAMP] < segment.min_ts:
+                        segment.min_ts = entry[TIMESTAMP]
+                    if segment.max_ts is None or entry[TIMESTAMP] > segment.max_ts:
+                        segment.max_ts = entry[TIMESTAMP]
+                    segment.count += 1
+                    segment.size = entry[OFFSET] + entry[LENGTH]
+                segment.index_size = index_size
+            self.segments = sorted(known.values(), key=lambda segment: segment.seq)
+
+    def _path(self, segment: AuditSegment, suffix: str) -> Path:
+        return self.directory / f"{segment.name}{suffix}"
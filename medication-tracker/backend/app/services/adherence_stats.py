@@ -0,0 +1,146 @@
+"""
+Adherence aggregation.
+
+Dose counts are computed in the database with one grouped query per
+user rather than by loading every history row. Full days in the past
+can optionally be read from the daily_adherence rollup, which the
+medication_history model keeps up to date, so long windows cost one row
+per medication and day instead of one per dose.
+"""
+import os
+from datetime import datetime, time, timedelta
+from sqlalchemy import and_, case, func, or_
+from .. import db
+from ..models.medication import Medication
+from ..models.medication_history import (
+    ADHERENCE_COUNTERS,
+    ON_TIME_WINDOW,
+    DailyAdherence,
+    MedicationHistory
+)
+
+# The rollup is only complete once rebuild_daily_adherence() has backfilled existing history
+ROLLUP_ENABLED = os.environ.get('ADHERENCE_ROLLUP_ENABLED', 'false').lower() == 'true'
+RESULT_COUNTERS = ADHERENCE_COUNTERS + ('overdue',)
+
+def _seconds_between(later, earlier):
+    """SQL expression for the whole seconds between two datetime columns"""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        return func.round((func.julianday(later) - func.julianday(earlier)) * 86400)
+    if dialect == 'postgresql':
+        return func.extract('epoch', later - earlier)
+    return func.timestampdiff(db.text('SECOND'), earlier, later)
+
+def _counter_columns(now):
+    """CASE-based counts matching dose_counters(), plus doses overdue at `now`"""
+    history = MedicationHistory
+    delay = _seconds_between(history.taken_time, history.scheduled_time)
+    window = ON_TIME_WINDOW.total_seconds()
+    taken = and_(history.action == 'taken', history.taken_time.isnot(None))
+
+    def count_if(condition):
+        return func.sum(case((condition, 1), else_=0))
+
+    return [
+        func.count(history.id).label('total'),
+        count_if(history.taken_time.isnot(None)).label('taken'),
+        count_if(and_(taken, func.abs(delay) <= window)).label('taken_on_time'),
+        count_if(and_(taken, delay > window)).label('taken_late'),
+        count_if(history.action == 'missed').label('missed'),
+        count_if(history.taken_time.is_(None)).label('untaken'),
+        count_if(and_(history.taken_time.is_(None), history.scheduled_time < now)).label('overdue')
+    ]
+
+def _rollup_days(start, end, now):
+    """The whole days in [start, end] that are over by `now`, as [first, last)"""
+    first = datetime.combine(start.date(), time.min)
+    if first < start:
+        first += timedelta(days=1)
+    last = datetime.combine(min(end, now).date(), time.min)
+    return (first, last) if first < last else None
+
+def empty_counts():
+    return {name: 0 for name in RESULT_COUNTERS}
+
+def adherence_by_medication(user_id, start, end, medication_id=None, now=None, use_rollup=None):
+    """Dose counts per medication for a user's history scheduled in [start, end].
+
+    Returns {medication_id: counts} for medications with history in the
+    window; counts has total, taken, taken_on_time, taken_late, missed,
+    untaken and overdue (untaken and scheduled before `now`).
+    """
+    now = now or datetime.now()
+    use_rollup = ROLLUP_ENABLED if use_rollup is None else use_rollup
+    days = _rollup_days(start, end, now) if use_rollup else None
+
+    history = MedicationHistory
+    if days:
+        # Raw rows only for the partial days at either end of the window
+        in_window = or_(
+            and_(history.scheduled_time >= start, history.scheduled_time < days[0]),
+            and_(history.scheduled_time >= days[1], history.scheduled_time <= end)
+        )
+    else:
+        in_window = history.scheduled_time.between(start, end)
+
+    query = db.session.query(history.medication_id, *_counter_columns(now)).join(
+        Medication, Medication.id == history.medication_id
+    ).filter(Medication.user_id == user_id, in_window)
+    if medication_id is not None:
+        query = query.filter(history.medication_id == medication_id)
+
+    results = {}
+    for row in query.group_by(history.medication_id).all():
+        results[row.medication_id] = {name: int(getattr(row, name) or 0) for name in RESULT_COUNTERS}
+
+    if days:
+        rollup = DailyAdherence
+        query = db.session.query(
+            rollup.medication_id,
+            *[func.sum(getattr(rollup, name)).label(name) for name in ADHERENCE_COUNTERS]
+        ).join(
+            Medication, Medication.id == rollup.medication_id
+        ).filter(
+            Medication.user_id == user_id,
+            rollup.day >= days[0].date(),
+            rollup.day < days[1].date()
+        )
+        if medication_id is not None:
+            query = query.filter(rollup.medication_id == medication_id)
+
+        for row in query.group_by(rollup.medication_id).all():
+            counts = results.setdefault(row.medication_id, empty_counts())
+            for name in ADHERENCE_COUNTERS:
+                counts[name] += int(getattr(row, name) or 0)
+            # Every dose on a finished day that was never taken is overdue
+            counts['overdue'] += int(row.untaken or 0)
+
+    return {med_id: counts for med_id, counts in results.items() if counts['total']}
+
+def rebuild_daily_adherence(medication_ids=None):
+    """Recompute the daily_adherence rollup from medication_history"""
+    history = MedicationHistory
+    day = func.date(history.scheduled_time)
+    columns = _counter_columns(datetime.max)[:len(ADHERENCE_COUNTERS)]
+    query = db.session.query(history.medication_id, day.label('day'), *columns)
+
+    delete = DailyAdherence.__table__.delete()
+    if medication_ids is not None:
+        query = query.filter(history.medication_id.in_(medication_ids))
+        delete = delete.where(DailyAdherence.medication_id.in_(medication_ids))
+
+    rows = [
+        dict(
+            {name: int(getattr(row, name) or 0) for name in ADHERENCE_COUNTERS},
+            medication_id=row.medication_id,
+            day=row.day if not isinstance(row.day, str) else datetime.strptime(row.day, '%Y-%m-%d').date()
+        )
+        for row in query.group_by(history.medication_id, day).all()
+    ]
+
+    db.session.execute(delete)
+    if rows:
+        db.session.execute(DailyAdherence.__table__.insert(), rows)
+    db.session.commit()
+    return len(rows)
@@ -1,56 +1,78 @@
 import requests
 from flask import current_app
 import json
-from datetime import datetime, timedelta
+from datetime import timedelta
 import logging
+from app.services.label_cache import create_label_cache
 
 class DrugInteractionService:
-    def __init__(self):
+    def __init__(self, label_cache=None):
         self.base_url = "https://api.fda.gov/drug/label.json"
-        self.interaction_cache = {}
-        self.cache_duration = timedelta(days=7)  # Cache interaction data for 7 days
+        self.label_cache = label_cache if label_cache is not None else create_label_cache()
+        self.cache_duration = timedelta(seconds=self.label_cache.ttl)
+
+    def _fetch_label(self, drug_name):
+        """
+        Query the FDA API for a drug label, keeping only the fields we serve
+        """
+        params = {
+            'search': f'openfda.brand_name:"{drug_name}" OR openfda.generic_name:"{drug_name}"',
+            'limit': 1
+        }
+        
+        response = requests.get(self.base_url, params=params)
+        response.raise_for_status()
+        
+        data = response.json()
+        
+        if 'results' not in data or not data['results']:
+            return None
+            
+        result = data['results'][0]
+        
+        return {
+            'brand_name': result.get('openfda', {}).get('brand_name', []),
+            'generic_name': result.get('openfda', {}).get('generic_name', []),
+            'description': result.get('description', []),
+            'indications_and_usage': result.get('indications_and_usage', []),
+            'dosage_and_administration': result.get('dosage_and_administration', []),
+            'warnings': result.get('warnings', []),
+            'drug_interactions': result.get('drug_interactions', []),
+            'contraindications': result.get('contraindications', []),
+            'adverse_reactions': result.get('adverse_reactions', []),
+            'precautions': result.get('precautions', [])
+        }
+
+    def _get_label(self, drug_name):
+        """
+        Get label data through the shared cache, fetching it at most once
+        per drug even when several requests miss at the same time
+        """
+        cache_key = drug_name.lower()
+        return self.label_cache.get_or_load(cache_key, lambda: self._fetch_label(drug_name))
+
+    def get_cache_stats(self):
+        """
+        Get hit/miss counters for the label cache
+        """
+        return self.label_cache.stats()
 
     def get_drug_interactions(self, drug_name):
         """
         Get drug interactions from the FDA API
         """
         try:
-            # Check cache first
-            cache_key = drug_name.lower()
-            if cache_key in self.interaction_cache:
-                cached_data = self.interaction_cache[cache_key]
-                if datetime.now() - cached_data['timestamp'] < self.cache_duration:
-                    return cached_data['data']
-
-            # Query FDA API
-            params = {
-                'search': f'openfda.brand_name:"{drug_name}" OR openfda.generic_name:"{drug_name}"',
-                'limit': 1
-            }
+            label = self._get_label(drug_name)
             
-            response = requests.get(self.base_url, params=params)
-            response.raise_for_status()
-            
-            data = response.json()
-            
-            if 'results' not in data or not data['results']:
+            if not label:
                 return None
                 
-            result = data['results'][0]
-            interactions = {
-                'drug_interactions': result.get('drug_interactions', []),
-                'warnings': result.get('warnings', []),
-                'contraindications': result.get('contraindications', []),
-                'precautions': result.get('precautions', [])
-            }
-            
-            # Cache the result
-            self.interaction_cache[cache_key] = {
-                'data': interactions,
-                'timestamp': datetime.now()
+            return {
+                'drug_interactions': label['drug_interactions'],
+                'warnings': label['warnings'],
+                'contraindications': label['contraindications'],
+                'precautions': label['precautions']
             }
-            
-            return interactions
 
         except requests.exceptions.RequestException as e:
             current_app.logger.error(f"Error fetching drug interactions: {str(e)}")
@@ -111,33 +133,12 @@ class DrugInteractionService:
         Get detailed information about a drug
         """
         try:
-            params = {
-                'search': f'openfda.brand_name:"{drug_name}" OR openfda.generic_name:"{drug_name}"',
-                'limit': 1
-            }
-            
-            response = requests.get(self.base_url, params=params)
-            response.raise_for_status()
-            
-            data = response.json()
+            label = self._get_label(drug_name)
             
-            if 'results' not in data or not data['results']:
+            if not label:
                 return None
                 
-            result = data['results'][0]
-            
-            return {
-                'brand_name': result.get('openfda', {}).get('brand_name', []),
-                'generic_name': result.get('openfda', {}).get('generic_name', []),
-                'description': result.get('description', []),
-                'indications_and_usage': result.get('indications_and_usage', []),
-                'dosage_and_administration': result.get('dosage_and_administration', []),
-                'warnings': result.get('warnings', []),
-                'drug_interactions': result.get('drug_interactions', []),
-                'contraindications': result.get('contraindications', []),
-                'adverse_reactions': result.get('adverse_reactions', []),
-                'precautions': result.get('precautions', [])
-            }
+            return dict(label)
 
         except Exception as e:
             current_app.logger.error(f"Error fetching drug details: {str(e)}")
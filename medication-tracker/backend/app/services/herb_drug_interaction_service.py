@@ -1,4 +1,5 @@
-import requests
+import asyncio
+import aiohttp
 from flask import current_app
 import json
 from datetime import datetime, timedelta
@@ -11,8 +12,19 @@ from app.services.api_parsers import (
     combine_interaction_data
 )
 
+logger = logging.getLogger(__name__)
+
+# Per-source request timeouts in seconds; a slow source only drops its own
+# contribution instead of delaying the whole check.
+SOURCE_TIMEOUTS = {
+    'MedlinePlus': 4.0,
+    'DailyMed': 4.0,
+    'NCCIH': 4.0,
+    'OpenFDA': 4.0
+}
+
 class HerbDrugInteractionService:
-    def __init__(self):
+    def __init__(self, max_connections: int = 32, source_timeouts: Optional[Dict[str, float]] = None):
         self.medline_base_url = 'https://wsearch.nlm.nih.gov/ws/query'
         self.dailymed_base_url = 'https://dailymed.nlm.nih.gov/dailymed/services'
         self.nccih_base_url = 'https://nccih.nih.gov/api/v1'
@@ -20,51 +32,98 @@ class HerbDrugInteractionService:
         self.cache = {}
         self.cache_duration = timedelta(days=7)
         self.interaction_cache = {}
+        self.max_connections = max_connections
+        self.source_timeouts = dict(SOURCE_TIMEOUTS, **(source_timeouts or {}))
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """
+        Get the pooled HTTP session for the running event loop.
+
+        The session is reused for as long as the loop lives; a new loop
+        (e.g. one per request under Flask async views) gets its own pool.
+        """
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            if self._session is not None and not self._session.closed and self._session_loop.is_closed():
+                # Owning loop is gone, so release the sockets synchronously
+                self._session.connector.close()
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections, ttl_dns_cache=300)
+            )
+            self._session_loop = loop
+        return self._session
+
+    async def close(self):
+        """Close the pooled HTTP session"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._session_loop = None
+
+    async def _get(self, source: str, url: str, params: Dict, as_xml: bool = False):
+        """GET a source endpoint with that source's timeout"""
+        session = await self._get_session()
+        timeout = aiohttp.ClientTimeout(total=self.source_timeouts[source])
+        async with session.get(url, params=params, timeout=timeout) as response:
+            if response.status != 200:
+                return None
+            if as_xml:
+                return ET.fromstring(await response.text())
+            return await response.json(content_type=None)
+
+    def _get_cached(self, cache_key: str) -> Optional[Dict]:
+        cached = self.interaction_cache.get(cache_key)
+        if cached and datetime.now() - cached['timestamp'] < self.cache_duration:
+            return cached['data']
+        return None
 
     async def check_interaction(self, herb: str, drug: str) -> Dict:
         """
         Check for interactions between an herb and a drug using multiple sources
         """
         try:
+            cache_key = f"{herb.lower()}_{drug.lower()}"
+            cached = self._get_cached(cache_key)
+            if cached is not None:
+                return cached
+
+            # Query every source concurrently; failures and timeouts only
+            # remove that source from the combined result
+            sources = [
+                ('MedlinePlus', MedlinePlusParser, self._check_medlineplus(herb, drug)),
+                ('DailyMed', DailyMedParser, self._check_dailymed(herb, drug)),
+                ('NCCIH', NCCIHParser, self._check_nccih(herb)),
+                ('OpenFDA', OpenFDAParser, self._check_openfda(drug))
+            ]
+            responses = await asyncio.gather(
+                *(request for _, _, request in sources),
+                return_exceptions=True
+            )
+
             interaction_data = []
-            
-            # Check MedlinePlus
-            medline_data = await self._check_medlineplus(herb, drug)
-            if medline_data:
-                parsed_medline = MedlinePlusParser.parse_response(medline_data)
-                if parsed_medline:
-                    interaction_data.append(parsed_medline)
-
-            # Check DailyMed
-            dailymed_data = await self._check_dailymed(herb, drug)
-            if dailymed_data:
-                parsed_dailymed = DailyMedParser.parse_response(dailymed_data)
-                if parsed_dailymed:
-                    interaction_data.append(parsed_dailymed)
-
-            # Check NCCIH
-            nccih_data = await self._check_nccih(herb)
-            if nccih_data:
-                parsed_nccih = NCCIHParser.parse_response(nccih_data)
-                if parsed_nccih:
-                    interaction_data.append(parsed_nccih)
-
-            # Check OpenFDA
-            openfda_data = await self._check_openfda(drug)
-            if openfda_data:
-                parsed_openfda = OpenFDAParser.parse_response(openfda_data)
-                if parsed_openfda:
-                    interaction_data.append(parsed_openfda)
+            complete = True
+            for (source, parser, _), response in zip(sources, responses):
+                if isinstance(response, BaseException):
+                    complete = False
+                    logger.error(f"{source} API error: {type(response).__name__} {str(response)}")
+                    continue
+                if response is None:
+                    continue
+                parsed = parser.parse_response(response)
+                if parsed:
+                    interaction_data.append(parsed)
 
             # Combine and normalize the interaction data
             combined_data = combine_interaction_data(interaction_data)
             
-            # Add cache key for future reference
-            cache_key = f"{herb.lower()}_{drug.lower()}"
-            self.interaction_cache[cache_key] = {
-                'data': combined_data,
-                'timestamp': datetime.now()
-            }
+            # Only cache answers that every source contributed to
+            if complete:
+                self.interaction_cache[cache_key] = {
+                    'data': combined_data,
+                    'timestamp': datetime.now()
+                }
             
             return combined_data
 
@@ -77,66 +136,38 @@ class HerbDrugInteractionService:
                 'sources': []
             }
 
-    async def _check_medlineplus(self, herb: str, drug: str) -> Optional[Dict]:
+    async def _check_medlineplus(self, herb: str, drug: str) -> Optional[ET.Element]:
         """Query MedlinePlus for interaction data"""
-        try:
-            params = {
-                'db': 'healthTopics',
-                'term': f'{herb} {drug} interaction',
-                'retmax': 1
-            }
-            response = requests.get(self.medline_base_url, params=params)
-            if response.status_code == 200:
-                return response.json()
-            return None
-        except Exception as e:
-            logger.error(f"MedlinePlus API error: {str(e)}")
-            return None
+        params = {
+            'db': 'healthTopics',
+            'term': f'{herb} {drug} interaction',
+            'retmax': 1
+        }
+        return await self._get('MedlinePlus', self.medline_base_url, params, as_xml=True)
 
     async def _check_dailymed(self, herb: str, drug: str) -> Optional[Dict]:
         """Query DailyMed for interaction data"""
-        try:
-            params = {
-                'drug_name': drug,
-                'search_term': herb
-            }
-            response = requests.get(f"{self.dailymed_base_url}/drugnames.json", params=params)
-            if response.status_code == 200:
-                return response.json()
-            return None
-        except Exception as e:
-            logger.error(f"DailyMed API error: {str(e)}")
-            return None
+        params = {
+            'drug_name': drug,
+            'search_term': herb
+        }
+        return await self._get('DailyMed', f"{self.dailymed_base_url}/drugnames.json", params)
 
     async def _check_nccih(self, herb: str) -> Optional[Dict]:
         """Query NCCIH for herb information"""
-        try:
-            params = {
-                'term': herb,
-                'type': 'herb'
-            }
-            response = requests.get(f"{self.nccih_base_url}/search", params=params)
-            if response.status_code == 200:
-                return response.json()
-            return None
-        except Exception as e:
-            logger.error(f"NCCIH API error: {str(e)}")
-            return None
+        params = {
+            'term': herb,
+            'type': 'herb'
+        }
+        return await self._get('NCCIH', f"{self.nccih_base_url}/search", params)
 
     async def _check_openfda(self, drug: str) -> Optional[Dict]:
         """Query OpenFDA for drug information"""
-        try:
-            params = {
-                'search': f'openfda.brand_name:{drug}',
-                'limit': 1
-            }
-            response = requests.get(f"{self.openfda_base_url}/enforcement.json", params=params)
-            if response.status_code == 200:
-                return response.json()
-            return None
-        except Exception as e:
-            logger.error(f"OpenFDA API error: {str(e)}")
-            return None
+        params = {
+            'search': f'openfda.brand_name:{drug}',
+            'limit': 1
+        }
+        return await self._get('OpenFDA', f"{self.openfda_base_url}/enforcement.json", params)
 
 # Create singleton instance
 herb_drug_interaction_service = HerbDrugInteractionService()
@@ -0,0 +1,237 @@
+"""
+Precomputed drug interaction index.
+
+Builds a normalized drug-name -> interacting-names adjacency map from the
+label data cached by DrugInteractionService. Label text is scanned once per
+drug with an Aho-Corasick automaton over every known drug name, so checking
+a pair afterwards is a dictionary lookup instead of a substring scan over
+the full label text.
+"""
+import logging
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set
+from app.services.drug_interaction_service import drug_interaction_service
+
+logger = logging.getLogger(__name__)
+
+# Label sections scanned for each drug, with the severity reported when
+# another drug is mentioned in them (mirrors DrugInteractionService).
+LABEL_SECTIONS = (
+    ('drug_interactions', 'high'),
+    ('warnings', 'medium'),
+    ('precautions', 'medium'),
+)
+
+# How often expired entries are swept; lookups between sweeps stay O(1)
+EXPIRY_SWEEP_INTERVAL = timedelta(minutes=1)
+
+
+def normalize_drug_name(name: str) -> str:
+    """Normalize a drug name for index lookups"""
+    return ' '.join(name.lower().split())
+
+
+class AhoCorasickMatcher:
+    """Multi-pattern substring matcher over a fixed set of lowercase patterns"""
+
+    def __init__(self, patterns: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Set[str]] = [set()]
+
+        for pattern in patterns:
+            if pattern:
+                self._add(pattern)
+        self._build_failure_links()
+
+    def _add(self, pattern: str):
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(set())
+            state = next_state
+        self._output[state].add(pattern)
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                if self._fail[next_state] == next_state:
+                    self._fail[next_state] = 0
+                self._output[next_state] |= self._output[self._fail[next_state]]
+
+    def find(self, text: str) -> Set[str]:
+        """Return every pattern occurring in the (already lowercased) text"""
+        found: Set[str] = set()
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found |= output[state]
+        return found
+
+
+class InteractionIndex:
+    """
+    Incrementally built adjacency index of label-text drug interactions.
+
+    Each indexed drug keeps its lowercased label sections; edges record
+    which other indexed drugs are mentioned in which section. Adding new
+    drugs only scans the new labels against the full vocabulary and the
+    existing labels against the new names.
+    """
+
+    def __init__(self, drug_service, ttl=None):
+        self.drug_service = drug_service
+        self.ttl = ttl if ttl is not None else drug_service.cache_duration
+        self._lock = threading.RLock()
+        self._labels: Dict[str, Dict[str, List[tuple]]] = {}
+        self._indexed_at: Dict[str, datetime] = {}
+        # source -> target -> [(section, severity, description)]
+        self._edges: Dict[str, Dict[str, List[tuple]]] = {}
+        self._last_sweep = datetime.min
+
+    def ensure(self, drug_names: Iterable[str]):
+        """Make sure every drug name is indexed and fresh"""
+        with self._lock:
+            self._evict_expired()
+            new_names = []
+            for name in drug_names:
+                key = normalize_drug_name(name)
+                if key and key not in self._labels and key not in new_names:
+                    new_names.append(key)
+            if new_names:
+                self._add(new_names)
+
+    def check_interaction(self, med1_name: str, med2_name: str) -> Optional[List[Dict]]:
+        """
+        Return the interactions between two drugs.
+
+        Produces the same entries, in the same order, as
+        DrugInteractionService.check_interaction.
+        """
+        key1 = normalize_drug_name(med1_name)
+        key2 = normalize_drug_name(med2_name)
+        self.ensure([key1, key2])
+
+        with self._lock:
+            if not self._labels.get(key1) or not self._labels.get(key2):
+                return None
+
+            forward = self._edges.get(key1, {}).get(key2, [])
+            backward = self._edges.get(key2, {}).get(key1, [])
+
+        interactions = []
+        for entries in (
+            [e for e in forward if e[0] == 'drug_interactions'],
+            [e for e in backward if e[0] == 'drug_interactions'],
+            [e for e in forward if e[0] != 'drug_interactions'],
+            [e for e in backward if e[0] != 'drug_interactions'],
+        ):
+            for _, severity, description in entries:
+                interactions.append({
+                    'severity': severity,
+                    'description': description
+                })
+
+        return interactions if interactions else None
+
+    def interacting_names(self, drug_name: str) -> Set[str]:
+        """Return the normalized names mentioned in a drug's label"""
+        key = normalize_drug_name(drug_name)
+        self.ensure([key])
+        with self._lock:
+            return set(self._edges.get(key, {}))
+
+    def invalidate(self, drug_name: Optional[str] = None):
+        """Drop one drug (or the whole index) so it is rebuilt on next use"""
+        with self._lock:
+            if drug_name is None:
+                self._labels.clear()
+                self._indexed_at.clear()
+                self._edges.clear()
+                return
+            self._remove(normalize_drug_name(drug_name))
+
+    def _evict_expired(self):
+        now = datetime.now()
+        if now - self._last_sweep < EXPIRY_SWEEP_INTERVAL:
+            return
+        self._last_sweep = now
+        expired = [
+            key for key, indexed_at in self._indexed_at.items()
+            if now - indexed_at >= self.ttl
+        ]
+        for key in expired:
+            self._remove(key)
+
+    def _remove(self, key: str):
+        self._labels.pop(key, None)
+        self._indexed_at.pop(key, None)
+        self._edges.pop(key, None)
+        for targets in self._edges.values():
+            targets.pop(key, None)
+
+    def _load_label(self, key: str) -> Optional[Dict[str, List[tuple]]]:
+        data = self.drug_service.get_drug_interactions(key)
+        if not data:
+            return None
+        return {
+            section: [(text, text.lower()) for text in data.get(section, [])]
+            for section, _ in LABEL_SECTIONS
+        }
+
+    def _add(self, new_names: List[str]):
+        # Drugs without label data are not remembered, so they are
+        # retried on the next lookup just like the uncached service path.
+        added = []
+        for key in new_names:
+            label = self._load_label(key)
+            if label:
+                self._labels[key] = label
+                self._indexed_at[key] = datetime.now()
+                added.append(key)
+        if not added:
+            return
+
+        full_matcher = AhoCorasickMatcher(self._labels)
+        new_matcher = AhoCorasickMatcher(added)
+        new_set = set(added)
+
+        for key, label in self._labels.items():
+            matcher = full_matcher if key in new_set else new_matcher
+            self._scan(key, label, matcher)
+
+        logger.debug(
+            "Interaction index extended with %d drug(s), %d indexed",
+            len(added), len(self._labels)
+        )
+
+    def _scan(self, source: str, label: Dict[str, List[tuple]], matcher: AhoCorasickMatcher):
+        targets = self._edges.setdefault(source, {})
+        for section, severity in LABEL_SECTIONS:
+            for text, lowered in label[section]:
+                for target in matcher.find(lowered):
+                    if target == source:
+                        continue
+                    targets.setdefault(target, []).append((section, severity, text))
+
+
+# Create singleton instance
+interaction_index = InteractionIndex(drug_interaction_service)
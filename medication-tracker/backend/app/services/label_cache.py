@@ -0,0 +1,288 @@
+"""
+Tiered cache for FDA drug label lookups.
+
+A bounded in-process LRU with TTL eviction sits in front of an optional
+shared tier (SQLite file or Redis) so label data survives restarts and is
+shared between gunicorn workers. Concurrent misses for the same key are
+coalesced so only one caller fetches from upstream.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600  # Cache label data for 7 days
+DEFAULT_MAX_ENTRIES = 2048
+
+
+class LRUCache:
+    """Thread-safe in-process LRU cache with per-entry TTL"""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl: float = DEFAULT_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteCacheBackend:
+    """Shared cache tier stored in a local SQLite file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        """Open the database on first use in each process; call with the lock held"""
+        # A connection inherited from the parent must not be used after fork
+        if self._conn is None or self._pid != os.getpid():
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS label_cache "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            conn.commit()
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def get(self, key: str) -> Optional[Any]:
+        try:
+            with self._lock:
+                row = self._connection().execute(
+                    "SELECT value, expires_at FROM label_cache WHERE key = ?", (key,)
+                ).fetchone()
+        except (sqlite3.Error, OSError) as e:
+            logger.error(f"Label cache read failed: {str(e)}")
+            return None
+        if row is None or row[1] <= time.time():
+            return None
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl: float):
+        try:
+            with self._lock:
+                conn = self._connection()
+                conn.execute(
+                    "INSERT OR REPLACE INTO label_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(value), time.time() + ttl)
+                )
+                conn.commit()
+        except (sqlite3.Error, OSError) as e:
+            logger.error(f"Label cache write failed: {str(e)}")
+
+    def delete(self, key: str):
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM label_cache WHERE key = ?", (key,))
+            conn.commit()
+
+    def purge_expired(self) -> int:
+        """Remove expired rows, returning how many were deleted"""
+        with self._lock:
+            conn = self._connection()
+            cursor = conn.execute(
+                "DELETE FROM label_cache WHERE expires_at <= ?", (time.time(),)
+            )
+            conn.commit()
+            return cursor.rowcount
+
+
+class RedisCacheBackend:
+    """Shared cache tier stored in Redis"""
+
+    def __init__(self, url: str, prefix: str = "label_cache:"):
+        import redis
+
+        self._redis_error = redis.RedisError
+        self._client = redis.Redis.from_url(url, socket_timeout=2)
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[Any]:
+        try:
+            raw = self._client.get(self.prefix + key)
+        except self._redis_error as e:
+            logger.error(f"Label cache read failed: {str(e)}")
+            return None
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key: str, value: Any, ttl: float):
+        try:
+            self._client.setex(self.prefix + key, int(ttl), json.dumps(value))
+        except self._redis_error as e:
+            logger.error(f"Label cache write failed: {str(e)}")
+
+    def delete(self, key: str):
+        try:
+            self._client.delete(self.prefix + key)
+        except self._redis_error as e:
+            logger.error(f"Label cache delete failed: {str(e)}")
+
+
+class _Flight:
+    """A fetch in progress that other callers can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error: Optional[BaseException] = None
+
+
+class TieredCache:
+    """
+    In-process LRU backed by an optional shared tier.
+
+    ``get_or_load`` checks both tiers and otherwise runs the loader once per
+    key, however many threads miss on that key at the same time. ``None``
+    results are not cached so failed lookups are retried.
+    """
+
+    def __init__(self, local: LRUCache, shared=None, ttl: float = DEFAULT_TTL_SECONDS):
+        self.local = local
+        self.shared = shared
+        self.ttl = ttl
+        self._flights: Dict[str, _Flight] = {}
+        self._flights_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'local_hits': 0,
+            'shared_hits': 0,
+            'misses': 0,
+            'loads': 0,
+            'coalesced': 0
+        }
+
+    def _count(self, name: str):
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.local.get(key)
+        if value is not None:
+            self._count('local_hits')
+            return value
+        if self.shared is not None:
+            value = self.shared.get(key)
+            if value is not None:
+                self._count('shared_hits')
+                self.local.set(key, value)
+                return value
+        self._count('misses')
+        return None
+
+    def set(self, key: str, value: Any):
+        self.local.set(key, value, self.ttl)
+        if self.shared is not None:
+            self.shared.set(key, value, self.ttl)
+
+    def delete(self, key: str):
+        self.local.delete(key)
+        if self.shared is not None:
+            self.shared.delete(key)
+
+    def get_or_load(self, key: str, loader: Callable[[], Optional[Any]]) -> Optional[Any]:
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            self._count('coalesced')
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            self._count('loads')
+            flight.value = loader()
+            if flight.value is not None:
+                self.set(key, flight.value)
+            return flight.value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._flights_lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def stats(self) -> Dict[str, int]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats['local_hits'] + stats['shared_hits'] + stats['misses']
+        stats['hit_rate'] = (
+            (stats['local_hits'] + stats['shared_hits']) / lookups if lookups else 0.0
+        )
+        stats['local_entries'] = len(self.local)
+        return stats
+
+
+def create_label_cache() -> TieredCache:
+    """
+    Build the label cache from environment settings.
+
+    DRUG_CACHE_BACKEND selects the shared tier: ``memory`` (none), ``sqlite``
+    (default, DRUG_CACHE_PATH) or ``redis`` (REDIS_URL).
+    """
+    ttl = float(os.environ.get('DRUG_CACHE_TTL_SECONDS', DEFAULT_TTL_SECONDS))
+    max_entries = int(os.environ.get('DRUG_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES))
+    backend = os.environ.get('DRUG_CACHE_BACKEND', 'sqlite').lower()
+
+    shared = None
+    try:
+        if backend == 'sqlite':
+            default_path = Path(__file__).parent.parent.parent / 'data' / 'drug_label_cache.db'
+            shared = SQLiteCacheBackend(os.environ.get('DRUG_CACHE_PATH', str(default_path)))
+        elif backend == 'redis':
+            shared = RedisCacheBackend(os.environ.get('REDIS_URL', 'redis://localhost:6379/0'))
+    except Exception as e:
+        logger.error(f"Shared label cache unavailable, using in-process cache only: {str(e)}")
+
+    return TieredCache(LRUCache(max_entries, ttl), shared, ttl)
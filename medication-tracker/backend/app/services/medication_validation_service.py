@@ -10,7 +10,7 @@ from datetime import datetime, timezone
 from typing import Dict, Any, List, Optional
 from pathlib import Path
 
-from ..core.unified_validation_framework import UnifiedValidationFramework
+from ..core.unified_validation_framework import get_framework
 from ..core.unified_decorator import unified_validation
 from ..core.exceptions import ValidationError
 from ..core.logging import medication_logger
@@ -19,7 +19,7 @@ class MedicationValidationService:
     """Medication validation service using unified framework"""
     
     def __init__(self):
-        self.unified_framework = UnifiedValidationFramework()
+        self.unified_framework = get_framework()
         self.logger = medication_logger
         
         # Common dosage patterns for different medications
@@ -5,7 +5,6 @@ Compliant with SINGLE_SOURCE_VALIDATION.md
 """
 from typing import Dict, List, Optional, Union
 from datetime import datetime
-import json
 import os
 from enum import Enum
 import time
@@ -13,6 +12,8 @@ import asyncio
 from collections import defaultdict
 
 from app.core.config import settings
+from app.core.evidence_sink import get_evidence_sink
+from app.services.metrics_store import get_metrics_store
 from app.validation.validation_orchestrator import ValidationOrchestrator
 from app.core.validation_monitoring import ValidationMonitor
 
@@ -38,6 +39,8 @@ class MetricsService:
         self.validator = ValidationOrchestrator()
         self.monitor = ValidationMonitor()
         self.metrics_path = os.path.join(settings.VALIDATION_EVIDENCE_PATH, "metrics")
+        self.evidence_sink = get_evidence_sink(self.metrics_path)
+        self.metrics_store = get_metrics_store(os.path.join(self.metrics_path, "columnar"))
         self._metrics_buffer = defaultdict(list)
         self._buffer_lock = asyncio.Lock()
         
@@ -147,14 +150,22 @@ class MetricsService:
         self,
         metric_type: Optional[MetricType] = None,
         start_time: Optional[datetime] = None,
-        end_time: Optional[datetime] = None
+        end_time: Optional[datetime] = None,
+        columns: Optional[List[str]] = None,
+        resolution: Optional[str] = None
     ) -> Dict:
-        """Retrieves metrics based on criteria"""
+        """
+        Retrieves metrics based on criteria. `columns` limits each metric to
+        the named fields (timestamp, name, value); `resolution` ('1m', '1h'
+        or '1d') returns precomputed rollups instead of raw metrics.
+        """
         evidence = {
             'timestamp': datetime.utcnow().isoformat(),
             'metric_type': metric_type,
             'start_time': start_time.isoformat() if start_time else None,
             'end_time': end_time.isoformat() if end_time else None,
+            'columns': columns,
+            'resolution': resolution,
             'status': 'pending'
         }
         
@@ -163,8 +174,8 @@ class MetricsService:
             await self._process_metrics()
             
             # 2. Load metrics
-            metrics = await self._load_metrics(metric_type, start_time, end_time)
-            evidence['metrics'] = metrics
+            metrics = await self._load_metrics(metric_type, start_time, end_time, columns, resolution)
+            evidence['metric_count'] = len(metrics)
             
             evidence['status'] = 'complete'
             await self._save_evidence(evidence, 'retrieval')
@@ -222,7 +233,7 @@ class MetricsService:
             
             # Process buffer if it gets too large
             if len(self._metrics_buffer[metric_type]) >= settings.METRICS_BUFFER_SIZE:
-                await self._process_metrics(metric_type)
+                self._drain_metrics([metric_type])
                 
     async def _process_metrics(
         self,
@@ -230,101 +241,47 @@ class MetricsService:
     ) -> None:
         """Processes buffered metrics"""
         async with self._buffer_lock:
-            types_to_process = [metric_type] if metric_type else list(self._metrics_buffer.keys())
-            
-            for mtype in types_to_process:
-                if not self._metrics_buffer[mtype]:
-                    continue
-                    
-                metrics_path = os.path.join(
-                    self.metrics_path,
-                    str(mtype),
-                    datetime.utcnow().strftime('%Y-%m-%d')
-                )
-                
-                if not os.path.exists(metrics_path):
-                    os.makedirs(metrics_path)
-                    
-                filename = f"{datetime.utcnow().isoformat()}.json"
-                filepath = os.path.join(metrics_path, filename)
-                
-                with open(filepath, 'w') as f:
-                    json.dump(self._metrics_buffer[mtype], f, indent=2)
-                    
-                self._metrics_buffer[mtype] = []
-                
+            self._drain_metrics([metric_type] if metric_type else list(self._metrics_buffer.keys()))
+
+    def _drain_metrics(self, metric_types: List[MetricType]) -> None:
+        """Hands buffered metrics to the columnar store; caller holds the buffer lock"""
+        for mtype in metric_types:
+            for metric in self._metrics_buffer[mtype]:
+                self.metrics_store.append(MetricType(mtype).value, metric)
+            self._metrics_buffer[mtype] = []
+
     async def _load_metrics(
         self,
         metric_type: Optional[MetricType],
         start_time: Optional[datetime],
-        end_time: Optional[datetime]
+        end_time: Optional[datetime],
+        columns: Optional[List[str]] = None,
+        resolution: Optional[str] = None
     ) -> List[Dict]:
-        """Loads metrics from storage"""
-        metrics = []
-        types_to_load = [metric_type] if metric_type else list(MetricType)
-        
-        for mtype in types_to_load:
-            metrics_path = os.path.join(self.metrics_path, str(mtype))
-            if not os.path.exists(metrics_path):
-                continue
-                
-            for date_dir in os.listdir(metrics_path):
-                date_path = os.path.join(metrics_path, date_dir)
-                if not os.path.isdir(date_path):
-                    continue
-                    
-                for filename in os.listdir(date_path):
-                    if not filename.endswith('.json'):
-                        continue
-                        
-                    filepath = os.path.join(date_path, filename)
-                    with open(filepath, 'r') as f:
-                        file_metrics = json.load(f)
-                        
-                    # Filter by time range
-                    if start_time or end_time:
-                        file_metrics = [
-                            m for m in file_metrics
-                            if self._is_metric_in_range(m, start_time, end_time)
-                        ]
-                        
-                    metrics.extend(file_metrics)
-                    
-        return metrics
-        
-    def _is_metric_in_range(
-        self,
-        metric: Dict,
-        start_time: Optional[datetime],
-        end_time: Optional[datetime]
-    ) -> bool:
-        """Checks if metric is within time range"""
-        metric_time = datetime.fromisoformat(metric['timestamp'])
-        
-        if start_time and metric_time < start_time:
-            return False
-            
-        if end_time and metric_time > end_time:
-            return False
-            
-        return True
+        """Loads metrics, or their rollups, from the columnar store"""
+        store_type = MetricType(metric_type).value if metric_type else None
+        if resolution:
+            return self.metrics_store.rollup(resolution, store_type, start_time, end_time)
+        if not columns or 'record' in columns:
+            return self.metrics_store.records(store_type, start_time, end_time)
+
+        data = self.metrics_store.query(store_type, start_time, end_time, columns=columns)
+        if 'timestamp' in data:
+            data['timestamp'] = [ts.isoformat() for ts in data['timestamp'].astype(datetime)]
+        if 'name' in data:
+            data['name'] = data['name'].tolist()
+        if 'value' in data:
+            # NaN marks metrics without a numeric value
+            data['value'] = [None if value != value else value for value in data['value'].tolist()]
+        return [dict(zip(columns, row)) for row in zip(*(data[column] for column in columns))]
         
     async def _save_evidence(
         self,
         evidence: Dict,
         category: str
     ) -> None:
-        """Saves validation evidence"""
-        evidence_path = os.path.join(self.metrics_path, 'evidence', category)
-        
-        if not os.path.exists(evidence_path):
-            os.makedirs(evidence_path)
-            
-        filename = f"{evidence['timestamp']}_{evidence['metric_type']}.json"
-        filepath = os.path.join(evidence_path, filename)
-        
-        with open(filepath, 'w') as f:
-            json.dump(evidence, f, indent=2)
+        """Queues validation evidence for the batched evidence sink"""
+        self.evidence_sink.submit('evidence', evidence, category=category)
             
         # Track in monitoring system
         self.monitor.track_validation(f"metrics_{evidence['metric_type']}")
@@ -0,0 +1,488 @@
+"""
+Columnar storage for tracked metrics.
+
+Metrics are staged in memory and flushed into hour partitions
+({metric_type}/{YYYY-MM-DD}/{HH}/part-N), each part holding one NumPy file
+per column plus the full records as JSON lines. A manifest records every
+partition's time range, so queries prune partitions without listing
+directories and load only the columns they ask for. Count/sum/min/max
+rollups at 1m, 1h and 1d resolution are computed when a part is written.
+Staged records are also flushed by a background thread once they have
+waited flush_interval seconds, and at exit.
+"""
+import atexit
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Union
+
+import numpy as np
+
+from app.core.file_lock import exclusive_lock
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ('timestamp', 'name', 'value', 'record')
+RESOLUTIONS = {'1m': 60, '1h': 3600, '1d': 86400}
+ROLLUP_DTYPE = np.dtype([
+    ('bucket', 'i8'),
+    ('name', 'i4'),
+    ('count', 'i8'),
+    ('value_count', 'i8'),
+    ('sum', 'f8'),
+    ('min', 'f8'),
+    ('max', 'f8')
+])
+MICROSECONDS = 1_000_000
+# Times a read starts over after a concurrent compaction removed a part
+READ_ATTEMPTS = 5
+
+_stores: Dict[str, "ColumnarMetricsStore"] = {}
+_stores_lock = threading.Lock()
+
+
+def get_metrics_store(directory: Union[str, Path]) -> "ColumnarMetricsStore":
+    """
+    Shared store per directory, so services in one process stage together.
+    Each store flushes idle records in the background and at exit.
+    """
+    path = os.path.abspath(str(directory))
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = ColumnarMetricsStore(path)
+        return _stores[path]
+
+
+def numeric_value(value: Any) -> float:
+    """The number a metric's value rolls up as, or NaN"""
+    if isinstance(value, dict):
+        value = value.get('duration')
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return float('nan')
+
+
+def to_microseconds(value: Union[str, datetime]) -> int:
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return int(np.datetime64(value, 'us').astype(np.int64))
+
+
+def merge_rollups(rows: np.ndarray) -> np.ndarray:
+    """Combine rollup rows sharing a (bucket, name)"""
+    if rows.size == 0:
+        return np.zeros(0, dtype=ROLLUP_DTYPE)
+    order = np.lexsort((rows['name'], rows['bucket']))
+    rows = rows[order]
+    change = (rows['bucket'][1:] != rows['bucket'][:-1]) | (rows['name'][1:] != rows['name'][:-1])
+    starts = np.flatnonzero(np.r_[True, change])
+
+    merged = np.zeros(starts.size, dtype=ROLLUP_DTYPE)
+    merged['bucket'] = rows['bucket'][starts]
+    merged['name'] = rows['name'][starts]
+    for field in ('count', 'value_count', 'sum'):
+        merged[field] = np.add.reduceat(rows[field], starts)
+    merged['min'] = np.minimum.reduceat(rows['min'], starts)
+    merged['max'] = np.maximum.reduceat(rows['max'], starts)
+    return merged
+
+
+def compute_rollup(timestamps: np.ndarray, names: np.ndarray, values: np.ndarray, seconds: int) -> np.ndarray:
+    """Rollup rows for raw samples at the given bucket width"""
+    width = seconds * MICROSECONDS
+    has_value = ~np.isnan(values)
+    rows = np.zeros(timestamps.size, dtype=ROLLUP_DTYPE)
+    rows['bucket'] = timestamps - timestamps % width
+    rows['name'] = names
+    rows['count'] = 1
+    rows['value_count'] = has_value
+    rows['sum'] = np.where(has_value, values, 0.0)
+    rows['min'] = np.where(has_value, values, np.inf)
+    rows['max'] = np.where(has_value, values, -np.inf)
+    return merge_rollups(rows)
+
+
+class ColumnarMetricsStore:
+    """Hour-partitioned columnar metric files with precomputed rollups"""
+
+    def __init__(
+        self,
+        directory: str,
+        flush_size: int = 1000,
+        max_parts: int = 16,
+        flush_interval: float = 5.0
+    ):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.manifest_path = self.directory / 'manifest.json'
+        self.flush_size = flush_size
+        self.max_parts = max_parts
+        self.flush_interval = flush_interval
+
+        self._lock = threading.RLock()
+        self._staged: List[tuple] = []
+        self._last_flush = time.monotonic()
+        self._closed = threading.Event()
+        self._manifest_version = None
+        self.manifest = {'names': [], 'next_part': 0, 'partitions': {}}
+        self._name_codes: Dict[str, int] = {}
+        self._rollup_cache: Dict[tuple, np.ndarray] = {}
+        self._refresh_manifest()
+
+        if self.flush_interval:
+            threading.Thread(target=self._run_flusher, name="metrics-flusher", daemon=True).start()
+        atexit.register(self.close)
+
+    def append(self, metric_type: str, record: Dict[str, Any]) -> None:
+        """Stage a metric record; written once flush_size records are staged"""
+        with self._lock:
+            self._staged.append((metric_type, record))
+            if len(self._staged) >= self.flush_size:
+                self.flush()
+
+    def flush(self) -> int:
+        """Write staged records as one part per hour partition"""
+        with self._lock:
+            self._last_flush = time.monotonic()
+            if not self._staged:
+                return 0
+            staged, self._staged = self._staged, []
+
+            with self._exclusive():
+                # Other processes may have written since we last looked
+                self._refresh_manifest()
+                groups = defaultdict(list)
+                for metric_type, record in staged:
+                    timestamp = to_microseconds(record['timestamp'])
+                    hour = np.datetime64(timestamp, 'us').astype('datetime64[h]')
+                    key = f"{metric_type}/{str(hour)[:10]}/{str(hour)[11:13]}"
+                    groups[key].append((timestamp, record))
+
+                replaced = []
+                for key, rows in groups.items():
+                    self._write_part(key, rows)
+                    if len(self.manifest['partitions'][key]['parts']) > self.max_parts:
+                        replaced.extend(self._compact(key))
+                self._save_manifest()
+
+                # Only remove merged parts once the manifest no longer lists them
+                for part_dir in replaced:
+                    shutil.rmtree(part_dir, ignore_errors=True)
+            return len(staged)
+
+    def close(self) -> None:
+        self._closed.set()
+        self.flush()
+
+    def _run_flusher(self) -> None:
+        """Flush records that have waited flush_interval without reaching flush_size"""
+        while not self._closed.wait(self.flush_interval):
+            with self._lock:
+                if self._staged and time.monotonic() - self._last_flush >= self.flush_interval:
+                    try:
+                        self.flush()
+                    except Exception as e:
+                        logger.error(f"Background metrics flush failed: {str(e)}")
+
+    def query(
+        self,
+        metric_type: Optional[str] = None,
+        start_time: Optional[Union[str, datetime]] = None,
+        end_time: Optional[Union[str, datetime]] = None,
+        columns: Optional[Sequence[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        Requested columns for matching metrics, ordered by time. Timestamps
+        are datetime64[us], names strings, values float (NaN when the metric
+        has no numeric value) and records the stored metric dicts.
+        """
+        columns = list(columns or COLUMNS)
+        unknown = set(columns) - set(COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown metric columns: {', '.join(sorted(unknown))}")
+
+        start = to_microseconds(start_time) if start_time is not None else None
+        end = to_microseconds(end_time) if end_time is not None else None
+        loaded = [column for column in columns if column != 'timestamp']
+
+        def read(part_dir: Path):
+            part_ts = np.load(part_dir / 'timestamp.npy', mmap_mode='r')
+            mask = np.ones(part_ts.size, dtype=bool)
+            if start is not None:
+                mask &= part_ts >= start
+            if end is not None:
+                mask &= part_ts <= end
+            if not mask.any():
+                return None
+            data = {}
+            for column in loaded:
+                if column == 'record':
+                    data[column] = self._read_records(part_dir, np.flatnonzero(mask))
+                else:
+                    data[column] = np.asarray(np.load(part_dir / f'{column}.npy', mmap_mode='r')[mask])
+            return np.asarray(part_ts[mask]), data
+
+        parts = [part for part in self._read_parts(metric_type, start, end, read) if part is not None]
+        timestamps = [part_ts for part_ts, _ in parts]
+        loaded = {column: [data[column] for _, data in parts] for column in loaded}
+
+        timestamps = np.concatenate(timestamps) if timestamps else np.zeros(0, dtype=np.int64)
+        order = np.argsort(timestamps, kind='stable')
+        result = {}
+        if 'timestamp' in columns:
+            result['timestamp'] = timestamps[order].astype('datetime64[us]')
+        if 'name' in loaded:
+            codes = np.concatenate(loaded['name']) if loaded['name'] else np.zeros(0, dtype=np.int32)
+            names = np.array(self.manifest['names'] or [''], dtype=object)
+            result['name'] = names[codes[order]]
+        if 'value' in loaded:
+            values = np.concatenate(loaded['value']) if loaded['value'] else np.zeros(0)
+            result['value'] = values[order]
+        if 'record' in loaded:
+            records = [record for part_records in loaded['record'] for record in part_records]
+            result['record'] = [records[i] for i in order]
+        return result
+
+    def records(
+        self,
+        metric_type: Optional[str] = None,
+        start_time: Optional[Union[str, datetime]] = None,
+        end_time: Optional[Union[str, datetime]] = None
+    ) -> List[Dict[str, Any]]:
+        """Stored metric dicts ordered by time"""
+        return self.query(metric_type, start_time, end_time, columns=['record'])['record']
+
+    def rollup(
+        self,
+        resolution: str,
+        metric_type: Optional[str] = None,
+        start_time: Optional[Union[str, datetime]] = None,
+        end_time: Optional[Union[str, datetime]] = None,
+        name: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Precomputed buckets whose start falls in the range"""
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Unknown rollup resolution: {resolution}")
+        width = RESOLUTIONS[resolution] * MICROSECONDS
+        start = to_microseconds(start_time) if start_time is not None else None
+        end = to_microseconds(end_time) if end_time is not None else None
+        if start is not None:
+            start -= start % width
+
+        rows = self._read_parts(metric_type, start, end, lambda part_dir: self._load_rollup(part_dir, resolution))
+        rows = merge_rollups(np.concatenate(rows)) if rows else np.zeros(0, dtype=ROLLUP_DTYPE)
+
+        mask = np.ones(rows.size, dtype=bool)
+        if start is not None:
+            mask &= rows['bucket'] >= start
+        if end is not None:
+            mask &= rows['bucket'] <= end
+        if name is not None:
+            code = self._name_codes.get(name)
+            mask &= rows['name'] == (-1 if code is None else code)
+
+        rows = rows[mask]
+        names = self.manifest['names']
+        buckets = rows['bucket'].astype('datetime64[us]').astype(datetime)
+        return [
+            {
+                'bucket': bucket.isoformat(),
+                'name': names[code],
+                'count': count,
+                'sum': total,
+                'min': low if value_count else None,
+                'max': high if value_count else None,
+                'mean': total / value_count if value_count else None
+            }
+            for bucket, code, count, value_count, total, low, high in zip(
+                buckets,
+                rows['name'].tolist(),
+                rows['count'].tolist(),
+                rows['value_count'].tolist(),
+                rows['sum'].tolist(),
+                rows['min'].tolist(),
+                rows['max'].tolist()
+            )
+        ]
+
+    def _parts(self, metric_type: Optional[str], start: Optional[int], end: Optional[int]) -> Iterable[Path]:
+        """Part directories of partitions overlapping the range"""
+        self.flush()
+        with self._lock:
+            self._refresh_manifest()
+            partitions = list(self.manifest['partitions'].items())
+
+        for key, partition in sorted(partitions):
+            if metric_type is not None and not key.startswith(f"{metric_type}/"):
+                continue
+            if start is not None and partition['max_ts'] < start:
+                continue
+            if end is not None and partition['min_ts'] > end:
+                continue
+            for part in partition['parts']:
+                yield self.directory / key / part
+
+    def _read_parts(
+        self,
+        metric_type: Optional[str],
+        start: Optional[int],
+        end: Optional[int],
+        read: Callable[[Path], Any]
+    ) -> List[Any]:
+        """
+        read() applied to every part overlapping the range. A flush in another
+        thread or process may compact and remove parts after they are listed;
+        the read then starts over from the manifest, which lists the merged part.
+        """
+        for attempt in range(READ_ATTEMPTS):
+            try:
+                return [read(part_dir) for part_dir in self._parts(metric_type, start, end)]
+            except FileNotFoundError:
+                if attempt == READ_ATTEMPTS - 1:
+                    raise
+                logger.debug("Metric part removed by compaction during a read, retrying")
+
+    def _load_rollup(self, part_dir: Path, resolution: str) -> np.ndarray:
+        """Rollup rows of a part; parts are immutable, so they are cached"""
+        cache_key = (str(part_dir), resolution)
+        rows = self._rollup_cache.get(cache_key)
+        if rows is None:
+            rows = np.load(part_dir / f'rollup_{resolution}.npy')
+            with self._lock:
+                self._rollup_cache[cache_key] = rows
+        return rows
+
+    def _prune_rollup_cache(self) -> None:
+        """Drop cached rollups of parts the manifest no longer lists"""
+        live = {
+            str(self.directory / key / part)
+            for key, partition in self.manifest['partitions'].items()
+            for part in partition['parts']
+        }
+        self._rollup_cache = {
+            cache_key: rows for cache_key, rows in self._rollup_cache.items() if cache_key[0] in live
+        }
+
+    def _write_part(self, key: str, rows: List[tuple]) -> None:
+        timestamps = np.array([timestamp for timestamp, _ in rows], dtype=np.int64)
+        names = np.array([self._name_code(str(record.get('name'))) for _, record in rows], dtype=np.int32)
+        values = np.array([numeric_value(record.get('value')) for _, record in rows], dtype=np.float64)
+        lines = [(json.dumps(record, default=str) + '\n').encode('utf-8') for _, record in rows]
+        self._save_part(key, timestamps, names, values, lines)
+
+    def _save_part(
+        self,
+        key: str,
+        timestamps: np.ndarray,
+        names: np.ndarray,
+        values: np.ndarray,
+        lines: List[bytes]
+    ) -> None:
+        """Write a part to a temporary directory and move it into place"""
+        part = f"part-{self.manifest['next_part']:06d}"
+        self.manifest['next_part'] += 1
+        partition_dir = self.directory / key
+        partition_dir.mkdir(parents=True, exist_ok=True)
+        tmp_dir = partition_dir / f".{part}.tmp"
+        tmp_dir.mkdir()
+
+        np.save(tmp_dir / 'timestamp.npy', timestamps)
+        np.save(tmp_dir / 'name.npy', names)
+        np.save(tmp_dir / 'value.npy', values)
+        np.save(tmp_dir / 'record_offsets.npy', np.cumsum([0] + [len(line) for line in lines], dtype=np.int64))
+        with open(tmp_dir / 'records.jsonl', 'wb') as f:
+            f.write(b''.join(lines))
+        for resolution, seconds in RESOLUTIONS.items():
+            np.save(tmp_dir / f'rollup_{resolution}.npy', compute_rollup(timestamps, names, values, seconds))
+        os.replace(tmp_dir, partition_dir / part)
+
+        partition = self.manifest['partitions'].setdefault(
+            key, {'parts': [], 'rows': 0, 'min_ts': int(timestamps.min()), 'max_ts': int(timestamps.max())}
+        )
+        partition['parts'].append(part)
+        partition['rows'] += int(timestamps.size)
+        partition['min_ts'] = min(partition['min_ts'], int(timestamps.min()))
+        partition['max_ts'] = max(partition['max_ts'], int(timestamps.max()))
+
+    def _compact(self, key: str) -> List[Path]:
+        """Merge a partition's parts into one, returning the replaced part directories"""
+        partition = self.manifest['partitions'][key]
+        old_parts = partition['parts']
+        part_dirs = [self.directory / key / part for part in old_parts]
+
+        timestamps = np.concatenate([np.load(d / 'timestamp.npy') for d in part_dirs])
+        names = np.concatenate([np.load(d / 'name.npy') for d in part_dirs])
+        values = np.concatenate([np.load(d / 'value.npy') for d in part_dirs])
+        lines = []
+        for d in part_dirs:
+            with open(d / 'records.jsonl', 'rb') as f:
+                lines.extend(f.readlines())
+
+        order = np.argsort(timestamps, kind='stable')
+        partition['parts'] = []
+        partition['rows'] = 0
+        self._save_part(key, timestamps[order], names[order], values[order], [lines[i] for i in order])
+        return part_dirs
+
+    def _read_records(self, part_dir: Path, indexes: np.ndarray) -> List[Dict[str, Any]]:
+        offsets = np.load(part_dir / 'record_offsets.npy', mmap_mode='r')
+        records = []
+        with open(part_dir / 'records.jsonl', 'rb') as f:
+            if indexes.size * 4 >= offsets.size:
+                # Most rows match; one sequential read is cheaper than seeks
+                data = f.read()
+                for i in indexes:
+                    records.append(json.loads(data[offsets[i]:offsets[i + 1]]))
+            else:
+                for i in indexes:
+                    f.seek(int(offsets[i]))
+                    records.append(json.loads(f.read(int(offsets[i + 1] - offsets[i]))))
+        return records
+
+    def _name_code(self, name: str) -> int:
+        code = self._name_codes.get(name)
+        if code is None:
+            code = len(self.manifest['names'])
+            self.manifest['names'].append(name)
+            self._name_codes[name] = code
+        return code
+
+    def _refresh_manifest(self) -> None:
+        """Reload the manifest if another process replaced it"""
+        try:
+            stat = self.manifest_path.stat()
+        except FileNotFoundError:
+            return
+        # Every save replaces the file, so the inode changes even within one mtime tick
+        version = (stat.st_ino, stat.st_mtime_ns)
+        if version == self._manifest_version:
+            return
+        with open(self.manifest_path) as f:
+            self.manifest = json.load(f)
+        self._manifest_version = version
+        self._name_codes = {name: code for code, name in enumerate(self.manifest['names'])}
+        self._prune_rollup_cache()
+
+    def _save_manifest(self) -> None:
+        tmp_path = self.manifest_path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(self.manifest, f)
+        os.replace(tmp_path, self.manifest_path)
+        stat = self.manifest_path.stat()
+        self._manifest_version = (stat.st_ino, stat.st_mtime_ns)
+        self._prune_rollup_cache()
+
+    @contextmanager
+    def _exclusive(self):
+        """Serialize manifest updates across processes"""
+        with exclusive_lock(str(self.directory / '.lock')):
+            yield
@@ -1,11 +1,25 @@
+import logging
+import os
+import time
 from datetime import datetime, timedelta
+import numpy as np
 from sqlalchemy import and_
+from sqlalchemy.dialects import postgresql, sqlite
 from ..models.medication import Medication
 from ..models.medication_history import MedicationHistory
 from ..models.notification_preferences import NotificationPreferences
 from ..models.notification import Notification
+from ..core.medication_interactions import InteractionChecker
+from .schedule_expansion import expand_medications
 from .. import db
 
+logger = logging.getLogger(__name__)
+
+SCHEDULE_AHEAD = timedelta(days=7)  # Schedule a week ahead
+MISSED_DOSE_GRACE = timedelta(minutes=30)
+INSERT_BATCH_SIZE = int(os.environ.get('NOTIFICATION_INSERT_BATCH_SIZE', 1000))
+DOSE_TYPES = ('UPCOMING_DOSE', 'MISSED_DOSE')
+
 class NotificationScheduler:
     @staticmethod
     def schedule_notifications():
@@ -13,134 +27,228 @@ class NotificationScheduler:
         try:
             # Get all active medications with their users
             medications = Medication.query.filter_by(active=True).all()
-            
-            for medication in medications:
-                user_prefs = NotificationPreferences.query.filter_by(user_id=medication.user_id).first()
-                if not user_prefs:
-                    continue
-
-                NotificationScheduler._schedule_dose_notifications(medication, user_prefs)
-                NotificationScheduler._schedule_refill_reminder(medication, user_prefs)
-                NotificationScheduler._check_interactions(medication, user_prefs)
+            return NotificationScheduler.materialize(medications)
 
         except Exception as e:
-            print(f"Error scheduling notifications: {str(e)}")
+            db.session.rollback()
+            logger.error(f"Error scheduling notifications: {str(e)}")
 
     @staticmethod
-    def _schedule_dose_notifications(medication, prefs):
-        """Schedule upcoming dose notifications for a medication"""
-        now = datetime.utcnow()
-        schedule_until = now + timedelta(days=7)  # Schedule a week ahead
-
-        # Calculate next doses
-        next_doses = medication.get_next_doses(schedule_until)
-        
-        for dose_time in next_doses:
-            # Check if notification already exists
-            existing = Notification.query.filter(
-                and_(
-                    Notification.medication_id == medication.id,
-                    Notification.type == 'UPCOMING_DOSE',
-                    Notification.scheduled_time == dose_time
-                )
-            ).first()
-
-            if not existing:
-                # Create reminder notification
-                reminder_time = dose_time - timedelta(minutes=prefs.reminder_advance_minutes)
-                if reminder_time > now:
-                    notification = Notification(
-                        user_id=medication.user_id,
-                        medication_id=medication.id,
-                        type='UPCOMING_DOSE',
-                        scheduled_time=reminder_time,
-                        data={'medication_id': medication.id}
-                    )
-                    db.session.add(notification)
-
-                # Create missed dose notification
-                missed_time = dose_time + timedelta(minutes=30)  # 30 minutes grace period
-                notification = Notification(
-                    user_id=medication.user_id,
-                    medication_id=medication.id,
-                    type='MISSED_DOSE',
-                    scheduled_time=missed_time,
-                    data={'medication_id': medication.id}
-                )
-                db.session.add(notification)
+    def materialize(medications, now=None):
+        """Create every missing notification for the given medications in batches.
 
-        db.session.commit()
+        Preferences, existing notification keys and interaction warnings are each
+        loaded with a single query, new rows are diffed in memory and then written
+        with one bulk insert and commit per batch. Returns run statistics.
+        """
+        started = time.perf_counter()
+        now = now or datetime.utcnow()
+
+        user_ids = {medication.user_id for medication in medications}
+        prefs_by_user = {
+            prefs.user_id: prefs
+            for prefs in NotificationPreferences.query.filter(
+                NotificationPreferences.user_id.in_(user_ids)
+            ).all()
+        } if user_ids else {}
+
+        regimens = {}
+        for medication in medications:
+            user_prefs = prefs_by_user.get(medication.user_id)
+            if user_prefs:
+                regimens.setdefault(medication.user_id, (user_prefs, []))[1].append(medication)
+        scheduled = [medication for _, user_medications in regimens.values() for medication in user_medications]
+
+        rows = NotificationScheduler._dose_notification_rows(scheduled, prefs_by_user, now)
+        rows.extend(NotificationScheduler._refill_reminder_rows(scheduled, prefs_by_user, now))
+
+        # Screen each user's whole regimen once instead of per medication pair
+        warned_pairs = NotificationScheduler._load_warned_pairs(regimens.keys())
+        for user_id, (user_prefs, user_medications) in regimens.items():
+            rows.extend(NotificationScheduler._check_interactions(
+                user_id, user_medications, user_prefs, warned_pairs.get(user_id, set())
+            ))
+
+        batches = NotificationScheduler._bulk_insert(rows)
+
+        elapsed = time.perf_counter() - started
+        stats = {
+            'medications': len(scheduled),
+            'created': len(rows),
+            'batches': batches,
+            'seconds': elapsed,
+            'rows_per_second': len(rows) / elapsed if elapsed > 0 else 0.0
+        }
+        logger.info(
+            f"Scheduled {stats['created']} notifications for {stats['medications']} medications "
+            f"in {batches} batches ({stats['rows_per_second']:.0f} rows/s)"
+        )
+        return stats
+
+    @staticmethod
+    def _dose_notification_rows(medications, prefs_by_user, now):
+        """Build upcoming and missed dose rows that do not exist yet"""
+        if not medications:
+            return []
+
+        doses = expand_medications(medications, now + timedelta(seconds=1), now + SCHEDULE_AHEAD)
+        if not doses.times.size:
+            return []
+
+        # doses.keys follows the order medications were added in
+        advance = np.array([
+            prefs_by_user[medication.user_id].reminder_advance_minutes or 0
+            for medication in medications
+        ], dtype=np.int64).astype('timedelta64[m]')
+        reminder_times = doses.times - advance[doses.owners]
+        missed_times = doses.times + np.timedelta64(MISSED_DOSE_GRACE)
+
+        # Fetch every existing dose key in the window with one query
+        existing = set(
+            db.session.query(
+                Notification.medication_id,
+                Notification.type,
+                Notification.scheduled_time
+            ).filter(
+                Notification.type.in_(DOSE_TYPES),
+                Notification.scheduled_time >= reminder_times.min().astype(datetime),
+                Notification.scheduled_time <= missed_times.max().astype(datetime)
+            ).all()
+        )
+
+        rows = []
+        for owner, reminder_time, missed_time in zip(
+            doses.owners.tolist(),
+            reminder_times.astype(datetime).tolist(),
+            missed_times.astype(datetime).tolist()
+        ):
+            medication = medications[owner]
+
+            # Create reminder notification
+            reminder_key = (medication.id, 'UPCOMING_DOSE', reminder_time)
+            if reminder_time > now and reminder_key not in existing:
+                existing.add(reminder_key)
+                rows.append(NotificationScheduler._row(medication, 'UPCOMING_DOSE', reminder_time))
+
+            # Create missed dose notification
+            missed_key = (medication.id, 'MISSED_DOSE', missed_time)
+            if missed_key not in existing:
+                existing.add(missed_key)
+                rows.append(NotificationScheduler._row(medication, 'MISSED_DOSE', missed_time))
+
+        return rows
 
     @staticmethod
-    def _schedule_refill_reminder(medication, prefs):
-        """Schedule refill reminder if medication is running low"""
-        if not medication.quantity or not medication.doses_remaining:
-            return
+    def _refill_reminder_rows(medications, prefs_by_user, now):
+        """Build refill reminders for medications running low"""
+        running_low = []
+        for medication in medications:
+            quantity = getattr(medication, 'quantity', None)
+            doses_remaining = getattr(medication, 'doses_remaining', None)
+            if not quantity or not doses_remaining:
+                continue
+
+            days_of_supply = doses_remaining / medication.daily_frequency
+            if days_of_supply <= prefs_by_user[medication.user_id].refill_reminder_days_before:
+                running_low.append(medication)
 
-        days_of_supply = medication.doses_remaining / medication.daily_frequency
-        reminder_threshold = prefs.refill_reminder_days_before
+        if not running_low:
+            return []
 
-        if days_of_supply <= reminder_threshold:
-            # Check if a refill reminder already exists
-            existing = Notification.query.filter(
+        # Check which refill reminders already exist
+        reminded = {
+            medication_id for (medication_id,) in db.session.query(Notification.medication_id).filter(
                 and_(
-                    Notification.medication_id == medication.id,
+                    Notification.medication_id.in_([medication.id for medication in running_low]),
                     Notification.type == 'REFILL_REMINDER',
-                    Notification.scheduled_time > datetime.utcnow()
+                    Notification.scheduled_time > now
                 )
-            ).first()
-
-            if not existing:
-                notification = Notification(
-                    user_id=medication.user_id,
-                    medication_id=medication.id,
-                    type='REFILL_REMINDER',
-                    scheduled_time=datetime.utcnow(),
-                    data={'medication_id': medication.id}
-                )
-                db.session.add(notification)
-                db.session.commit()
+            ).all()
+        }
+
+        return [
+            NotificationScheduler._row(medication, 'REFILL_REMINDER', now)
+            for medication in running_low
+            if medication.id not in reminded
+        ]
+
+    @staticmethod
+    def _row(medication, notification_type, scheduled_time):
+        return {
+            'user_id': medication.user_id,
+            'medication_id': medication.id,
+            'type': notification_type,
+            'scheduled_time': scheduled_time,
+            'data': {'medication_id': medication.id}
+        }
 
     @staticmethod
-    def _check_interactions(medication, prefs):
-        """Check for interactions with other medications"""
-        if not prefs.notify_interactions:
-            return
+    def _load_warned_pairs(user_ids):
+        """Load existing interaction warnings for all users at once"""
+        user_ids = list(user_ids)
+        if not user_ids:
+            return {}
 
-        # Get all other active medications for the user
-        other_medications = Medication.query.filter(
+        warnings = db.session.query(Notification.user_id, Notification.data).filter(
             and_(
-                Medication.user_id == medication.user_id,
-                Medication.id != medication.id,
-                Medication.active == True
+                Notification.user_id.in_(user_ids),
+                Notification.type == 'INTERACTION_WARNING'
             )
         ).all()
 
-        for other_med in other_medications:
-            if medication.has_interaction_with(other_med):
-                # Check if an interaction warning already exists
-                existing = Notification.query.filter(
-                    and_(
-                        Notification.user_id == medication.user_id,
-                        Notification.type == 'INTERACTION_WARNING',
-                        Notification.data.contains({
-                            'medications': [medication.id, other_med.id]
-                        })
-                    )
-                ).first()
-
-                if not existing:
-                    notification = Notification(
-                        user_id=medication.user_id,
-                        type='INTERACTION_WARNING',
-                        scheduled_time=datetime.utcnow(),
-                        data={
-                            'medications': [medication.id, other_med.id]
-                        }
-                    )
-                    db.session.add(notification)
+        warned_pairs = {}
+        for user_id, data in warnings:
+            if data:
+                warned_pairs.setdefault(user_id, set()).add(frozenset(data.get('medications', [])))
+        return warned_pairs
 
-        db.session.commit()
+    @staticmethod
+    def _insert_statement():
+        """Bulk insert that skips rows already covered by the schedule key"""
+        table = Notification.__table__
+        dialect = db.session.get_bind().dialect.name
+        if dialect == 'postgresql':
+            return postgresql.insert(table).on_conflict_do_nothing()
+        if dialect == 'sqlite':
+            return sqlite.insert(table).on_conflict_do_nothing()
+        return table.insert()
+
+    @staticmethod
+    def _bulk_insert(rows):
+        """Insert rows in chunks with a single commit per chunk"""
+        if not rows:
+            return 0
+
+        statement = NotificationScheduler._insert_statement()
+        batches = 0
+        for offset in range(0, len(rows), INSERT_BATCH_SIZE):
+            db.session.execute(statement, rows[offset:offset + INSERT_BATCH_SIZE])
+            db.session.commit()
+            batches += 1
+        return batches
+
+    @staticmethod
+    def _check_interactions(user_id, medications, prefs, warned_pairs):
+        """Build interaction warnings for a user's regimen in one pass"""
+        if not prefs.notify_interactions or len(medications) < 2:
+            return []
+
+        regimen = InteractionChecker().check_regimen(medications)
+
+        return [
+            {
+                'user_id': user_id,
+                'medication_id': None,
+                'type': 'INTERACTION_WARNING',
+                'scheduled_time': datetime.utcnow(),
+                'data': {
+                    'medications': pair['medication_ids'],
+                    'severity': pair['severity']
+                }
+            }
+            for pair in regimen['pairs']
+            if frozenset(pair['medication_ids']) not in warned_pairs
+        ]
 
     @staticmethod
     def clean_old_notifications():
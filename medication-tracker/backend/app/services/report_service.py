@@ -1,12 +1,28 @@
-import pandas as pd
 from datetime import datetime, timedelta
 from flask import current_app
+from sqlalchemy.orm import contains_eager
 import json
 import csv
 import io
+import logging
+import os
+import zlib
 from ..models.medication import Medication
 from ..models.medication_history import MedicationHistory
 from ..models.notification import Notification
+from .adherence_stats import adherence_by_medication, empty_counts
+from .. import db
+
+logger = logging.getLogger(__name__)
+
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', 500))
+EXPORT_CHUNK_SIZE = 64 * 1024  # Characters buffered before a chunk is yielded
+MISSED_DOSES_PER_TABLE = int(os.environ.get('REPORT_MISSED_DOSES_PER_TABLE', 40))
+EXPORT_SECTIONS = (
+    ('medication', 'MEDICATIONS'),
+    ('history', 'MEDICATION HISTORY'),
+    ('notification', 'NOTIFICATIONS')
+)
 
 class ReportService:
     @staticmethod
@@ -34,16 +50,12 @@ class ReportService:
 
             total_doses = 0
             total_taken = 0
+            counts_by_medication = adherence_by_medication(user_id, start_date, end_date)
 
             for medication in medications:
-                # Get medication history
-                history = MedicationHistory.query.filter(
-                    MedicationHistory.medication_id == medication.id,
-                    MedicationHistory.scheduled_time.between(start_date, end_date)
-                ).all()
-
-                doses_taken = len([h for h in history if h.taken])
-                total_scheduled = len(history)
+                counts = counts_by_medication.get(medication.id, empty_counts())
+                doses_taken = counts['taken']
+                total_scheduled = counts['total']
                 
                 if total_scheduled > 0:
                     compliance_rate = (doses_taken / total_scheduled) * 100
@@ -53,9 +65,6 @@ class ReportService:
                 total_doses += total_scheduled
                 total_taken += doses_taken
 
-                # Get missed doses
-                missed_doses = [h for h in history if not h.taken]
-                
                 med_data = {
                     'id': medication.id,
                     'name': medication.name,
@@ -64,18 +73,30 @@ class ReportService:
                     'total_doses': total_scheduled,
                     'doses_taken': doses_taken,
                     'compliance_rate': round(compliance_rate, 2),
-                    'missed_doses_count': len(missed_doses)
+                    'missed_doses_count': counts['untaken']
                 }
 
                 report_data['medications'].append(med_data)
-                
-                # Add missed doses details
-                for dose in missed_doses:
-                    report_data['missed_doses'].append({
-                        'medication_name': medication.name,
-                        'scheduled_time': dose.scheduled_time.isoformat(),
-                        'reason': dose.notes
-                    })
+
+            # Missed dose details for every medication in one query
+            missed_doses = db.session.query(
+                Medication.name,
+                MedicationHistory.scheduled_time,
+                MedicationHistory.notes
+            ).join(
+                Medication, Medication.id == MedicationHistory.medication_id
+            ).filter(
+                Medication.user_id == user_id,
+                MedicationHistory.taken_time.is_(None),
+                MedicationHistory.scheduled_time.between(start_date, end_date)
+            ).order_by(MedicationHistory.medication_id, MedicationHistory.scheduled_time).all()
+
+            for name, scheduled_time, notes in missed_doses:
+                report_data['missed_doses'].append({
+                    'medication_name': name,
+                    'scheduled_time': scheduled_time.isoformat(),
+                    'reason': notes
+                })
 
             # Calculate overall compliance
             if total_doses > 0:
@@ -163,6 +184,105 @@ class ReportService:
             current_app.logger.error(f"Error exporting medication data: {str(e)}")
             raise
 
+    @staticmethod
+    def _export_sections(user_id):
+        """Yield (section, records) pairs, each section read with one query.
+
+        History and notifications are read in batches through server-side
+        cursors, so only one batch of rows is held at a time.
+        """
+        medications = Medication.query.filter_by(user_id=user_id).order_by(Medication.id).all()
+        yield 'medication', (medication.to_dict() for medication in medications)
+
+        history = MedicationHistory.query.join(
+            Medication, Medication.id == MedicationHistory.medication_id
+        ).filter(
+            Medication.user_id == user_id
+        ).order_by(
+            MedicationHistory.medication_id, MedicationHistory.id
+        ).yield_per(EXPORT_BATCH_SIZE)
+        yield 'history', (record.to_dict() for record in history)
+
+        notifications = Notification.query.join(
+            Medication, Medication.id == Notification.medication_id
+        ).options(
+            contains_eager(Notification.medication)
+        ).filter(
+            Medication.user_id == user_id
+        ).order_by(
+            Notification.medication_id, Notification.id
+        ).yield_per(EXPORT_BATCH_SIZE)
+        yield 'notification', (notification.to_dict() for notification in notifications)
+
+    @staticmethod
+    def _ndjson_lines(user_id):
+        yield json.dumps({'type': 'export', 'export_date': datetime.utcnow().isoformat()}) + '\n'
+        for section, records in ReportService._export_sections(user_id):
+            for record in records:
+                yield json.dumps({'type': section, 'data': record}, default=str) + '\n'
+
+    @staticmethod
+    def _csv_lines(user_id):
+        """Same layout as the buffered CSV export, written row by row"""
+        output = io.StringIO()
+        writer = csv.writer(output)
+        titles = dict(EXPORT_SECTIONS)
+
+        for index, (section, records) in enumerate(ReportService._export_sections(user_id)):
+            if index:
+                writer.writerow([])  # Empty row for separation
+            writer.writerow([titles[section]])
+            for count, record in enumerate(records):
+                if not count:
+                    writer.writerow(record.keys())
+                writer.writerow(record.values())
+                yield output.getvalue()
+                output.seek(0)
+                output.truncate()
+        yield output.getvalue()
+
+    @staticmethod
+    def stream_medication_data(user_id, format='json'):
+        """Yield the export as text chunks without building it in memory.
+
+        JSON is written as NDJSON: an export header line, then one
+        {"type": ..., "data": ...} line per medication, history record and
+        notification. CSV keeps the sectioned layout of export_medication_data.
+        """
+        if format == 'json':
+            lines = ReportService._ndjson_lines(user_id)
+        elif format == 'csv':
+            lines = ReportService._csv_lines(user_id)
+        else:
+            raise ValueError(f"Unsupported export format: {format}")
+
+        try:
+            buffer = []
+            buffered = 0
+            for line in lines:
+                buffer.append(line)
+                buffered += len(line)
+                if buffered >= EXPORT_CHUNK_SIZE:
+                    yield ''.join(buffer)
+                    buffer = []
+                    buffered = 0
+            if buffer:
+                yield ''.join(buffer)
+
+        except Exception as e:
+            current_app.logger.error(f"Error streaming medication data export: {str(e)}")
+            raise
+
+    @staticmethod
+    def gzip_chunks(chunks, level=6):
+        """Compress text chunks into a gzip stream as they are produced"""
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        for chunk in chunks:
+            compressed = compressor.compress(chunk.encode('utf-8'))
+            if compressed:
+                yield compressed
+        yield compressor.flush()
+
     @staticmethod
     def generate_pdf_report(user_id, report_data):
         """Generate a PDF report from the compliance data"""
@@ -246,16 +366,17 @@ class ReportService:
                 story.append(Paragraph("Missed Doses", styles['Heading2']))
                 story.append(Spacer(1, 12))
 
-                missed_data = [['Medication', 'Scheduled Time', 'Reason']]
-                for dose in report_data['missed_doses']:
-                    missed_data.append([
+                missed_header = ['Medication', 'Scheduled Time', 'Reason']
+                missed_rows = [
+                    [
                         dose['medication_name'],
                         dose['scheduled_time'],
                         dose.get('reason', 'No reason provided')
-                    ])
+                    ]
+                    for dose in report_data['missed_doses']
+                ]
 
-                missed_table = Table(missed_data)
-                missed_table.setStyle(TableStyle([
+                missed_style = TableStyle([
                     ('BACKGROUND', (0, 0), (-1, 0), colors.red),
                     ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
                     ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
@@ -267,8 +388,18 @@ class ReportService:
                     ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
                     ('FONTSIZE', (0, 1), (-1, -1), 12),
                     ('GRID', (0, 0), (-1, -1), 1, colors.black)
-                ]))
-                story.append(missed_table)
+                ])
+
+                # Fixed-size tables, each with its own header, instead of one
+                # table that ReportLab has to split across every page
+                for offset in range(0, len(missed_rows), MISSED_DOSES_PER_TABLE):
+                    missed_table = Table(
+                        [missed_header] + missed_rows[offset:offset + MISSED_DOSES_PER_TABLE],
+                        repeatRows=1
+                    )
+                    missed_table.setStyle(missed_style)
+                    story.append(missed_table)
+                    story.append(Spacer(1, 12))
 
             # Build PDF
             doc.build(story)
@@ -276,7 +407,8 @@ class ReportService:
             return buffer
 
         except Exception as e:
-            current_app.logger.error(f"Error generating PDF report: {str(e)}")
+            # Also runs in the report worker, outside any app context
+            logger.error(f"Error generating PDF report: {str(e)}")
             raise
 
 # Create singleton instance
@@ -1,7 +1,9 @@
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional
+import numpy as np
 from ..models.medication import Medication
 from ..models.schedule import Schedule
+from .schedule_expansion import interval_hours_of_day
 from ..exceptions import (
     InvalidScheduleError,
     ConflictError,
@@ -104,22 +106,9 @@ class ScheduleAdjustment:
     def _check_interval_overlap(self, time1: datetime, interval1: int, 
                               time2: datetime, interval2: int) -> bool:
         """Check if two intervals overlap within 24 hours."""
-        times1 = set()
-        times2 = set()
-        
-        current = time1
-        end = time1 + timedelta(hours=24)
-        while current < end:
-            times1.add(current.hour)
-            current += timedelta(hours=interval1)
-
-        current = time2
-        end = time2 + timedelta(hours=24)
-        while current < end:
-            times2.add(current.hour)
-            current += timedelta(hours=interval2)
-
-        return bool(times1.intersection(times2))
+        hours1 = interval_hours_of_day(time1, interval1)
+        hours2 = interval_hours_of_day(time2, interval2)
+        return bool(np.intersect1d(hours1, hours2).size)
 
     def _generate_time_suggestions(self, schedule1: Dict, schedule2: Dict) -> List[Dict]:
         """Generate suggestions for time-based conflicts."""
@@ -1,7 +1,9 @@
+from collections import deque
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from app.models.medication import Medication
-from app.models.schedule import Schedule, ScheduleType
+from app.models.schedule import Schedule
+from app.services.schedule_expansion import ScheduleExpansionEngine, compile_schedule
 
 class ScheduleConflict:
     def __init__(
@@ -24,153 +26,89 @@ class ScheduleConflictChecker:
         self,
         new_schedule: Schedule,
         existing_schedules: List[Schedule],
-        date: datetime
+        date: datetime,
+        end_date: Optional[datetime] = None
     ) -> List[ScheduleConflict]:
-        """Check for conflicts between a new schedule and existing schedules."""
-        conflicts = []
-        
-        # Get dose times for new schedule
-        new_dose_times = self._get_dose_times(new_schedule, date)
-        
-        # Check against each existing schedule
-        for existing_schedule in existing_schedules:
-            existing_dose_times = self._get_dose_times(existing_schedule, date)
-            
-            # Check for time conflicts
-            time_conflicts = self._check_time_conflicts(
-                new_dose_times,
-                existing_dose_times,
-                new_schedule.medication.name,
-                existing_schedule.medication.name
-            )
-            conflicts.extend(time_conflicts)
-        
-        return conflicts
+        """Check for conflicts between a new schedule and existing schedules.
 
-    def _get_dose_times(
-        self,
-        schedule: Schedule,
-        date: datetime
-    ) -> List[datetime]:
-        """Get all dose times for a schedule on a given date."""
-        dose_times = []
-        
-        if schedule.type == ScheduleType.FIXED_TIME:
-            dose_times = self._get_fixed_time_doses(schedule, date)
-        elif schedule.type == ScheduleType.INTERVAL:
-            dose_times = self._get_interval_doses(schedule, date)
-        elif schedule.type == ScheduleType.MEAL_BASED:
-            dose_times = self._get_meal_based_doses(schedule, date)
-        elif schedule.type == ScheduleType.CYCLIC:
-            if self._is_medication_day(schedule, date):
-                dose_times = self._get_fixed_time_doses(schedule, date)
-        elif schedule.type == ScheduleType.TAPERED:
-            if self._get_taper_dose(schedule, date) > 0:
-                dose_times = self._get_fixed_time_doses(schedule, date)
-        
-        return dose_times
+        Covers every day from ``date`` through ``end_date`` (inclusive) in a
+        single sweep over one sorted timeline of dose events.
+        """
+        schedules = [new_schedule] + list(existing_schedules)
+        timeline = self._build_timeline(schedules, date, end_date)
+        return self._sweep_conflicts(timeline, schedules, anchor=0)
 
-    def _check_time_conflicts(
+    def find_conflicts(
         self,
-        times1: List[datetime],
-        times2: List[datetime],
-        med1: str,
-        med2: str
+        schedules: List[Schedule],
+        date: datetime,
+        end_date: Optional[datetime] = None
     ) -> List[ScheduleConflict]:
-        """Check for conflicts between two sets of dose times."""
-        conflicts = []
-        
-        for time1 in times1:
-            for time2 in times2:
-                time_diff = abs(time1 - time2)
-                if time_diff < self.MIN_DOSE_INTERVAL:
-                    conflicts.append(
-                        ScheduleConflict(
-                            medication1=med1,
-                            medication2=med2,
-                            time=time1,
-                            conflict_type="time_proximity"
-                        )
-                    )
-        
-        return conflicts
+        """Find conflicts between any two of the given schedules.
 
-    def _get_fixed_time_doses(
-        self,
-        schedule: Schedule,
-        date: datetime
-    ) -> List[datetime]:
-        """Get dose times for fixed time schedule."""
-        times = []
-        for time_slot in schedule.fixed_time_slots:
-            hour, minute = map(int, time_slot.time.split(':'))
-            dose_time = date.replace(hour=hour, minute=minute)
-            times.append(dose_time)
-        return times
+        Useful for screening everything a carer manages at once; dose events
+        of all schedules are merged into one timeline so the cost is
+        O(n log n) in the number of doses plus the conflicts reported.
+        """
+        timeline = self._build_timeline(schedules, date, end_date)
+        return self._sweep_conflicts(timeline, schedules)
 
-    def _get_interval_doses(
+    def _build_timeline(
         self,
-        schedule: Schedule,
-        date: datetime
-    ) -> List[datetime]:
-        """Get dose times for interval-based schedule."""
-        times = []
-        interval_hours = schedule.interval.hours
-        current_time = date.replace(hour=0, minute=0)
-        end_time = date.replace(hour=23, minute=59)
+        schedules: List[Schedule],
+        date: datetime,
+        end_date: Optional[datetime] = None
+    ) -> List[Tuple[datetime, int]]:
+        """Gather (dose time, schedule index) events for a date range, sorted."""
+        day_start = date.replace(hour=0, minute=0, second=0, microsecond=0)
+        days = max((end_date - date).days, 0) + 1 if end_date else 1
         
-        while current_time <= end_time:
-            times.append(current_time)
-            current_time += timedelta(hours=interval_hours)
+        engine = ScheduleExpansionEngine()
+        for index, schedule in enumerate(schedules):
+            engine.add(index, compile_schedule(schedule))
+        doses = engine.expand(day_start, day_start + timedelta(days=days))
         
-        return times
+        return list(zip(doses.times.astype(datetime).tolist(), doses.owners.tolist()))
 
-    def _get_meal_based_doses(
+    def _sweep_conflicts(
         self,
-        schedule: Schedule,
-        date: datetime
-    ) -> List[datetime]:
-        """Get dose times for meal-based schedule."""
-        meal_times = {
-            'breakfast': date.replace(hour=8, minute=0),
-            'lunch': date.replace(hour=12, minute=0),
-            'dinner': date.replace(hour=18, minute=0)
-        }
-        
-        base_time = meal_times[schedule.meal_based.meal]
-        offset = timedelta(minutes=schedule.meal_based.time_offset)
-        
-        if schedule.meal_based.relation == 'before':
-            return [base_time - offset]
-        elif schedule.meal_based.relation == 'after':
-            return [base_time + offset]
-        else:  # with
-            return [base_time]
+        timeline: List[Tuple[datetime, int]],
+        schedules: List[Schedule],
+        anchor: Optional[int] = None
+    ) -> List[ScheduleConflict]:
+        """Pair up events closer than MIN_DOSE_INTERVAL with a sliding window.
 
-    def _is_medication_day(self, schedule: Schedule, date: datetime) -> bool:
-        """Check if medication should be taken on this day for cyclic schedule."""
-        if not schedule.cyclic:
-            return True
-            
-        start_date = schedule.start_date
-        days_since_start = (date - start_date).days
-        cycle_length = schedule.cyclic.days_on + schedule.cyclic.days_off
-        day_in_cycle = days_since_start % cycle_length
+        With an ``anchor`` only pairs involving that schedule are reported,
+        and the anchor's medication and dose time lead each conflict.
+        Events are kept in one window per side so events that can never
+        pair with each other are not compared.
+        """
+        conflicts = []
+        windows = {True: deque(), False: deque()}
         
-        return day_in_cycle < schedule.cyclic.days_on
-
-    def _get_taper_dose(self, schedule: Schedule, date: datetime) -> float:
-        """Get the dose for a specific date in a tapered schedule."""
-        if not schedule.tapered:
-            return 0
+        for dose_time, index in timeline:
+            side = index == anchor
+            for window in windows.values():
+                while window and dose_time - window[0][0] >= self.MIN_DOSE_INTERVAL:
+                    window.popleft()
             
-        days_since_start = (date - schedule.start_date).days
-        if days_since_start >= schedule.tapered.days:
-            return 0
+            candidates = windows[not side] if anchor is not None else windows[side]
+            for other_time, other_index in candidates:
+                if other_index == index:
+                    continue
+                if anchor is not None and side:
+                    first, second = (dose_time, index), (other_time, other_index)
+                else:
+                    first, second = (other_time, other_index), (dose_time, index)
+                conflicts.append(
+                    ScheduleConflict(
+                        medication1=schedules[first[1]].medication.name,
+                        medication2=schedules[second[1]].medication.name,
+                        time=first[0],
+                        conflict_type="time_proximity"
+                    )
+                )
             
-        dose_change = (
-            schedule.tapered.end_dose - schedule.tapered.start_dose
-        ) / (schedule.tapered.steps - 1)
+            windows[side].append((dose_time, index))
         
-        step = days_since_start // (schedule.tapered.days // schedule.tapered.steps)
-        return schedule.tapered.start_dose + (dose_change * step)
+        return conflicts
@@ -0,0 +1,329 @@
+"""
+Schedule expansion engine.
+
+Compiles medication schedules once (dose times parsed to second offsets,
+cycle/taper rules resolved to integers) and expands any number of them
+over an arbitrary range into NumPy ``datetime64[s]`` arrays. Day-based
+schedules are expanded together as one days x doses matrix, anchored
+interval schedules with a single repeat/arange, so week- or month-long
+look-aheads over thousands of medications stay vectorized.
+"""
+import json
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, Hashable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pytz
+
+logger = logging.getLogger(__name__)
+
+SECONDS_PER_DAY = 86400
+
+# Meal times used by meal-based schedules, as offsets from midnight
+MEAL_TIMES = {
+    'breakfast': 8 * 3600,
+    'lunch': 12 * 3600,
+    'dinner': 18 * 3600
+}
+
+
+@dataclass
+class CompiledSchedule:
+    """A schedule reduced to the numbers needed to expand it"""
+    day_offsets: np.ndarray  # Seconds since local midnight (day-based schedules)
+    interval: Optional[int] = None  # Seconds between doses (anchored interval schedules)
+    anchor: Optional[np.datetime64] = None  # First dose of an anchored interval schedule
+    valid_from: Optional[np.datetime64] = None
+    valid_until: Optional[np.datetime64] = None
+    cycle: Optional[Tuple[int, int, int]] = None  # (start day, days on, days off)
+    taper: Optional[Tuple[int, int, int, float, float]] = None  # (start day, days, steps, start, end dose)
+    timezone: Optional[str] = None  # Dose times are wall-clock times in this zone
+
+    @property
+    def is_interval(self) -> bool:
+        return self.interval is not None and self.anchor is not None
+
+
+class ExpandedDoses(NamedTuple):
+    """Dose instants of many schedules, sorted by time"""
+    keys: List[Hashable]
+    owners: np.ndarray  # Index into keys for each dose
+    times: np.ndarray  # datetime64[s], naive UTC (or naive local without a timezone)
+
+    def for_key(self, key: Hashable) -> np.ndarray:
+        return self.times[self.owners == self.keys.index(key)]
+
+    def by_key(self) -> Dict[Hashable, np.ndarray]:
+        return {key: self.times[self.owners == index] for index, key in enumerate(self.keys)}
+
+    def to_datetimes(self, key: Hashable) -> List[datetime]:
+        return self.for_key(key).astype(datetime).tolist()
+
+
+def _field(obj: Any, name: str, default=None):
+    """Read a field from either an object or a dict"""
+    if obj is None:
+        return default
+    if isinstance(obj, dict):
+        return obj.get(name, default)
+    return getattr(obj, name, default)
+
+
+def _to_datetime64(value) -> Optional[np.datetime64]:
+    if value is None:
+        return None
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        value = value.astimezone(pytz.UTC).replace(tzinfo=None)
+    return np.datetime64(value, 's')
+
+
+def _day_number(value) -> int:
+    """Days since the epoch for a date or datetime"""
+    return int(np.datetime64(value, 'D').astype(np.int64))
+
+
+def parse_time_of_day(value) -> int:
+    """Convert "HH:MM" (or a time object) to seconds since midnight"""
+    if isinstance(value, str):
+        parts = value.split(':')
+        hour, minute = int(parts[0]), int(parts[1])
+        second = int(parts[2]) if len(parts) > 2 else 0
+        return hour * 3600 + minute * 60 + second
+    return value.hour * 3600 + value.minute * 60 + getattr(value, 'second', 0)
+
+
+def interval_hours_of_day(start: datetime, interval_hours: float, span_hours: int = 24) -> np.ndarray:
+    """Clock hours touched by an interval schedule within a span from its start"""
+    start_of_day = start.hour * 3600 + start.minute * 60 + start.second
+    steps = np.arange(0, span_hours * 3600, interval_hours * 3600)
+    return np.unique(((start_of_day + steps) // 3600).astype(np.int64) % 24)
+
+
+def compile_schedule(schedule) -> CompiledSchedule:
+    """
+    Compile a typed schedule (fixed_time, interval, meal_based, cyclic, tapered).
+
+    Interval schedules without an explicit ``start_time`` repeat from
+    midnight every day, matching ScheduleConflictChecker.
+    """
+    kind = _field(schedule, 'type')
+    kind = getattr(kind, 'value', kind)
+    start_date = _field(schedule, 'start_date')
+    compiled = CompiledSchedule(
+        day_offsets=np.empty(0, dtype=np.int64),
+        valid_until=_to_datetime64(_field(schedule, 'end_date')),
+        timezone=_field(schedule, 'timezone')
+    )
+
+    if kind in ('fixed_time', 'cyclic', 'tapered'):
+        slots = _field(schedule, 'fixed_time_slots') or []
+        compiled.day_offsets = np.array(
+            sorted(parse_time_of_day(_field(slot, 'time')) for slot in slots), dtype=np.int64
+        )
+    elif kind == 'interval':
+        interval = _field(schedule, 'interval')
+        seconds = int(round(float(_field(interval, 'hours')) * 3600))
+        start_time = _field(interval, 'start_time') or _field(schedule, 'start_time')
+        if start_time is not None:
+            if isinstance(start_time, str):
+                start_time = datetime.fromisoformat(start_time.replace('Z', '+00:00'))
+            compiled.interval = seconds
+            compiled.anchor = _to_datetime64(start_time)
+        else:
+            compiled.day_offsets = np.arange(0, SECONDS_PER_DAY - 59, seconds, dtype=np.int64)
+    elif kind == 'meal_based':
+        meal = _field(schedule, 'meal_based')
+        base = MEAL_TIMES[_field(meal, 'meal')]
+        offset = int(_field(meal, 'time_offset', 0)) * 60
+        relation = _field(meal, 'relation')
+        if relation == 'before':
+            base -= offset
+        elif relation == 'after':
+            base += offset
+        compiled.day_offsets = np.array([base], dtype=np.int64)
+
+    if kind == 'cyclic':
+        cyclic = _field(schedule, 'cyclic')
+        if cyclic and start_date is not None:
+            compiled.cycle = (
+                _day_number(start_date),
+                int(_field(cyclic, 'days_on')),
+                int(_field(cyclic, 'days_off'))
+            )
+    elif kind == 'tapered':
+        tapered = _field(schedule, 'tapered')
+        if not tapered or start_date is None:
+            compiled.day_offsets = np.empty(0, dtype=np.int64)
+        else:
+            compiled.taper = (
+                _day_number(start_date),
+                int(_field(tapered, 'days')),
+                int(_field(tapered, 'steps')),
+                float(_field(tapered, 'start_dose')),
+                float(_field(tapered, 'end_dose'))
+            )
+
+    return compiled
+
+
+def compile_medication(medication) -> CompiledSchedule:
+    """Compile a Medication row's dose_times (HH:MM, user's local time)"""
+    dose_times = _field(medication, 'dose_times') or []
+    if isinstance(dose_times, str):
+        dose_times = json.loads(dose_times)
+    if _field(medication, 'is_prn'):
+        dose_times = []
+
+    user = _field(medication, 'user')
+    return CompiledSchedule(
+        day_offsets=np.array(sorted(parse_time_of_day(t) for t in dose_times), dtype=np.int64),
+        valid_from=_to_datetime64(_field(medication, 'start_date')),
+        valid_until=_to_datetime64(_field(medication, 'end_date')),
+        timezone=_field(user, 'timezone')
+    )
+
+
+class ScheduleExpansionEngine:
+    """Holds compiled schedules and expands them together"""
+
+    def __init__(self):
+        self.keys: List[Hashable] = []
+        self.schedules: List[CompiledSchedule] = []
+
+    def add(self, key: Hashable, compiled: CompiledSchedule):
+        self.keys.append(key)
+        self.schedules.append(compiled)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def expand(self, start: datetime, end: datetime) -> ExpandedDoses:
+        """Every dose instant in [start, end), sorted by time"""
+        start64, end64 = _to_datetime64(start), _to_datetime64(end)
+        parts = [
+            self._expand_daily(start64, end64),
+            self._expand_intervals(start64, end64)
+        ]
+        owners = np.concatenate([p[0] for p in parts])
+        times = np.concatenate([p[1] for p in parts])
+        order = np.argsort(times, kind='stable')
+        return ExpandedDoses(list(self.keys), owners[order], times[order])
+
+    def _expand_daily(self, start64, end64) -> Tuple[np.ndarray, np.ndarray]:
+        indices = [i for i, s in enumerate(self.schedules) if not s.is_interval and s.day_offsets.size]
+        if not indices:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype='datetime64[s]')
+
+        counts = np.array([self.schedules[i].day_offsets.size for i in indices])
+        owner_idx = np.repeat(np.arange(len(indices)), counts)  # Position in `indices`
+        offsets = np.concatenate([self.schedules[i].day_offsets for i in indices])
+
+        # One spare day either side covers timezone shifts and offsets past midnight
+        first_day = start64.astype('datetime64[D]').astype(np.int64) - 1
+        last_day = end64.astype('datetime64[D]').astype(np.int64) + 1
+        days = np.arange(first_day, last_day + 1, dtype=np.int64)
+
+        # (days x doses) matrix of local wall-clock instants in seconds
+        local = days[:, None] * SECONDS_PER_DAY + offsets[None, :]
+        mask = np.ones(local.shape, dtype=bool)
+
+        cycle_start = np.zeros(len(indices), dtype=np.int64)
+        cycle_len = np.ones(len(indices), dtype=np.int64)
+        cycle_on = np.ones(len(indices), dtype=np.int64)
+        taper_start = np.zeros(len(indices), dtype=np.int64)
+        taper_days = np.full(len(indices), np.iinfo(np.int64).max, dtype=np.int64)
+        taper_step_len = np.ones(len(indices), dtype=np.int64)
+        taper_first = np.ones(len(indices))
+        taper_change = np.zeros(len(indices))
+        valid_from = np.full(len(indices), np.iinfo(np.int64).min, dtype=np.int64)
+        valid_until = np.full(len(indices), np.iinfo(np.int64).max, dtype=np.int64)
+
+        zone_positions: Dict[str, List[int]] = {}
+        for pos, i in enumerate(indices):
+            schedule = self.schedules[i]
+            if schedule.cycle:
+                cycle_start[pos], on, off = schedule.cycle
+                cycle_len[pos], cycle_on[pos] = on + off, on
+            if schedule.taper:
+                taper_start[pos], taper_days[pos], steps, first, last = schedule.taper
+                taper_step_len[pos] = max(taper_days[pos] // max(steps, 1), 1)
+                taper_first[pos] = first
+                taper_change[pos] = (last - first) / (steps - 1) if steps > 1 else 0.0
+            if schedule.valid_from is not None:
+                valid_from[pos] = schedule.valid_from.astype(np.int64)
+            if schedule.valid_until is not None:
+                valid_until[pos] = schedule.valid_until.astype(np.int64)
+            if schedule.timezone:
+                zone_positions.setdefault(schedule.timezone, []).append(pos)
+
+        # Offsets are taken at each dose's own wall-clock time, so doses on
+        # either side of a DST change that day get different offsets
+        utc_shift = np.zeros(local.shape, dtype=np.int64)
+        for zone, positions in zone_positions.items():
+            cols = np.flatnonzero(np.isin(owner_idx, positions))
+            utc_shift[:, cols] = self._utc_offsets(zone, local[:, cols])
+
+        day_col = days[:, None]
+        mask &= ((day_col - cycle_start[owner_idx]) % cycle_len[owner_idx]) < cycle_on[owner_idx]
+
+        since_taper = day_col - taper_start[owner_idx]
+        taper_dose = taper_first[owner_idx] + taper_change[owner_idx] * (since_taper // taper_step_len[owner_idx])
+        mask &= (since_taper < taper_days[owner_idx]) & (taper_dose > 0)
+
+        instants = local - utc_shift
+        mask &= (instants >= valid_from[owner_idx]) & (instants < valid_until[owner_idx])
+        mask &= (instants >= start64.astype(np.int64)) & (instants < end64.astype(np.int64))
+
+        rows, cols = np.nonzero(mask)
+        owners = np.asarray(indices, dtype=np.int64)[owner_idx[cols]]
+        return owners, instants[rows, cols].astype('datetime64[s]')
+
+    def _expand_intervals(self, start64, end64) -> Tuple[np.ndarray, np.ndarray]:
+        indices = [i for i, s in enumerate(self.schedules) if s.is_interval]
+        if not indices:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype='datetime64[s]')
+
+        anchors = np.array([self.schedules[i].anchor.astype(np.int64) for i in indices])
+        steps = np.array([self.schedules[i].interval for i in indices], dtype=np.int64)
+        lower = np.maximum(start64.astype(np.int64), anchors)
+        upper = np.full(len(indices), end64.astype(np.int64))
+        for pos, i in enumerate(indices):
+            schedule = self.schedules[i]
+            if schedule.valid_from is not None:
+                lower[pos] = max(lower[pos], schedule.valid_from.astype(np.int64))
+            if schedule.valid_until is not None:
+                upper[pos] = min(upper[pos], schedule.valid_until.astype(np.int64))
+
+        first = anchors + -(-(lower - anchors) // steps) * steps
+        counts = np.maximum(-(-(upper - first) // steps), 0)
+        total = int(counts.sum())
+
+        owner_pos = np.repeat(np.arange(len(indices)), counts)
+        within = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        instants = first[owner_pos] + within * steps[owner_pos]
+        owners = np.asarray(indices, dtype=np.int64)[owner_pos]
+        return owners, instants.astype('datetime64[s]')
+
+    @staticmethod
+    def _utc_offsets(zone: str, local: np.ndarray) -> np.ndarray:
+        """UTC offset in seconds of each local wall-clock instant"""
+        tz = pytz.timezone(zone)
+        epoch = datetime(1970, 1, 1)
+        # Schedules share dose times, so each distinct instant is localized once
+        distinct, inverse = np.unique(local, return_inverse=True)
+        # Times skipped or repeated by a DST change resolve to standard time
+        offsets = np.array([
+            int(tz.localize(epoch + timedelta(seconds=int(instant)), is_dst=False).utcoffset().total_seconds())
+            for instant in distinct
+        ], dtype=np.int64)
+        return offsets[inverse].reshape(local.shape)
+
+
+def expand_medications(medications, start: datetime, end: datetime) -> ExpandedDoses:
+    """Expand the dose times of many Medication rows keyed by medication id"""
+    engine = ScheduleExpansionEngine()
+    for medication in medications:
+        engine.add(medication.id, compile_medication(medication))
+    return engine.expand(start, end)
@@ -57,6 +57,16 @@ class TokenService:
         except Exception as e:
             raise TokenError(f"Failed to remove FCM token: {str(e)}")
     
+    async def remove_tokens(self, tokens: List[str]) -> int:
+        """Remove every device registered with one of the given tokens"""
+        if not tokens:
+            return 0
+        try:
+            result = await self.collection.delete_many({"token": {"$in": list(tokens)}})
+            return result.deleted_count
+        except Exception as e:
+            raise TokenError(f"Failed to remove FCM tokens: {str(e)}")
+    
     async def get_user_tokens(self, user_id: str) -> List[FCMToken]:
         """Get all FCM tokens for a user"""
         try:
@@ -156,5 +156,48 @@ class TestScheduleConflictChecker(unittest.TestCase):
 
         self.assertEqual(len(conflicts), 0)
 
+    def test_find_conflicts_between_all_schedules(self):
+        # Every pair of schedules is screened, not just new vs existing
+        schedules = [
+            Schedule(
+                medication=Medication(name=name),
+                type=ScheduleType.FIXED_TIME,
+                fixed_time_slots=[{"time": time, "dose": 1}]
+            )
+            for name, time in [("Med1", "08:00"), ("Med2", "08:10"), ("Med3", "08:20"), ("Med4", "20:00")]
+        ]
+
+        conflicts = self.checker.find_conflicts(schedules, self.test_date)
+
+        pairs = sorted((c.medication1, c.medication2) for c in conflicts)
+        self.assertEqual(pairs, [("Med1", "Med2"), ("Med1", "Med3"), ("Med2", "Med3")])
+
+    def test_date_range_conflicts(self):
+        # A multi-day range is checked in one call, including across midnight
+        med1 = Medication(name="Med1")
+        med2 = Medication(name="Med2")
+
+        schedule1 = Schedule(
+            medication=med1,
+            type=ScheduleType.FIXED_TIME,
+            fixed_time_slots=[{"time": "23:50", "dose": 1}]
+        )
+
+        schedule2 = Schedule(
+            medication=med2,
+            type=ScheduleType.FIXED_TIME,
+            fixed_time_slots=[{"time": "00:05", "dose": 1}]
+        )
+
+        conflicts = self.checker.check_conflicts(
+            schedule1,
+            [schedule2],
+            self.test_date,
+            end_date=self.test_date + timedelta(days=6)
+        )
+
+        self.assertEqual(len(conflicts), 6)
+        self.assertTrue(all(c.medication1 == "Med1" for c in conflicts))
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,13 +1,16 @@
 """Worker for processing medication reminders."""
 
 import logging
+import os
+import time
+from collections import Counter
 from datetime import datetime, timedelta
 from typing import List, Dict, Any
 import json
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
 import redis
-from rq import Queue, Worker, Connection
+from rq import Queue, Retry, Worker, Connection
 from rq.job import Job
 
 from ..core.config import get_settings
@@ -21,6 +24,8 @@ from ..security.audit_logger import AuditLogger
 logger = logging.getLogger(__name__)
 audit_logger = AuditLogger(__name__)
 
+REMINDER_BATCH_SIZE = int(os.environ.get('REMINDER_BATCH_SIZE', 500))
+
 class ReminderWorker:
     """Worker for processing medication reminders."""
 
@@ -72,24 +77,24 @@ class ReminderWorker:
             # Log processing start
             audit_logger.info(
                 "reminder_processing_start",
-                {"window_start": window_start, "window_end": window_end}
+                {"window_start": window_start.isoformat(), "window_end": window_end.isoformat()}
             )
 
-            # Get due medications with security wrapper
-            due_medications = self.medication_repository.get_due_medications(
+            # Get due medications in chunks with security wrapper
+            totals = {"medications_processed": 0, "reminders_queued": 0, "rate_limited": 0, "batches": 0}
+            for batch in self.medication_repository.iter_due_medications(
                 window_start,
-                window_end
-            )
-
-            # Process each medication
-            for medication in due_medications:
-                self._process_medication_reminder(medication, current_time)
+                window_end,
+                REMINDER_BATCH_SIZE
+            ):
+                metrics = self._process_reminder_batch(batch, current_time)
+                totals["medications_processed"] += metrics["batch_size"]
+                totals["reminders_queued"] += metrics["queued"]
+                totals["rate_limited"] += metrics["rate_limited"]
+                totals["batches"] += 1
 
             # Log processing completion
-            audit_logger.info(
-                "reminder_processing_complete",
-                {"medications_processed": len(due_medications)}
-            )
+            audit_logger.info("reminder_processing_complete", totals)
 
         except Exception as e:
             audit_logger.error(
@@ -99,106 +104,132 @@ class ReminderWorker:
             logger.error(f"Error processing reminders: {str(e)}")
             raise
 
-    def _process_medication_reminder(
+    def _process_reminder_batch(
         self,
-        medication: MedicationEntity,
+        medications: List[MedicationEntity],
         current_time: datetime
-    ) -> None:
-        """Process reminder for a single medication."""
+    ) -> Dict[str, Any]:
+        """Rate-limit, enqueue and audit a batch of reminders in a few round trips."""
+        started = time.perf_counter()
         try:
-            # Check rate limit for notifications
-            if self._is_rate_limited(medication.user_id):
+            allowed = self._check_rate_limits([medication.user_id for medication in medications])
+            due = [medication for medication, ok in zip(medications, allowed) if ok]
+            limited = [medication for medication, ok in zip(medications, allowed) if not ok]
+
+            if limited:
                 audit_logger.warning(
                     "reminder_rate_limited",
                     {
-                        "user_id": medication.user_id,
-                        "medication_id": medication.id
+                        "reminders": [
+                            {"user_id": medication.user_id, "medication_id": medication.id}
+                            for medication in limited
+                        ]
                     }
                 )
-                return
 
-            # Create notification job
-            job = self._create_notification_job(medication, current_time)
-            
-            # Log notification queued
-            audit_logger.info(
-                "reminder_notification_queued",
-                {
-                    "job_id": job.id,
-                    "medication_id": medication.id,
-                    "user_id": medication.user_id
-                }
-            )
+            jobs = self._create_notification_jobs(due, current_time)
+            if jobs:
+                audit_logger.info(
+                    "reminder_notification_queued",
+                    {
+                        "reminders": [
+                            {
+                                "job_id": job.id,
+                                "medication_id": medication.id,
+                                "user_id": medication.user_id
+                            }
+                            for job, medication in zip(jobs, due)
+                        ]
+                    }
+                )
+
+            metrics = {
+                "batch_size": len(medications),
+                "queued": len(jobs),
+                "rate_limited": len(limited),
+                "duration_ms": round((time.perf_counter() - started) * 1000, 2)
+            }
+            logger.info(f"Processed reminder batch: {metrics}")
+            return metrics
 
         except Exception as e:
             audit_logger.error(
                 "reminder_notification_error",
                 {
-                    "medication_id": medication.id,
+                    "medication_ids": [medication.id for medication in medications],
                     "error": str(e)
                 }
             )
-            logger.error(
-                f"Error processing reminder for medication {medication.id}: {str(e)}"
-            )
+            logger.error(f"Error processing reminder batch: {str(e)}")
             raise
 
-    def _is_rate_limited(self, user_id: int) -> bool:
-        """Check if user has exceeded notification rate limit."""
+    def _check_rate_limits(self, user_ids: List[int]) -> List[bool]:
+        """
+        Check the 15 minute notification limit for a batch in one pipelined
+        round trip. Returns, per entry, whether the reminder may be sent; a
+        user's reminders within the batch count against their limit in order.
+        """
+        counts = Counter(user_ids)
+        users = list(counts)
         try:
-            key = f"reminder_rate_limit:{user_id}"
-            count = self.redis_conn.get(key)
-            
-            if count is None:
-                self.redis_conn.setex(
-                    key,
-                    timedelta(minutes=15),
-                    1
-                )
-                return False
-                
-            count = int(count)
-            if count >= self.settings.MAX_REMINDERS_PER_15_MIN:
-                return True
-                
-            self.redis_conn.incr(key)
-            return False
-
+            pipe = self.redis_conn.pipeline(transaction=True)
+            for user_id in users:
+                key = f"reminder_rate_limit:{user_id}"
+                # Starts the 15 minute window on the user's first reminder
+                pipe.set(key, 0, ex=timedelta(minutes=15), nx=True)
+                pipe.incrby(key, counts[user_id])
+            results = pipe.execute()
         except redis.RedisError as e:
             logger.error(f"Rate limit check failed: {str(e)}")
-            return False  # Fail open to ensure medications are not missed
+            return [True] * len(user_ids)  # Fail open to ensure medications are not missed
+
+        # Each user's allowance is what remained of the limit before this batch
+        limit = self.settings.MAX_REMINDERS_PER_15_MIN
+        remaining = {
+            user_id: max(0, limit - (total - counts[user_id]))
+            for user_id, total in zip(users, results[1::2])
+        }
+
+        allowed = []
+        for user_id in user_ids:
+            allowed.append(remaining[user_id] > 0)
+            remaining[user_id] -= 1
+        return allowed
 
-    def _create_notification_job(
+    def _create_notification_jobs(
         self,
-        medication: MedicationEntity,
+        medications: List[MedicationEntity],
         current_time: datetime
-    ) -> Job:
-        """Create a notification job with security measures."""
+    ) -> List[Job]:
+        """Enqueue notification jobs for a batch in one pipelined call."""
+        if not medications:
+            return []
         try:
-            # Prepare notification data
-            notification_data = {
-                "user_id": medication.user_id,
-                "medication_id": medication.id,
-                "medication_name": medication.name,
-                "dosage": medication.dosage,
-                "scheduled_time": current_time.isoformat(),
-                "notification_type": "medication_reminder"
-            }
-
-            # Enqueue notification job
-            job = self.queue.enqueue(
-                self.notification_service.send_notification,
-                notification_data,
-                retry=self.settings.NOTIFICATION_MAX_RETRIES,
-                ttl=300  # 5 minutes
-            )
-
-            return job
+            return self.queue.enqueue_many([
+                Queue.prepare_data(
+                    self.notification_service.send_notification,
+                    args=(self._notification_data(medication, current_time),),
+                    retry=Retry(max=self.settings.NOTIFICATION_MAX_RETRIES),
+                    ttl=300  # 5 minutes
+                )
+                for medication in medications
+            ])
 
         except Exception as e:
-            logger.error(f"Failed to create notification job: {str(e)}")
+            logger.error(f"Failed to create notification jobs: {str(e)}")
             raise
 
+    @staticmethod
+    def _notification_data(medication: MedicationEntity, current_time: datetime) -> Dict[str, Any]:
+        return {
+            "user_id": medication.user_id,
+            "medication_id": medication.id,
+            "medication_name": medication.name,
+            "dosage": medication.dosage,
+            "scheduled_time": current_time.isoformat(),
+            "notification_type": "medication_reminder"
+        }
+
     def cleanup_old_jobs(self) -> None:
         """Clean up old jobs from the queue."""
         try:
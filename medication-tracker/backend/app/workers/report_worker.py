@@ -0,0 +1,121 @@
+"""Worker for rendering PDF compliance reports."""
+
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Dict, Optional, Tuple
+
+import redis
+from rq import Queue, get_current_job
+from rq.exceptions import NoSuchJobError
+from rq.job import Job
+
+logger = logging.getLogger(__name__)
+
+REPORT_QUEUE = 'reports'
+CACHE_PREFIX = 'report_pdf:'
+SUBMIT_LOCK_PREFIX = 'report_submit:'
+SUBMIT_LOCK_SECONDS = 30
+CACHE_TTL_SECONDS = int(os.environ.get('REPORT_CACHE_TTL_SECONDS', 24 * 3600))
+RENDER_TIMEOUT_SECONDS = int(os.environ.get('REPORT_RENDER_TIMEOUT_SECONDS', 300))
+PENDING_STATUSES = ('queued', 'started', 'deferred', 'scheduled')
+
+def report_cache_key(user_id, report_data: Dict[str, Any]) -> str:
+    """Content address of a report: its user, date range and every value rendered"""
+    payload = json.dumps(
+        {'user_id': str(user_id), 'report': report_data},
+        sort_keys=True,
+        default=str,
+        separators=(',', ':')
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def cache_name(user_id, key: str) -> str:
+    """Cached PDFs are namespaced by user, so a key only resolves for its owner"""
+    return f"{CACHE_PREFIX}{user_id}:{key}"
+
+def render_compliance_report(user_id, report_data: Dict[str, Any], key: str) -> str:
+    """RQ job: render the PDF and store it in the report cache under `key`"""
+    from ..services.report_service import ReportService
+
+    pdf = ReportService.generate_pdf_report(user_id, report_data).getvalue()
+    get_current_job().connection.setex(cache_name(user_id, key), CACHE_TTL_SECONDS, pdf)
+    logger.info(f"Rendered compliance report {key} ({len(pdf)} bytes)")
+    return key
+
+class ReportRenderQueue:
+    """Enqueues compliance report renders and serves them from the report cache."""
+
+    def __init__(self, redis_conn: Optional[redis.Redis] = None):
+        self.redis_conn = redis_conn or redis.Redis.from_url(
+            os.environ.get('REDIS_URL', 'redis://localhost:6379/0'),
+            socket_timeout=5
+        )
+        self.queue = Queue(REPORT_QUEUE, connection=self.redis_conn)
+
+    def get_cached(self, user_id, key: str) -> Optional[bytes]:
+        return self.redis_conn.get(cache_name(user_id, key))
+
+    def submit(self, user_id, report_data: Dict[str, Any]) -> Tuple[str, Optional[Job]]:
+        """Return (key, job); job is None when the PDF is already cached.
+
+        The job id is the cache key, so identical requests made while a
+        render is pending share one job instead of queueing duplicates.
+        Submitters of a key take a SET NX lock around the check and enqueue,
+        so concurrent misses can't both find no job and queue it twice.
+        """
+        key = report_cache_key(user_id, report_data)
+        if self.redis_conn.exists(cache_name(user_id, key)):
+            return key, None
+
+        with self.redis_conn.lock(
+            f"{SUBMIT_LOCK_PREFIX}{key}",
+            timeout=SUBMIT_LOCK_SECONDS,
+            blocking_timeout=SUBMIT_LOCK_SECONDS
+        ):
+            # The render may have finished while we waited for the lock
+            if self.redis_conn.exists(cache_name(user_id, key)):
+                return key, None
+
+            job = self._fetch(key)
+            if job is not None and self.job_status(job) in PENDING_STATUSES:
+                return key, job
+            if job is not None:
+                # Failed, or finished with its PDF since evicted from the cache
+                job.delete()
+
+            job = self.queue.enqueue(
+                render_compliance_report,
+                user_id,
+                report_data,
+                key,
+                job_id=key,
+                job_timeout=RENDER_TIMEOUT_SECONDS,
+                result_ttl=CACHE_TTL_SECONDS,
+                failure_ttl=3600
+            )
+            return key, job
+
+    def status(self, user_id, key: str) -> Optional[str]:
+        """'finished', 'failed' or a pending RQ status; None if the user has no such report"""
+        if self.redis_conn.exists(cache_name(user_id, key)):
+            return 'finished'
+
+        job = self._fetch(key)
+        if job is None or str(job.args[0]) != str(user_id):
+            return None
+        status = self.job_status(job)
+        # A finished job whose PDF has since expired from the cache must be resubmitted
+        return None if status == 'finished' else status
+
+    @staticmethod
+    def job_status(job: Job) -> str:
+        status = job.get_status()
+        return getattr(status, 'value', status)
+
+    def _fetch(self, key: str) -> Optional[Job]:
+        try:
+            return Job.fetch(key, connection=self.redis_conn)
+        except NoSuchJobError:
+            return None
@@ -0,0 +1,44 @@
+"""add adherence aggregation index and daily rollup
+
+Revision ID: add_adherence_aggregation
+Revises: add_notification_schedule_key
+Create Date: 2024-02-12
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_adherence_aggregation'
+down_revision = 'add_notification_schedule_key'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_index(
+        'ix_medication_history_adherence',
+        'medication_history',
+        ['medication_id', 'scheduled_time', 'action'],
+        unique=False
+    )
+
+    # Filled by app.services.adherence_stats.rebuild_daily_adherence() and
+    # kept current by the medication_history model's flush events
+    op.create_table('daily_adherence',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('medication_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('total', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('taken', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('taken_on_time', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('taken_late', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('missed', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('untaken', sa.Integer(), nullable=False, server_default='0'),
+        sa.ForeignKeyConstraint(['medication_id'], ['medications.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('medication_id', 'day', name='uq_daily_adherence_medication_day')
+    )
+
+def downgrade():
+    op.drop_table('daily_adherence')
+    op.drop_index('ix_medication_history_adherence', table_name='medication_history')
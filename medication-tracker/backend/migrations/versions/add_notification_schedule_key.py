@@ -0,0 +1,40 @@
+"""add notification schedule key
+
+Revision ID: add_notification_schedule_key
+Revises: add_email_verification
+Create Date: 2024-02-05
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'add_notification_schedule_key'
+down_revision = 'add_email_verification'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Remove duplicates left by earlier scheduler runs, keeping the oldest row.
+    # Rows without a medication never conflict under the constraint, so they
+    # are left alone; the derived table lets MySQL read the table it deletes from
+    op.execute("""
+        DELETE FROM notifications
+        WHERE medication_id IS NOT NULL
+          AND id NOT IN (
+            SELECT id FROM (
+                SELECT MIN(id) AS id
+                FROM notifications
+                WHERE medication_id IS NOT NULL
+                GROUP BY medication_id, type, scheduled_time
+            ) AS keep
+          )
+    """)
+
+    op.create_unique_constraint(
+        'uq_notifications_schedule_key',
+        'notifications',
+        ['medication_id', 'type', 'scheduled_time']
+    )
+
+def downgrade():
+    op.drop_constraint('uq_notifications_schedule_key', 'notifications', type_='unique')
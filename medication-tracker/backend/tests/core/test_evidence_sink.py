@@ -0,0 +1,97 @@
+"""Tests for the batched evidence sink."""
+
+import sqlite3
+import threading
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+
+from app.core.evidence_sink import EvidenceSink, get_evidence_sink
+
+
+@pytest.fixture
+def sink(tmp_path):
+    sink = EvidenceSink(str(tmp_path / "evidence.db"))
+    yield sink
+    sink.close()
+
+
+def record(i, minute=0):
+    return {
+        'timestamp': f"2024-01-01T10:{minute:02d}:00",
+        'endpoint': f"endpoint_{i}",
+        'validation_status': 'complete'
+    }
+
+
+def test_records_written_in_batches(sink):
+    for i in range(200):
+        sink.submit('security_validation', record(i))
+    assert sink.flush(timeout=5)
+
+    stats = sink.stats()
+    assert stats['written'] == 200
+    assert stats['batches'] < 200
+    assert stats['queued'] == 0
+    assert len(sink.query(kind='security_validation')) == 200
+
+
+def test_query_filters_by_kind_category_and_time(sink):
+    for minute in range(5):
+        sink.submit('metric', record(minute, minute), category='usage')
+    sink.submit('metric', record(9, 3), category='security')
+    sink.submit('evidence', record(10, 3), category='tracking')
+
+    results = sink.query(
+        kind='metric',
+        category='usage',
+        start_time=datetime(2024, 1, 1, 10, 1),
+        end_time="2024-01-01T10:03:00"
+    )
+
+    assert [r['endpoint'] for r in results] == ['endpoint_1', 'endpoint_2', 'endpoint_3']
+    assert len(sink.query(limit=2)) == 2
+
+
+def test_full_queue_drops_instead_of_blocking(tmp_path):
+    sink = EvidenceSink(str(tmp_path / "evidence.db"), max_queue=5)
+    release = threading.Event()
+    original = sink._write
+    with patch.object(sink, '_write', side_effect=lambda batch: release.wait(5) and original(batch)):
+        accepted = [sink.submit('metric', record(i)) for i in range(20)]
+        stats = sink.stats()
+        release.set()
+
+    assert not all(accepted)
+    assert stats['dropped'] == accepted.count(False)
+    assert stats['high_water'] == 5
+    assert sink.flush(timeout=5)
+    assert len(sink.query()) == accepted.count(True)
+    sink.close()
+
+
+def test_write_errors_are_counted(sink):
+    with patch.object(sink, '_conn') as conn:
+        conn.executemany.side_effect = sqlite3.OperationalError("disk I/O error")
+        sink.submit('metric', record(1))
+        assert sink.flush(timeout=5)
+
+    assert sink.stats()['write_errors'] == 1
+
+
+def test_close_flushes_and_persists(tmp_path):
+    path = str(tmp_path / "evidence.db")
+    sink = EvidenceSink(path)
+    sink.submit('metric', record(1), category='usage')
+    sink.close()
+
+    assert sink.submit('metric', record(2)) is False
+    reopened = EvidenceSink(path)
+    assert [r['endpoint'] for r in reopened.query(category='usage')] == ['endpoint_1']
+    assert reopened.purge("2025-01-01T00:00:00") == 1
+    reopened.close()
+
+
+def test_shared_sink_per_directory(tmp_path):
+    assert get_evidence_sink(tmp_path) is get_evidence_sink(str(tmp_path))
@@ -3,6 +3,7 @@ Metrics Collector Tests
 Maintains critical path alignment and validation chain
 Last Updated: 2024-12-24T21:37:30+01:00
 """
+import json
 import pytest
 from datetime import datetime
 from unittest.mock import Mock, patch
@@ -223,6 +224,9 @@ async def test_metrics_persistence(tmp_path, mock_evidence_collector):
         evidence={}
     )
 
+    # Values are buffered until flushed
+    collector1.flush()
+
     # Create second collector and verify metric exists
     collector2 = MetricsCollector(
         evidence_collector=mock_evidence_collector,
@@ -233,3 +237,30 @@ async def test_metrics_persistence(tmp_path, mock_evidence_collector):
     assert result.is_valid
     assert len(result.data["values"]) == 1
     assert result.data["values"][0]["value"] == 1.0
+
+@pytest.mark.asyncio
+async def test_legacy_metrics_file_is_imported(tmp_path, mock_evidence_collector):
+    """Test metrics from the old metrics.json are moved into segments"""
+    metrics_dir = tmp_path / "metrics"
+    metrics_dir.mkdir()
+    (metrics_dir / "metrics.json").write_text(json.dumps({
+        "legacy_metric": {
+            "type": "gauge",
+            "category": "performance",
+            "values": [
+                {"value": 3.0, "labels": {}, "timestamp": "2024-01-01T00:00:00"},
+                {"value": 5.0, "labels": {}, "timestamp": "2024-01-01T00:01:00"}
+            ]
+        }
+    }))
+
+    collector = MetricsCollector(
+        evidence_collector=mock_evidence_collector,
+        metrics_dir=str(metrics_dir),
+        retention_days=None
+    )
+
+    result = await collector.get_metrics_summary()
+    assert result.data["legacy_metric"]["avg_value"] == 4.0
+    assert result.data["legacy_metric"]["latest_value"] == 5.0
+    assert not (metrics_dir / "metrics.json").exists()
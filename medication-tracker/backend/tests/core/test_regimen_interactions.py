@@ -0,0 +1,125 @@
+"""Tests for whole-regimen interaction screening."""
+
+import pytest
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock
+
+from app.core.medication_interactions import InteractionChecker
+from app.services.interaction_index import InteractionIndex
+
+LABELS = {
+    'warfarin': {
+        'drug_interactions': ['Aspirin increases bleeding risk.', 'Aspirin increases bleeding risk.'],
+        'warnings': [],
+        'contraindications': [],
+        'precautions': []
+    },
+    'aspirin': {
+        'drug_interactions': ['May potentiate warfarin.'],
+        'warnings': [],
+        'contraindications': [],
+        'precautions': []
+    },
+    'metformin': {
+        'drug_interactions': [],
+        'warnings': [],
+        'contraindications': [],
+        'precautions': []
+    }
+}
+
+def make_medication(med_id, name, schedule=None, dose_times=None):
+    return SimpleNamespace(id=med_id, name=name, schedule=schedule, dose_times=dose_times or [])
+
+@pytest.fixture
+def drug_service():
+    """Create a drug service serving canned label data."""
+    service = Mock()
+    service.cache_duration = timedelta(days=7)
+    service.get_drug_interactions.side_effect = lambda name: LABELS.get(name.lower())
+    return service
+
+@pytest.fixture
+def checker(drug_service):
+    """Create a checker wired to the canned label data."""
+    checker = InteractionChecker()
+    checker.interaction_index = InteractionIndex(drug_service)
+    checker.herb_service = Mock()
+    checker.herb_service.check_interaction = AsyncMock(return_value={
+        'severity': 'Major',
+        'effect': 'Increased bleeding risk',
+        'evidence': 'Strong',
+        'sources': ['NCCIH']
+    })
+    return checker
+
+def test_regimen_resolves_each_drug_once(checker, drug_service):
+    medications = [
+        make_medication(1, 'Warfarin'),
+        make_medication(2, 'Aspirin'),
+        make_medication(3, 'Metformin')
+    ]
+
+    regimen = checker.check_regimen(medications)
+
+    assert drug_service.get_drug_interactions.call_count == 3
+    assert regimen['pairs_checked'] == 3
+    assert [pair['medication_ids'] for pair in regimen['pairs']] == [[1, 2]]
+    assert regimen['matrix'] == {'1': {'2': 'high'}, '2': {'1': 'high'}}
+
+def test_duplicate_interactions_are_collapsed(checker):
+    regimen = checker.check_regimen([make_medication(1, 'Warfarin'), make_medication(2, 'Aspirin')])
+
+    descriptions = [i['description'] for i in regimen['pairs'][0]['interactions']]
+    assert descriptions == ['Aspirin increases bleeding risk.', 'May potentiate warfarin.']
+
+def test_timing_conflicts_reported_once_per_pair(checker):
+    medications = [
+        make_medication(1, 'Metformin', ['08:00', '20:00']),
+        make_medication(2, 'Levothyroxine', ['08:30', '20:30'])
+    ]
+
+    regimen = checker.check_regimen(medications)
+
+    interactions = regimen['pairs'][0]['interactions']
+    assert [i['type'] for i in interactions] == ['timing']
+    assert regimen['pairs'][0]['severity'] == 'moderate'
+
+def test_dose_times_alone_do_not_flag_timing(checker):
+    medications = [
+        make_medication(1, 'Metformin', dose_times=['08:00', '20:00']),
+        make_medication(2, 'Levothyroxine', dose_times=['08:30', '20:30'])
+    ]
+
+    assert checker.check_regimen(medications)['pairs'] == []
+
+def test_herb_pairs_checked_concurrently_and_merged(checker):
+    medications = [make_medication(1, 'Ginkgo'), make_medication(2, 'Warfarin')]
+
+    regimen = checker.check_regimen(medications)
+
+    checker.herb_service.check_interaction.assert_awaited_once_with('Ginkgo', 'Warfarin')
+    interaction = regimen['pairs'][0]['interactions'][0]
+    assert interaction['type'] == 'herb-drug'
+    assert interaction['severity'] == 'high'
+
+def test_check_interactions_flattens_regimen(checker):
+    interactions = checker.check_interactions([make_medication(1, 'Warfarin'), make_medication(2, 'Aspirin')])
+
+    assert len(interactions) == 2
+    assert all('recommendation' in interaction for interaction in interactions)
+
+@pytest.mark.asyncio
+async def test_check_regimen_async_matches_sync(checker):
+    medications = [make_medication(1, 'Warfarin'), make_medication(2, 'Aspirin')]
+
+    assert await checker.check_regimen_async(medications) == checker.check_regimen(medications)
+
+@pytest.mark.asyncio
+async def test_check_regimen_with_herbs_inside_running_loop(checker):
+    medications = [make_medication(1, 'Ginkgo'), make_medication(2, 'Warfarin')]
+
+    regimen = checker.check_regimen(medications)
+
+    assert regimen['pairs'][0]['interactions'][0]['type'] == 'herb-drug'
@@ -0,0 +1,160 @@
+"""
+Segmented Store Tests
+"""
+import json
+import pytest
+import time
+from datetime import datetime, timedelta
+
+from app.core.segmented_store import SegmentedStore, COUNT, TOTAL, MINIMUM, MAXIMUM, LATEST_VALUE
+
+START = datetime(2024, 1, 1)
+
+def record(name, minutes, value):
+    return {
+        "name": name,
+        "value": value,
+        "timestamp": (START + timedelta(minutes=minutes)).isoformat()
+    }
+
+@pytest.fixture
+def store(tmp_path):
+    return SegmentedStore(
+        str(tmp_path / "segments"),
+        flush_size=10,
+        flush_interval=3600,
+        segment_max_records=5,
+        retention=None,
+        compact_every=0
+    )
+
+def test_writes_are_buffered_until_flush_size(store, tmp_path):
+    for minute in range(9):
+        store.append(record("cpu", minute, minute))
+
+    assert store.segments == []
+    assert len(list(store.query())) == 9
+
+    store.append(record("cpu", 9, 9))
+
+    assert store.buffer == []
+    assert [segment.count for segment in store.segments] == [5, 5]
+
+def test_segments_roll_on_time_span(tmp_path):
+    store = SegmentedStore(str(tmp_path), flush_size=1000, segment_span=timedelta(minutes=10), retention=None)
+    for minute in range(0, 30, 2):
+        store.append(record("cpu", minute, 1))
+    store.flush()
+
+    assert [segment.count for segment in store.segments] == [5, 5, 5]
+    assert store.segments[1].min_ts == record("cpu", 10, 1)["timestamp"]
+
+def test_range_query_only_reads_overlapping_segments(store, monkeypatch):
+    for minute in range(20):
+        store.append(record("cpu" if minute % 2 else "mem", minute, minute))
+    store.flush()
+
+    read = []
+    original = store._read
+    monkeypatch.setattr(store, "_read", lambda segment: read.append(segment.name) or original(segment))
+
+    values = [r["value"] for r in store.query(record("", 6, 0)["timestamp"], record("", 8, 0)["timestamp"], key="cpu")]
+
+    assert values == [7]
+    assert read == [store.segments[1].name]
+
+def test_stats_use_index_for_whole_segments(store, monkeypatch):
+    for minute in range(10):
+        store.append(record("cpu", minute, minute))
+    store.append(record("cpu", 10, 100))
+
+    monkeypatch.setattr(store, "_read", lambda segment: pytest.fail("segment was read"))
+    stats = store.stats()["cpu"]
+
+    assert stats[COUNT] == 11
+    assert stats[TOTAL] == sum(range(10)) + 100
+    assert (stats[MINIMUM], stats[MAXIMUM], stats[LATEST_VALUE]) == (0, 100, 100)
+
+def test_stats_scan_segments_straddling_the_range(store):
+    for minute in range(10):
+        store.append(record("cpu", minute, minute))
+
+    stats = store.stats(start=record("", 3, 0)["timestamp"], end=record("", 6, 0)["timestamp"])
+
+    assert stats["cpu"][COUNT] == 4
+    assert stats["cpu"][TOTAL] == 3 + 4 + 5 + 6
+
+def test_retention_drops_expired_segments(store):
+    for minute in range(10):
+        store.append(record("cpu", minute, minute))
+    store.retention = timedelta(days=1)
+
+    dropped = store.apply_retention(now=START + timedelta(days=2))
+
+    assert dropped == 1  # The active segment is kept until it is sealed
+    assert len(store.segments) == 1
+
+def test_compaction_merges_small_segments(tmp_path):
+    store = SegmentedStore(
+        str(tmp_path), flush_size=1000, segment_span=timedelta(minutes=1), retention=None, compact_every=0
+    )
+    for minute in range(6):
+        store.append(record("cpu", minute, minute))
+    store.flush()
+    assert len(store.segments) == 6
+
+    store.compact()
+
+    assert [segment.count for segment in store.segments] == [5, 1]
+    assert [r["value"] for r in store.query()] == list(range(6))
+    assert len(list(tmp_path.glob("segment-*"))) == 2
+
+def test_reopen_rebuilds_summary_for_unindexed_writes(store, tmp_path):
+    for minute in range(10):
+        store.append(record("cpu", minute, minute))
+    store.meta["metrics"] = {"cpu": {"type": "gauge"}}
+    store.flush()
+
+    # Simulate a crash after a segment append but before the index was saved
+    with open(store._path(store.segments[-1]), "a") as f:
+        f.write(json.dumps(record("cpu", 11, 50)) + "\n")
+        f.write('{"name": "cpu", "val')
+
+    reopened = SegmentedStore(str(tmp_path / "segments"), retention=None)
+
+    assert reopened.meta["metrics"] == {"cpu": {"type": "gauge"}}
+    assert reopened.stats()["cpu"][COUNT] == 11
+    assert reopened.stats()["cpu"][MAXIMUM] == 50
+
+def test_idle_buffer_is_flushed_in_background(tmp_path):
+    store = SegmentedStore(str(tmp_path), flush_size=1000, flush_interval=0.05, retention=None)
+    store.append(record("cpu", 0, 1))
+
+    deadline = time.monotonic() + 5
+    while store.buffer and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert store.buffer == []
+    assert [segment.count for segment in store.segments] == [1]
+    store.close()
+
+def test_close_flushes_buffer(store, tmp_path):
+    store.append(record("cpu", 0, 1))
+    store.close()
+
+    reopened = SegmentedStore(str(tmp_path / "segments"), retention=None)
+    assert [r["value"] for r in reopened.query()] == [1]
+
+def test_compaction_overwrites_leftover_temporary_file(tmp_path):
+    store = SegmentedStore(
+        str(tmp_path), flush_size=1000, segment_span=timedelta(minutes=1), retention=None, compact_every=0
+    )
+    for minute in range(2):
+        store.append(record("cpu", minute, minute))
+    store.flush()
+
+    # Left behind by a compaction interrupted before its rename
+    (tmp_path / "segment-00000002.tmp").write_text(json.dumps(record("cpu", 9, 99)) + "\n")
+    store.compact()
+
+    assert [r["value"] for r in store.query()] == [0, 1]
@@ -0,0 +1,110 @@
+"""Tests for compiled validation plans in the unified_validation decorator."""
+
+import pytest
+from unittest.mock import patch
+
+from app.core import unified_validation_framework
+from app.core.unified_decorator import unified_validation
+from app.core.unified_validation_framework import UnifiedValidationFramework, get_framework
+
+
+@pytest.fixture
+def framework():
+    framework = UnifiedValidationFramework()
+    with patch.object(unified_validation_framework, "_framework", framework), \
+         patch.object(framework, "_store_validation_evidence") as store:
+        framework.store = store
+        yield framework
+
+
+def test_framework_is_shared(framework):
+    assert get_framework() is framework
+    assert get_framework() is get_framework()
+
+
+@pytest.mark.asyncio
+async def test_plan_compiled_once_and_result_memoized(framework):
+    framework.register_pattern("base", 0.9, {"required_headers": {}})
+
+    @unified_validation(critical_path="Medication.Safety", validation_layer="Domain")
+    async def validate(value):
+        return value * 2
+
+    with patch.object(framework, "_relevant_patterns", wraps=framework._relevant_patterns) as resolve, \
+         patch.object(framework, "_apply_pattern", wraps=framework._apply_pattern) as apply:
+        assert [await validate(i) for i in range(5)] == [0, 2, 4, 6, 8]
+
+    assert resolve.call_count == 1
+    assert apply.call_count == 1
+    # Evidence is still built and recorded for every call
+    assert framework.store.call_count == 5
+    evidence = [call.args[1]["validation_result"]["evidence"] for call in framework.store.call_args_list]
+    assert all(a is not b for a, b in zip(evidence, evidence[1:]))
+    assert [e["timestamp"] for e in evidence] == sorted(e["timestamp"] for e in evidence)
+    plan = framework.compile_plan("Medication.Safety", "Domain")
+    assert [p["id"] for p in plan.patterns] == ["base"]
+    assert plan.layer_result["valid"]
+
+
+@pytest.mark.asyncio
+async def test_pattern_registration_invalidates_plans(framework):
+    plan = framework.compile_plan("Medication.Safety", "Domain")
+    await framework.execute_plan(plan)
+
+    framework.register_pattern("base", 0.9, {})
+    framework.register_pattern("base", 0.9, {})
+    recompiled = framework.compile_plan("Medication.Safety", "Domain")
+
+    assert recompiled is not plan
+    assert framework.compile_plan("Medication.Safety", "Domain") is recompiled
+    assert [p["id"] for p in recompiled.patterns] == ["base"]
+
+
+@pytest.mark.asyncio
+async def test_explicit_invalidation_by_path(framework):
+    safety = framework.compile_plan("Medication.Safety", "Domain")
+    schedule = framework.compile_plan("Medication.Schedule", "Domain")
+
+    framework.invalidate_plans("Medication.Safety")
+
+    assert framework.compile_plan("Medication.Safety", "Domain") is not safety
+    assert framework.compile_plan("Medication.Schedule", "Domain") is schedule
+
+
+@pytest.mark.asyncio
+async def test_hooks_run_every_call(framework):
+    calls = []
+
+    async def hook(context):
+        calls.append(context["critical_path"])
+
+    framework.hooks.register_pre_hook(hook)
+
+    @unified_validation(critical_path="Medication.Schedule", skip_evidence=True)
+    async def validate():
+        return True
+
+    await validate()
+    await validate()
+
+    assert calls == ["Medication.Schedule", "Medication.Schedule"]
+    assert framework.compile_plan("Medication.Schedule").results is None
+
+
+def test_unknown_layer_is_invalid(framework):
+    plan = framework.compile_plan("Medication.Safety", "Persistence")
+
+    assert plan.layer_result["valid"] is False
+    assert "Persistence" in plan.layer_result["error"]
+
+
+@pytest.mark.asyncio
+async def test_memoized_result_is_not_shared(framework):
+    plan = framework.compile_plan("Medication.Safety", "Domain")
+    first = await framework.execute_plan(plan)
+    first["issues"].append("changed by caller")
+    second = await framework.execute_plan(plan)
+    second["valid"] = False
+
+    assert "changed by caller" not in (await framework.execute_plan(plan))["issues"]
+    assert (await framework.execute_plan(plan))["valid"]
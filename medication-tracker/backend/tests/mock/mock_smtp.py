@@ -0,0 +1,114 @@
+"""
+Local SMTP stand-in for exercising the pooled email transport
+Speaks enough ESMTP (EHLO, AUTH PLAIN, NOOP, RSET) for aiosmtplib
+"""
+import asyncio
+import base64
+from typing import List, Optional, Tuple
+
+class MockSMTPServer:
+    """In-process SMTP server that records every delivered message"""
+
+    def __init__(
+        self,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        latency: float = 0.0
+    ):
+        self.username = username
+        self.password = password
+        self.latency = latency
+        self.messages: List[Tuple[str, List[str], bytes]] = []
+        self.connections = 0
+        self.commands: List[str] = []
+        self.port: Optional[int] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._writers: List[asyncio.StreamWriter] = []
+
+    async def start(self) -> "MockSMTPServer":
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self) -> None:
+        self.drop_connections()
+        self._server.close()
+        await self._server.wait_closed()
+
+    def drop_connections(self) -> None:
+        """Close every client connection, as a server idle timeout would"""
+        for writer in self._writers:
+            writer.close()
+        self._writers = []
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        self._writers.append(writer)
+        sender, recipients = None, []
+
+        async def reply(line: str) -> None:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            writer.write(line.encode() + b"\r\n")
+            await writer.drain()
+
+        try:
+            await reply("220 localhost mock ESMTP")
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command = line.decode().rstrip("\r\n")
+                verb = command.split(" ", 1)[0].upper()
+                self.commands.append(verb)
+
+                if verb in ("EHLO", "HELO"):
+                    lines = ["localhost"] + (["AUTH PLAIN"] if self.username else [])
+                    writer.write("".join(
+                        f"250{'-' if i < len(lines) - 1 else ' '}{text}\r\n" for i, text in enumerate(lines)
+                    ).encode())
+                    await writer.drain()
+                elif verb == "AUTH":
+                    credentials = base64.b64decode(command.split()[-1]).split(b"\0")
+                    if credentials[1:] == [self.username.encode(), self.password.encode()]:
+                        await reply("235 Authentication successful")
+                    else:
+                        await reply("535 Authentication failed")
+                elif verb == "MAIL":
+                    sender, recipients = command[10:].strip("<>"), []
+                    await reply("250 OK")
+                elif verb == "RCPT":
+                    recipient = command[8:].strip("<>")
+                    if recipient.startswith("bad"):
+                        await reply("550 No such user")
+                    else:
+                        recipients.append(recipient)
+                        await reply("250 OK")
+                elif verb == "DATA":
+                    if not recipients:
+                        await reply("554 No valid recipients")
+                        continue
+                    await reply("354 End data with <CR><LF>.<CR><LF>")
+                    data = []
+                    while True:
+                        chunk = await reader.readline()
+                        if chunk == b".\r\n" or not chunk:
+                            break
+                        data.append(chunk[1:] if chunk.startswith(b"..") else chunk)
+                    self.messages.append((sender, recipients, b"".join(data)))
+                    sender, recipients = None, []
+                    await reply("250 Queued")
+                elif verb == "RSET":
+                    sender, recipients = None, []
+                    await reply("250 OK")
+                elif verb == "NOOP":
+                    await reply("250 OK")
+                elif verb == "QUIT":
+                    await reply("221 Bye")
+                    break
+                else:
+                    await reply("502 Command not implemented")
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
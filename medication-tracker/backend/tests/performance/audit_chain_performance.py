@@ -0,0 +1,77 @@
+import json
+import logging
+import time
+import pytest
+from app.security.audit_chain import AuditChain, ChainedAuditHandler
+
+def write_log(path: str, num_entries: int) -> AuditChain:
+    """Write a chained log spread over 500 users and a day of timestamps."""
+    chain = AuditChain(path, key=b"benchmark")
+    target = logging.getLogger(f"audit.benchmark.{num_entries}")
+    target.propagate = False
+    target.setLevel(logging.INFO)
+    ChainedAuditHandler.attach(target, chain, logging.Formatter('%(message)s'))
+    for i in range(num_entries):
+        seconds = i * 86400 // num_entries
+        with chain.writing():
+            entry = chain.stamp({
+                "timestamp": f"2024-01-01T{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}",
+                "event_type": "data_access",
+                "user_id": f"user_{i % 500}",
+                "resource_id": f"medication_{i}"
+            })
+            target.info(json.dumps(entry), extra={"audit_entry": entry})
+    return chain
+
+def measure_execution_time(func):
+    """Decorator to measure function execution time."""
+    def wrapper(*args, **kwargs):
+        start_time = time.perf_counter()
+        result = func(*args, **kwargs)
+        end_time = time.perf_counter()
+        execution_time = (end_time - start_time) * 1000  # Convert to milliseconds
+        return result, execution_time
+    return wrapper
+
+@measure_execution_time
+def run_full_scan_trail(path, user_id, start_time, end_time):
+    """Previous approach: json.loads every line from byte 0."""
+    trail = []
+    with open(path) as f:
+        for line in f:
+            event = json.loads(line)
+            if event["user_id"] == user_id and start_time <= event["timestamp"] <= end_time:
+                trail.append(event)
+    return trail
+
+@measure_execution_time
+def run_checkpoint_trail(chain, user_id, start_time, end_time):
+    return list(chain.query(start_time=start_time, end_time=end_time, user_id=user_id))
+
+@measure_execution_time
+def run_verify(chain, **kwargs):
+    return chain.verify(**kwargs)
+
+class TestAuditChainPerformance:
+    @pytest.mark.parametrize("num_entries", [100000])
+    def test_trail_and_verify_performance(self, tmp_path, num_entries):
+        """Compare full scans with checkpoint-indexed trails and verification."""
+        chain = write_log(str(tmp_path / "audit.log"), num_entries)
+
+        scanned, scan_time = run_full_scan_trail(chain.path, "user_7", "2024-01-01T12:00:00", "2024-01-01T13:00:00")
+        trail, trail_time = run_checkpoint_trail(chain, "user_7", "2024-01-01T12:00:00", "2024-01-01T13:00:00")
+        _, sequential_time = run_verify(chain, full=True, workers=1)
+        _, parallel_time = run_verify(chain, full=True)
+        result, incremental_time = run_verify(chain)
+
+        print(f"\nAudit Chain Performance (n={num_entries}):")
+        print(f"Full scan trail:        {scan_time:.2f}ms")
+        print(f"Checkpoint trail:       {trail_time:.2f}ms")
+        print(f"Full verify:            {sequential_time:.2f}ms")
+        print(f"Parallel full verify:   {parallel_time:.2f}ms")
+        print(f"Incremental verify:     {incremental_time:.2f}ms")
+
+        assert trail == scanned
+        assert result["valid"]
+        assert trail_time < scan_time
+        assert incremental_time < sequential_time
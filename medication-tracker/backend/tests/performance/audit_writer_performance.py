@@ -0,0 +1,80 @@
+import json
+import os
+import time
+import pytest
+from app.security.audit_writer import AuditWriter
+
+def generate_records(num_records: int):
+    """Generate audit records spread over a few users and components."""
+    return [
+        {
+            "event_id": f"EVENT_{i}",
+            "timestamp": f"2024-01-01T10:00:00.{i:06d}",
+            "level": "critical",
+            "component": ["phi_access", "login", "export"][i % 3],
+            "action": "read",
+            "user_id": f"user_{i % 50}",
+            "details": {"record": i},
+            "validation_status": True
+        }
+        for i in range(num_records)
+    ]
+
+def measure_execution_time(func):
+    """Decorator to measure function execution time."""
+    def wrapper(*args, **kwargs):
+        start_time = time.perf_counter()
+        result = func(*args, **kwargs)
+        end_time = time.perf_counter()
+        execution_time = (end_time - start_time) * 1000  # Convert to milliseconds
+        return result, execution_time
+    return wrapper
+
+@measure_execution_time
+def run_per_event_append(path, records):
+    """Previous approach: open, append, fsync and close for every event."""
+    for record in records:
+        with open(path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+@measure_execution_time
+def run_writer(directory, records):
+    """Queue every event and wait for the group commits to land."""
+    writer = AuditWriter(directory)
+    for record in records:
+        writer.write(record)
+    writer.flush()
+    return writer
+
+@measure_execution_time
+def run_scan_query(path, user_id):
+    with open(path) as f:
+        return [record for record in map(json.loads, f) if record["user_id"] == user_id]
+
+@measure_execution_time
+def run_indexed_query(writer, user_id):
+    return list(writer.query(user_id=user_id))
+
+class TestAuditWriterPerformance:
+    @pytest.mark.parametrize("num_records", [1000, 5000])
+    def test_write_and_query_performance(self, tmp_path, num_records):
+        """Compare per-event durable appends and full scans with the segment writer."""
+        records = generate_records(num_records)
+        log_path = tmp_path / "secure_audit.log"
+
+        _, baseline_time = run_per_event_append(log_path, records)
+        writer, writer_time = run_writer(str(tmp_path / "segments"), records)
+        scanned, scan_time = run_scan_query(log_path, "user_7")
+        indexed, query_time = run_indexed_query(writer, "user_7")
+        writer.close()
+
+        print(f"\nAudit Writer Performance (n={num_records}):")
+        print(f"Per-event append: {baseline_time:.2f}ms ({num_records / baseline_time * 1000:.0f} events/s)")
+        print(f"Group commit:     {writer_time:.2f}ms ({num_records / writer_time * 1000:.0f} events/s)")
+        print(f"Full scan query:  {scan_time:.2f}ms")
+        print(f"Indexed query:    {query_time:.2f}ms")
+
+        assert indexed == scanned
+        assert writer_time < baseline_time
@@ -0,0 +1,69 @@
+import json
+import os
+import time
+import pytest
+from datetime import datetime
+from app.core.evidence_sink import EvidenceSink
+
+def generate_evidence(num_records: int):
+    """Generate security validation evidence records."""
+    return [
+        {
+            'timestamp': datetime(2024, 1, 1, 10, 0, 0, i % 1000000).isoformat() + f"-{i}",
+            'endpoint': f"api.medications_{i % 20}",
+            'method': 'GET',
+            'validation_status': 'complete'
+        }
+        for i in range(num_records)
+    ]
+
+def measure_execution_time(func):
+    """Decorator to measure function execution time."""
+    def wrapper(*args, **kwargs):
+        start_time = time.perf_counter()
+        result = func(*args, **kwargs)
+        end_time = time.perf_counter()
+        execution_time = (end_time - start_time) * 1000  # Convert to milliseconds
+        return result, execution_time
+    return wrapper
+
+@measure_execution_time
+def run_file_per_record(directory, records):
+    """Previous approach: one indented JSON file per request."""
+    for evidence in records:
+        filepath = os.path.join(directory, f"{evidence['timestamp']}_security_validation.json")
+        with open(filepath, 'w') as f:
+            json.dump(evidence, f, indent=2)
+
+@measure_execution_time
+def run_submit(sink, records):
+    """Request-path cost: queue each record."""
+    for evidence in records:
+        sink.submit('security_validation', evidence)
+
+@measure_execution_time
+def run_drain(sink):
+    return sink.flush()
+
+class TestEvidenceSinkPerformance:
+    @pytest.mark.parametrize("num_records", [1000, 10000])
+    def test_evidence_write_performance(self, tmp_path, num_records):
+        """Compare per-record files with the batched sink."""
+        records = generate_evidence(num_records)
+        files_dir = tmp_path / "files"
+        files_dir.mkdir()
+        sink = EvidenceSink(str(tmp_path / "evidence.db"), max_queue=num_records)
+
+        _, file_time = run_file_per_record(str(files_dir), records)
+        _, submit_time = run_submit(sink, records)
+        _, drain_time = run_drain(sink)
+        stats = sink.stats()
+        sink.close()
+
+        print(f"\nEvidence Sink Performance (n={num_records}):")
+        print(f"File per record: {file_time:.2f}ms ({num_records} files)")
+        print(f"Sink submit:     {submit_time:.2f}ms (request path)")
+        print(f"Sink drain:      {drain_time:.2f}ms ({stats['batches']} batches)")
+
+        assert stats['written'] == num_records
+        assert submit_time < file_time
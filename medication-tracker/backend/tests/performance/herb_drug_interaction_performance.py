@@ -0,0 +1,97 @@
+import time
+import json
+import asyncio
+import threading
+import statistics
+import pytest
+import requests
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from app.services.herb_drug_interaction_service import HerbDrugInteractionService
+
+UPSTREAM_LATENCY = 0.02  # Seconds each stub source takes to answer
+
+class StubSourceHandler(BaseHTTPRequestHandler):
+    """Answers every source endpoint after a fixed delay."""
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        time.sleep(UPSTREAM_LATENCY)
+        if self.path.startswith('/medline'):
+            body = b'<result><document><content>Use caution.</content></document></result>'
+            content_type = 'application/xml'
+        else:
+            body = json.dumps({'result': {'safety': {'interactions': ['Use with caution.']}}}).encode()
+            content_type = 'application/json'
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture(scope='module')
+def stub_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubSourceHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+
+def point_at_stub(service: HerbDrugInteractionService, base_url: str):
+    service.medline_base_url = f'{base_url}/medline'
+    service.dailymed_base_url = f'{base_url}/dailymed'
+    service.nccih_base_url = f'{base_url}/nccih'
+    service.openfda_base_url = f'{base_url}/openfda'
+
+def sequential_blocking_check(service: HerbDrugInteractionService, herb: str, drug: str):
+    """The previous implementation: four blocking requests one after another."""
+    requests.get(service.medline_base_url, params={'term': f'{herb} {drug} interaction'})
+    requests.get(f'{service.dailymed_base_url}/drugnames.json', params={'drug_name': drug})
+    requests.get(f'{service.nccih_base_url}/search', params={'term': herb})
+    requests.get(f'{service.openfda_base_url}/enforcement.json', params={'search': drug})
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return (
+        statistics.median(samples),
+        samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    )
+
+class TestHerbDrugInteractionPerformance:
+    @pytest.mark.parametrize("num_checks", [50])
+    def test_check_interaction_latency(self, stub_server, num_checks):
+        """Compare per-check latency of sequential and concurrent fan-out."""
+        service = HerbDrugInteractionService()
+        point_at_stub(service, stub_server)
+
+        before = []
+        for i in range(num_checks):
+            start_time = time.perf_counter()
+            sequential_blocking_check(service, 'ginkgo', f'drug{i}')
+            before.append((time.perf_counter() - start_time) * 1000)
+
+        async def run_concurrent():
+            samples = []
+            for i in range(num_checks):
+                start_time = time.perf_counter()
+                await service.check_interaction('ginkgo', f'drug{i}')
+                samples.append((time.perf_counter() - start_time) * 1000)
+            cached_start = time.perf_counter()
+            await service.check_interaction('ginkgo', 'drug0')
+            cached = (time.perf_counter() - cached_start) * 1000
+            await service.close()
+            return samples, cached
+
+        after, cached = asyncio.run(run_concurrent())
+
+        before_p50, before_p99 = percentiles(before)
+        after_p50, after_p99 = percentiles(after)
+        print(f"\nHerb-Drug Check Latency (n={num_checks}, upstream={UPSTREAM_LATENCY * 1000:.0f}ms/source):")
+        print(f"Sequential: p50={before_p50:.2f}ms p99={before_p99:.2f}ms")
+        print(f"Concurrent: p50={after_p50:.2f}ms p99={after_p99:.2f}ms")
+        print(f"Cached repeat: {cached:.3f}ms")
+
+        assert after_p50 < before_p50 / 2, "Concurrent fan-out should approach a single round trip"
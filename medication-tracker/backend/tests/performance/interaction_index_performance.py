@@ -0,0 +1,80 @@
+import time
+import pytest
+import random
+from datetime import timedelta
+from unittest.mock import Mock
+from app.services.drug_interaction_service import DrugInteractionService
+from app.services.label_cache import LRUCache, TieredCache
+from app.services.interaction_index import InteractionIndex
+
+FILLER = (
+    "Patients should be monitored for adverse reactions when this product is "
+    "co-administered with other agents metabolized by CYP3A4 or CYP2C9. "
+)
+
+def generate_labels(num_medications: int) -> dict:
+    """Generate FDA-style label data where each drug mentions a few others."""
+    names = [f'drug{i:03d}' for i in range(num_medications)]
+    labels = {}
+    for name in names:
+        mentioned = random.sample(names, min(3, len(names)))
+        labels[name] = {
+            'drug_interactions': [FILLER * 20 + f'Avoid use with {other}.' for other in mentioned],
+            'warnings': [FILLER * 30],
+            'contraindications': [],
+            'precautions': [FILLER * 10 + f'Caution with {mentioned[0]}.']
+        }
+    return labels
+
+def all_pairs(names):
+    return [(a, b) for i, a in enumerate(names) for b in names[i + 1:]]
+
+def measure_execution_time(func):
+    """Decorator to measure function execution time."""
+    def wrapper(*args, **kwargs):
+        start_time = time.perf_counter()
+        result = func(*args, **kwargs)
+        end_time = time.perf_counter()
+        execution_time = (end_time - start_time) * 1000  # Convert to milliseconds
+        return result, execution_time
+    return wrapper
+
+@measure_execution_time
+def run_service_pairs(service: DrugInteractionService, pairs):
+    """Check every pair with the substring-scanning service."""
+    return [service.check_interaction(a, b) for a, b in pairs]
+
+@measure_execution_time
+def run_index_pairs(index: InteractionIndex, pairs):
+    """Check every pair against the precomputed index."""
+    return [index.check_interaction(a, b) for a, b in pairs]
+
+class TestInteractionIndexPerformance:
+    @pytest.mark.parametrize("num_medications", [5, 20, 50])
+    def test_pair_check_throughput(self, num_medications):
+        """Compare pair-check throughput of the index against the service."""
+        labels = generate_labels(num_medications)
+        pairs = all_pairs(list(labels))
+
+        service = DrugInteractionService(TieredCache(LRUCache()))
+        for name, data in labels.items():
+            service.label_cache.set(name, data)
+
+        provider = Mock()
+        provider.cache_duration = timedelta(days=7)
+        provider.get_drug_interactions.side_effect = labels.get
+        index = InteractionIndex(provider)
+
+        start_time = time.perf_counter()
+        index.ensure(labels)
+        build_time = (time.perf_counter() - start_time) * 1000
+
+        expected, service_time = run_service_pairs(service, pairs)
+        results, index_time = run_index_pairs(index, pairs)
+
+        print(f"\nInteraction Pair Check Performance (n={num_medications}, pairs={len(pairs)}):")
+        print(f"Service: {len(pairs) / (service_time / 1000):,.0f} pairs/s ({service_time:.2f}ms)")
+        print(f"Index:   {len(pairs) / (index_time / 1000):,.0f} pairs/s ({index_time:.2f}ms, build {build_time:.2f}ms)")
+
+        assert results == expected
+        assert index_time < service_time, "Index lookups should beat label scanning"
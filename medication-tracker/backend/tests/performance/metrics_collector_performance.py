@@ -0,0 +1,86 @@
+import json
+import time
+import pytest
+import random
+from datetime import datetime, timedelta
+from pathlib import Path
+from app.core.segmented_store import SegmentedStore
+
+METRIC_NAMES = [f"metric_{i}" for i in range(20)]
+
+def generate_records(count: int):
+    """Generate metric records one second apart."""
+    start = datetime(2024, 1, 1)
+    return [
+        {
+            "name": random.choice(METRIC_NAMES),
+            "value": random.random() * 100,
+            "labels": {"env": "test"},
+            "timestamp": (start + timedelta(seconds=i)).isoformat()
+        }
+        for i in range(count)
+    ]
+
+def measure_execution_time(func):
+    """Decorator to measure function execution time."""
+    def wrapper(*args, **kwargs):
+        start_time = time.perf_counter()
+        result = func(*args, **kwargs)
+        end_time = time.perf_counter()
+        execution_time = (end_time - start_time) * 1000  # Convert to milliseconds
+        return result, execution_time
+    return wrapper
+
+@measure_execution_time
+def run_full_rewrite(directory: Path, records):
+    """Previous approach: rewrite the whole metrics.json after every metric."""
+    metrics = {}
+    for record in records:
+        metrics.setdefault(record["name"], {"values": []})["values"].append(record)
+        with open(directory / "metrics.json", "w") as f:
+            json.dump(metrics, f, indent=2)
+
+@measure_execution_time
+def run_segmented_append(directory: Path, records):
+    """Buffered appends to time-indexed segments."""
+    store = SegmentedStore(str(directory), retention=None)
+    for record in records:
+        store.append(record)
+    store.flush()
+    return store
+
+@measure_execution_time
+def run_range_summary(store: SegmentedStore, start: str, end: str):
+    return store.stats(start, end)
+
+class TestMetricsCollectorPerformance:
+    @pytest.mark.parametrize("num_metrics", [200, 1000])
+    def test_ingestion_performance(self, num_metrics, tmp_path):
+        """Compare full-file rewrites with segmented appends."""
+        random.seed(num_metrics)
+        records = generate_records(num_metrics)
+
+        (tmp_path / "rewrite").mkdir()
+        _, rewrite_time = run_full_rewrite(tmp_path / "rewrite", records)
+        store, append_time = run_segmented_append(tmp_path / "segments", records)
+
+        print(f"\nMetrics Ingestion Performance (n={num_metrics}):")
+        print(f"Full rewrite:  {rewrite_time:.2f}ms")
+        print(f"Segmented:     {append_time:.2f}ms ({len(store.segments)} segments)")
+
+        assert sum(segment.count for segment in store.segments) == num_metrics
+        assert append_time < rewrite_time
+
+    def test_range_summary_performance(self, tmp_path):
+        """Summaries over a day of history read only boundary segments."""
+        records = generate_records(86400)
+        store, _ = run_segmented_append(tmp_path, records)
+
+        _, full_time = run_range_summary(store, None, None)
+        _, range_time = run_range_summary(store, records[1800]["timestamp"], records[5400]["timestamp"])
+
+        print(f"\nMetrics Summary Performance ({len(store.segments)} segments, 86400 values):")
+        print(f"Whole history: {full_time:.2f}ms")
+        print(f"One hour:      {range_time:.2f}ms")
+
+        assert full_time < 100
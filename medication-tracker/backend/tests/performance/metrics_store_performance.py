@@ -0,0 +1,111 @@
+import json
+import os
+import time
+import pytest
+from datetime import datetime, timedelta
+from app.services.metrics_store import ColumnarMetricsStore
+
+START = datetime(2024, 1, 1)
+
+def generate_metrics(num_metrics: int, days: int = 7):
+    """Generate performance metrics spread evenly over a number of days."""
+    step = timedelta(days=days) / num_metrics
+    return [
+        {
+            'timestamp': (START + step * i).isoformat(),
+            'metric_type': 'performance',
+            'name': f"component_{i % 10}.action",
+            'value': {'duration': (i % 500) / 10, 'metadata': {}},
+            'priority': 'high',
+            'status': 'complete'
+        }
+        for i in range(num_metrics)
+    ]
+
+def measure_execution_time(func):
+    """Decorator to measure function execution time."""
+    def wrapper(*args, **kwargs):
+        start_time = time.perf_counter()
+        result = func(*args, **kwargs)
+        end_time = time.perf_counter()
+        execution_time = (end_time - start_time) * 1000  # Convert to milliseconds
+        return result, execution_time
+    return wrapper
+
+def write_json_files(directory, metrics, batch_size=100):
+    """Previous layout: one JSON file per buffer flush."""
+    for i in range(0, len(metrics), batch_size):
+        batch = metrics[i:i + batch_size]
+        with open(os.path.join(directory, f"performance_{batch[0]['timestamp']}.json"), 'w') as f:
+            json.dump(batch, f, indent=2)
+
+@measure_execution_time
+def run_json_scan(directory, start_time, end_time):
+    """Previous approach: list, parse and filter every metrics file."""
+    metrics = []
+    for filename in os.listdir(directory):
+        if not filename.startswith('performance'):
+            continue
+        with open(os.path.join(directory, filename)) as f:
+            for metric in json.load(f):
+                if start_time.isoformat() <= metric['timestamp'] <= end_time.isoformat():
+                    metrics.append(metric)
+    return metrics
+
+@measure_execution_time
+def run_json_hourly_mean(directory):
+    sums = {}
+    for filename in os.listdir(directory):
+        with open(os.path.join(directory, filename)) as f:
+            for metric in json.load(f):
+                key = (metric['timestamp'][:13], metric['name'])
+                total, count = sums.get(key, (0.0, 0))
+                sums[key] = (total + metric['value']['duration'], count + 1)
+    return sums
+
+@measure_execution_time
+def run_columnar(store, start_time, end_time, columns):
+    return store.query('performance', start_time, end_time, columns=columns)
+
+@measure_execution_time
+def run_rollup(store, resolution):
+    return store.rollup(resolution, 'performance')
+
+class TestMetricsStorePerformance:
+    @pytest.mark.parametrize("num_metrics", [10000, 100000])
+    def test_metrics_query_performance(self, tmp_path, num_metrics):
+        """Compare JSON file scans with the columnar store over a week of metrics."""
+        metrics = generate_metrics(num_metrics)
+        json_dir = tmp_path / "json"
+        json_dir.mkdir()
+        write_json_files(str(json_dir), metrics)
+
+        store = ColumnarMetricsStore(str(tmp_path / "columnar"), flush_size=len(metrics) + 1)
+        for metric in metrics:
+            store.append('performance', metric)
+        store.flush()
+
+        window_start = START + timedelta(days=3)
+        window_end = window_start + timedelta(hours=6)
+
+        json_window, json_window_time = run_json_scan(str(json_dir), window_start, window_end)
+        column_window, column_window_time = run_columnar(store, window_start, window_end, ['timestamp', 'value'])
+        record_window, record_window_time = run_columnar(store, window_start, window_end, ['record'])
+        json_hourly, json_hourly_time = run_json_hourly_mean(str(json_dir))
+        hourly, rollup_time = run_rollup(store, '1h')
+        _, warm_rollup_time = run_rollup(store, '1h')
+
+        print(f"\nMetrics store ({num_metrics} metrics over 7 days):")
+        print(f"6h window, JSON scan:        {json_window_time:.2f}ms ({len(json_window)} metrics)")
+        print(f"6h window, columnar values:  {column_window_time:.2f}ms")
+        print(f"6h window, columnar records: {record_window_time:.2f}ms")
+        print(f"Hourly means, JSON scan:     {json_hourly_time:.2f}ms")
+        print(f"Hourly means, 1h rollup:     {rollup_time:.2f}ms cold, {warm_rollup_time:.2f}ms warm ({len(hourly)} buckets)")
+
+        assert len(column_window['value']) == len(json_window) == len(record_window['record'])
+        assert len(hourly) == len(json_hourly)
+        assert column_window_time < json_window_time
+        assert warm_rollup_time < json_hourly_time
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
@@ -0,0 +1,136 @@
+import time
+import pytest
+import random
+import sqlalchemy as sa
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import List
+from sqlalchemy.dialects import sqlite
+from app.services.schedule_expansion import expand_medications
+
+SCHEDULE_AHEAD = timedelta(days=7)
+BATCH_SIZE = 1000
+
+def create_store():
+    """In-memory notifications table with the schedule key constraint."""
+    metadata = sa.MetaData()
+    table = sa.Table(
+        'notifications', metadata,
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('user_id', sa.Integer, nullable=False),
+        sa.Column('medication_id', sa.Integer),
+        sa.Column('type', sa.String(50), nullable=False),
+        sa.Column('scheduled_time', sa.DateTime, nullable=False),
+        sa.Column('data', sa.JSON),
+        sa.UniqueConstraint('medication_id', 'type', 'scheduled_time')
+    )
+    engine = sa.create_engine('sqlite://')
+    metadata.create_all(engine)
+    return engine, table
+
+def generate_medications(num_medications: int) -> List[SimpleNamespace]:
+    """Generate medications with 1-4 daily dose times."""
+    return [
+        SimpleNamespace(
+            id=i,
+            user_id=i // 3,
+            dose_times=[f'{random.randint(0, 23):02d}:00' for _ in range(random.randint(1, 4))],
+            is_prn=False,
+            start_date=None,
+            end_date=None,
+            user=None
+        )
+        for i in range(num_medications)
+    ]
+
+def dose_rows(medications, now: datetime):
+    doses = expand_medications(medications, now, now + SCHEDULE_AHEAD)
+    for owner, dose_time in zip(doses.owners.tolist(), doses.times.astype(datetime).tolist()):
+        medication = medications[owner]
+        yield {
+            'user_id': medication.user_id,
+            'medication_id': medication.id,
+            'type': 'MISSED_DOSE',
+            'scheduled_time': dose_time + timedelta(minutes=30),
+            'data': {'medication_id': medication.id}
+        }
+
+def measure_execution_time(func):
+    """Decorator to measure function execution time."""
+    def wrapper(*args, **kwargs):
+        start_time = time.perf_counter()
+        result = func(*args, **kwargs)
+        end_time = time.perf_counter()
+        execution_time = (end_time - start_time) * 1000  # Convert to milliseconds
+        return result, execution_time
+    return wrapper
+
+@measure_execution_time
+def run_per_row_materialization(engine, table, medications, now: datetime):
+    """Previous approach: one existence query and insert per dose, commit per medication."""
+    created = 0
+    rows_by_medication = {}
+    for row in dose_rows(medications, now):
+        rows_by_medication.setdefault(row['medication_id'], []).append(row)
+
+    for medication_rows in rows_by_medication.values():
+        with engine.begin() as connection:
+            for row in medication_rows:
+                existing = connection.execute(
+                    sa.select(table.c.id).where(
+                        table.c.medication_id == row['medication_id'],
+                        table.c.type == row['type'],
+                        table.c.scheduled_time == row['scheduled_time']
+                    )
+                ).first()
+                if not existing:
+                    connection.execute(table.insert(), row)
+                    created += 1
+    return created
+
+@measure_execution_time
+def run_set_based_materialization(engine, table, medications, now: datetime):
+    """One key query for the window, in-memory diff, chunked bulk insert."""
+    with engine.connect() as connection:
+        existing = set(connection.execute(
+            sa.select(table.c.medication_id, table.c.type, table.c.scheduled_time).where(
+                table.c.scheduled_time >= now
+            )
+        ).all())
+
+    rows = []
+    for row in dose_rows(medications, now):
+        key = (row['medication_id'], row['type'], row['scheduled_time'])
+        if key not in existing:
+            existing.add(key)
+            rows.append(row)
+
+    statement = sqlite.insert(table).on_conflict_do_nothing()
+    for offset in range(0, len(rows), BATCH_SIZE):
+        with engine.begin() as connection:
+            connection.execute(statement, rows[offset:offset + BATCH_SIZE])
+    return len(rows)
+
+class TestNotificationSchedulerPerformance:
+    @pytest.mark.parametrize("num_medications", [100, 1000])
+    def test_materialization_performance(self, num_medications):
+        """Compare per-row and set-based notification materialization."""
+        random.seed(num_medications)
+        medications = generate_medications(num_medications)
+        now = datetime(2024, 1, 1)
+
+        engine, table = create_store()
+        per_row, per_row_time = run_per_row_materialization(engine, table, medications, now)
+
+        engine, table = create_store()
+        set_based, set_based_time = run_set_based_materialization(engine, table, medications, now)
+        rerun, rerun_time = run_set_based_materialization(engine, table, medications, now)
+
+        print(f"\nNotification Materialization Performance (n={num_medications}):")
+        print(f"Per-row:   {per_row_time:.2f}ms ({per_row / per_row_time * 1000:.0f} rows/s)")
+        print(f"Set-based: {set_based_time:.2f}ms ({set_based / set_based_time * 1000:.0f} rows/s)")
+        print(f"Re-run:    {rerun_time:.2f}ms ({rerun} new rows)")
+
+        assert per_row == set_based
+        assert rerun == 0
+        assert set_based_time < per_row_time
@@ -0,0 +1,60 @@
+import asyncio
+import time
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch
+import fakeredis.aioredis
+from app.infrastructure.queue import worker as worker_module
+from app.infrastructure.queue.redis_manager import RedisQueueManager
+from app.infrastructure.queue.worker import NotificationWorker
+
+# Simulated downstream send time
+SEND_SECONDS = 0.01
+SETTINGS = SimpleNamespace(QUEUE_POLL_INTERVAL=1.0, QUEUE_ERROR_RETRY_INTERVAL=0.1, MAX_NOTIFICATION_ATTEMPTS=3)
+
+class MockService:
+    def __init__(self):
+        self.sent = 0
+
+    async def send_notification(self, notification):
+        await asyncio.sleep(SEND_SECONDS)
+        self.sent += 1
+
+async def drain_spike(num_notifications, concurrency):
+    """Enqueue a reminder spike and time how long one worker takes to send it."""
+    manager = RedisQueueManager()
+    manager.redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    with patch.object(worker_module, "queue_manager", manager), \
+            patch.object(worker_module, "settings", SETTINGS), \
+            patch.object(worker_module.Notification, "from_dict",
+                         side_effect=lambda data: SimpleNamespace(**data), create=True):
+        for i in range(num_notifications):
+            await manager.enqueue_notification({"id": i, "channel": "push"})
+
+        service = MockService()
+        start_time = time.perf_counter()
+        worker = await NotificationWorker.create_and_start(service, concurrency=concurrency, channel_limits={})
+        while service.sent < num_notifications:
+            await asyncio.sleep(0.005)
+        elapsed = time.perf_counter() - start_time
+        await worker.stop()
+        return elapsed, worker.stats()
+
+class TestNotificationWorkerPerformance:
+    @pytest.mark.parametrize("num_notifications", [500, 2000])
+    @pytest.mark.asyncio
+    async def test_spike_drain(self, num_notifications):
+        """Compare serial processing with the concurrent worker pool."""
+        results = {}
+        for concurrency in (1, 16, 64):
+            results[concurrency] = await drain_spike(num_notifications, concurrency)
+
+        print(f"\nReminder spike ({num_notifications} notifications, {SEND_SECONDS * 1000:.0f}ms per send):")
+        for concurrency, (elapsed, stats) in results.items():
+            print(f"concurrency {concurrency:>3}: {num_notifications / elapsed:8.1f} sends/sec, "
+                  f"p99 send {stats['latency_p99'] * 1000:.1f}ms")
+
+        assert results[64][0] < results[1][0] / 10
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
@@ -0,0 +1,90 @@
+import asyncio
+import time
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch
+from firebase_admin import messaging
+from app.infrastructure.notification import push_batcher
+from app.infrastructure.notification.push_batcher import PushDeliveryBatcher
+
+# Simulated costs: one FCM HTTP request, per-message batch overhead, one MongoDB write
+FCM_REQUEST_SECONDS = 0.005
+FCM_PER_MESSAGE_SECONDS = 0.00002
+MONGO_WRITE_SECONDS = 0.001
+
+class MockMonitor:
+    """NotificationMonitor stand-in that only pays write latency."""
+
+    def __init__(self):
+        self.writes = 0
+
+    async def _write(self):
+        self.writes += 1
+        await asyncio.sleep(MONGO_WRITE_SECONDS)
+
+    async def log_notification(self, **kwargs):
+        await self._write()
+
+    async def update_status(self, **kwargs):
+        await self._write()
+
+    async def log_notifications(self, logs):
+        await self._write()
+
+    async def update_statuses(self, updates):
+        await self._write()
+
+def mock_send(message, dry_run=False):
+    time.sleep(FCM_REQUEST_SECONDS)
+    return f"id-{message.token}"
+
+def mock_send_each(messages):
+    time.sleep(FCM_REQUEST_SECONDS + FCM_PER_MESSAGE_SECONDS * len(messages))
+    return SimpleNamespace(responses=[
+        SimpleNamespace(message_id=f"id-{message.token}", exception=None) for message in messages
+    ])
+
+async def send_unbatched(monitor, token):
+    """Previous approach: two awaited writes around a blocking send on the event loop."""
+    await monitor.log_notification(notification_id=token)
+    response = mock_send(messaging.Message(token=token))
+    await monitor.update_status(notification_id=token)
+    return response
+
+async def measure(coro):
+    start_time = time.perf_counter()
+    result = await coro
+    return result, time.perf_counter() - start_time
+
+class TestPushDeliveryPerformance:
+    @pytest.mark.parametrize("num_pushes", [500, 2000])
+    @pytest.mark.asyncio
+    async def test_push_throughput(self, num_pushes):
+        """Compare unbatched single-device pushes with the delivery batcher."""
+        tokens = [f"token-{i}" for i in range(num_pushes)]
+
+        unbatched_monitor = MockMonitor()
+        _, unbatched_time = await measure(asyncio.gather(*(
+            send_unbatched(unbatched_monitor, token) for token in tokens
+        )))
+
+        batched_monitor = MockMonitor()
+        batcher = PushDeliveryBatcher(batched_monitor)
+        with patch.object(push_batcher.messaging, "send_each", mock_send_each):
+            results, batched_time = await measure(asyncio.gather(*(
+                batcher.send(messaging.Message(token=token), {"notification_id": token, "tokens": [token]})
+                for token in tokens
+            )))
+
+        unbatched_rate = num_pushes / unbatched_time
+        batched_rate = num_pushes / batched_time
+        print(f"\nPush delivery ({num_pushes} single-device pushes):")
+        print(f"Unbatched: {unbatched_rate:8.1f} pushes/sec, {unbatched_monitor.writes} monitor writes")
+        print(f"Batched:   {batched_rate:8.1f} pushes/sec, {batched_monitor.writes} monitor writes")
+
+        assert all(result["success"] for result in results)
+        assert batched_monitor.writes == 2 * -(-num_pushes // push_batcher.MAX_BATCH_SIZE)
+        assert batched_rate > unbatched_rate * 10
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
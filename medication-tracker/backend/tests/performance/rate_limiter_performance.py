@@ -0,0 +1,81 @@
+import os
+import time
+import asyncio
+import statistics
+import pytest
+import httpx
+import redis.asyncio as redis
+from fastapi import FastAPI
+from app.middleware.rate_limiter import RateLimiter
+
+REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+
+def create_app(limited: bool, redis_client=None) -> FastAPI:
+    app = FastAPI()
+    if limited:
+        app.add_middleware(RateLimiter, redis_client=redis_client)
+
+    @app.get("/api/history/{run_id}")
+    async def history(run_id: str):
+        return {"history": []}
+
+    return app
+
+async def redis_available(client) -> bool:
+    try:
+        await client.ping()
+        return True
+    except (redis.RedisError, OSError):
+        return False
+
+async def run_load(app: FastAPI, total_requests: int, concurrency: int):
+    """Fire requests from many clients at once and record per-request latency."""
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+    # A fresh path per run keeps every request within the default burst of 120
+    path = f"/api/history/{time.monotonic_ns()}"
+
+    started = time.perf_counter()
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        async def one():
+            async with semaphore:
+                start_time = time.perf_counter()
+                response = await client.get(path)
+                latencies.append((time.perf_counter() - start_time) * 1000)
+                return response.status_code
+
+        statuses = await asyncio.gather(*(one() for _ in range(total_requests)))
+    wall_time = (time.perf_counter() - started) * 1000
+    return statuses, latencies, wall_time
+
+def summarize(latencies):
+    ordered = sorted(latencies)
+    return statistics.median(ordered), ordered[int(len(ordered) * 0.99) - 1]
+
+class TestRateLimiterPerformance:
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("concurrency", [1, 50])
+    async def test_added_latency(self, concurrency):
+        """Measure per-request latency added by the rate limiter."""
+        total_requests = 100
+        redis_client = redis.from_url(REDIS_URL)
+        backends = {'none': create_app(False), 'local': create_app(True)}
+        if await redis_available(redis_client):
+            backends['redis'] = create_app(True, redis_client)
+
+        results = {}
+        for name, app in backends.items():
+            statuses, latencies, wall_time = await run_load(app, total_requests, concurrency)
+            results[name] = (statuses, summarize(latencies), wall_time / total_requests)
+
+        base_per_request = results['none'][2]
+        print(f"\nRate Limiter Performance (concurrency={concurrency}):")
+        for name, (statuses, (p50, p99), per_request) in results.items():
+            print(f"{name:>6}: p50 {p50:.3f}ms, p99 {p99:.3f}ms, "
+                  f"added {per_request - base_per_request:.3f}ms/request, "
+                  f"{statuses.count(429)} limited")
+
+        await redis_client.aclose()
+        assert all(result[0].count(200) == total_requests for result in results.values())
+        assert results['local'][2] - base_per_request < 5
@@ -0,0 +1,93 @@
+import asyncio
+import json
+import os
+import time
+import pytest
+from collections import Counter
+from datetime import datetime, timedelta
+import fakeredis.aioredis
+import redis.asyncio as redis
+from app.infrastructure.queue.redis_manager import RedisQueueManager
+
+NUM_WORKERS = 10
+
+def create_client():
+    """A real Redis when REDIS_BENCHMARK_URL is set, otherwise an in-process stand-in."""
+    url = os.getenv("REDIS_BENCHMARK_URL")
+    if url:
+        return redis.from_url(url, decode_responses=True)
+    return fakeredis.aioredis.FakeRedis(decode_responses=True)
+
+async def fill_scheduled(client, num_messages):
+    due = (datetime.utcnow() - timedelta(seconds=1)).timestamp()
+    await client.delete("scheduled_notifications", "notification_queue", "notification_processing")
+    for start in range(0, num_messages, 1000):
+        await client.zadd("scheduled_notifications", {
+            json.dumps({"id": i, "data": {"id": i}, "attempts": 0}): due
+            for i in range(start, min(start + 1000, num_messages))
+        })
+
+async def legacy_dequeue(client):
+    """Previous approach: read the next due item, then remove it in a separate command."""
+    now = datetime.utcnow().timestamp()
+    scheduled = await client.zrangebyscore("scheduled_notifications", "-inf", now, start=0, num=1)
+    if scheduled:
+        await client.zrem("scheduled_notifications", scheduled[0])
+        return json.loads(scheduled[0])
+    return None
+
+async def run_workers(claim):
+    """Drain the queue with concurrent workers; returns every delivered id."""
+    delivered = []
+
+    async def worker():
+        while True:
+            batch = await claim()
+            if not batch:
+                return
+            delivered.extend(notification["data"]["id"] for notification in batch)
+
+    start_time = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(NUM_WORKERS)))
+    return delivered, time.perf_counter() - start_time
+
+class TestRedisQueuePerformance:
+    @pytest.mark.parametrize("num_messages", [2000, 10000])
+    @pytest.mark.asyncio
+    async def test_dequeue_throughput(self, num_messages):
+        """Compare the read-then-remove dequeue with atomic batch claims."""
+        client = create_client()
+        results = {}
+
+        await fill_scheduled(client, num_messages)
+
+        async def legacy():
+            notification = await legacy_dequeue(client)
+            return [notification] if notification else []
+
+        results["legacy"] = await run_workers(legacy)
+
+        for batch_size in (1, 50):
+            await fill_scheduled(client, num_messages)
+            manager = RedisQueueManager()
+            manager.redis = client
+            results[f"claim x{batch_size}"] = await run_workers(
+                lambda: manager.claim_notifications(batch_size)
+            )
+
+        print(f"\nRedis queue ({num_messages} due notifications, {NUM_WORKERS} workers):")
+        for name, (delivered, elapsed) in results.items():
+            duplicates = sum(count - 1 for count in Counter(delivered).values())
+            print(f"{name:<10} {len(set(delivered)) / elapsed:10.1f} msgs/sec, {duplicates} duplicate deliveries")
+
+        for name, (delivered, _) in results.items():
+            if name != "legacy":
+                assert sorted(delivered) == list(range(num_messages))
+        claim_rate = num_messages / results["claim x50"][1]
+        legacy_rate = len(set(results["legacy"][0])) / results["legacy"][1]
+        assert claim_rate > legacy_rate
+
+        await client.aclose()
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
@@ -0,0 +1,111 @@
+import os
+import time
+import pytest
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+import fakeredis
+import redis
+from rq import Queue, Retry
+from app.workers import reminder_worker as reminder_module
+from app.workers.reminder_worker import ReminderWorker
+
+# Simulated network round trip to Redis
+RTT_SECONDS = 0.0005
+NUM_USERS = 500
+
+def create_client():
+    """A real Redis when REDIS_BENCHMARK_URL is set, otherwise an in-process stand-in."""
+    url = os.getenv("REDIS_BENCHMARK_URL")
+    if url:
+        return redis.from_url(url)
+    return fakeredis.FakeRedis()
+
+def create_worker(client):
+    worker = ReminderWorker.__new__(ReminderWorker)
+    worker.settings = SimpleNamespace(MAX_REMINDERS_PER_15_MIN=100, NOTIFICATION_MAX_RETRIES=3)
+    worker.redis_conn = client
+    worker.queue = Queue('reminders', connection=client)
+    worker.notification_service = SimpleNamespace(send_notification=print)
+    return worker
+
+def create_medications(num_reminders):
+    return [
+        SimpleNamespace(id=i, user_id=i % NUM_USERS, name="Test Medication", dosage="10mg")
+        for i in range(num_reminders)
+    ]
+
+def legacy_process(worker, medication, current_time):
+    """Previous approach: GET/SETEX/INCR and one enqueue per reminder."""
+    key = f"reminder_rate_limit:{medication.user_id}"
+    count = worker.redis_conn.get(key)
+    if count is None:
+        worker.redis_conn.setex(key, timedelta(minutes=15), 1)
+    elif int(count) >= worker.settings.MAX_REMINDERS_PER_15_MIN:
+        return
+    else:
+        worker.redis_conn.incr(key)
+    worker.queue.enqueue(
+        worker.notification_service.send_notification,
+        worker._notification_data(medication, current_time),
+        retry=Retry(max=worker.settings.NOTIFICATION_MAX_RETRIES),
+        ttl=300
+    )
+
+def measure(process, client):
+    """Run process() counting Redis round trips, each delayed by RTT_SECONDS."""
+    round_trips = [0]
+    execute_command = redis.Redis.execute_command
+    execute_pipeline = redis.client.Pipeline.execute
+
+    def command(self, *args, **kwargs):
+        round_trips[0] += 1
+        time.sleep(RTT_SECONDS)
+        return execute_command(self, *args, **kwargs)
+
+    def pipeline(self, *args, **kwargs):
+        round_trips[0] += 1
+        time.sleep(RTT_SECONDS)
+        return execute_pipeline(self, *args, **kwargs)
+
+    client.flushdb()
+    with patch.object(redis.Redis, "execute_command", command), \
+            patch.object(redis.client.Pipeline, "execute", pipeline), \
+            patch.object(reminder_module, "audit_logger", Mock()):
+        start_time = time.perf_counter()
+        process()
+        elapsed = time.perf_counter() - start_time
+    return elapsed, round_trips[0]
+
+class TestReminderBatchPerformance:
+    @pytest.mark.parametrize("num_reminders", [500, 2000])
+    def test_reminder_tick(self, num_reminders):
+        """Compare per-reminder rate limiting and enqueueing with batched round trips."""
+        client = create_client()
+        worker = create_worker(client)
+        medications = create_medications(num_reminders)
+        now = datetime.utcnow()
+
+        def serial():
+            for medication in medications:
+                legacy_process(worker, medication, now)
+
+        def batched():
+            for start in range(0, num_reminders, reminder_module.REMINDER_BATCH_SIZE):
+                worker._process_reminder_batch(medications[start:start + reminder_module.REMINDER_BATCH_SIZE], now)
+
+        results = {"serial": measure(serial, client)}
+        queued = {"serial": worker.queue.count}
+        results["batched"] = measure(batched, client)
+        queued["batched"] = worker.queue.count
+
+        print(f"\nReminder tick ({num_reminders} reminders, {RTT_SECONDS * 1000:.1f}ms simulated RTT):")
+        for name, (elapsed, round_trips) in results.items():
+            print(f"{name:<8} {num_reminders / elapsed:10.1f} reminders/sec, {round_trips} Redis round trips")
+
+        assert queued["serial"] == queued["batched"] == num_reminders
+        assert results["batched"][1] < results["serial"][1] / 50
+        assert results["batched"][0] < results["serial"][0]
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
@@ -0,0 +1,76 @@
+import time
+import pytest
+from datetime import datetime, timedelta
+import pytz
+import fakeredis.aioredis
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.cron import CronTrigger
+from app.infrastructure.notification.reminder_engine import ReminderEngine
+
+NUM_UPDATES = 200
+SCHEDULE = {"type": "daily", "times": ["08:00", "20:00"]}
+NOW = datetime(2025, 1, 6, 7, 59, 30, tzinfo=pytz.UTC)
+
+async def noop(*args):
+    pass
+
+def legacy_remove(scheduler, medication_id):
+    """Previous approach: scan every job for the medication's prefix."""
+    for job in scheduler.get_jobs():
+        if job.id.startswith(f"med_{medication_id}_"):
+            job.remove()
+
+def legacy_schedule(scheduler, medication_id):
+    for dose_time in SCHEDULE["times"]:
+        hour, minute = map(int, dose_time.split(':'))
+        scheduler.add_job(
+            noop,
+            trigger=CronTrigger(hour=hour, minute=minute, timezone=pytz.UTC),
+            id=f"med_{medication_id}_{dose_time}",
+            replace_existing=True
+        )
+
+class TestReminderEnginePerformance:
+    @pytest.mark.parametrize("num_medications", [2000, 10000])
+    @pytest.mark.asyncio
+    async def test_schedule_updates(self, num_medications):
+        """Compare schedule updates against per-dose APScheduler jobs and the timing wheel."""
+        scheduler = AsyncIOScheduler()
+        scheduler.start(paused=True)
+        for i in range(num_medications):
+            legacy_schedule(scheduler, i)
+
+        start_time = time.perf_counter()
+        for i in range(NUM_UPDATES):
+            legacy_remove(scheduler, i)
+            legacy_schedule(scheduler, i)
+        legacy_elapsed = time.perf_counter() - start_time
+        scheduler.shutdown(wait=False)
+
+        client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+        engine = ReminderEngine(noop, redis_client=client)
+        for i in range(num_medications):
+            await engine.schedule("u1", str(i), SCHEDULE, "UTC", now=NOW)
+
+        start_time = time.perf_counter()
+        for i in range(NUM_UPDATES):
+            await engine.cancel(str(i))
+            await engine.schedule("u1", str(i), SCHEDULE, "UTC", now=NOW)
+        engine_elapsed = time.perf_counter() - start_time
+
+        await engine.tick(NOW)
+        start_time = time.perf_counter()
+        fired = await engine.tick(NOW + timedelta(minutes=1))
+        tick_elapsed = time.perf_counter() - start_time
+
+        print(f"\nSchedule updates ({num_medications} medications, {NUM_UPDATES} updates):")
+        print(f"APScheduler jobs: {NUM_UPDATES / legacy_elapsed:10.1f} updates/sec")
+        print(f"Timing wheel:     {NUM_UPDATES / engine_elapsed:10.1f} updates/sec")
+        print(f"Tick firing {fired} reminders: {tick_elapsed * 1000:.1f}ms")
+
+        assert fired == num_medications
+        assert engine_elapsed < legacy_elapsed
+        await client.aclose()
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
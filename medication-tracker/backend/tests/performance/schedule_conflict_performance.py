@@ -0,0 +1,112 @@
+import time
+import pytest
+import random
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import List
+from app.services.schedule_conflict import ScheduleConflict, ScheduleConflictChecker
+from app.models.schedule import ScheduleType
+
+def generate_test_schedules(num_medications: int) -> List[SimpleNamespace]:
+    """Generate dense fixed-time and interval schedules for performance testing."""
+    schedules = []
+    for i in range(num_medications):
+        medication = SimpleNamespace(name=f'Medication {i}')
+        if i % 2:
+            schedules.append(SimpleNamespace(
+                medication=medication,
+                type=ScheduleType.INTERVAL,
+                interval=SimpleNamespace(hours=random.choice([2, 4, 6, 8]))
+            ))
+        else:
+            slots = [
+                SimpleNamespace(time=f'{random.randint(0, 23):02d}:{random.randint(0, 59):02d}')
+                for _ in range(random.randint(1, 4))
+            ]
+            schedules.append(SimpleNamespace(
+                medication=medication,
+                type=ScheduleType.FIXED_TIME,
+                fixed_time_slots=slots
+            ))
+    return schedules
+
+def measure_execution_time(func):
+    """Decorator to measure function execution time."""
+    def wrapper(*args, **kwargs):
+        start_time = time.perf_counter()
+        result = func(*args, **kwargs)
+        end_time = time.perf_counter()
+        execution_time = (end_time - start_time) * 1000  # Convert to milliseconds
+        return result, execution_time
+    return wrapper
+
+def legacy_dose_times(schedule, date: datetime) -> List[datetime]:
+    """Previous per-day expansion of the fixed-time and interval schedules generated above."""
+    if schedule.type == ScheduleType.FIXED_TIME:
+        times = []
+        for time_slot in schedule.fixed_time_slots:
+            hour, minute = map(int, time_slot.time.split(':'))
+            times.append(date.replace(hour=hour, minute=minute))
+        return times
+
+    times = []
+    current_time = date.replace(hour=0, minute=0)
+    end_time = date.replace(hour=23, minute=59)
+    while current_time <= end_time:
+        times.append(current_time)
+        current_time += timedelta(hours=schedule.interval.hours)
+    return times
+
+def legacy_time_conflicts(checker: ScheduleConflictChecker, times1, times2, med1: str, med2: str) -> List[ScheduleConflict]:
+    """Previous comparison of every dose of one schedule with every dose of another."""
+    return [
+        ScheduleConflict(medication1=med1, medication2=med2, time=time1, conflict_type="time_proximity")
+        for time1 in times1
+        for time2 in times2
+        if abs(time1 - time2) < checker.MIN_DOSE_INTERVAL
+    ]
+
+@measure_execution_time
+def run_pairwise_check(checker: ScheduleConflictChecker, schedules, start_date: datetime, days: int):
+    """Previous approach: expand each schedule per day and compare every pair of doses."""
+    conflicts = []
+    for day in range(days):
+        date = start_date + timedelta(days=day)
+        for i, schedule1 in enumerate(schedules):
+            times1 = legacy_dose_times(schedule1, date)
+            for schedule2 in schedules[i + 1:]:
+                conflicts.extend(legacy_time_conflicts(
+                    checker,
+                    times1,
+                    legacy_dose_times(schedule2, date),
+                    schedule1.medication.name,
+                    schedule2.medication.name
+                ))
+    return conflicts
+
+@measure_execution_time
+def run_sweep_check(checker: ScheduleConflictChecker, schedules, start_date: datetime, days: int):
+    """Sweep-line conflict detection over the whole date range."""
+    return checker.find_conflicts(schedules, start_date, start_date + timedelta(days=days - 1))
+
+class TestScheduleConflictPerformance:
+    @pytest.mark.parametrize("num_medications", [10, 50, 200])
+    @pytest.mark.parametrize("days", [1, 7])
+    def test_conflict_detection_performance(self, num_medications, days):
+        """Compare pairwise and sweep-line conflict detection."""
+        random.seed(num_medications)
+        schedules = generate_test_schedules(num_medications)
+        checker = ScheduleConflictChecker()
+        start_date = datetime(2024, 1, 1)
+
+        pairwise, pairwise_time = run_pairwise_check(checker, schedules, start_date, days)
+        sweep, sweep_time = run_sweep_check(checker, schedules, start_date, days)
+
+        print(f"\nSchedule Conflict Performance (n={num_medications}, days={days}):")
+        print(f"Pairwise: {pairwise_time:.2f}ms ({len(pairwise)} conflicts)")
+        print(f"Sweep:    {sweep_time:.2f}ms ({len(sweep)} conflicts)")
+
+        # The sweep also reports conflicts across midnight, never fewer
+        assert len(sweep) >= len(pairwise)
+        if num_medications >= 50:
+            assert sweep_time < pairwise_time
@@ -0,0 +1,76 @@
+import time
+import pytest
+import random
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import List
+from app.services.schedule_expansion import expand_medications
+
+ZONES = ['UTC', 'Europe/London', 'America/New_York', 'Australia/Sydney']
+
+def generate_medications(num_medications: int) -> List[SimpleNamespace]:
+    """Generate medication rows with 1-4 daily dose times."""
+    return [
+        SimpleNamespace(
+            id=i,
+            dose_times=[
+                f'{random.randint(0, 23):02d}:{random.choice([0, 15, 30, 45]):02d}'
+                for _ in range(random.randint(1, 4))
+            ],
+            is_prn=False,
+            start_date=None,
+            end_date=None,
+            user=SimpleNamespace(timezone=random.choice(ZONES))
+        )
+        for i in range(num_medications)
+    ]
+
+def measure_execution_time(func):
+    """Decorator to measure function execution time."""
+    def wrapper(*args, **kwargs):
+        start_time = time.perf_counter()
+        result = func(*args, **kwargs)
+        end_time = time.perf_counter()
+        execution_time = (end_time - start_time) * 1000  # Convert to milliseconds
+        return result, execution_time
+    return wrapper
+
+@measure_execution_time
+def run_per_dose_expansion(medications, start: datetime, days: int):
+    """Previous approach: parse "HH:MM" and build each datetime one by one."""
+    import pytz
+    doses = []
+    for medication in medications:
+        tz = pytz.timezone(medication.user.timezone)
+        for day in range(days):
+            date = start + timedelta(days=day)
+            for time_str in medication.dose_times:
+                hour, minute = map(int, time_str.split(':'))
+                local = tz.localize(date.replace(hour=hour, minute=minute))
+                doses.append((medication.id, local.astimezone(pytz.UTC)))
+    return doses
+
+@measure_execution_time
+def run_engine_expansion(medications, start: datetime, days: int):
+    """Compile once and expand all medications as arrays."""
+    return expand_medications(medications, start, start + timedelta(days=days))
+
+class TestScheduleExpansionPerformance:
+    @pytest.mark.parametrize("num_medications", [1000, 5000])
+    @pytest.mark.parametrize("days", [7, 30])
+    def test_expansion_performance(self, num_medications, days):
+        """Compare per-dose datetime expansion with the vectorized engine."""
+        random.seed(num_medications)
+        medications = generate_medications(num_medications)
+        start = datetime(2024, 3, 1)
+
+        baseline, baseline_time = run_per_dose_expansion(medications, start, days)
+        expanded, engine_time = run_engine_expansion(medications, start, days)
+
+        print(f"\nSchedule Expansion Performance (n={num_medications}, days={days}):")
+        print(f"Per-dose datetimes: {baseline_time:.2f}ms ({len(baseline)} doses)")
+        print(f"Engine:             {engine_time:.2f}ms ({expanded.times.size} doses)")
+
+        # Doses shifted across the range boundary by timezones may differ slightly
+        assert abs(expanded.times.size - len(baseline)) <= num_medications * 4
+        assert engine_time < baseline_time
@@ -0,0 +1,72 @@
+import time
+import pytest
+import aiosmtplib
+from email.message import EmailMessage
+from app.infrastructure.notification.smtp_pool import SMTPPool
+from tests.mock.mock_smtp import MockSMTPServer
+
+# Per-reply delay standing in for the network round trip to a real relay
+SERVER_LATENCY = 0.002
+
+def generate_messages(num_messages: int):
+    """Generate medication reminder emails."""
+    messages = []
+    for i in range(num_messages):
+        message = EmailMessage()
+        message["From"] = "reminders@example.com"
+        message["To"] = f"patient{i}@example.com"
+        message["Subject"] = f"Medication reminder {i}"
+        message.set_content("Time to take your medication\n" * 20)
+        messages.append(message)
+    return messages
+
+async def send_per_message(server, messages):
+    """Previous approach: connect and authenticate for every email."""
+    for message in messages:
+        async with aiosmtplib.SMTP(hostname="127.0.0.1", port=server.port) as smtp:
+            await smtp.login("user", "secret")
+            await smtp.send_message(message)
+
+async def send_pooled(pool, messages):
+    results = await pool.send_many(messages)
+    await pool.close()
+    return results
+
+async def measure(coro):
+    start_time = time.perf_counter()
+    result = await coro
+    return result, time.perf_counter() - start_time
+
+class TestSMTPPoolPerformance:
+    @pytest.mark.parametrize("num_messages", [200, 1000])
+    @pytest.mark.asyncio
+    async def test_email_throughput(self, num_messages):
+        """Compare per-email connections with the pooled transport."""
+        messages = generate_messages(num_messages)
+        rates = {}
+
+        server = await MockSMTPServer(username="user", password="secret", latency=SERVER_LATENCY).start()
+        _, elapsed = await measure(send_per_message(server, messages))
+        rates["per-message"] = num_messages / elapsed
+        assert server.connections == num_messages
+        await server.stop()
+
+        for size in (1, 4, 8):
+            server = await MockSMTPServer(username="user", password="secret", latency=SERVER_LATENCY).start()
+            pool = SMTPPool("127.0.0.1", server.port, "user", "secret", size=size, max_messages=num_messages)
+            results, elapsed = await measure(send_pooled(pool, messages))
+            rates[f"pool size {size}"] = num_messages / elapsed
+            assert not [result for result in results if isinstance(result, Exception)]
+            assert len(server.messages) == num_messages
+            assert server.connections == size
+            await server.stop()
+
+        print(f"\nSMTP throughput ({num_messages} emails, {SERVER_LATENCY * 1000:.0f}ms per reply):")
+        for name, rate in rates.items():
+            print(f"{name:<14} {rate:8.1f} emails/sec")
+
+        assert rates["pool size 1"] > rates["per-message"]
+        assert rates["pool size 8"] > rates["pool size 1"]
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
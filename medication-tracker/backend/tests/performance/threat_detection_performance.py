@@ -0,0 +1,78 @@
+import re
+import time
+import pytest
+import random
+import string
+from app.infrastructure.security.threat_detection import ThreatDetectionService, request_text
+
+def generate_request(num_fields: int) -> dict:
+    """Generate a clean medication request with nested fields."""
+    words = ["tablet", "morning", "with food", "refill", "dose", "notes", "taken"]
+    return {
+        "ip_address": f"10.0.{random.randint(0, 255)}.{random.randint(0, 255)}",
+        "path": "/api/medications",
+        "method": "POST",
+        "body": {
+            f"field_{i}": random.choice([
+                " ".join(random.choices(words, k=5)),
+                random.randint(0, 1000),
+                ["".join(random.choices(string.ascii_lowercase, k=12)) for _ in range(3)]
+            ])
+            for i in range(num_fields)
+        }
+    }
+
+def measure_execution_time(func):
+    """Decorator to measure function execution time."""
+    def wrapper(*args, **kwargs):
+        start_time = time.perf_counter()
+        result = func(*args, **kwargs)
+        end_time = time.perf_counter()
+        execution_time = (end_time - start_time) * 1000  # Convert to milliseconds
+        return result, execution_time
+    return wrapper
+
+@measure_execution_time
+def run_per_pattern_scan(service: ThreatDetectionService, requests):
+    """Previous approach: str(dict) and a separate re.search per pattern."""
+    hits = 0
+    for request in requests:
+        request_str = str(request)
+        if any(re.search(p, request_str, re.IGNORECASE) for p in service.sql_injection_patterns):
+            hits += 1
+        elif any(re.search(p, request_str) for p in service.phi_patterns):
+            hits += 1
+        elif any(re.search(p, request_str) for p in service.encryption_patterns):
+            hits += 1
+    return hits
+
+@measure_execution_time
+def run_combined_scan(service: ThreatDetectionService, requests):
+    """One guarded, precompiled alternation per category over the request fields."""
+    hits = 0
+    for request in requests:
+        text = request_text(request)
+        if (
+            service._detect_injection_attempt(request, text)
+            or service._detect_phi_access(request, text)
+            or service._detect_encryption_issue(request, text)
+        ):
+            hits += 1
+    return hits
+
+class TestThreatDetectionPerformance:
+    @pytest.mark.parametrize("num_fields", [5, 20, 100])
+    def test_scan_performance(self, num_fields):
+        """Compare per-pattern and combined scanning in microseconds per request."""
+        random.seed(num_fields)
+        service = ThreatDetectionService()
+        requests = [generate_request(num_fields) for _ in range(2000)]
+
+        _, per_pattern_time = run_per_pattern_scan(service, requests)
+        _, combined_time = run_combined_scan(service, requests)
+
+        print(f"\nThreat Scan Performance (fields={num_fields}):")
+        print(f"Per-pattern: {per_pattern_time * 1000 / len(requests):.1f}µs/request")
+        print(f"Combined:    {combined_time * 1000 / len(requests):.1f}µs/request")
+
+        assert combined_time < per_pattern_time
@@ -0,0 +1,79 @@
+import asyncio
+import time
+import pytest
+from datetime import datetime
+from app.infrastructure.websocket.manager import ConnectionManager
+
+# Every SLOW_EVERY-th client takes SLOW_SEND_SECONDS per message
+SLOW_EVERY = 100
+SLOW_SEND_SECONDS = 0.05
+
+class MockWebSocket:
+    def __init__(self, slow):
+        self.slow = slow
+        self.received = asyncio.Event()
+
+    async def accept(self):
+        pass
+
+    async def send_json(self, message):
+        await self.send_text(message)
+
+    async def send_text(self, text):
+        if self.slow:
+            await asyncio.sleep(SLOW_SEND_SECONDS)
+        self.received.set()
+
+    async def close(self, code=1000):
+        pass
+
+async def legacy_broadcast(active_connections, message):
+    """Previous approach: await each socket in turn."""
+    for user_connections in active_connections.values():
+        for connection in user_connections:
+            await connection.send_json({
+                "type": "system",
+                "data": {"message": message, "timestamp": datetime.utcnow().isoformat()}
+            })
+
+async def time_to_fast_clients(broadcast, sockets):
+    """Time until every client that is not slow has the message."""
+    start_time = time.perf_counter()
+    task = asyncio.create_task(broadcast())
+    await asyncio.gather(*(socket.received.wait() for socket in sockets if not socket.slow))
+    elapsed = time.perf_counter() - start_time
+    await task
+    return elapsed
+
+class TestWebSocketFanoutPerformance:
+    @pytest.mark.parametrize("num_connections", [1000, 5000])
+    @pytest.mark.asyncio
+    async def test_broadcast_with_slow_clients(self, num_connections):
+        """Compare serial broadcast with per-connection writers when some clients are slow."""
+        manager = ConnectionManager(routing=False)
+        sockets = [MockWebSocket(slow=i % SLOW_EVERY == 0) for i in range(num_connections)]
+        for i, socket in enumerate(sockets):
+            await manager.connect(socket, f"user{i // 2}")
+
+        legacy_elapsed = await time_to_fast_clients(
+            lambda: legacy_broadcast(manager.active_connections, "Maintenance at 22:00"),
+            sockets
+        )
+
+        for socket in sockets:
+            socket.received.clear()
+        fanout_elapsed = await time_to_fast_clients(
+            lambda: manager.broadcast_system_message("Maintenance at 22:00"),
+            sockets
+        )
+        await manager.flush()
+
+        print(f"\nBroadcast to {num_connections} sockets ({num_connections // SLOW_EVERY} slow):")
+        print(f"serial:     {legacy_elapsed * 1000:8.1f}ms until every fast client has the message")
+        print(f"concurrent: {fanout_elapsed * 1000:8.1f}ms until every fast client has the message")
+
+        assert fanout_elapsed < legacy_elapsed / 5
+        await manager.close()
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
@@ -0,0 +1,171 @@
+"""Test the chained, checkpointed audit log."""
+
+import json
+import logging
+import pytest
+from unittest.mock import patch
+
+from app.security import audit_chain
+from app.security.audit_chain import GENESIS_HASH, AuditChain, ChainedAuditHandler, entry_hash
+
+def write_entries(chain, target, count, start=0):
+    for i in range(start, start + count):
+        with chain.writing():
+            entry = chain.stamp({
+                "timestamp": f"2024-01-01T10:{i // 60:02d}:{i % 60:02d}",
+                "event_type": "phi_access",
+                "user_id": i % 4
+            })
+            target.info(json.dumps(entry), extra={"audit_entry": entry})
+
+@pytest.fixture
+def log_path(tmp_path):
+    return str(tmp_path / "audit.log")
+
+@pytest.fixture
+def target():
+    target = logging.getLogger("audit.test_chain")
+    target.propagate = False
+    target.setLevel(logging.INFO)
+    yield target
+    for handler in list(target.handlers):
+        target.removeHandler(handler)
+        handler.close()
+
+def open_chain(log_path, target, checkpoint_every=10):
+    chain = AuditChain(log_path, checkpoint_every=checkpoint_every, key=b"secret")
+    ChainedAuditHandler.attach(target, chain, logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    return chain
+
+def test_entries_link_to_previous_hash(log_path, target):
+    chain = open_chain(log_path, target)
+    write_entries(chain, target, 3)
+
+    entries = [json.loads(line.split(" - ")[-1]) for line in open(log_path)]
+    assert entries[0]["prev_hash"] == GENESIS_HASH
+    assert [e["prev_hash"] for e in entries[1:]] == [e["hash"] for e in entries[:-1]]
+    assert all(e["hash"] == entry_hash(e) for e in entries)
+
+def test_checkpoints_record_offsets(log_path, target):
+    chain = open_chain(log_path, target)
+    write_entries(chain, target, 25)
+
+    assert [c.entries for c in chain.checkpoints] == [0, 10, 20]
+    with open(log_path, "rb") as f:
+        data = f.read()
+    for checkpoint in chain.checkpoints[1:]:
+        assert data[:checkpoint.offset].count(b"\n") == checkpoint.entries
+    assert chain.verify() == {"valid": True, "verified_entries": 25, "checkpoints": 3}
+
+def test_attach_replaces_existing_handler(log_path, target):
+    chain = open_chain(log_path, target)
+    ChainedAuditHandler.attach(target, chain, logging.Formatter('%(message)s'))
+    write_entries(chain, target, 2)
+
+    assert len(target.handlers) == 1
+    assert chain.verify()["valid"]
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_tampered_entry_detected(log_path, target, workers):
+    chain = open_chain(log_path, target)
+    write_entries(chain, target, 35)
+
+    with open(log_path) as f:
+        lines = f.readlines()
+    lines[15] = lines[15].replace('"user_id": 3', '"user_id": 1')
+    with open(log_path, "w") as f:
+        f.writelines(lines)
+
+    result = chain.verify(full=True, workers=workers)
+    assert result["valid"] is False
+    assert result["offset"] == sum(len(line.encode()) for line in lines[:15])
+
+def test_incremental_verify_skips_verified_blocks(log_path, target):
+    chain = open_chain(log_path, target)
+    write_entries(chain, target, 20)
+    assert chain.verify()["valid"]
+
+    write_entries(chain, target, 15, start=20)
+    verified = []
+    original = audit_chain.verify_block
+    with patch.object(audit_chain, "verify_block", side_effect=lambda *args: verified.append(args[1]) or original(*args)):
+        result = chain.verify(workers=1)
+
+    assert result["valid"]
+    assert verified == [chain.checkpoints[2].offset, chain.checkpoints[3].offset]
+
+def test_forged_checkpoint_signature_detected(log_path, target):
+    chain = open_chain(log_path, target)
+    write_entries(chain, target, 10)
+    chain.checkpoints[1].entries = 9
+
+    assert chain.verify()["error"] == "Checkpoint signature mismatch"
+
+def test_restart_continues_chain(log_path, target):
+    chain = open_chain(log_path, target)
+    write_entries(chain, target, 15)
+
+    reopened = open_chain(log_path, target)
+    assert reopened.head == chain.head
+    assert reopened.entries == 15
+    write_entries(reopened, target, 10, start=15)
+
+    assert [c.entries for c in reopened.checkpoints] == [0, 10, 20]
+    assert reopened.verify(full=True, workers=1)["valid"]
+
+def test_chain_anchors_after_legacy_entries(log_path, target):
+    with open(log_path, "w") as f:
+        f.write('2024-01-01 - audit.legacy - INFO - {"event_type": "old", "hash": "abc"}\n')
+
+    chain = open_chain(log_path, target)
+    write_entries(chain, target, 12)
+
+    assert chain.checkpoints[0].offset > 0
+    assert chain.verify(full=True)["valid"]
+
+def test_query_reads_only_matching_blocks(log_path, target):
+    chain = open_chain(log_path, target)
+    write_entries(chain, target, 35)
+
+    read = []
+    original = audit_chain.iter_lines
+    with patch.object(audit_chain, "iter_lines", side_effect=lambda path, start, end=None: read.append(start) or original(path, start, end)):
+        trail = list(chain.query(start_time="2024-01-01T10:00:22", user_id=2))
+
+    assert [e["timestamp"] for e in trail] == ["2024-01-01T10:00:22", "2024-01-01T10:00:26", "2024-01-01T10:00:30", "2024-01-01T10:00:34"]
+    # After catching up at the tail, only the two matching blocks are read
+    assert read == [chain.offset, chain.checkpoints[2].offset, chain.checkpoints[3].offset]
+
+def test_processes_sharing_a_log_keep_one_chain(log_path, target):
+    # Each worker process holds its own chain on the same file
+    other_target = logging.getLogger("audit.test_chain.other")
+    other_target.propagate = False
+    other_target.setLevel(logging.INFO)
+    chain = open_chain(log_path, target)
+    other = open_chain(log_path, other_target)
+    try:
+        for i in range(0, 30, 3):
+            write_entries(chain, target, 2, start=i)
+            write_entries(other, other_target, 1, start=i + 2)
+    finally:
+        for handler in list(other_target.handlers):
+            other_target.removeHandler(handler)
+            handler.close()
+
+    assert chain.verify(full=True, workers=1) == {"valid": True, "verified_entries": 30, "checkpoints": 4}
+    assert other.verify(full=True, workers=1)["valid"]
+    assert [c.entries for c in AuditChain(log_path, key=b"secret").checkpoints] == [0, 10, 20, 30]
+
+def test_missing_checkpoint_key_fails_closed(log_path, monkeypatch):
+    monkeypatch.delenv("AUDIT_CHECKPOINT_KEY", raising=False)
+    with pytest.raises(ValueError):
+        AuditChain(log_path)
+
+def test_unstamped_records_stay_out_of_the_chain(log_path, target):
+    chain = open_chain(log_path, target)
+    write_entries(chain, target, 2)
+    target.error("Failed to reach evidence collector")
+    write_entries(chain, target, 10, start=2)
+
+    assert "evidence collector" not in open(log_path).read()
+    assert chain.verify(full=True, workers=1)["valid"]
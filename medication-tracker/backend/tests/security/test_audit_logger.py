@@ -230,3 +230,19 @@ def test_audit_log_large_data(audit_logger, mock_log_file):
     
     assert log_entry["event_type"] == "large_data_event"
     assert log_entry["data"] == large_data
+
+def test_audit_chain_built_on_first_write(tmp_path, monkeypatch):
+    """Test that creating a logger doesn't require the checkpoint key."""
+    monkeypatch.delenv("AUDIT_CHECKPOINT_KEY", raising=False)
+    log_path = tmp_path / "lazy" / "audit.log"
+
+    with patch("app.security.audit_logger.get_settings") as mock_settings:
+        mock_settings.return_value.AUDIT_LOG_PATH = str(log_path)
+        logger = AuditLogger("lazy_module")
+
+    with pytest.raises(ValueError):
+        logger.info("test_event", {"action": "test"})
+
+    monkeypatch.setenv("AUDIT_CHECKPOINT_KEY", "test-key")
+    logger.info("test_event", {"action": "test"})
+    assert "test_event" in log_path.read_text()
@@ -0,0 +1,153 @@
+"""Test the buffered, indexed secure audit writer."""
+
+import json
+import pytest
+from unittest.mock import patch
+
+from app.security import audit_writer
+from app.security.audit_writer import AuditWriter
+
+def make_record(i, user_id="user_1", component="phi_access", minute=0):
+    return {
+        "event_id": f"EVENT_{i}",
+        "timestamp": f"2024-01-01T10:{minute:02d}:00.{i:06d}",
+        "level": "critical",
+        "component": component,
+        "action": "read",
+        "user_id": user_id,
+        "details": {"i": i},
+        "validation_status": True
+    }
+
+@pytest.fixture
+def writer(tmp_path):
+    writer = AuditWriter(str(tmp_path), flush_interval=60)
+    yield writer
+    writer.close()
+
+def test_batch_committed_with_one_fsync_per_file(writer):
+    with patch.object(audit_writer.os, "fsync") as fsync:
+        for i in range(100):
+            writer.write(make_record(i))
+        writer.flush()
+
+    assert fsync.call_count == 2  # Data file and sidecar index
+    assert len(list(writer.query())) == 100
+
+def test_flush_waits_only_for_requested_sequence(writer):
+    first = writer.write(make_record(1))
+    writer.write(make_record(2))
+
+    assert writer.flush(until=first, timeout=5)
+    assert writer._durable >= first
+
+def test_query_by_user_component_and_time(writer):
+    for i in range(30):
+        writer.write(make_record(i, user_id=f"user_{i % 3}", component=["phi_access", "login"][i % 2], minute=i))
+
+    by_user = [record["details"]["i"] for record in writer.query(user_id="user_1")]
+    by_time = [record["details"]["i"] for record in writer.query(
+        start="2024-01-01T10:05:00", end="2024-01-01T10:07:59", component="login"
+    )]
+
+    assert by_user == list(range(1, 30, 3))
+    assert by_time == [5, 7]
+
+def test_segments_rotate_by_size(tmp_path):
+    writer = AuditWriter(str(tmp_path), flush_interval=60, segment_max_bytes=500)
+    for i in range(10):
+        writer.write(make_record(i))
+        writer.flush()
+    writer.close()
+
+    assert len(writer.segments) > 1
+    assert all(segment.size <= 500 + 300 for segment in writer.segments)
+
+def test_time_range_skips_segments_by_index_bounds(tmp_path):
+    writer = AuditWriter(str(tmp_path), flush_interval=60, segment_max_bytes=1)
+    for minute in range(5):
+        writer.write(make_record(minute, minute=minute))
+        writer.flush()
+
+    read = []
+    original = writer._read_index
+    with patch.object(writer, "_read_index", side_effect=lambda s: read.append(s.seq) or original(s)):
+        records = list(writer.query(start="2024-01-01T10:03:00"))
+
+    assert [record["details"]["i"] for record in records] == [3, 4]
+    assert read == [3, 4]
+    writer.close()
+
+def test_reopen_starts_new_segment_and_keeps_history(tmp_path):
+    writer = AuditWriter(str(tmp_path), flush_interval=60)
+    writer.write(make_record(1))
+    writer.close()
+
+    # A torn index line from a crash is ignored
+    with open(tmp_path / "audit-00000000.idx", "a") as f:
+        f.write('["2024-01-01T10:00')
+
+    reopened = AuditWriter(str(tmp_path), flush_interval=60)
+    reopened.write(make_record(2, minute=1))
+
+    assert [record["event_id"] for record in reopened.query()] == ["EVENT_1", "EVENT_2"]
+    assert [segment.seq for segment in reopened.segments] == [0, 1]
+    reopened.close()
+
+def test_close_flushes_pending_records(tmp_path):
+    writer = AuditWriter(str(tmp_path), flush_interval=60)
+    writer.write(make_record(1))
+    writer.close()
+
+    lines = (tmp_path / "audit-00000000.log").read_text().splitlines()
+    assert json.loads(lines[0])["event_id"] == "EVENT_1"
+    with pytest.raises(RuntimeError):
+        writer.write(make_record(2))
+
+def test_writers_sharing_a_directory_use_their_own_segments(tmp_path):
+    # Each worker process holds its own writer on the same directory
+    first = AuditWriter(str(tmp_path), flush_interval=60)
+    second = AuditWriter(str(tmp_path), flush_interval=60)
+    for i in range(10):
+        (first if i % 2 else second).write(make_record(i, minute=i))
+    first.flush()
+    second.flush()
+
+    assert sorted(record["details"]["i"] for record in first.query()) == list(range(10))
+    assert sorted(record["details"]["i"] for record in second.query(start="2024-01-01T10:05:00")) == [5, 6, 7, 8, 9]
+    assert {segment.seq for segment in first.segments} == {0, 1}
+    first.close()
+    second.close()
+
+def test_query_merges_writers_by_timestamp(tmp_path):
+    first = AuditWriter(str(tmp_path), flush_interval=60)
+    second = AuditWriter(str(tmp_path), flush_interval=60)
+    for i, writer in enumerate([first, second, first, second, first]):
+        writer.write(make_record(i, minute=i))
+        writer.flush()
+
+    assert [record["details"]["i"] for record in first.query()] == [0, 1, 2, 3, 4]
+    assert [record["details"]["i"] for record in second.query(start="2024-01-01T10:01:00")] == [1, 2, 3, 4]
+    assert [[entry[0][14:16] for entry in entries] for entries in first.index_entries()] == [
+        ["00", "02", "04"], ["01", "03"]
+    ]
+    first.close()
+    second.close()
+
+def test_failed_commit_is_retried_and_reported(writer):
+    writer.write(make_record(1))
+    with patch.object(audit_writer.os, "fsync", side_effect=OSError("disk full")):
+        with pytest.raises(OSError):
+            writer.flush(timeout=5)
+    assert writer._durable == 0
+
+    writer.write(make_record(2))
+    assert writer.flush(timeout=5)
+    assert [record["event_id"] for record in writer.query()] == ["EVENT_1", "EVENT_2"]
+
+def test_unserializable_record_rejected_on_write(writer):
+    with pytest.raises(TypeError):
+        writer.write({"timestamp": "2024-01-01T10:00:00", "details": object()})
+    writer.write(make_record(1))
+
+    assert [record["event_id"] for record in writer.query()] == ["EVENT_1"]
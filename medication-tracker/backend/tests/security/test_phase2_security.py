@@ -66,8 +66,8 @@ class TestAuditSystem:
     """Test Comprehensive Audit System"""
     
     @pytest.fixture
-    def audit_system(self):
-        return AuditSystem()
+    def audit_system(self, tmp_path):
+        return AuditSystem(log_dir=str(tmp_path))
     
     def test_event_logging(self, audit_system):
         """Test audit event logging"""
@@ -112,6 +112,26 @@ class TestAuditSystem:
         # Validate chain
         assert audit_system.validate_audit_chain()
     
+    def test_writers_sharing_a_directory(self, tmp_path):
+        """Test validation and query order with two writers on one log directory"""
+        first = AuditSystem(log_dir=str(tmp_path))
+        second = AuditSystem(log_dir=str(tmp_path))
+        for system, action in [(first, "act1"), (second, "act2"), (first, "act3")]:
+            system.log_event(
+                level=AuditLevel.CRITICAL,
+                component="security_test",
+                action=action,
+                user_id="test_user",
+                details={}
+            )
+            system.flush()
+        
+        assert first.validate_audit_chain()
+        assert second.validate_audit_chain()
+        assert [event.action for event in first.query_events()] == ["act1", "act2", "act3"]
+        first.writer.close()
+        second.writer.close()
+    
     def test_event_filtering(self, audit_system):
         """Test audit event filtering"""
         # Log events with different levels
@@ -0,0 +1,114 @@
+"""Test request threat detection."""
+
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import Mock, patch
+
+from app.infrastructure.security import threat_detection
+from app.infrastructure.security.threat_detection import (
+    ThreatDetectionService,
+    ThreatLevel,
+    ThreatType,
+    iter_request_fields
+)
+
+@pytest.fixture
+def service():
+    """Create a threat detection service with a mocked logger."""
+    with patch.object(threat_detection, "beta_logger", Mock()):
+        yield ThreatDetectionService()
+
+def make_request(**body):
+    return {"ip_address": "10.0.0.1", "path": "/api/medications", "method": "POST", "body": body}
+
+def test_request_fields_are_walked_without_stringifying(service):
+    fields = list(iter_request_fields({"a": [1, {"b": "text"}], "c": None, "d": True}))
+
+    assert sorted(fields) == ["1", "a", "b", "c", "d", "text"]
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("body,expected", [
+    ({"name": "x' OR 1=1"}, ThreatType.INJECTION_ATTEMPT),
+    ({"name": "or 1=1"}, ThreatType.INJECTION_ATTEMPT),
+    ({"query": "SELECT * FROM users"}, ThreatType.INJECTION_ATTEMPT),
+    ({"notes": ["fine", "drop -- comment"]}, ThreatType.INJECTION_ATTEMPT),
+    ({"ssn": "123-45-6789"}, ThreatType.DATA_EXFILTRATION),
+    ({"patient": 1234567890}, ThreatType.DATA_EXFILTRATION),
+    ({"url": "https://x?password=hunter2"}, ThreatType.ENCRYPTION_FAILURE),
+])
+async def test_threats_detected_per_category(service, body, expected):
+    event = await service.analyze_request(make_request(**body), user_id="u1")
+
+    assert event.event_type == expected
+
+@pytest.mark.asyncio
+async def test_keywords_in_separate_fields_do_not_combine(service):
+    request = make_request(action="delete", note="sent from home")
+
+    assert await service.analyze_request(request) is None
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("body", [
+    {"notes": "Take with food;"},
+    {"notes": "Morning;\nevening"},
+    {"notes": "Take with food;", "instructions": "Update the pharmacy"},
+    {"name": "Vitamin D or 1000 IU"},
+])
+async def test_benign_notes_are_not_injection(service, body):
+    assert await service.analyze_request(make_request(**body)) is None
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("body", [
+    {"query": "1; DROP users;"},
+    {"query": "x';\ndelete users;"},
+])
+async def test_terminated_statements_are_injection(service, body):
+    event = await service.analyze_request(make_request(**body))
+
+    assert event.event_type == ThreatType.INJECTION_ATTEMPT
+
+@pytest.mark.asyncio
+async def test_injection_checked_before_phi(service):
+    event = await service.analyze_request(make_request(name="' or 1=1", ssn="123-45-6789"))
+
+    assert event.severity == ThreatLevel.HIGH
+
+@pytest.mark.asyncio
+async def test_ip_window_is_bounded_and_expires(service):
+    request = make_request(name="' or 1=1")
+    for _ in range(60):
+        await service.analyze_request(request)
+
+    assert len(service.suspicious_ips["10.0.0.1"]) == threat_detection.IP_EVENT_THRESHOLD + 1
+    assert await service._detect_abnormal_behavior("10.0.0.1", None, "/") is True
+
+    old = datetime.utcnow() - timedelta(minutes=10)
+    service.suspicious_ips["10.0.0.1"] = type(service.suspicious_ips["10.0.0.1"])(
+        [old] * 51, maxlen=threat_detection.IP_EVENT_THRESHOLD + 1
+    )
+    assert await service._detect_abnormal_behavior("10.0.0.1", None, "/") is False
+    assert len(service.suspicious_ips["10.0.0.1"]) == 0
+
+@pytest.mark.asyncio
+async def test_user_distinct_resources_window(service):
+    for i in range(25):
+        request = {"ip_address": f"10.0.1.{i}", "path": f"/api/r{i}", "body": {"q": "' or 1=1"}}
+        await service.analyze_request(request, user_id="u1")
+
+    assert len(service.suspicious_users["u1"]) == threat_detection.USER_RESOURCE_THRESHOLD + 1
+    assert await service._detect_abnormal_behavior("", "u1", "/") is True
+
+def test_scanner_skips_regex_without_trigger(service):
+    scanner = service.sql_injection_scanner
+    scanner.pattern = Mock(wraps=scanner.pattern)
+
+    assert scanner.search("morning tablet\nwith food") is False
+    assert scanner.pattern.search.call_count == 0
+    assert scanner.search("UNION select 1 FROM users") is True
+
+def test_tracked_sources_are_capped(service):
+    with patch.object(threat_detection, "MAX_TRACKED_SOURCES", 3):
+        for i in range(5):
+            service._track_event(Mock(source_ip=f"ip{i}", user_id=None, timestamp=datetime.utcnow()))
+
+    assert list(service.suspicious_ips) == ["ip2", "ip3", "ip4"]
@@ -0,0 +1,109 @@
+"""Tests for SQL-side adherence aggregation."""
+
+import pytest
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from app.models.medication_history import dose_counters
+from app.services import adherence_stats
+from app.services.adherence_stats import RESULT_COUNTERS, adherence_by_medication
+
+NOW = datetime(2024, 3, 10, 12, 0)
+SCHEDULED = datetime(2024, 3, 1, 9, 0)
+
+def make_row(medication_id, **counts):
+    return SimpleNamespace(medication_id=medication_id, **{name: counts.get(name, 0) for name in RESULT_COUNTERS})
+
+@pytest.fixture
+def mock_db():
+    """Patch the aggregation's database handle with a SQLite bind."""
+    with patch.object(adherence_stats, 'db') as db:
+        db.session.get_bind.return_value.dialect.name = 'sqlite'
+        yield db
+
+def query_results(mock_db, *results):
+    chain = mock_db.session.query.return_value.join.return_value.filter.return_value
+    chain.filter.return_value = chain
+    chain.group_by.return_value.all.side_effect = list(results)
+    return chain
+
+def test_dose_counters_classify_on_time_late_and_missed():
+    assert dose_counters('taken', SCHEDULED, SCHEDULED + timedelta(minutes=30)) == {
+        'total': 1, 'taken': 1, 'taken_on_time': 1
+    }
+    assert dose_counters('taken', SCHEDULED, SCHEDULED - timedelta(minutes=10))['taken_on_time'] == 1
+    assert dose_counters('taken', SCHEDULED, SCHEDULED + timedelta(minutes=31)) == {
+        'total': 1, 'taken': 1, 'taken_late': 1
+    }
+    assert dose_counters('missed', SCHEDULED, None) == {'total': 1, 'untaken': 1, 'missed': 1}
+    assert dose_counters('skipped', SCHEDULED, None) == {'total': 1, 'untaken': 1}
+
+def test_rollup_days_cover_only_whole_finished_days():
+    days = adherence_stats._rollup_days(datetime(2024, 3, 1, 8, 0), datetime(2024, 3, 20), NOW)
+    assert days == (datetime(2024, 3, 2), datetime(2024, 3, 10))
+
+    days = adherence_stats._rollup_days(datetime(2024, 3, 1), datetime(2024, 3, 5, 6, 0), NOW)
+    assert days == (datetime(2024, 3, 1), datetime(2024, 3, 5))
+
+    assert adherence_stats._rollup_days(datetime(2024, 3, 9, 1, 0), NOW, NOW) is None
+
+def test_counts_come_from_one_grouped_query(mock_db):
+    query_results(mock_db, [make_row(1, total=4, taken=3, overdue=1), make_row(2, total=2, taken=2)])
+
+    counts = adherence_by_medication(7, NOW - timedelta(days=30), NOW, now=NOW, use_rollup=False)
+
+    assert mock_db.session.query.call_count == 1
+    assert counts[1]['taken'] == 3
+    assert counts[1]['overdue'] == 1
+    assert counts[2]['total'] == 2
+
+def test_rollup_days_are_merged_with_raw_edges(mock_db):
+    rollup_row = SimpleNamespace(
+        medication_id=1, total=20, taken=15, taken_on_time=12, taken_late=3, missed=4, untaken=5
+    )
+    query_results(mock_db, [make_row(1, total=2, taken=1, untaken=1, overdue=1)], [rollup_row])
+
+    counts = adherence_by_medication(
+        7, datetime(2024, 2, 9, 12, 0), NOW, now=NOW, use_rollup=True
+    )
+
+    assert mock_db.session.query.call_count == 2
+    assert counts[1] == {
+        'total': 22,
+        'taken': 16,
+        'taken_on_time': 12,
+        'taken_late': 3,
+        'missed': 4,
+        'untaken': 6,
+        'overdue': 6
+    }
+
+def test_rollup_skipped_when_window_has_no_whole_day(mock_db):
+    query_results(mock_db, [])
+
+    counts = adherence_by_medication(7, NOW - timedelta(hours=6), NOW, now=NOW, use_rollup=True)
+
+    assert counts == {}
+    assert mock_db.session.query.call_count == 1
+
+def test_rebuild_parses_sqlite_dates(mock_db):
+    row = SimpleNamespace(
+        medication_id=1, day='2024-03-01', total=3, taken=2, taken_on_time=2, taken_late=0, missed=1, untaken=1
+    )
+    mock_db.session.query.return_value.group_by.return_value.all.return_value = [row]
+
+    assert adherence_stats.rebuild_daily_adherence() == 1
+
+    inserted = mock_db.session.execute.call_args_list[-1][0][1]
+    assert inserted == [{
+        'medication_id': 1,
+        'day': date(2024, 3, 1),
+        'total': 3,
+        'taken': 2,
+        'taken_on_time': 2,
+        'taken_late': 0,
+        'missed': 1,
+        'untaken': 1
+    }]
+    mock_db.session.commit.assert_called_once()
@@ -0,0 +1,122 @@
+"""Tests for the precomputed interaction index."""
+
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import Mock
+
+from app.services.drug_interaction_service import DrugInteractionService
+from app.services.label_cache import LRUCache, TieredCache
+from app.services.interaction_index import (
+    AhoCorasickMatcher,
+    InteractionIndex,
+    normalize_drug_name
+)
+
+LABELS = {
+    'warfarin': {
+        'drug_interactions': ['Aspirin increases bleeding risk.', 'Avoid NSAIDs such as Ibuprofen.'],
+        'warnings': ['Monitor INR closely.'],
+        'contraindications': [],
+        'precautions': ['Use caution with aspirin in the elderly.']
+    },
+    'aspirin': {
+        'drug_interactions': ['May potentiate warfarin.'],
+        'warnings': [],
+        'contraindications': [],
+        'precautions': []
+    },
+    'ibuprofen': {
+        'drug_interactions': [],
+        'warnings': ['Reduces effect of low-dose Aspirin.'],
+        'contraindications': [],
+        'precautions': []
+    },
+    'metformin': {
+        'drug_interactions': ['Contrast agents may cause lactic acidosis.'],
+        'warnings': [],
+        'contraindications': [],
+        'precautions': []
+    }
+}
+
+@pytest.fixture
+def drug_service():
+    """Create a drug service serving canned label data."""
+    service = Mock()
+    service.cache_duration = timedelta(days=7)
+    service.get_drug_interactions.side_effect = lambda name: LABELS.get(name.lower())
+    return service
+
+@pytest.fixture
+def legacy_service():
+    """Create a real DrugInteractionService with a pre-populated cache."""
+    service = DrugInteractionService(TieredCache(LRUCache()))
+    for name, data in LABELS.items():
+        service.label_cache.set(name, data)
+    return service
+
+def test_normalize_drug_name():
+    assert normalize_drug_name('  St  John\'s   Wort ') == "st john's wort"
+
+def test_matcher_finds_overlapping_patterns():
+    matcher = AhoCorasickMatcher(['he', 'she', 'his', 'hers'])
+    assert matcher.find('ushers') == {'she', 'he', 'hers'}
+    assert matcher.find('nothing here') == {'he'}
+    assert matcher.find('xyz') == set()
+
+@pytest.mark.parametrize('med1,med2', [
+    ('Warfarin', 'Aspirin'),
+    ('Aspirin', 'Warfarin'),
+    ('Warfarin', 'Ibuprofen'),
+    ('Ibuprofen', 'Aspirin'),
+    ('Metformin', 'Aspirin'),
+])
+def test_matches_service_check_interaction(drug_service, legacy_service, med1, med2):
+    """Index results are identical to the substring-scanning service."""
+    index = InteractionIndex(drug_service)
+    index.ensure(LABELS)
+
+    assert index.check_interaction(med1, med2) == legacy_service.check_interaction(med1, med2)
+
+def test_labels_fetched_once_per_drug(drug_service):
+    index = InteractionIndex(drug_service)
+    index.ensure(['Warfarin', 'Aspirin', 'Ibuprofen'])
+
+    for _ in range(3):
+        index.check_interaction('Warfarin', 'Aspirin')
+        index.check_interaction('Aspirin', 'Ibuprofen')
+
+    assert drug_service.get_drug_interactions.call_count == 3
+
+def test_incremental_add_indexes_existing_labels(drug_service):
+    """Drugs added later are found in labels indexed earlier."""
+    index = InteractionIndex(drug_service)
+    index.ensure(['Warfarin'])
+    assert index.interacting_names('Warfarin') == set()
+
+    index.ensure(['Ibuprofen'])
+    assert index.interacting_names('Warfarin') == {'ibuprofen'}
+    assert index.interacting_names('Ibuprofen') == set()
+
+def test_missing_label_returns_none(drug_service):
+    index = InteractionIndex(drug_service)
+    assert index.check_interaction('Warfarin', 'Unknownium') is None
+
+def test_expired_entries_are_refetched(drug_service):
+    index = InteractionIndex(drug_service, ttl=timedelta(0))
+    index.ensure(['Warfarin', 'Aspirin'])
+    index._last_sweep = datetime.min
+
+    index.ensure(['Warfarin'])
+
+    assert drug_service.get_drug_interactions.call_count == 3
+    assert 'aspirin' not in index._labels
+    assert 'aspirin' not in index._edges['warfarin']
+
+def test_invalidate_drops_edges(drug_service):
+    index = InteractionIndex(drug_service)
+    index.ensure(['Warfarin', 'Aspirin'])
+
+    index.invalidate('Aspirin')
+
+    assert 'aspirin' not in index._edges['warfarin']
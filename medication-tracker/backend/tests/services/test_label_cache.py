@@ -0,0 +1,127 @@
+"""Tests for the tiered drug label cache."""
+
+import threading
+import time
+import pytest
+from unittest.mock import Mock, patch
+
+from app.services.drug_interaction_service import DrugInteractionService
+from app.services.label_cache import (
+    LRUCache,
+    SQLiteCacheBackend,
+    TieredCache
+)
+
+FDA_RESPONSE = {
+    'results': [{
+        'openfda': {'brand_name': ['Coumadin'], 'generic_name': ['warfarin']},
+        'drug_interactions': ['Aspirin increases bleeding risk.'],
+        'warnings': ['Monitor INR.'],
+        'contraindications': [],
+        'precautions': []
+    }]
+}
+
+@pytest.fixture
+def shared_backend(tmp_path):
+    """Create a SQLite shared tier in a temporary directory."""
+    return SQLiteCacheBackend(str(tmp_path / 'labels.db'))
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(max_entries=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+
+    assert cache.get('a') == 1
+    assert cache.get('b') is None
+    assert cache.get('c') == 3
+
+def test_lru_expires_entries():
+    cache = LRUCache(ttl=0.01)
+    cache.set('a', 1)
+    time.sleep(0.02)
+    assert cache.get('a') is None
+    assert len(cache) == 0
+
+def test_shared_tier_survives_new_process_cache(shared_backend):
+    """A fresh in-process tier is populated from the shared tier."""
+    TieredCache(LRUCache(), shared_backend).set('warfarin', {'warnings': []})
+
+    cache = TieredCache(LRUCache(), shared_backend)
+    assert cache.get('warfarin') == {'warnings': []}
+    assert cache.get('warfarin') == {'warnings': []}
+
+    stats = cache.stats()
+    assert stats['shared_hits'] == 1
+    assert stats['local_hits'] == 1
+
+def test_sqlite_opens_lazily_per_process(tmp_path):
+    """The database is created on first use and reopened after fork."""
+    path = tmp_path / 'cache' / 'labels.db'
+    backend = SQLiteCacheBackend(str(path))
+    assert not path.exists()
+
+    backend.set('warfarin', {'warnings': []}, ttl=60)
+    assert path.exists()
+    parent_conn = backend._conn
+
+    with patch('app.services.label_cache.os.getpid', return_value=backend._pid + 1):
+        assert backend.get('warfarin') == {'warnings': []}
+    assert backend._conn is not parent_conn
+
+def test_none_results_are_not_cached():
+    cache = TieredCache(LRUCache())
+    loader = Mock(return_value=None)
+
+    assert cache.get_or_load('unknown', loader) is None
+    assert cache.get_or_load('unknown', loader) is None
+    assert loader.call_count == 2
+
+def test_concurrent_misses_are_coalesced():
+    cache = TieredCache(LRUCache())
+    release = threading.Event()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        release.wait(1)
+        return {'drug_interactions': []}
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_or_load('warfarin', loader)))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [{'drug_interactions': []}] * 8
+    assert cache.stats()['coalesced'] == 7
+
+def test_loader_errors_reach_every_waiter():
+    cache = TieredCache(LRUCache())
+
+    with pytest.raises(ValueError):
+        cache.get_or_load('warfarin', Mock(side_effect=ValueError('boom')))
+    assert cache.get_or_load('warfarin', Mock(return_value={'a': 1})) == {'a': 1}
+
+@patch('app.services.drug_interaction_service.requests.get')
+def test_interactions_and_details_share_one_fetch(mock_get):
+    """get_drug_interactions and get_detailed_info both read the cached label."""
+    mock_get.return_value.json.return_value = FDA_RESPONSE
+    service = DrugInteractionService(TieredCache(LRUCache()))
+
+    interactions = service.get_drug_interactions('Warfarin')
+    details = service.get_detailed_info('warfarin')
+
+    assert mock_get.call_count == 1
+    assert interactions['drug_interactions'] == ['Aspirin increases bleeding risk.']
+    assert details['brand_name'] == ['Coumadin']
+    assert service.get_cache_stats()['local_hits'] == 1
@@ -0,0 +1,165 @@
+"""Tests for the columnar metrics store."""
+
+import time
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from app.services.metrics_store import ColumnarMetricsStore
+
+BASE = datetime(2024, 1, 1, 10, 0, 0)
+
+def metric(offset_seconds, name='api.latency', value=None, metric_type='performance'):
+    return {
+        'timestamp': (BASE + timedelta(seconds=offset_seconds)).isoformat(),
+        'metric_type': metric_type,
+        'name': name,
+        'value': {'duration': offset_seconds} if value is None else value,
+        'priority': 'high',
+        'status': 'complete'
+    }
+
+@pytest.fixture
+def store(tmp_path):
+    """Create a store that only writes on explicit flush."""
+    return ColumnarMetricsStore(str(tmp_path / 'columnar'), flush_size=10000, flush_interval=0)
+
+def test_flush_writes_hour_partitions(store):
+    store.append('performance', metric(0))
+    store.append('performance', metric(3600))
+    store.append('usage', metric(60, value={'user_id': 'u1'}, metric_type='usage'))
+    assert store.flush() == 3
+
+    assert sorted(store.manifest['partitions']) == [
+        'performance/2024-01-01/10',
+        'performance/2024-01-01/11',
+        'usage/2024-01-01/10'
+    ]
+    assert (store.directory / 'performance/2024-01-01/11').is_dir()
+
+def test_query_prunes_partitions_and_orders_by_time(store):
+    for offset in (7300, 10, 3700, 20):
+        store.append('performance', metric(offset))
+    store.flush()
+
+    parts = list(store._parts('performance', None, int(np.datetime64(BASE + timedelta(minutes=59), 'us').astype(np.int64))))
+    assert len(parts) == 1
+
+    result = store.query('performance', start_time=BASE + timedelta(seconds=15))
+    assert [record['value']['duration'] for record in result['record']] == [20, 3700, 7300]
+    assert result['timestamp'][0] == np.datetime64(BASE + timedelta(seconds=20), 'us')
+
+def test_query_loads_only_requested_columns(store):
+    store.append('performance', metric(5))
+    store.append('security', metric(6, name='login', value={'status': 'ok'}, metric_type='security'))
+
+    result = store.query(columns=['name', 'value'])
+    assert set(result) == {'name', 'value'}
+    assert result['name'].tolist() == ['api.latency', 'login']
+    assert result['value'][0] == 5.0
+    assert np.isnan(result['value'][1])
+
+    with pytest.raises(ValueError):
+        store.query(columns=['priority'])
+
+def test_rollups_merge_across_parts(store):
+    store.append('performance', metric(0))
+    store.append('performance', metric(30))
+    store.flush()
+    store.append('performance', metric(45))
+    store.append('performance', metric(90))
+    store.flush()
+
+    minutes = store.rollup('1m', 'performance')
+    assert [(row['count'], row['sum'], row['min'], row['max']) for row in minutes] == [
+        (3, 75.0, 0.0, 45.0),
+        (1, 90.0, 90.0, 90.0)
+    ]
+    hourly = store.rollup('1h', 'performance', name='api.latency')
+    assert hourly == [{
+        'bucket': BASE.isoformat(),
+        'name': 'api.latency',
+        'count': 4,
+        'sum': 165.0,
+        'min': 0.0,
+        'max': 90.0,
+        'mean': 41.25
+    }]
+    assert store.rollup('1d', name='missing') == []
+
+def test_rollup_without_numeric_values(store):
+    store.append('usage', metric(0, value={'user_id': 'u1'}, metric_type='usage'))
+    rows = store.rollup('1d', 'usage')
+    assert rows[0]['count'] == 1
+    assert rows[0]['mean'] is None
+
+def test_compaction_keeps_rows_and_removes_old_parts(tmp_path):
+    store = ColumnarMetricsStore(str(tmp_path / 'columnar'), flush_size=10000, max_parts=3)
+    for offset in range(5):
+        store.append('performance', metric(offset * 10))
+        store.flush()
+
+    partition = store.manifest['partitions']['performance/2024-01-01/10']
+    assert partition['rows'] == 5
+    assert len(partition['parts']) <= 3
+    on_disk = sorted(p.name for p in (store.directory / 'performance/2024-01-01/10').iterdir())
+    assert on_disk == sorted(partition['parts'])
+    assert [r['value']['duration'] for r in store.records('performance')] == [0, 10, 20, 30, 40]
+
+def test_store_reloads_manifest_written_elsewhere(tmp_path):
+    writer = ColumnarMetricsStore(str(tmp_path / 'columnar'), flush_size=10000)
+    reader = ColumnarMetricsStore(str(tmp_path / 'columnar'), flush_size=10000)
+    writer.append('performance', metric(1))
+    writer.flush()
+
+    assert len(reader.records()) == 1
+    reader.append('performance', metric(2, name='api.other'))
+    reader.flush()
+    assert writer.query(columns=['name'])['name'].tolist() == ['api.latency', 'api.other']
+
+def test_idle_records_are_flushed_in_background(tmp_path):
+    store = ColumnarMetricsStore(str(tmp_path / 'columnar'), flush_size=10000, flush_interval=0.05)
+    store.append('performance', metric(1))
+
+    reader = ColumnarMetricsStore(str(tmp_path / 'columnar'), flush_interval=0)
+    deadline = time.monotonic() + 5
+    while not reader.records() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(reader.records()) == 1
+    store.close()
+
+def test_close_flushes_staged_records(tmp_path):
+    store = ColumnarMetricsStore(str(tmp_path / 'columnar'), flush_size=10000, flush_interval=0)
+    store.append('performance', metric(1))
+    store.close()
+
+    assert len(ColumnarMetricsStore(str(tmp_path / 'columnar'), flush_interval=0).records()) == 1
+
+def test_query_retries_when_compaction_removes_a_part(tmp_path):
+    writer = ColumnarMetricsStore(str(tmp_path / 'columnar'), flush_size=10000, max_parts=2, flush_interval=0)
+    reader = ColumnarMetricsStore(str(tmp_path / 'columnar'), flush_size=10000, flush_interval=0)
+    for offset in (0, 10):
+        writer.append('performance', metric(offset))
+        writer.flush()
+
+    listed = []
+    original = reader._parts
+
+    def parts_then_compact(*args):
+        parts = list(original(*args))
+        if not listed:
+            # Another writer compacts the partition after the reader listed its parts
+            writer.append('performance', metric(20))
+            writer.flush()
+        listed.append(parts)
+        return parts
+
+    with patch.object(reader, '_parts', side_effect=parts_then_compact):
+        durations = [r['value']['duration'] for r in reader.records('performance')]
+        minutes = reader.rollup('1m', 'performance')
+
+    assert durations == [0, 10, 20]
+    assert len(listed) == 3
+    assert minutes[0]['count'] == 3
@@ -0,0 +1,109 @@
+"""Tests for batched notification materialization."""
+
+import pytest
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+from app.services import notification_scheduler
+from app.services.notification_scheduler import NotificationScheduler
+
+NOW = datetime(2024, 1, 1, 6, 0)
+
+def make_medication(med_id, user_id=1, dose_times=None):
+    return SimpleNamespace(
+        id=med_id,
+        user_id=user_id,
+        dose_times=dose_times or ['09:00'],
+        is_prn=False,
+        start_date=None,
+        end_date=None,
+        user=None
+    )
+
+def make_prefs(user_id=1, advance=30):
+    return SimpleNamespace(
+        user_id=user_id,
+        reminder_advance_minutes=advance,
+        refill_reminder_days_before=7,
+        notify_interactions=False
+    )
+
+@pytest.fixture
+def mock_db():
+    """Patch the scheduler's database handle."""
+    with patch.object(notification_scheduler, 'db') as db:
+        db.session.query.return_value.filter.return_value.all.return_value = []
+        yield db
+
+def test_dose_rows_cover_the_week(mock_db):
+    rows = NotificationScheduler._dose_notification_rows([make_medication(1)], {1: make_prefs()}, NOW)
+
+    reminders = [row['scheduled_time'] for row in rows if row['type'] == 'UPCOMING_DOSE']
+    missed = [row['scheduled_time'] for row in rows if row['type'] == 'MISSED_DOSE']
+    assert reminders[0] == datetime(2024, 1, 1, 8, 30)
+    assert missed[0] == datetime(2024, 1, 1, 9, 30)
+    assert len(reminders) == len(missed) == 7
+    assert mock_db.session.query.call_count == 1
+
+def test_existing_keys_are_skipped(mock_db):
+    mock_db.session.query.return_value.filter.return_value.all.return_value = [
+        (1, 'UPCOMING_DOSE', datetime(2024, 1, 1, 8, 30)),
+        (1, 'MISSED_DOSE', datetime(2024, 1, 1, 9, 30))
+    ]
+
+    rows = NotificationScheduler._dose_notification_rows([make_medication(1)], {1: make_prefs()}, NOW)
+
+    assert len(rows) == 12
+    assert all(row['scheduled_time'].date() != NOW.date() for row in rows)
+
+def test_reminders_in_the_past_are_not_created(mock_db):
+    now = datetime(2024, 1, 1, 8, 45)
+    rows = NotificationScheduler._dose_notification_rows([make_medication(1)], {1: make_prefs()}, now)
+
+    first_day = [row['type'] for row in rows if row['scheduled_time'].date() == now.date()]
+    assert first_day == ['MISSED_DOSE']
+
+def test_reminder_advance_is_per_user(mock_db):
+    medications = [make_medication(1, user_id=1), make_medication(2, user_id=2)]
+    prefs = {1: make_prefs(1, advance=30), 2: make_prefs(2, advance=60)}
+
+    rows = NotificationScheduler._dose_notification_rows(medications, prefs, NOW)
+
+    first = {
+        row['medication_id']: row['scheduled_time']
+        for row in reversed(rows) if row['type'] == 'UPCOMING_DOSE'
+    }
+    assert first == {1: datetime(2024, 1, 1, 8, 30), 2: datetime(2024, 1, 1, 8, 0)}
+
+def test_bulk_insert_commits_once_per_batch(mock_db):
+    rows = [{'medication_id': i} for i in range(5)]
+
+    with patch.object(notification_scheduler, 'INSERT_BATCH_SIZE', 2), \
+            patch.object(NotificationScheduler, '_insert_statement', return_value='INSERT'):
+        batches = NotificationScheduler._bulk_insert(rows)
+
+    assert batches == 3
+    assert [len(call.args[1]) for call in mock_db.session.execute.call_args_list] == [2, 2, 1]
+    assert mock_db.session.commit.call_count == 3
+
+def test_materialize_preloads_preferences_once(mock_db):
+    medications = [make_medication(i, user_id=i % 3) for i in range(9)]
+    preferences = Mock()
+    preferences.query.filter.return_value.all.return_value = [make_prefs(0), make_prefs(1)]
+
+    with patch.object(notification_scheduler, 'NotificationPreferences', preferences), \
+            patch.object(NotificationScheduler, '_insert_statement', return_value='INSERT'):
+        stats = NotificationScheduler.materialize(medications, NOW)
+
+    assert preferences.query.filter.call_count == 1
+    assert stats['medications'] == 6
+    assert stats['created'] == 6 * 14
+    assert stats['rows_per_second'] > 0
+
+def test_duplicate_dose_times_create_one_row(mock_db):
+    medication = make_medication(1, dose_times=['09:00', '09:00'])
+
+    rows = NotificationScheduler._dose_notification_rows([medication], {1: make_prefs()}, NOW)
+
+    assert len(rows) == 14
@@ -0,0 +1,93 @@
+"""Tests for the streaming medication data export."""
+
+import csv
+import gzip
+import io
+import json
+import pytest
+from unittest.mock import patch
+
+from app.services import report_service as report_module
+from app.services.report_service import ReportService
+
+MEDICATION = {'id': 1, 'name': 'Warfarin', 'dosage': '5mg'}
+HISTORY = [
+    {'id': 10, 'medicationId': 1, 'action': 'taken', 'notes': 'with food, after breakfast'},
+    {'id': 11, 'medicationId': 1, 'action': 'missed', 'notes': None}
+]
+
+def sections(medications=(MEDICATION,), history=tuple(HISTORY), notifications=()):
+    def fake(user_id):
+        yield 'medication', iter(medications)
+        yield 'history', iter(history)
+        yield 'notification', iter(notifications)
+    return fake
+
+@pytest.fixture
+def export_data():
+    with patch.object(ReportService, '_export_sections', side_effect=sections()) as fake:
+        yield fake
+
+def test_json_export_streams_ndjson(export_data):
+    lines = ''.join(ReportService.stream_medication_data(1, 'json')).splitlines()
+
+    assert json.loads(lines[0])['type'] == 'export'
+    assert [json.loads(line) for line in lines[1:]] == [
+        {'type': 'medication', 'data': MEDICATION},
+        {'type': 'history', 'data': HISTORY[0]},
+        {'type': 'history', 'data': HISTORY[1]}
+    ]
+
+def test_csv_export_keeps_sectioned_layout(export_data):
+    rows = list(csv.reader(io.StringIO(''.join(ReportService.stream_medication_data(1, 'csv')))))
+
+    assert rows == [
+        ['MEDICATIONS'],
+        ['id', 'name', 'dosage'],
+        ['1', 'Warfarin', '5mg'],
+        [],
+        ['MEDICATION HISTORY'],
+        ['id', 'medicationId', 'action', 'notes'],
+        ['10', '1', 'taken', 'with food, after breakfast'],
+        ['11', '1', 'missed', ''],
+        [],
+        ['NOTIFICATIONS']
+    ]
+
+def test_chunks_are_bounded(monkeypatch):
+    history = [{'id': i, 'notes': 'x' * 100} for i in range(1000)]
+    monkeypatch.setattr(report_module, 'EXPORT_CHUNK_SIZE', 4096)
+
+    with patch.object(ReportService, '_export_sections', side_effect=sections(history=history)):
+        chunks = list(ReportService.stream_medication_data(1, 'json'))
+
+    assert len(chunks) > 10
+    assert all(len(chunk) < 4096 + 200 for chunk in chunks)
+    assert len(''.join(chunks).splitlines()) == 1002
+
+def test_records_are_consumed_lazily():
+    consumed = []
+
+    def history():
+        for record in HISTORY:
+            consumed.append(record['id'])
+            yield record
+
+    with patch.object(ReportService, '_export_sections', side_effect=sections(history=history())):
+        stream = ReportService.stream_medication_data(1, 'json')
+        assert consumed == []
+        list(stream)
+
+    assert consumed == [10, 11]
+
+def test_gzip_chunks_round_trip(export_data):
+    text = ''.join(ReportService.stream_medication_data(1, 'csv'))
+
+    with patch.object(ReportService, '_export_sections', side_effect=sections()):
+        compressed = b''.join(ReportService.gzip_chunks(ReportService.stream_medication_data(1, 'csv')))
+
+    assert gzip.decompress(compressed).decode('utf-8') == text
+
+def test_unknown_format_rejected():
+    with pytest.raises(ValueError):
+        list(ReportService.stream_medication_data(1, 'xml'))
@@ -0,0 +1,132 @@
+"""Tests for the schedule expansion engine."""
+
+import numpy as np
+import pytest
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from app.services.schedule_expansion import (
+    ScheduleExpansionEngine,
+    compile_medication,
+    compile_schedule,
+    expand_medications,
+    interval_hours_of_day
+)
+
+START = datetime(2024, 1, 1)
+
+def fixed(times, **extra):
+    return SimpleNamespace(
+        type='fixed_time',
+        fixed_time_slots=[{'time': t} for t in times],
+        **extra
+    )
+
+def expand_one(compiled, start=START, days=1):
+    engine = ScheduleExpansionEngine()
+    engine.add('med', compiled)
+    return engine.expand(start, start + timedelta(days=days)).to_datetimes('med')
+
+def test_fixed_times_over_multiple_days():
+    doses = expand_one(compile_schedule(fixed(['20:00', '08:00'])), days=2)
+
+    assert doses == [
+        datetime(2024, 1, 1, 8), datetime(2024, 1, 1, 20),
+        datetime(2024, 1, 2, 8), datetime(2024, 1, 2, 20)
+    ]
+
+def test_daily_interval_restarts_at_midnight():
+    schedule = SimpleNamespace(type='interval', interval={'hours': 8})
+
+    assert expand_one(compile_schedule(schedule)) == [
+        datetime(2024, 1, 1, 0), datetime(2024, 1, 1, 8), datetime(2024, 1, 1, 16)
+    ]
+
+def test_anchored_interval_runs_continuously():
+    schedule = SimpleNamespace(
+        type='interval',
+        interval={'hours': 10, 'start_time': '2023-12-31T22:00:00'}
+    )
+
+    assert expand_one(compile_schedule(schedule)) == [
+        datetime(2024, 1, 1, 8), datetime(2024, 1, 1, 18)
+    ]
+
+def test_meal_based_offset():
+    schedule = SimpleNamespace(
+        type='meal_based',
+        meal_based={'meal': 'dinner', 'relation': 'before', 'time_offset': 30}
+    )
+
+    assert expand_one(compile_schedule(schedule)) == [datetime(2024, 1, 1, 17, 30)]
+
+def test_cyclic_days_on_and_off():
+    schedule = fixed(['09:00'], start_date=START)
+    schedule.type = 'cyclic'
+    schedule.cyclic = {'days_on': 2, 'days_off': 1}
+
+    doses = expand_one(compile_schedule(schedule), days=6)
+
+    assert [d.day for d in doses] == [1, 2, 4, 5]
+
+def test_tapered_stops_when_dose_reaches_zero():
+    schedule = fixed(['09:00'], start_date=START)
+    schedule.type = 'tapered'
+    schedule.tapered = {'days': 6, 'steps': 3, 'start_dose': 20, 'end_dose': 0}
+
+    doses = expand_one(compile_schedule(schedule), days=10)
+
+    assert [d.day for d in doses] == [1, 2, 3, 4]
+
+def test_medication_dose_times_in_user_timezone():
+    medication = SimpleNamespace(
+        id=7,
+        dose_times='["09:00"]',
+        is_prn=False,
+        start_date=None,
+        end_date=datetime(2024, 1, 3),
+        user=SimpleNamespace(timezone='Europe/Paris')
+    )
+
+    doses = expand_one(compile_medication(medication), days=5)
+
+    assert doses == [datetime(2024, 1, 1, 8), datetime(2024, 1, 2, 8)]
+
+def test_doses_around_dst_change_use_their_own_offset():
+    # Paris moves from UTC+1 to UTC+2 at 02:00 on 2024-03-31
+    medication = SimpleNamespace(
+        id=7,
+        dose_times=['01:00', '09:00'],
+        is_prn=False,
+        start_date=None,
+        end_date=None,
+        user=SimpleNamespace(timezone='Europe/Paris')
+    )
+
+    doses = expand_one(compile_medication(medication), start=datetime(2024, 3, 31), days=1)
+
+    assert doses == [datetime(2024, 3, 31, 0), datetime(2024, 3, 31, 7), datetime(2024, 3, 31, 23)]
+
+def test_prn_medications_have_no_doses():
+    medication = SimpleNamespace(id=1, dose_times=['09:00'], is_prn=True, user=None)
+
+    assert expand_one(compile_medication(medication)) == []
+
+def test_many_medications_sorted_with_owners():
+    medications = [
+        SimpleNamespace(id=i, dose_times=[f'{8 + i:02d}:00'], is_prn=False, user=None)
+        for i in range(3)
+    ]
+
+    doses = expand_medications(medications, START, START + timedelta(days=1))
+
+    assert doses.owners.tolist() == [0, 1, 2]
+    assert doses.times.dtype == np.dtype('datetime64[s]')
+    assert doses.to_datetimes(2) == [datetime(2024, 1, 1, 10)]
+
+@pytest.mark.parametrize('start,interval,expected', [
+    (datetime(2024, 1, 1, 22, 30), 8, [6, 14, 22]),
+    (datetime(2024, 1, 1, 0, 0), 12, [0, 12]),
+])
+def test_interval_hours_of_day(start, interval, expected):
+    assert interval_hours_of_day(start, interval).tolist() == expected
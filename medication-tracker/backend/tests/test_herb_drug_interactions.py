@@ -7,6 +7,7 @@ from app.services.api_parsers import (
     MedlinePlusParser, DailyMedParser, NCCIHParser, OpenFDAParser,
     combine_interaction_data
 )
+from app.services.herb_drug_interaction_service import HerbDrugInteractionService
 
 class TestHerbDrugParsers(unittest.TestCase):
     def setUp(self):
@@ -117,5 +118,65 @@ class TestHerbDrugParsers(unittest.TestCase):
         self.assertIsNone(NCCIHParser.parse_response({}))
         self.assertIsNone(OpenFDAParser.parse_response({}))
 
+class TestHerbDrugInteractionService(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.service = HerbDrugInteractionService()
+        self.nccih_data = {
+            'result': {
+                'safety': {'interactions': ['Moderate interaction potential with blood thinners.']},
+                'evidence_level': 'B'
+            }
+        }
+        self.openfda_data = {
+            'results': [{'warnings': ['Severe interaction with certain medications.']}]
+        }
+
+    async def asyncTearDown(self):
+        await self.service.close()
+
+    async def test_sources_are_queried_concurrently(self):
+        in_flight = []
+        peak = []
+
+        async def fake_get(source, url, params, as_xml=False):
+            in_flight.append(source)
+            peak.append(len(in_flight))
+            await asyncio.sleep(0.05)
+            in_flight.remove(source)
+            return {'NCCIH': self.nccih_data, 'OpenFDA': self.openfda_data}.get(source)
+
+        with patch.object(self.service, '_get', side_effect=fake_get):
+            result = await self.service.check_interaction('Ginkgo', 'Warfarin')
+
+        self.assertEqual(max(peak), 4)
+        self.assertEqual(result['severity'], 'Major')
+        self.assertCountEqual(result['sources'], ['NCCIH', 'OpenFDA'])
+
+    async def test_failed_source_keeps_partial_result_uncached(self):
+        async def fake_get(source, url, params, as_xml=False):
+            if source == 'OpenFDA':
+                raise asyncio.TimeoutError()
+            return self.nccih_data if source == 'NCCIH' else None
+
+        with patch.object(self.service, '_get', side_effect=fake_get):
+            result = await self.service.check_interaction('Ginkgo', 'Warfarin')
+
+        self.assertEqual(result['sources'], ['NCCIH'])
+        self.assertEqual(self.service.interaction_cache, {})
+
+    async def test_repeat_pair_is_served_from_cache(self):
+        calls = []
+
+        async def fake_get(source, url, params, as_xml=False):
+            calls.append(source)
+            return self.nccih_data if source == 'NCCIH' else None
+
+        with patch.object(self.service, '_get', side_effect=fake_get):
+            first = await self.service.check_interaction('Ginkgo', 'Warfarin')
+            second = await self.service.check_interaction('ginkgo', 'WARFARIN')
+
+        self.assertEqual(first, second)
+        self.assertEqual(len(calls), 4)
+
 if __name__ == '__main__':
     unittest.main()
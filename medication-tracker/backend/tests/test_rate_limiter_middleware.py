@@ -0,0 +1,100 @@
+"""Tests for the token bucket rate limiting middleware."""
+
+import pytest
+from unittest.mock import AsyncMock, Mock
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from redis.exceptions import ConnectionError
+
+from app.middleware.rate_limiter import Bucket, LocalTokenBuckets, RateLimiter, TOKEN_BUCKET_SCRIPT
+
+def make_app(redis_client=None):
+    app = FastAPI()
+    app.add_middleware(RateLimiter, redis_client=redis_client)
+
+    @app.get("/api/auth/me")
+    async def me():
+        return {"email": "test@example.com"}
+
+    return app
+
+def make_redis(reply=None, error=None):
+    """Async Redis client whose registered script returns a canned reply."""
+    script = AsyncMock(return_value=reply, side_effect=error)
+    client = Mock()
+    client.register_script.return_value = script
+    return client, script
+
+def test_local_buckets_allow_burst_then_refill():
+    buckets = LocalTokenBuckets()
+    limit = [Bucket("key", 10, 10, 3)]  # 1 token per second, burst of 3
+
+    results = [buckets.consume(limit, 100.0)[0] for _ in range(4)]
+    assert results == [True, True, True, False]
+
+    allowed, tokens = buckets.consume(limit, 101.0)
+    assert allowed is True
+    assert tokens == [0.0]
+
+def test_local_buckets_charge_all_or_nothing():
+    buckets = LocalTokenBuckets()
+    path, ip = Bucket("path", 60, 60, 5), Bucket("ip", 60, 60, 1)
+
+    assert buckets.consume([path, ip], 0.0)[0] is True
+    allowed, tokens = buckets.consume([path, ip], 0.0)
+
+    assert allowed is False
+    assert tokens == [4.0, 0.0]
+
+def test_local_buckets_evict_idle_keys():
+    buckets = LocalTokenBuckets(max_keys=2)
+    buckets.consume([Bucket("old", 1, 1, 1)], 0.0)
+    buckets.consume([Bucket("recent", 1, 1, 1)], 5000.0)
+    buckets.consume([Bucket("new", 1, 1, 1)], 5000.0)
+
+    assert set(buckets.buckets) == {"recent", "new"}
+
+def test_script_called_once_with_both_buckets():
+    client, script = make_redis(reply=[1, "19", "1199"])
+    response = TestClient(make_app(client)).get("/api/auth/me")
+
+    assert response.status_code == 200
+    assert client.register_script.call_args.args[0] == TOKEN_BUCKET_SCRIPT
+    script.assert_awaited_once()
+    keys = script.await_args.kwargs["keys"]
+    assert keys == ["rate_limit:testclient:/api/auth/me", "ip_rate_limit:testclient"]
+    assert response.headers["X-RateLimit-Limit"] == "20"
+    assert response.headers["X-RateLimit-Remaining"] == "19"
+    assert response.headers["X-RateLimit-Burst-Remaining"] == "19"
+    assert response.headers["X-RateLimit-Reset"] == "33"
+
+def test_denied_by_script_returns_429():
+    client, _ = make_redis(reply=[0, "0.5", "1100"])
+    response = TestClient(make_app(client)).get("/api/auth/me")
+
+    assert response.status_code == 429
+    assert "Rate limit exceeded" in response.json()["detail"]
+    assert response.headers["Retry-After"] == "2"
+
+def test_falls_back_to_local_buckets_when_redis_is_down():
+    client, script = make_redis(error=ConnectionError("down"))
+    test_client = TestClient(make_app(client))
+
+    statuses = [test_client.get("/api/auth/me").status_code for _ in range(31)]
+
+    # Burst of 30 is still enforced locally, and Redis is not retried immediately
+    assert statuses.count(200) == 30
+    assert statuses[-1] == 429
+    assert script.await_count == 1
+
+def test_blacklisted_ip_is_blocked():
+    app = make_app()
+    test_client = TestClient(app)
+    test_client.get("/api/auth/me")
+    limiter = app.middleware_stack.app
+    limiter.add_to_blacklist("testclient")
+
+    response = test_client.get("/api/auth/me")
+
+    assert response.status_code == 403
+    assert response.json()["detail"] == "IP address blocked"
@@ -0,0 +1,123 @@
+"""Tests for the concurrent notification worker pool."""
+
+import asyncio
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import fakeredis.aioredis
+
+from app.infrastructure.queue import worker as worker_module
+from app.infrastructure.queue.redis_manager import RedisQueueManager
+from app.infrastructure.queue.worker import NotificationWorker, parse_channel_limits
+
+SETTINGS = SimpleNamespace(QUEUE_POLL_INTERVAL=10, QUEUE_ERROR_RETRY_INTERVAL=0.01, MAX_NOTIFICATION_ATTEMPTS=3)
+
+class RecordingService:
+    """Notification service stand-in that tracks concurrent sends per channel."""
+
+    def __init__(self, delay=0.02, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.sent = []
+        self.active = {}
+        self.peak = {}
+
+    async def send_notification(self, notification):
+        channel = notification.channel
+        self.active[channel] = self.active.get(channel, 0) + 1
+        self.peak[channel] = max(self.peak.get(channel, 0), self.active[channel])
+        try:
+            await asyncio.sleep(self.delay)
+            if self.fail:
+                raise RuntimeError("Channel unavailable")
+            self.sent.append(notification.id)
+        finally:
+            self.active[channel] -= 1
+
+@pytest.fixture
+async def queue():
+    manager = RedisQueueManager(visibility_timeout=30)
+    manager.redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    with patch.object(worker_module, "queue_manager", manager), \
+            patch.object(worker_module, "settings", SETTINGS), \
+            patch.object(worker_module.Notification, "from_dict",
+                         side_effect=lambda data: SimpleNamespace(**data), create=True):
+        yield manager
+    await manager.disconnect()
+
+async def enqueue(queue, count, channel="push"):
+    for i in range(count):
+        await queue.enqueue_notification({"id": f"{channel}-{i}", "channel": channel})
+
+async def wait_until(condition, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.005)
+
+def test_parse_channel_limits():
+    assert parse_channel_limits("push=32, email=8") == {"push": 32, "email": 8}
+    assert parse_channel_limits("") == {}
+
+@pytest.mark.asyncio
+async def test_sends_run_concurrently_up_to_the_pool_size(queue):
+    service = RecordingService()
+    await enqueue(queue, 40)
+    worker = await NotificationWorker.create_and_start(service, concurrency=8, channel_limits={})
+
+    await wait_until(lambda: len(service.sent) == 40)
+    await worker.stop()
+
+    assert service.peak["push"] == 8
+    assert (await queue.get_queue_stats())["processing_notifications"] == 0
+    assert worker.stats()["sent"] == 40
+
+@pytest.mark.asyncio
+async def test_channel_limit_leaves_slots_for_other_channels(queue):
+    service = RecordingService()
+    await enqueue(queue, 10, channel="email")
+    await enqueue(queue, 10, channel="push")
+    worker = await NotificationWorker.create_and_start(service, concurrency=8, channel_limits={"email": 2})
+
+    await wait_until(lambda: len(service.sent) == 20)
+    await worker.stop()
+
+    assert service.peak["email"] == 2
+    assert service.peak["push"] > 2
+
+@pytest.mark.asyncio
+async def test_idle_worker_wakes_on_enqueue(queue):
+    service = RecordingService(delay=0)
+    worker = await NotificationWorker.create_and_start(service, concurrency=4, channel_limits={})
+    await asyncio.sleep(0.05)
+
+    await enqueue(queue, 1)
+    # Far sooner than the 10 second poll interval
+    await wait_until(lambda: len(service.sent) == 1, timeout=1.0)
+    await worker.stop()
+
+@pytest.mark.asyncio
+async def test_stop_drains_in_flight_sends(queue):
+    service = RecordingService(delay=0.1)
+    await enqueue(queue, 6)
+    worker = await NotificationWorker.create_and_start(service, concurrency=6, channel_limits={})
+    await wait_until(lambda: service.active.get("push") == 6)
+
+    await worker.stop()
+
+    assert len(service.sent) == 6
+    assert (await queue.get_queue_stats())["processing_notifications"] == 0
+
+@pytest.mark.asyncio
+async def test_failed_send_is_rescheduled(queue):
+    service = RecordingService(delay=0, fail=True)
+    await enqueue(queue, 1)
+    worker = await NotificationWorker.create_and_start(service, concurrency=2, channel_limits={})
+
+    await wait_until(lambda: service.peak.get("push") == 1 and not worker.in_flight)
+    await worker.stop()
+
+    stats = await queue.get_queue_stats()
+    assert stats["processing_notifications"] == 0
+    assert stats["scheduled_notifications"] == 1
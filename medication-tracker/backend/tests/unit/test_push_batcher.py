@@ -0,0 +1,113 @@
+"""Tests for batched FCM push delivery."""
+
+import asyncio
+import threading
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+from firebase_admin import messaging
+
+from app.infrastructure.notification import push_batcher
+from app.infrastructure.notification.push_batcher import PushDeliveryBatcher
+
+def make_log(index, token=None):
+    return {"notification_id": f"n{index}", "tokens": [token or f"token-{index}"]}
+
+def make_message(index, token=None):
+    return messaging.Message(token=token or f"token-{index}")
+
+def fake_send_each(calls, failures=None):
+    """FCM stand-in: records each batch and fails tokens listed in `failures`."""
+    failures = failures or {}
+
+    def send_each(messages):
+        calls.append((len(messages), threading.current_thread()))
+        return SimpleNamespace(responses=[
+            SimpleNamespace(message_id=None, exception=failures[message.token])
+            if message.token in failures
+            else SimpleNamespace(message_id=f"id-{message.token}", exception=None)
+            for message in messages
+        ])
+    return send_each
+
+@pytest.fixture
+def monitor():
+    return AsyncMock()
+
+@pytest.fixture
+def token_service():
+    return AsyncMock()
+
+async def send_all(batcher, count, token=None):
+    return await asyncio.gather(*(
+        batcher.send(make_message(i, token), make_log(i, token)) for i in range(count)
+    ))
+
+@pytest.mark.asyncio
+async def test_concurrent_sends_share_one_batch(monitor, token_service):
+    calls = []
+    batcher = PushDeliveryBatcher(monitor, token_service, linger=0.01)
+
+    with patch.object(push_batcher.messaging, "send_each", fake_send_each(calls)):
+        results = await send_all(batcher, 50)
+
+    assert [count for count, _ in calls] == [50]
+    assert calls[0][1] is not threading.current_thread()
+    assert results[7] == {"notification_id": "n7", "success": True, "message_id": "id-token-7"}
+    monitor.log_notifications.assert_awaited_once()
+    assert len(monitor.log_notifications.await_args[0][0]) == 50
+    monitor.update_statuses.assert_awaited_once()
+    monitor.log_notification.assert_not_called()
+    monitor.update_status.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_full_batch_is_sent_without_waiting(monitor):
+    calls = []
+    batcher = PushDeliveryBatcher(monitor, max_batch_size=20, linger=60)
+
+    with patch.object(push_batcher.messaging, "send_each", fake_send_each(calls)):
+        results = await asyncio.wait_for(send_all(batcher, 40), timeout=5)
+
+    assert [count for count, _ in calls] == [20, 20]
+    assert all(result["success"] for result in results)
+
+@pytest.mark.asyncio
+async def test_unregistered_tokens_are_pruned(monitor, token_service):
+    calls = []
+    failures = {"token-1": messaging.UnregisteredError("Requested entity was not found.")}
+    batcher = PushDeliveryBatcher(monitor, token_service, linger=0)
+
+    with patch.object(push_batcher.messaging, "send_each", fake_send_each(calls, failures)):
+        results = await send_all(batcher, 3)
+
+    assert results[1] == {"notification_id": "n1", "success": False, "error": "Token is unregistered"}
+    assert results[0]["success"] and results[2]["success"]
+    token_service.remove_tokens.assert_awaited_once_with(["token-1"])
+
+    updates = monitor.update_statuses.await_args[0][0]
+    assert updates[1]["failed_tokens"] == ["token-1"]
+    assert updates[0]["success_count"] == 1
+
+@pytest.mark.asyncio
+async def test_failed_batch_fails_every_message(monitor, token_service):
+    batcher = PushDeliveryBatcher(monitor, token_service, linger=0)
+
+    with patch.object(push_batcher.messaging, "send_each", side_effect=RuntimeError("FCM unavailable")):
+        results = await send_all(batcher, 3)
+
+    assert all(result == {"notification_id": result["notification_id"], "success": False, "error": "FCM unavailable"}
+               for result in results)
+    assert len(monitor.update_statuses.await_args[0][0]) == 3
+    token_service.remove_tokens.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_monitor_failure_does_not_block_delivery(monitor):
+    calls = []
+    monitor.log_notifications.side_effect = RuntimeError("MongoDB unavailable")
+    batcher = PushDeliveryBatcher(monitor, linger=0)
+
+    with patch.object(push_batcher.messaging, "send_each", fake_send_each(calls)):
+        results = await send_all(batcher, 2)
+
+    assert all(result["success"] for result in results)
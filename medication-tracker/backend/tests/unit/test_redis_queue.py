@@ -0,0 +1,133 @@
+"""Tests for reliable notification queue semantics."""
+
+import asyncio
+import json
+import pytest
+from datetime import datetime, timedelta
+
+import fakeredis.aioredis
+
+from app.infrastructure.queue.redis_manager import RedisQueueManager
+
+@pytest.fixture
+async def queue():
+    """Queue manager backed by an in-process Redis stand-in."""
+    manager = RedisQueueManager(visibility_timeout=30)
+    manager.redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    yield manager
+    await manager.disconnect()
+
+async def enqueue(queue, count, **kwargs):
+    for i in range(count):
+        await queue.enqueue_notification({"id": i}, **kwargs)
+
+@pytest.mark.asyncio
+async def test_concurrent_claims_never_overlap(queue):
+    await enqueue(queue, 200)
+    claimed = []
+
+    async def worker():
+        while True:
+            batch = await queue.claim_notifications(7)
+            if not batch:
+                return
+            claimed.extend(notification["data"]["id"] for notification in batch)
+            await asyncio.sleep(0)
+
+    await asyncio.gather(*(worker() for _ in range(10)))
+
+    assert sorted(claimed) == list(range(200))
+    assert (await queue.get_queue_stats())["processing_notifications"] == 200
+
+@pytest.mark.asyncio
+async def test_due_scheduled_notifications_are_claimed_first(queue):
+    await queue.enqueue_notification({"id": "ready"})
+    await queue.enqueue_notification({"id": "due"}, datetime.utcnow() - timedelta(seconds=1))
+    await queue.enqueue_notification({"id": "later"}, datetime.utcnow() + timedelta(hours=1))
+
+    claimed = await queue.claim_notifications(5)
+
+    assert [notification["data"]["id"] for notification in claimed] == ["due", "ready"]
+    assert (await queue.get_queue_stats())["scheduled_notifications"] == 1
+
+@pytest.mark.asyncio
+async def test_acknowledged_notification_is_not_redelivered(queue):
+    await enqueue(queue, 1)
+
+    notification = await queue.dequeue_notification()
+    assert await queue.ack_notification(notification)
+
+    assert await queue.reap_expired_leases() == 0
+    assert await queue.dequeue_notification() is None
+    assert (await queue.get_queue_stats())["processing_notifications"] == 0
+
+@pytest.mark.asyncio
+async def test_expired_lease_is_redelivered(queue):
+    await enqueue(queue, 2)
+
+    lost = (await queue.claim_notifications(1, visibility_timeout=0.01))[0]
+    await asyncio.sleep(0.05)
+    redelivered = await queue.claim_notifications(2)
+
+    assert [notification["id"] for notification in redelivered][0] == lost["id"]
+    assert len(redelivered) == 2
+    # The original claimer lost its lease and can no longer settle it
+    assert not await queue.extend_lease(lost)
+    assert not await queue.ack_notification(lost)
+    assert not await queue.retry_notification(lost, datetime.utcnow().timestamp())
+    assert await queue.ack_notifications(redelivered) == 2
+
+@pytest.mark.asyncio
+async def test_extended_lease_stays_invisible(queue):
+    await enqueue(queue, 1)
+
+    notification = (await queue.claim_notifications(1, visibility_timeout=0.05))[0]
+    assert await queue.extend_lease(notification, 30)
+    await asyncio.sleep(0.1)
+
+    assert await queue.claim_notifications(1) == []
+    assert await queue.ack_notification(notification)
+
+@pytest.mark.asyncio
+async def test_retry_reschedules_and_releases_lease(queue):
+    await enqueue(queue, 1)
+    notification = await queue.dequeue_notification()
+    notification["attempts"] = 2
+
+    assert await queue.retry_notification(notification, datetime.utcnow().timestamp() - 1)
+    stats = await queue.get_queue_stats()
+    retried = await queue.dequeue_notification()
+
+    assert stats["processing_notifications"] == 0
+    assert stats["scheduled_notifications"] == 1
+    assert retried["id"] == notification["id"]
+    assert retried["attempts"] == 2
+
+@pytest.mark.asyncio
+async def test_dead_lettered_notification_releases_lease(queue):
+    await enqueue(queue, 1)
+    notification = await queue.dequeue_notification()
+
+    assert await queue.move_to_dlq(notification, "Max attempts reached")
+    stats = await queue.get_queue_stats()
+    dead = json.loads(await queue.redis.lindex(queue.dead_letter_queue, 0))
+
+    assert stats["processing_notifications"] == 0
+    assert stats["dead_letter_queue"] == 1
+    assert dead["error"] == "Max attempts reached"
+    assert "receipt" not in dead
+
+@pytest.mark.asyncio
+async def test_dead_letter_requires_lease(queue):
+    await enqueue(queue, 1)
+
+    lost = (await queue.claim_notifications(1, visibility_timeout=0.01))[0]
+    await asyncio.sleep(0.05)
+    redelivered = await queue.claim_notifications(1)
+
+    # The redelivered copy is still leased, so the lost claim must not settle it
+    assert not await queue.move_to_dlq(lost, "Max attempts reached")
+    stats = await queue.get_queue_stats()
+    assert stats["dead_letter_queue"] == 0
+    assert stats["processing_notifications"] == 1
+    assert await queue.ack_notifications(redelivered) == 1
@@ -0,0 +1,175 @@
+"""Tests for the Redis timing-wheel reminder engine."""
+
+import json
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+import pytz
+
+import fakeredis
+import fakeredis.aioredis
+
+from app.infrastructure.notification import reminder_engine
+from app.infrastructure.notification.reminder_engine import ReminderEngine, minute_of
+
+NOW = datetime(2025, 1, 6, 8, 59, 30, tzinfo=pytz.UTC)  # a Monday
+
+def daily(*times):
+    return {"type": "daily", "times": list(times)}
+
+class Recorder:
+    def __init__(self):
+        self.fired = []
+
+    async def __call__(self, user_id, medication_id, dose_time):
+        self.fired.append((user_id, medication_id, dose_time))
+
+@pytest.fixture
+def server():
+    return fakeredis.FakeServer()
+
+@pytest.fixture
+def client(server):
+    return fakeredis.aioredis.FakeRedis(server=server, decode_responses=True)
+
+def make_engine(client, recorder, **kwargs):
+    return ReminderEngine(recorder, redis_client=client, shards=8, **kwargs)
+
+@pytest.mark.asyncio
+async def test_fires_due_reminder_once_and_moves_it_to_the_next_day(client):
+    recorder = Recorder()
+    engine = make_engine(client, recorder)
+    await engine.schedule("u1", "m1", daily("09:00", "21:00"), "UTC", now=NOW)
+
+    assert await engine.tick(NOW) == 0
+    assert await engine.tick(NOW + timedelta(seconds=40)) == 1
+    assert await engine.tick(NOW + timedelta(seconds=50)) == 0
+
+    assert recorder.fired == [("u1", "m1", "09:00")]
+    next_fire = datetime(2025, 1, 7, 9, 0, tzinfo=pytz.UTC)
+    assert await client.hget("reminder_entry:m1", "slot:09:00") == str(minute_of(next_fire))
+
+@pytest.mark.asyncio
+async def test_cancel_and_reschedule_remove_old_entries(client):
+    recorder = Recorder()
+    engine = make_engine(client, recorder)
+    await engine.schedule("u1", "m1", daily("09:00"), "UTC", now=NOW)
+    await engine.schedule("u1", "m1", daily("10:00"), "UTC", now=NOW)
+    await engine.schedule("u2", "m2", daily("09:00"), "UTC", now=NOW)
+
+    assert await engine.cancel("m2")
+    assert not await engine.cancel("m2")
+
+    await engine.tick(NOW + timedelta(minutes=1))
+    assert recorder.fired == []
+    await engine.tick(NOW + timedelta(minutes=61))
+    assert recorder.fired == [("u1", "m1", "10:00")]
+
+@pytest.mark.asyncio
+async def test_shards_are_split_between_workers(client):
+    recorders = [Recorder(), Recorder()]
+    engines = [
+        make_engine(client, recorder, worker_index=index, worker_count=2)
+        for index, recorder in enumerate(recorders)
+    ]
+    for i in range(40):
+        await engines[0].schedule("u1", f"m{i}", daily("09:00"), "UTC", now=NOW)
+
+    for engine in engines:
+        await engine.tick(NOW + timedelta(minutes=1))
+
+    fired = [{medication_id for _, medication_id, _ in recorder.fired} for recorder in recorders]
+    assert fired[0] and fired[1]
+    assert fired[0] | fired[1] == {f"m{i}" for i in range(40)}
+    assert not fired[0] & fired[1]
+
+@pytest.mark.asyncio
+async def test_missed_minutes_are_caught_up_within_the_window(client):
+    recorder = Recorder()
+    engine = make_engine(client, recorder, catch_up_minutes=15)
+    await engine.tick(NOW)
+    await engine.schedule("u1", "m1", daily("09:00"), "UTC", now=NOW)
+    await engine.schedule("u1", "m2", daily("09:10"), "UTC", now=NOW)
+
+    # Down from 08:59 until 09:20: 09:00 is outside the window, 09:10 is not
+    await engine.tick(NOW + timedelta(minutes=21))
+
+    assert recorder.fired == [("u1", "m2", "09:10")]
+
+@pytest.mark.asyncio
+async def test_invalid_schedule_is_rejected_without_changes(client):
+    engine = make_engine(client, Recorder())
+    await engine.schedule("u1", "m1", daily("09:00"), "UTC", now=NOW)
+
+    with pytest.raises(ValueError):
+        await engine.schedule("u1", "m1", {"type": "weekly", "times": ["09:00"]}, "UTC", now=NOW)
+
+    assert await client.hget("reminder_entry:m1", "slot:09:00")
+
+@pytest.mark.asyncio
+async def test_custom_schedule_stops_after_end_date(client):
+    recorder = Recorder()
+    engine = make_engine(client, recorder)
+    schedule = {
+        "type": "custom",
+        "times": ["09:00"],
+        "interval": 2,
+        "startDate": "2025-01-06T09:00:00",
+        "endDate": "2025-01-07T09:00:00"
+    }
+    await engine.schedule("u1", "m1", schedule, "UTC", now=NOW)
+
+    assert await engine.tick(NOW + timedelta(minutes=1)) == 1
+    assert not await client.exists("reminder_entry:m1")
+
+@pytest.mark.asyncio
+async def test_bad_schedule_does_not_drop_the_rest_of_the_batch(client):
+    recorder = Recorder()
+    engine = make_engine(client, recorder)
+    await engine.schedule("u1", "a", daily("09:00"), "UTC", now=NOW)
+    await engine.schedule("u2", "b", daily("09:00"), "UTC", now=NOW)
+    await client.hset("reminder_entry:b", "schedule", json.dumps({"type": "bogus"}))
+
+    assert await engine.tick(NOW + timedelta(minutes=1)) == 1
+
+    assert recorder.fired == [("u1", "a", "09:00")]
+    next_fire = datetime(2025, 1, 7, 9, 0, tzinfo=pytz.UTC)
+    assert await client.hget("reminder_entry:a", "slot:09:00") == str(minute_of(next_fire))
+    assert not await client.exists("reminder_in_flight:" + str(reminder_engine.shard_for("b", 8)))
+
+@pytest.mark.asyncio
+async def test_interrupted_tick_is_recovered_after_the_lease(client):
+    recorder = Recorder()
+    engine = make_engine(client, recorder, in_flight_lease=300)
+    await engine.schedule("u1", "a", daily("09:00"), "UTC", now=NOW)
+
+    with patch.object(engine, "_reschedule", side_effect=RuntimeError("worker died")):
+        with pytest.raises(RuntimeError):
+            await engine.tick(NOW + timedelta(minutes=1))
+
+    # Still leased to the interrupted tick
+    assert await engine.tick(NOW + timedelta(minutes=2)) == 0
+    assert await engine.tick(NOW + timedelta(minutes=7)) == 1
+
+    assert recorder.fired == [("u1", "a", "09:00")]
+    next_fire = datetime(2025, 1, 7, 9, 0, tzinfo=pytz.UTC)
+    assert await client.hget("reminder_entry:a", "slot:09:00") == str(minute_of(next_fire))
+
+@pytest.mark.asyncio
+async def test_cancel_during_tick_leaves_no_partial_entry(server, client):
+    recorder = Recorder()
+    engine = make_engine(client, recorder)
+    await engine.schedule("u1", "a", daily("09:00"), "UTC", now=NOW)
+    other_node = fakeredis.FakeRedis(server=server, decode_responses=True)
+    build_trigger = reminder_engine.build_trigger
+
+    def cancel_then_build(*args):
+        other_node.delete("reminder_entry:a")
+        return build_trigger(*args)
+
+    with patch.object(reminder_engine, "build_trigger", side_effect=cancel_then_build):
+        assert await engine.tick(NOW + timedelta(minutes=1)) == 0
+
+    assert recorder.fired == []
+    assert not await client.exists("reminder_entry:a")
+
@@ -0,0 +1,133 @@
+"""Tests for the pooled SMTP transport."""
+
+import asyncio
+import pytest
+from email.message import EmailMessage
+
+import aiosmtplib
+
+from app.infrastructure.notification.smtp_pool import SMTPPool
+from tests.mock.mock_smtp import MockSMTPServer
+
+def make_message(index=0, to="patient@example.com", body="Time to take your medication"):
+    message = EmailMessage()
+    message["From"] = "reminders@example.com"
+    message["To"] = to
+    message["Subject"] = f"Reminder {index}"
+    message.set_content(body)
+    return message
+
+async def start_server(**kwargs):
+    return await MockSMTPServer(username="user", password="secret", **kwargs).start()
+
+def make_pool(server, **kwargs):
+    return SMTPPool("127.0.0.1", server.port, "user", "secret", **kwargs)
+
+@pytest.mark.asyncio
+async def test_connections_are_reused():
+    server = await start_server()
+    pool = make_pool(server, size=2)
+
+    for index in range(5):
+        await pool.send(make_message(index))
+    await pool.close()
+    await server.stop()
+
+    assert len(server.messages) == 5
+    assert server.connections == 1
+    assert server.commands.count("AUTH") == 1
+
+@pytest.mark.asyncio
+async def test_send_many_is_bounded_by_pool_size():
+    server = await start_server(latency=0.005)
+    pool = make_pool(server, size=3)
+
+    results = await pool.send_many(make_message(index) for index in range(20))
+    await pool.close()
+    await server.stop()
+
+    assert not [result for result in results if isinstance(result, Exception)]
+    assert len(server.messages) == 20
+    assert server.connections == 3
+
+@pytest.mark.asyncio
+async def test_rejected_recipients_are_reported():
+    server = await start_server()
+    pool = make_pool(server)
+
+    errors, _ = await pool.send(make_message(to="patient@example.com, bad@example.com"))
+    await pool.close()
+    await server.stop()
+
+    assert list(errors) == ["bad@example.com"]
+    assert errors["bad@example.com"].code == 550
+    assert server.messages[0][1] == ["patient@example.com"]
+
+@pytest.mark.asyncio
+async def test_refused_transaction_keeps_connection():
+    server = await start_server()
+    pool = make_pool(server)
+
+    with pytest.raises(aiosmtplib.SMTPRecipientsRefused):
+        await pool.send(make_message(to="bad@example.com"))
+    await pool.send(make_message())
+    await pool.close()
+    await server.stop()
+
+    assert "RSET" in server.commands
+    assert len(server.messages) == 1
+    assert server.connections == 1
+
+@pytest.mark.asyncio
+async def test_message_body_is_dot_stuffed():
+    server = await start_server()
+    pool = make_pool(server)
+
+    await pool.send(make_message(body="Dose log\n.\n..end"))
+    await pool.close()
+    await server.stop()
+
+    assert b"\r\n.\r\n..end" in server.messages[0][2]
+
+@pytest.mark.asyncio
+async def test_dropped_connection_is_replaced():
+    server = await start_server()
+    pool = make_pool(server)
+
+    await pool.send(make_message(0))
+    server.drop_connections()
+    await asyncio.sleep(0.01)
+    await pool.send(make_message(1))
+    await pool.close()
+    await server.stop()
+
+    assert len(server.messages) == 2
+    assert server.connections == 2
+
+@pytest.mark.asyncio
+async def test_idle_connection_is_health_checked():
+    server = await start_server()
+    pool = make_pool(server, health_check_after=0)
+
+    await pool.send(make_message(0))
+    await asyncio.sleep(0.01)
+    await pool.send(make_message(1))
+    await pool.close()
+    await server.stop()
+
+    assert pool.stats["health_checks"] == 1
+    assert "NOOP" in server.commands
+    assert server.connections == 1
+
+@pytest.mark.asyncio
+async def test_connection_recycled_after_max_messages():
+    server = await start_server()
+    pool = make_pool(server, max_messages=2)
+
+    for index in range(5):
+        await pool.send(make_message(index))
+    await pool.close()
+    await server.stop()
+
+    assert server.connections == 3
+    assert len(server.messages) == 5
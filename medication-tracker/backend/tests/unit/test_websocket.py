@@ -1,20 +1,29 @@
+import asyncio
+import json
 import pytest
-from unittest.mock import Mock, patch
+from unittest.mock import AsyncMock, Mock, patch
+import fakeredis
+import fakeredis.aioredis
 from fastapi import WebSocket
-from app.infrastructure.websocket.manager import ConnectionManager
+from app.infrastructure.websocket.manager import ConnectionManager, SLOW_CONSUMER_CLOSE_CODE
 from app.domain.notification.entities import Notification
 from datetime import datetime
 
 @pytest.fixture
-def connection_manager():
-    return ConnectionManager()
+async def connection_manager():
+    manager = ConnectionManager(routing=False)
+    yield manager
+    await manager.close()
 
-@pytest.fixture
-def mock_websocket():
+def make_websocket():
     websocket = Mock(spec=WebSocket)
-    websocket.send_json = Mock()
+    websocket.send_text = AsyncMock()
     return websocket
 
+@pytest.fixture
+def mock_websocket():
+    return make_websocket()
+
 @pytest.fixture
 def sample_notification():
     return Notification(
@@ -51,10 +60,11 @@ async def test_send_notification(connection_manager, mock_websocket, sample_noti
 
     # Execute
     await connection_manager.send_notification("1", sample_notification)
+    await connection_manager.flush()
 
     # Assert
-    mock_websocket.send_json.assert_called_once()
-    sent_message = mock_websocket.send_json.call_args[0][0]
+    mock_websocket.send_text.assert_called_once()
+    sent_message = json.loads(mock_websocket.send_text.call_args[0][0])
     assert sent_message["type"] == "notification"
     assert sent_message["data"]["id"] == str(sample_notification.id)
     assert sent_message["data"]["title"] == sample_notification.title
@@ -66,11 +76,12 @@ async def test_send_notification_no_connections(connection_manager, sample_notif
 
 async def test_send_notification_failed_connection(connection_manager, mock_websocket, sample_notification):
     # Setup
-    mock_websocket.send_json.side_effect = Exception("Connection error")
+    mock_websocket.send_text.side_effect = Exception("Connection error")
     connection_manager.active_connections["1"] = {mock_websocket}
 
     # Execute
     await connection_manager.send_notification("1", sample_notification)
+    await connection_manager.flush()
 
     # Assert
     assert "1" not in connection_manager.active_connections
@@ -82,17 +93,17 @@ async def test_broadcast_system_message(connection_manager, mock_websocket):
 
     # Execute
     await connection_manager.broadcast_system_message("Test system message")
+    await connection_manager.flush()
 
     # Assert
-    assert mock_websocket.send_json.call_count == 2
-    sent_message = mock_websocket.send_json.call_args[0][0]
+    assert mock_websocket.send_text.call_count == 2
+    sent_message = json.loads(mock_websocket.send_text.call_args[0][0])
     assert sent_message["type"] == "system"
     assert sent_message["data"]["message"] == "Test system message"
 
-async def test_multiple_connections_same_user(connection_manager, mock_websocket):
+async def test_multiple_connections_same_user(connection_manager, mock_websocket, sample_notification):
     # Setup
-    another_websocket = Mock(spec=WebSocket)
-    another_websocket.send_json = Mock()
+    another_websocket = make_websocket()
 
     # Execute
     await connection_manager.connect(mock_websocket, "user1")
@@ -102,7 +113,84 @@ async def test_multiple_connections_same_user(connection_manager, mock_websocket
     assert len(connection_manager.active_connections["user1"]) == 2
 
     # Test sending notification
-    notification = sample_notification()
-    await connection_manager.send_notification("1", notification)
-    assert mock_websocket.send_json.called
-    assert another_websocket.send_json.called
+    await connection_manager.send_notification("user1", sample_notification)
+    await connection_manager.flush()
+    assert mock_websocket.send_text.called
+    assert another_websocket.send_text.called
+
+async def test_slow_client_does_not_delay_other_devices(connection_manager, sample_notification):
+    # Setup
+    release = asyncio.Event()
+    slow_websocket = make_websocket()
+
+    async def slow_send(text):
+        await release.wait()
+    slow_websocket.send_text.side_effect = slow_send
+    fast_websocket = make_websocket()
+    await connection_manager.connect(slow_websocket, "user1")
+    await connection_manager.connect(fast_websocket, "user1")
+
+    # Execute
+    await connection_manager.send_notification("user1", sample_notification)
+    await asyncio.wait_for(connection_manager.writers[fast_websocket].drain(), timeout=1.0)
+
+    # Assert
+    fast_websocket.send_text.assert_called_once()
+    release.set()
+
+async def test_full_send_queue_closes_connection(sample_notification):
+    # Setup
+    connection_manager = ConnectionManager(routing=False, max_queue=2)
+    stuck_websocket = make_websocket()
+
+    async def stuck_send(text):
+        await asyncio.Event().wait()
+    stuck_websocket.send_text.side_effect = stuck_send
+    await connection_manager.connect(stuck_websocket, "user1")
+
+    # Execute: one message in flight and two queued fill the outbox
+    for _ in range(4):
+        await connection_manager.send_notification("user1", sample_notification)
+        await asyncio.sleep(0)
+    await asyncio.sleep(0)
+
+    # Assert
+    assert "user1" not in connection_manager.active_connections
+    stuck_websocket.close.assert_called_once_with(code=SLOW_CONSUMER_CLOSE_CODE)
+    await connection_manager.close()
+
+async def test_broadcast_is_serialized_once(connection_manager):
+    # Setup
+    websockets = [make_websocket() for _ in range(5)]
+    for index, websocket in enumerate(websockets):
+        await connection_manager.connect(websocket, f"user{index}")
+
+    # Execute
+    with patch("app.infrastructure.websocket.manager.json.dumps", wraps=json.dumps) as dumps:
+        await connection_manager.broadcast_system_message("Maintenance at 22:00")
+    await connection_manager.flush()
+
+    # Assert
+    dumps.assert_called_once()
+    assert len({websocket.send_text.call_args[0][0] for websocket in websockets}) == 1
+
+async def test_notification_reaches_user_on_another_node(sample_notification):
+    # Setup: two nodes sharing one Redis
+    server = fakeredis.FakeServer()
+    node_a = ConnectionManager(fakeredis.aioredis.FakeRedis(server=server, decode_responses=True), routing=True)
+    node_b = ConnectionManager(fakeredis.aioredis.FakeRedis(server=server, decode_responses=True), routing=True)
+    websocket = make_websocket()
+    await node_b.connect(websocket, "1")
+
+    # Execute
+    await node_a.send_notification("1", sample_notification)
+    for _ in range(100):
+        if websocket.send_text.called:
+            break
+        await asyncio.sleep(0.01)
+
+    # Assert
+    websocket.send_text.assert_called_once()
+    assert json.loads(websocket.send_text.call_args[0][0])["data"]["title"] == sample_notification.title
+    await node_a.close()
+    await node_b.close()
@@ -3,6 +3,7 @@
 import pytest
 from datetime import datetime, timedelta
 from unittest.mock import Mock, patch, MagicMock
+import fakeredis
 import redis
 from rq.job import Job
 
@@ -99,41 +100,52 @@ class TestReminderWorker:
         """Test processing of due reminders."""
         # Setup
         current_time = datetime.utcnow()
-        reminder_worker.medication_repository.get_due_medications.return_value = [sample_medication]
+        reminder_worker.medication_repository.iter_due_medications.return_value = iter([[sample_medication]])
+        reminder_worker.redis_conn = fakeredis.FakeRedis()
+        reminder_worker.queue.enqueue_many.return_value = [Mock(spec=Job, id="job-1")]
         
         # Execute
         reminder_worker.process_reminders()
         
         # Verify
-        reminder_worker.medication_repository.get_due_medications.assert_called_once()
-        assert reminder_worker.queue.enqueue.called
-
-    def test_rate_limiting(self, reminder_worker):
-        """Test rate limiting functionality."""
-        user_id = 1
-        
-        # First attempt should not be rate limited
-        reminder_worker.redis_conn.get.return_value = None
-        assert not reminder_worker._is_rate_limited(user_id)
-        
-        # Simulate max attempts
-        reminder_worker.redis_conn.get.return_value = str(
-            reminder_worker.settings.MAX_REMINDERS_PER_15_MIN
+        reminder_worker.medication_repository.iter_due_medications.assert_called_once()
+        assert reminder_worker.queue.enqueue_many.called
+
+    def test_batch_rate_limits_use_one_round_trip(self, reminder_worker):
+        """Test the pipelined rate limit check for a whole batch."""
+        reminder_worker.redis_conn = fakeredis.FakeRedis()
+        reminder_worker.redis_conn.set("reminder_rate_limit:2", 4)
+        limit = reminder_worker.settings.MAX_REMINDERS_PER_15_MIN
+
+        with patch.object(reminder_worker.redis_conn, 'pipeline', wraps=reminder_worker.redis_conn.pipeline) as pipeline:
+            allowed = reminder_worker._check_rate_limits([1] * (limit + 1) + [2, 2, 3])
+
+        pipeline.assert_called_once()
+        assert allowed == [True] * limit + [False] + [True, False, True]
+        assert reminder_worker.redis_conn.ttl("reminder_rate_limit:1") > 0
+        assert reminder_worker._check_rate_limits([3]) == [True]
+
+    def test_batch_rate_limit_redis_error(self, reminder_worker):
+        """Test that the batch rate limit check fails open."""
+        reminder_worker.redis_conn.pipeline.side_effect = redis.RedisError("Test error")
+
+        assert reminder_worker._check_rate_limits([1, 1]) == [True, True]
+
+    def test_process_reminders_in_batches(self, reminder_worker, sample_medication):
+        """Test that each batch is rate limited and enqueued in one call."""
+        reminder_worker.redis_conn = fakeredis.FakeRedis()
+        reminder_worker.medication_repository.iter_due_medications.return_value = iter(
+            [[sample_medication] * 3, [sample_medication] * 3]
         )
-        
-        # Should be rate limited now
-        assert reminder_worker._is_rate_limited(user_id)
+        reminder_worker.queue.enqueue_many.side_effect = lambda jobs: [Mock(spec=Job, id=str(i)) for i in range(len(jobs))]
 
-    def test_create_notification_job(self, reminder_worker, sample_medication):
-        """Test creation of notification job."""
-        current_time = datetime.utcnow()
-        mock_job = Mock(spec=Job)
-        reminder_worker.queue.enqueue.return_value = mock_job
-
-        job = reminder_worker._create_notification_job(sample_medication, current_time)
+        with patch.object(reminder_worker.queue, 'enqueue') as enqueue:
+            reminder_worker.process_reminders()
 
-        assert job == mock_job
-        reminder_worker.queue.enqueue.assert_called_once()
+        enqueue.assert_not_called()
+        queued = [len(call.args[0]) for call in reminder_worker.queue.enqueue_many.call_args_list]
+        # Both batches are for the same user, so the second stops at the limit
+        assert queued == [3, reminder_worker.settings.MAX_REMINDERS_PER_15_MIN - 3]
 
     def test_cleanup_old_jobs(self, reminder_worker):
         """Test cleanup of old jobs."""
@@ -159,19 +171,11 @@ class TestReminderWorker:
             assert old_job.delete.called
             assert not recent_job.delete.called
 
-    def test_process_medication_reminder_error(self, reminder_worker, sample_medication):
-        """Test error handling in medication reminder processing."""
+    def test_process_reminder_batch_error(self, reminder_worker, sample_medication):
+        """Test error handling in reminder batch processing."""
         current_time = datetime.utcnow()
-        reminder_worker.queue.enqueue.side_effect = Exception("Test error")
+        reminder_worker.redis_conn = fakeredis.FakeRedis()
+        reminder_worker.queue.enqueue_many.side_effect = Exception("Test error")
 
         with pytest.raises(Exception):
-            reminder_worker._process_medication_reminder(sample_medication, current_time)
-
-    @patch('app.workers.reminder_worker.logger')
-    def test_rate_limit_redis_error(self, mock_logger, reminder_worker):
-        """Test handling of Redis errors in rate limiting."""
-        reminder_worker.redis_conn.get.side_effect = redis.RedisError("Test error")
-        
-        # Should fail open (return False) when Redis errors
-        assert not reminder_worker._is_rate_limited(1)
-        mock_logger.error.assert_called_once()
+            reminder_worker._process_reminder_batch([sample_medication], current_time)
@@ -0,0 +1,138 @@
+"""Tests for the PDF compliance report render queue."""
+
+import io
+import threading
+import time
+import fakeredis
+import pytest
+from unittest.mock import MagicMock, Mock, patch
+from rq.exceptions import NoSuchJobError
+
+from app.workers import report_worker
+from app.workers.report_worker import ReportRenderQueue, cache_name, report_cache_key
+
+REPORT = {
+    'overall_compliance': 75.0,
+    'medications': [{'id': 1, 'name': 'Warfarin', 'total_doses': 4, 'doses_taken': 3}],
+    'missed_doses': [{'medication_name': 'Warfarin', 'scheduled_time': '2024-01-02T09:00:00', 'reason': None}],
+    'date_range': {'start': '2024-01-01T00:00:00', 'end': '2024-01-31T00:00:00'}
+}
+
+def make_job(status, user_id=1):
+    job = Mock()
+    job.get_status.return_value = status
+    job.args = (user_id, REPORT, 'key')
+    return job
+
+@pytest.fixture
+def mock_redis():
+    """Mock Redis connection with an empty report cache."""
+    conn = MagicMock()
+    conn.exists.return_value = 0
+    return conn
+
+@pytest.fixture
+def mock_queue():
+    with patch.object(report_worker, 'Queue') as queue:
+        yield queue.return_value
+
+@pytest.fixture
+def mock_fetch():
+    with patch.object(report_worker.Job, 'fetch') as fetch:
+        fetch.side_effect = NoSuchJobError()
+        yield fetch
+
+def test_cache_key_is_content_addressed():
+    reordered = {key: REPORT[key] for key in reversed(list(REPORT))}
+    changed = dict(REPORT, overall_compliance=80.0)
+
+    assert report_cache_key(1, REPORT) == report_cache_key('1', reordered)
+    assert report_cache_key(1, REPORT) != report_cache_key(2, REPORT)
+    assert report_cache_key(1, REPORT) != report_cache_key(1, changed)
+
+def test_cached_report_is_not_requeued(mock_redis, mock_queue, mock_fetch):
+    mock_redis.exists.return_value = 1
+
+    key, job = ReportRenderQueue(mock_redis).submit(1, REPORT)
+
+    assert job is None
+    mock_redis.exists.assert_called_with(cache_name(1, key))
+    mock_queue.enqueue.assert_not_called()
+
+def test_submit_enqueues_render_under_cache_key(mock_redis, mock_queue, mock_fetch):
+    key, job = ReportRenderQueue(mock_redis).submit(1, REPORT)
+
+    assert job is mock_queue.enqueue.return_value
+    args, kwargs = mock_queue.enqueue.call_args
+    assert args == (report_worker.render_compliance_report, 1, REPORT, key)
+    assert kwargs['job_id'] == key
+
+def test_pending_job_is_shared(mock_redis, mock_queue, mock_fetch):
+    pending = make_job('started')
+    mock_fetch.side_effect = None
+    mock_fetch.return_value = pending
+
+    _, job = ReportRenderQueue(mock_redis).submit(1, REPORT)
+
+    assert job is pending
+    mock_queue.enqueue.assert_not_called()
+
+def test_concurrent_misses_enqueue_once(mock_queue, mock_fetch):
+    """Two submitters racing on a cache miss queue a single render."""
+    jobs = []
+
+    def fetch(key, connection):
+        found = list(jobs)
+        time.sleep(0.05)
+        if not found:
+            raise NoSuchJobError()
+        return found[0]
+
+    mock_fetch.side_effect = fetch
+    mock_queue.enqueue.side_effect = lambda *args, **kwargs: jobs.append(make_job('queued')) or jobs[-1]
+    render_queue = ReportRenderQueue(fakeredis.FakeRedis())
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(render_queue.submit(1, REPORT)[1]))
+        for _ in range(2)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert mock_queue.enqueue.call_count == 1
+    assert results == [jobs[0], jobs[0]]
+
+@pytest.mark.parametrize("status", ['failed', 'finished'])
+def test_stale_job_is_replaced(mock_redis, mock_queue, mock_fetch, status):
+    stale = make_job(status)
+    mock_fetch.side_effect = None
+    mock_fetch.return_value = stale
+
+    _, job = ReportRenderQueue(mock_redis).submit(1, REPORT)
+
+    stale.delete.assert_called_once()
+    assert job is mock_queue.enqueue.return_value
+
+def test_status_is_scoped_to_the_owner(mock_redis, mock_queue, mock_fetch):
+    render_queue = ReportRenderQueue(mock_redis)
+    mock_fetch.side_effect = None
+    mock_fetch.return_value = make_job('queued', user_id=1)
+
+    assert render_queue.status(1, 'key') == 'queued'
+    assert render_queue.status(2, 'key') is None
+
+    mock_redis.exists.side_effect = lambda name: name == cache_name(1, 'key')
+    assert render_queue.status(1, 'key') == 'finished'
+
+def test_render_job_stores_pdf(mock_redis):
+    with patch('app.services.report_service.ReportService.generate_pdf_report') as render, \
+            patch.object(report_worker, 'get_current_job') as current_job:
+        render.return_value = io.BytesIO(b'%PDF-1.4')
+        current_job.return_value.connection = mock_redis
+
+        assert report_worker.render_compliance_report(1, REPORT, 'key') == 'key'
+
+    mock_redis.setex.assert_called_once_with(cache_name(1, 'key'), report_worker.CACHE_TTL_SECONDS, b'%PDF-1.4')